@@ -27,6 +27,7 @@ from fastapi.responses import JSONResponse
 
 # Shared imports
 from shared.database import init_db, get_db
+from shared.services.http_client import close_http_clients
 from shared.auth import verify_token
 
 # Local imports
@@ -50,6 +51,7 @@ async def lifespan(app: FastAPI):
     yield
     
     logger.info("[BYE] Shutting down Harf Platform...")
+    await close_http_clients()
 
 
 # Create FastAPI app
@@ -2,7 +2,7 @@
 Lessions Platform Backend - Lessons Router
 Darsliklar yaratish va boshqarish (PostgreSQL)
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from pydantic import BaseModel, Field
@@ -12,6 +12,7 @@ import logging
 from shared.database import get_db
 from shared.database.models.story import Story
 from shared.database.models.book import Book, BookReadingRecord
+from shared.services.tts_render_service import TTSRenderer, get_tts_renderer
 from app.lessons.models import Lesson, LessonProgress as LessonProgressModel, LessonStatus
 
 logger = logging.getLogger("lessions")
@@ -358,6 +359,7 @@ async def create_ertak(
     db.add(ertak)
     await db.commit()
     await db.refresh(ertak)
+    get_tts_renderer().prerender(ertak.content, ertak.language or "uz", "female")
 
     logger.info(f"Ertak created: {data.title} (ID: {ertak.id})")
     return {"success": True, "data": _ertak_to_dict(ertak)}
@@ -681,7 +683,7 @@ async def evaluate_quiz_answer_text(
     admin bergan to'g'ri javob bilan 100 ballik shkalada solishtiriladi.
     OpenAI semantic baholash qo'llaniladi, xato bo'lsa difflib fallback.
     """
-    import httpx, os
+    import os
     res = await db.execute(select(Story).where(Story.id == ertak_id))
     ertak = res.scalars().first()
     if not ertak:
@@ -702,31 +704,31 @@ async def evaluate_quiz_answer_text(
 
     if api_key and recognized_clean and correct_answer:
         try:
-            async with httpx.AsyncClient(timeout=15) as client:
-                prompt = (
-                    f"Savol: {question_text}\n"
-                    f"To'g'ri javob: {correct_answer}\n"
-                    f"Bola aytgan: {recognized_clean}\n\n"
-                    "Bolaning javobi ma'nosi jihatidan to'g'ri javobga qanchalik mos kelishini "
-                    "0 dan 100 gacha faqat bitta butun son bilan baholang. "
-                    "100 = to'liq mos, 0 = mutlaqo noto'g'ri. "
-                    "Faqat son qaytaring, boshqa hech narsa yozmang."
-                )
-                resp = await client.post(
-                    "https://api.openai.com/v1/chat/completions",
-                    headers={"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
-                    json={
-                        "model": "gpt-4o-mini",
-                        "messages": [{"role": "user", "content": prompt}],
-                        "temperature": 0.0,
-                        "max_tokens": 5,
-                    }
-                )
-                if resp.status_code == 200:
-                    raw = resp.json()["choices"][0]["message"]["content"].strip()
-                    digits = "".join(filter(str.isdigit, raw))[:3]
-                    score = max(0, min(100, int(digits or "0")))
-                    ai_used = True
+            prompt = (
+                f"Savol: {question_text}\n"
+                f"To'g'ri javob: {correct_answer}\n"
+                f"Bola aytgan: {recognized_clean}\n\n"
+                "Bolaning javobi ma'nosi jihatidan to'g'ri javobga qanchalik mos kelishini "
+                "0 dan 100 gacha faqat bitta butun son bilan baholang. "
+                "100 = to'liq mos, 0 = mutlaqo noto'g'ri. "
+                "Faqat son qaytaring, boshqa hech narsa yozmang."
+            )
+            resp = await get_http_client("openai").post(
+                "https://api.openai.com/v1/chat/completions",
+                headers={"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
+                json={
+                    "model": "gpt-4o-mini",
+                    "messages": [{"role": "user", "content": prompt}],
+                    "temperature": 0.0,
+                    "max_tokens": 5,
+                },
+                timeout=15,
+            )
+            if resp.status_code == 200:
+                raw = resp.json()["choices"][0]["message"]["content"].strip()
+                digits = "".join(filter(str.isdigit, raw))[:3]
+                score = max(0, min(100, int(digits or "0")))
+                ai_used = True
         except Exception as e:
             logger.warning(f"AI evaluation failed, falling back to difflib: {e}")
 
@@ -757,11 +759,10 @@ async def evaluate_quiz_answer_text(
 
 # ============= TTS — Ertakni AI o'qib berish (OpenAI) =============
 
-from fastapi import Response as FastAPIResponse
 from pydantic import BaseModel as TTSBaseModel
-import httpx
 import os
 from shared.services.azure_speech_service import speech_service
+from shared.services.http_client import get_http_client
 
 class TTSRequest(TTSBaseModel):
     text: str
@@ -779,24 +780,50 @@ TTS_MODEL = os.getenv("OPENAI_TTS_MODEL", "tts-1-hd")   # e.g gpt-4o-mini-tts
 TTS_SPEED = 0.95          # sekinroq — bolalar uchun
 
 
+async def _openai_synthesize(text: str, language: str, voice: str) -> bytes:
+    response = await get_http_client("openai").post(
+        OPENAI_TTS_URL,
+        headers={
+            "Authorization": f"Bearer {os.getenv('OPENAI_API_KEY', '')}",
+            "Content-Type": "application/json",
+        },
+        json={
+            "model": TTS_MODEL,
+            "input": text,
+            "voice": voice,
+            "speed": TTS_SPEED,
+            "response_format": "mp3",
+        },
+        idempotent=True,
+    )
+    if response.status_code != 200:
+        logger.error(f"OpenAI TTS error: {response.status_code}")
+        raise HTTPException(status_code=500, detail=f"OpenAI xatoligi: {response.status_code}")
+    return response.content
+
+
+# OpenAI ovozlari (shimmer, nova) uchun — bo'laklar audio_cache'da Azure'dan alohida kalitda
+openai_tts_renderer = TTSRenderer(_openai_synthesize)
+
+
+@router.get("/ertaklar/{ertak_id}/tts")
 @router.post("/ertaklar/{ertak_id}/tts")
 async def ertak_tts(
     ertak_id: str,
+    request: Request,
     db: AsyncSession = Depends(get_db),
 ):
-    """AI yordamida ertakni o'qib berish (Azure TTS)"""
+    """AI yordamida ertakni o'qib berish (Azure TTS, oldindan ovozlashtirilgan bo'laklar)"""
     res = await db.execute(select(Story).where(Story.id == ertak_id))
     ertak = res.scalars().first()
     if not ertak:
         raise HTTPException(status_code=404, detail="Ertak topilmadi")
 
     lang = ertak.language or "uz"
-    text = (ertak.content or "")[:4096]
+    text = ertak.content or ""
 
     try:
-        # Generate Audio using Azure Speech Services
-        audio_content = await speech_service.text_to_speech(text=text, language=lang, gender="female")
-        return FastAPIResponse(content=audio_content, media_type="audio/mpeg")
+        return await get_tts_renderer().audio_response(request, text, lang, "female", db)
 
     except HTTPException:
         raise
@@ -806,7 +833,11 @@ async def ertak_tts(
 
 
 @router.post("/tts")
-async def general_tts(data: TTSRequest):
+async def general_tts(
+    data: TTSRequest,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+):
     """Umumiy TTS endpoint — istalgan matnni o'qib berish (OpenAI HD)"""
     if not data.text or not data.text.strip():
         raise HTTPException(status_code=400, detail="Matn kiritilmadi")
@@ -818,25 +849,7 @@ async def general_tts(data: TTSRequest):
     voice = LANGUAGE_VOICES.get(lang, "shimmer")
 
     try:
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(
-                OPENAI_TTS_URL,
-                headers={
-                    "Authorization": f"Bearer {api_key}",
-                    "Content-Type": "application/json",
-                },
-                json={
-                    "model": TTS_MODEL,
-                    "input": data.text[:4096],
-                    "voice": voice,
-                    "speed": TTS_SPEED,
-                    "response_format": "mp3",
-                },
-            )
-            if response.status_code != 200:
-                logger.error(f"OpenAI TTS error: {response.status_code}")
-                raise HTTPException(status_code=500, detail=f"OpenAI xatoligi: {response.status_code}")
-            return FastAPIResponse(content=response.content, media_type="audio/mpeg")
+        return await openai_tts_renderer.audio_response(request, data.text[:4096], lang, voice, db)
     except Exception as e:
         logger.error(f"TTS error: {e}")
         raise HTTPException(status_code=500, detail=f"TTS xatoligi: {str(e)}")
@@ -848,9 +861,11 @@ from fastapi import Query
 
 @router.get("/speech/tts")
 async def speech_tts_get(
+    request: Request,
     text: str = Query(..., description="O'qiladigan matn"),
     language: str = Query("uz", description="Til: uz, ru, en"),
     gender: str = Query("female", description="Ovoz jinsi: male, female"),
+    db: AsyncSession = Depends(get_db),
 ):
     """
     GET /speech/tts?text=...&language=uz&gender=female
@@ -861,12 +876,8 @@ async def speech_tts_get(
         raise HTTPException(status_code=400, detail="Matn kiritilmadi")
 
     try:
-        audio_content = await speech_service.text_to_speech(
-            text=text[:4096],
-            language=language,
-            gender=gender,
-        )
-        return FastAPIResponse(content=audio_content, media_type="audio/mpeg")
+        voice = gender if gender in ("male", "female") else "female"
+        return await get_tts_renderer().audio_response(request, text[:4096], language, voice, db)
     except HTTPException:
         raise
     except Exception as e:
@@ -910,13 +921,14 @@ async def evaluate_quiz_general(request: EvaluateQuizRequest):
             client = AsyncAzureOpenAI(
                 api_key=api_key,
                 api_version=os.getenv("AZURE_OPENAI_API_VERSION", "2024-02-01"),
-                azure_endpoint=endpoint
+                azure_endpoint=endpoint,
+                http_client=get_http_client("azure_openai").pool,
             )
             model_kwargs = {"model": deployment_name}
         else:
             # Standard OpenAI or custom endpoint (like sambanova)
             base_url = endpoint if endpoint else None
-            client = AsyncOpenAI(api_key=api_key, base_url=base_url)
+            client = AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=get_http_client("openai").pool)
             model_kwargs = {"model": deployment_name if endpoint else "gpt-4o-mini"}
 
         lang = request.language or "uz-UZ"
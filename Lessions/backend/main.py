@@ -26,7 +26,9 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
 # Shared imports
-from shared.database import init_db, get_db
+from shared.database import init_db, get_db, AsyncSessionLocal
+from shared.services.audio_cache_service import start_audio_cache_maintenance, stop_audio_cache_maintenance
+from shared.services.http_client import close_http_clients
 from shared.auth import verify_token
 from shared.database.models import User, AccountStatus
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -82,9 +84,16 @@ async def lifespan(app: FastAPI):
     await init_db()
     logger.info("[OK] Database initialized")
 
+    # TTS audio keshi: inline qatorlarni blob'ga ko'chirish va eviction
+    if AsyncSessionLocal is not None:
+        start_audio_cache_maintenance(AsyncSessionLocal)
+
     yield
 
     logger.info("[BYE] Shutting down Lessions Platform...")
+    # Yig'ilgan audio cache hit'larini yozib qo'yish
+    await stop_audio_cache_maintenance()
+    await close_http_clients()
 
 
 # Create FastAPI app
@@ -0,0 +1,44 @@
+"""Audio cache: blob offload + last access
+
+audio_cache qatori endi faqat metadata saqlaydi; audio baytlari storage_key
+bo'yicha Azure Blob yoki lokal diskda. last_accessed_at eviction uchun.
+
+Revision ID: 042
+Revises: 041
+Create Date: 2026-06-10
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import text
+
+revision = '042'
+down_revision = '041'
+branch_labels = None
+depends_on = None
+
+
+def _column_exists(conn, table, column):
+    result = conn.execute(text(
+        f"SELECT column_name FROM information_schema.columns "
+        f"WHERE table_name='{table}' AND column_name='{column}'"
+    ))
+    return result.fetchone() is not None
+
+
+def upgrade():
+    conn = op.get_bind()
+
+    if not _column_exists(conn, 'audio_cache', 'storage_key'):
+        op.add_column('audio_cache', sa.Column('storage_key', sa.String(length=300), nullable=True))
+
+    if not _column_exists(conn, 'audio_cache', 'last_accessed_at'):
+        op.add_column('audio_cache', sa.Column('last_accessed_at', sa.DateTime(timezone=True), nullable=True))
+        conn.execute(text("UPDATE audio_cache SET last_accessed_at = COALESCE(updated_at, created_at)"))
+
+    op.execute("CREATE INDEX IF NOT EXISTS ix_audio_cache_last_accessed_at ON audio_cache (last_accessed_at)")
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS ix_audio_cache_last_accessed_at")
+    op.drop_column('audio_cache', 'last_accessed_at')
+    op.drop_column('audio_cache', 'storage_key')
@@ -0,0 +1,46 @@
+"""Telegram broadcasts progress table
+
+Ommaviy Telegram xabarlari holati: yuborilganlar soni va kursor, uzilgan
+broadcast shu yerdan davom ettiriladi.
+
+Revision ID: 043
+Revises: 042
+Create Date: 2026-06-14
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '043'
+down_revision = '042'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    if 'telegram_broadcasts' in inspector.get_table_names():
+        return
+
+    op.create_table(
+        'telegram_broadcasts',
+        sa.Column('id', sa.String(length=8), primary_key=True),
+        sa.Column('message', sa.Text(), nullable=False),
+        sa.Column('parse_mode', sa.String(length=20), nullable=True),
+        sa.Column('filter_type', sa.String(length=20), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False, server_default='pending'),
+        sa.Column('total', sa.Integer(), nullable=True, server_default='0'),
+        sa.Column('sent', sa.Integer(), nullable=True, server_default='0'),
+        sa.Column('failed', sa.Integer(), nullable=True, server_default='0'),
+        sa.Column('last_recipient_id', sa.String(length=8), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index('ix_telegram_broadcasts_status', 'telegram_broadcasts', ['status'])
+
+
+def downgrade():
+    op.drop_index('ix_telegram_broadcasts_status', table_name='telegram_broadcasts')
+    op.drop_table('telegram_broadcasts')
@@ -0,0 +1,44 @@
+"""Telegram outbox queue
+
+Vazifa/taklif xabarlari uchun Telegram chiqish navbati: amal bilan bir
+tranzaksiyada yoziladi, fon worker'i limitlar bilan yuboradi.
+
+Revision ID: 044
+Revises: 043
+Create Date: 2026-06-21
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '044'
+down_revision = '043'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    if 'telegram_outbox' in inspector.get_table_names():
+        return
+
+    op.create_table(
+        'telegram_outbox',
+        sa.Column('id', sa.String(length=36), primary_key=True),
+        sa.Column('user_id', sa.String(length=8), nullable=True),
+        sa.Column('chat_id', sa.String(length=50), nullable=False),
+        sa.Column('text', sa.Text(), nullable=False),
+        sa.Column('parse_mode', sa.String(length=20), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False, server_default='pending'),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('next_attempt_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column('sent_at', sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index('idx_telegram_outbox_due', 'telegram_outbox', ['status', 'next_attempt_at'])
+
+
+def downgrade():
+    op.drop_index('idx_telegram_outbox_due', table_name='telegram_outbox')
+    op.drop_table('telegram_outbox')
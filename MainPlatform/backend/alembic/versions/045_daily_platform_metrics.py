@@ -0,0 +1,67 @@
+"""Daily platform metrics rollups
+
+Admin dashboard uchun kunlik ko'rsatkichlar jadvali va kun x foydalanuvchi
+login jadvali (bir necha kunlik unique loginlar uchun). To'ldirish:
+python rebuild_daily_metrics.py
+
+Revision ID: 045
+Revises: 044
+Create Date: 2026-07-02
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '045'
+down_revision = '044'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    tables = inspector.get_table_names()
+
+    if 'daily_platform_metrics' not in tables:
+        op.create_table(
+            'daily_platform_metrics',
+            sa.Column('day', sa.Date(), primary_key=True),
+            sa.Column('new_users', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('new_by_role', sa.JSON(), nullable=True),
+            sa.Column('logins', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('unique_logins', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('revenue', sa.BigInteger(), nullable=False, server_default='0'),
+            sa.Column('subscriptions_started', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('coins_earned', sa.BigInteger(), nullable=False, server_default='0'),
+            sa.Column('coins_spent', sa.BigInteger(), nullable=False, server_default='0'),
+            sa.Column('users_total', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('users_by_role', sa.JSON(), nullable=True),
+            sa.Column('active_users', sa.Integer(), nullable=True),
+            sa.Column('active_subscriptions', sa.Integer(), nullable=True),
+            sa.Column('subscribers', sa.Integer(), nullable=True),
+            sa.Column('coins_in_circulation', sa.BigInteger(), nullable=True),
+            sa.Column('coin_rich_users', sa.Integer(), nullable=True),
+            sa.Column('computed_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+
+    if 'user_daily_logins' not in tables:
+        op.create_table(
+            'user_daily_logins',
+            sa.Column('day', sa.Date(), primary_key=True),
+            sa.Column('user_id', sa.String(length=8), primary_key=True),
+        )
+
+    # Rollup kun oralig'i bo'yicha o'qiydi: created_at ustida indekslar
+    existing = {ix['name'] for ix in inspector.get_indexes('user_geo_logs')} if 'user_geo_logs' in tables else set()
+    if 'user_geo_logs' in tables and 'idx_geo_action_created' not in existing:
+        op.create_index('idx_geo_action_created', 'user_geo_logs', ['action', 'created_at'])
+    existing = {ix['name'] for ix in inspector.get_indexes('users')} if 'users' in tables else set()
+    if 'users' in tables and 'ix_users_created_at' not in existing:
+        op.create_index('ix_users_created_at', 'users', ['created_at'])
+
+
+def downgrade():
+    op.drop_index('ix_users_created_at', table_name='users')
+    op.drop_index('idx_geo_action_created', table_name='user_geo_logs')
+    op.drop_table('user_daily_logins')
+    op.drop_table('daily_platform_metrics')
@@ -0,0 +1,57 @@
+"""Users search trigram index and keyset index
+
+Admin foydalanuvchilar ro'yxati uchun:
+- (created_at, id) — keyset sahifalash (ORDER BY created_at DESC, id DESC)
+- pg_trgm GIN indeks app.services.admin_browser.user_search_expr() ifodasi
+  ustida — '%x%' qidiruvi butun jadvalni skan qilmaydi. Ifoda o'zgarsa
+  indeks ham qayta yaratilishi kerak.
+
+pg_trgm kengaytmasini yaratishga ruxsat bo'lmasa trigram indeks o'tkazib
+yuboriladi (qidiruv ishlaydi, faqat sekinroq).
+
+Revision ID: 046
+Revises: 045
+Create Date: 2026-07-09
+"""
+import logging
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = '046'
+down_revision = '045'
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+SEARCH_EXPR = (
+    "lower(coalesce(first_name, '') || ' ' || coalesce(last_name, '') || ' ' "
+    "|| coalesce(email, '') || ' ' || coalesce(phone, ''))"
+)
+
+
+def upgrade():
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    if 'users' not in inspector.get_table_names():
+        return
+    existing = {ix['name'] for ix in inspector.get_indexes('users')}
+
+    if 'ix_users_created_id' not in existing:
+        op.create_index('ix_users_created_id', 'users', ['created_at', 'id'])
+
+    if conn.dialect.name != 'postgresql' or 'ix_users_search_trgm' in existing:
+        return
+    try:
+        with conn.begin_nested():
+            conn.execute(sa.text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    except Exception as e:
+        logger.warning(f"pg_trgm yaratilmadi, trigram indeks o'tkazib yuborildi: {e}")
+        return
+    op.execute(f"CREATE INDEX ix_users_search_trgm ON users USING gin (({SEARCH_EXPR}) gin_trgm_ops)")
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS ix_users_search_trgm")
+    op.drop_index('ix_users_created_id', table_name='users')
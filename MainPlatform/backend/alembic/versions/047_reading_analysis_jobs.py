@@ -0,0 +1,44 @@
+"""Reading analysis jobs queue
+
+O'qish musobaqasi ovoz yozuvlarini fon tahlili navbati (Olimp
+app/reading/analysis.py worker'i). session_id — idempotentlik kaliti.
+
+Revision ID: 047
+Revises: 046
+Create Date: 2026-07-16
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '047'
+down_revision = '046'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    if 'reading_analysis_jobs' in inspector.get_table_names():
+        return
+
+    op.create_table(
+        'reading_analysis_jobs',
+        sa.Column('id', sa.String(length=36), primary_key=True),
+        sa.Column('session_id', sa.String(length=8),
+                  sa.ForeignKey('reading_sessions.id', ondelete='CASCADE'), nullable=False, unique=True),
+        sa.Column('audio_filename', sa.String(length=200), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False, server_default='pending'),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('next_attempt_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('result', sa.JSON(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index('idx_reading_analysis_due', 'reading_analysis_jobs', ['status', 'next_attempt_at'])
+
+
+def downgrade():
+    op.drop_index('idx_reading_analysis_due', table_name='reading_analysis_jobs')
+    op.drop_table('reading_analysis_jobs')
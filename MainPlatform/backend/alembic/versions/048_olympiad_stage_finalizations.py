@@ -0,0 +1,56 @@
+"""Olympiad stage finalization jobs + participant scope index
+
+Ko'p bosqichli olimpiadada bosqichni yakunlash fon jarayoni (Olimp
+app/olimp/stage_finalization.py): holat, progress va davom ettirish
+kursori. ix_participant_scope — guruhlarni scope kaliti bo'yicha
+bo'laklab o'qish uchun.
+
+Revision ID: 048
+Revises: 047
+Create Date: 2026-07-24
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '048'
+down_revision = '047'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+
+    if 'olympiad_stage_finalizations' not in inspector.get_table_names():
+        op.create_table(
+            'olympiad_stage_finalizations',
+            sa.Column('id', sa.String(length=8), primary_key=True),
+            sa.Column('stage_id', sa.String(length=8),
+                      sa.ForeignKey('olympiad_stages.id', ondelete='CASCADE'), nullable=False, unique=True),
+            sa.Column('stage_number', sa.Integer(), nullable=False),
+            sa.Column('status', sa.String(length=20), nullable=False, server_default='pending'),
+            sa.Column('groups_total', sa.Integer(), server_default='0'),
+            sa.Column('groups_done', sa.Integer(), server_default='0'),
+            sa.Column('results_total', sa.Integer(), server_default='0'),
+            sa.Column('results_done', sa.Integer(), server_default='0'),
+            sa.Column('total_passed', sa.Integer(), server_default='0'),
+            sa.Column('total_failed', sa.Integer(), server_default='0'),
+            sa.Column('last_group_key', sa.JSON(), nullable=True),
+            sa.Column('error', sa.Text(), nullable=True),
+            sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        )
+        op.create_index('ix_olympiad_stage_finalizations_status', 'olympiad_stage_finalizations', ['status'])
+
+    indexes = {ix['name'] for ix in inspector.get_indexes('olympiad_participants')}
+    if 'ix_participant_scope' not in indexes:
+        op.create_index('ix_participant_scope', 'olympiad_participants',
+                        ['olympiad_id', 'region', 'district', 'school_number'])
+
+
+def downgrade():
+    op.drop_index('ix_participant_scope', table_name='olympiad_participants')
+    op.drop_index('ix_olympiad_stage_finalizations_status', table_name='olympiad_stage_finalizations')
+    op.drop_table('olympiad_stage_finalizations')
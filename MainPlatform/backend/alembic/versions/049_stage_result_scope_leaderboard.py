@@ -0,0 +1,69 @@
+"""Stage results: denormalized scope + per-scope ranking indexes
+
+Ko'p bosqichli olimpiada leaderboard'i (Olimp app/olimp/stage_leaderboard.py)
+uchun olympiad_stage_results ga ishtirokchining region, district va
+school_number i ko'chiriladi va har bir scope darajasi uchun
+(stage_id, scope..., score DESC, duration_seconds, id) INCLUDE
+(participant_id, is_passed) indeksi quriladi. ix_stage_result_stage endi
+ix_stage_result_rank_republic ning prefiksi — o'chiriladi.
+
+Revision ID: 049
+Revises: 048
+Create Date: 2026-07-28
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '049'
+down_revision = '048'
+branch_labels = None
+depends_on = None
+
+RANK_ORDER = [sa.text('score DESC'), 'duration_seconds', 'id']
+RANK_INDEXES = {
+    'ix_stage_result_rank_republic': ['stage_id'],
+    'ix_stage_result_rank_region': ['stage_id', 'region'],
+    'ix_stage_result_rank_district': ['stage_id', 'region', 'district'],
+    'ix_stage_result_rank_school': ['stage_id', 'region', 'district', 'school_number'],
+}
+
+
+def upgrade():
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    if 'olympiad_stage_results' not in inspector.get_table_names():
+        return
+
+    columns = {c['name'] for c in inspector.get_columns('olympiad_stage_results')}
+    if 'region' not in columns:
+        op.add_column('olympiad_stage_results', sa.Column('region', sa.String(length=100), nullable=True))
+        op.add_column('olympiad_stage_results', sa.Column('district', sa.String(length=100), nullable=True))
+        op.add_column('olympiad_stage_results', sa.Column('school_number', sa.Integer(), nullable=True))
+        op.execute(
+            """
+            UPDATE olympiad_stage_results r
+            SET region = p.region, district = p.district, school_number = p.school_number
+            FROM olympiad_participants p
+            WHERE r.participant_id = p.id
+            """
+        )
+    # Reyting indekslari NULL'siz tartibni kutadi (score DESC da NULL birinchi bo'lardi)
+    op.execute("UPDATE olympiad_stage_results SET score = 0 WHERE score IS NULL")
+    op.execute("UPDATE olympiad_stage_results SET duration_seconds = 0 WHERE duration_seconds IS NULL")
+
+    indexes = {ix['name'] for ix in inspector.get_indexes('olympiad_stage_results')}
+    for name, prefix in RANK_INDEXES.items():
+        if name not in indexes:
+            op.create_index(name, 'olympiad_stage_results', prefix + RANK_ORDER,
+                            postgresql_include=['participant_id', 'is_passed'])
+    if 'ix_stage_result_stage' in indexes:
+        op.drop_index('ix_stage_result_stage', table_name='olympiad_stage_results')
+
+
+def downgrade():
+    op.create_index('ix_stage_result_stage', 'olympiad_stage_results', ['stage_id'])
+    for name in RANK_INDEXES:
+        op.drop_index(name, table_name='olympiad_stage_results')
+    op.drop_column('olympiad_stage_results', 'school_number')
+    op.drop_column('olympiad_stage_results', 'district')
+    op.drop_column('olympiad_stage_results', 'region')
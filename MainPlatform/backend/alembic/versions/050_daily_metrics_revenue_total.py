@@ -0,0 +1,43 @@
+"""Daily platform metrics: cumulative revenue_total
+
+Dashboard'dagi jami daromad kunlik revenue yig'indisidan emas, users_total
+kabi kumulyativ ustundan olinadi — birinchi rollup faqat
+METRICS_ROLLUP_MAX_CATCHUP_DAYS kunni hisoblaydi, undan oldingi to'lovlar
+yig'indida yo'qolardi. Mavjud qatorlar user_subscriptions dan to'ldiriladi.
+
+Revision ID: 050
+Revises: 049
+Create Date: 2026-08-04
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '050'
+down_revision = '049'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    if 'daily_platform_metrics' not in inspector.get_table_names():
+        return
+
+    columns = {c['name'] for c in inspector.get_columns('daily_platform_metrics')}
+    if 'revenue_total' not in columns:
+        op.add_column('daily_platform_metrics', sa.Column('revenue_total', sa.BigInteger(), nullable=True))
+        op.execute(
+            """
+            UPDATE daily_platform_metrics d
+            SET revenue_total = (
+                SELECT COALESCE(SUM(s.amount_paid), 0)
+                FROM user_subscriptions s
+                WHERE s.amount_paid > 0 AND s.created_at < ((d.day + 1)::timestamp AT TIME ZONE 'UTC')
+            )
+            """
+        )
+
+
+def downgrade():
+    op.drop_column('daily_platform_metrics', 'revenue_total')
@@ -5,18 +5,19 @@ Geolocation stats, trends, audit log, notifications, user segments, subscription
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import func, text, select, case, distinct, cast, Date
+from sqlalchemy import func, text, select, case, distinct
 from typing import Optional, Dict, Any, List
 from datetime import datetime, timezone, timedelta
 import logging
 
 from shared.database import get_db
 from shared.database.models import (
-    User, UserRole, AccountStatus,
-    StudentCoin, CoinTransaction,
+    User,
+    CoinTransaction,
     UserSubscription, SubscriptionPlanConfig, SubscriptionStatus,
 )
 from shared.database.models.analytics import UserGeoLog, AuditLog, AdminNotification
+from app.services import metrics_rollup
 
 logger = logging.getLogger(__name__)
 
@@ -68,80 +69,8 @@ async def analytics_overview(
     admin: Dict = Depends(verify_admin),
     db: AsyncSession = Depends(get_db),
 ):
-    """Asosiy platform statistikasi — kengaytirilgan"""
-    now = datetime.now(timezone.utc)
-    today = now.date()
-    week_ago = today - timedelta(days=7)
-    month_ago = today - timedelta(days=30)
-
-    # Asosiy sonlar
-    total_users = (await db.execute(select(func.count(User.id)))).scalar() or 0
-    total_students = (await db.execute(select(func.count(User.id)).where(User.role == UserRole.student))).scalar() or 0
-    total_parents = (await db.execute(select(func.count(User.id)).where(User.role == UserRole.parent))).scalar() or 0
-    total_teachers = (await db.execute(select(func.count(User.id)).where(User.role == UserRole.teacher))).scalar() or 0
-    active_users = (await db.execute(select(func.count(User.id)).where(User.status == AccountStatus.active))).scalar() or 0
-
-    # Yangi foydalanuvchilar (bugun, hafta, oy)
-    new_today = (await db.execute(
-        select(func.count(User.id)).where(cast(User.created_at, Date) == today)
-    )).scalar() or 0
-    new_week = (await db.execute(
-        select(func.count(User.id)).where(cast(User.created_at, Date) >= week_ago)
-    )).scalar() or 0
-    new_month = (await db.execute(
-        select(func.count(User.id)).where(cast(User.created_at, Date) >= month_ago)
-    )).scalar() or 0
-
-    # Coins
-    coins_result = (await db.execute(select(func.sum(StudentCoin.current_balance)))).scalar()
-    coins_in_circulation = int(coins_result) if coins_result else 0
-
-    # Subscription stats
-    active_subs = (await db.execute(
-        select(func.count(UserSubscription.id)).where(UserSubscription.status == SubscriptionStatus.active)
-    )).scalar() or 0
-
-    # Revenue
-    total_revenue = (await db.execute(
-        select(func.sum(UserSubscription.amount_paid)).where(UserSubscription.amount_paid > 0)
-    )).scalar() or 0
-
-    # Login bugun (geo log'dan)
-    logins_today = (await db.execute(
-        select(func.count(UserGeoLog.id)).where(
-            cast(UserGeoLog.created_at, Date) == today,
-            UserGeoLog.action == "login"
-        )
-    )).scalar() or 0
-
-    # Unique logins bugun
-    unique_logins_today = (await db.execute(
-        select(func.count(distinct(UserGeoLog.user_id))).where(
-            cast(UserGeoLog.created_at, Date) == today,
-            UserGeoLog.action == "login"
-        )
-    )).scalar() or 0
-
-    return {
-        "total_users": total_users,
-        "total_students": total_students,
-        "total_parents": total_parents,
-        "total_teachers": total_teachers,
-        "active_users": active_users,
-        "coins_in_circulation": coins_in_circulation,
-        "active_subscriptions": active_subs,
-        "total_revenue": int(total_revenue or 0),
-        "new_users": {
-            "today": new_today,
-            "this_week": new_week,
-            "this_month": new_month,
-        },
-        "logins": {
-            "today_total": logins_today,
-            "today_unique": unique_logins_today,
-        },
-        "conversion_rate": round((active_subs / total_users * 100), 1) if total_users > 0 else 0,
-    }
+    """Asosiy platform statistikasi — daily_platform_metrics + bugungi jonli delta"""
+    return await metrics_rollup.platform_overview(db)
 
 
 # ============================================================================
@@ -154,53 +83,10 @@ async def analytics_trends(
     admin: Dict = Depends(verify_admin),
     db: AsyncSession = Depends(get_db),
 ):
-    """Kunlik trend ma'lumotlari (grafik uchun)"""
+    """Kunlik trend ma'lumotlari (grafik uchun) — rollup jadvalidan"""
     days_map = {"7d": 7, "30d": 30, "90d": 90, "1y": 365}
-    days = days_map.get(period, 30)
-    start_date = datetime.now(timezone.utc).date() - timedelta(days=days)
-
-    # Kunlik yangi ro'yxatlar
-    reg_result = await db.execute(
-        select(
-            cast(User.created_at, Date).label("day"),
-            func.count(User.id).label("count")
-        ).where(cast(User.created_at, Date) >= start_date)
-        .group_by(cast(User.created_at, Date))
-        .order_by(cast(User.created_at, Date))
-    )
-    registrations = [{"date": str(r.day), "count": r.count} for r in reg_result]
-
-    # Kunlik loginlar
-    login_result = await db.execute(
-        select(
-            cast(UserGeoLog.created_at, Date).label("day"),
-            func.count(distinct(UserGeoLog.user_id)).label("unique_users"),
-            func.count(UserGeoLog.id).label("total_logins"),
-        ).where(
-            cast(UserGeoLog.created_at, Date) >= start_date,
-            UserGeoLog.action == "login"
-        )
-        .group_by(cast(UserGeoLog.created_at, Date))
-        .order_by(cast(UserGeoLog.created_at, Date))
-    )
-    logins = [{"date": str(r.day), "unique_users": r.unique_users, "total_logins": r.total_logins} for r in login_result]
-
-    # Rol bo'yicha ro'yxatlar
-    role_result = await db.execute(
-        select(
-            User.role,
-            func.count(User.id).label("count")
-        ).where(cast(User.created_at, Date) >= start_date)
-        .group_by(User.role)
-    )
-    by_role = {str(r.role.value) if r.role else "unknown": r.count for r in role_result}
-
-    return {
-        "period": period,
-        "registrations": registrations,
-        "logins": logins,
-        "by_role": by_role,
-    }
+    trends = await metrics_rollup.platform_trends(db, days_map.get(period, 30))
+    return {"period": period, **trends}
 
 
 # ============================================================================
@@ -442,49 +328,14 @@ async def user_segments(
     admin: Dict = Depends(verify_admin),
     db: AsyncSession = Depends(get_db),
 ):
-    """Foydalanuvchi segmentlari"""
-    now = datetime.now(timezone.utc)
-    today = now.date()
-    week_ago = today - timedelta(days=7)
-    month_ago = today - timedelta(days=30)
-    three_months_ago = today - timedelta(days=90)
-
-    # 1. Yangi (oxirgi 7 kunda ro'yxatdan o'tgan)
-    new_users = (await db.execute(
-        select(func.count(User.id)).where(cast(User.created_at, Date) >= week_ago)
-    )).scalar() or 0
-
-    # 2. Faol (oxirgi 7 kunda login qilgan)
-    active_last_week = (await db.execute(
-        select(func.count(distinct(UserGeoLog.user_id))).where(
-            cast(UserGeoLog.created_at, Date) >= week_ago,
-            UserGeoLog.action == "login"
-        )
-    )).scalar() or 0
-
-    # 3. O'rtacha faol (7-30 kun ichida login)
-    moderate_active = (await db.execute(
-        select(func.count(distinct(UserGeoLog.user_id))).where(
-            cast(UserGeoLog.created_at, Date) >= month_ago,
-            cast(UserGeoLog.created_at, Date) < week_ago,
-            UserGeoLog.action == "login"
-        )
-    )).scalar() or 0
-
-    # 4. Nofaol (30+ kun login qilmagan lekin ro'yxatdan o'tgan)
-    total = (await db.execute(select(func.count(User.id)))).scalar() or 0
-
-    # 5. Obunador (faol obunasi bor)
-    subscribers = (await db.execute(
-        select(func.count(distinct(UserSubscription.user_id))).where(
-            UserSubscription.status == SubscriptionStatus.active
-        )
-    )).scalar() or 0
-
-    # 6. Coin boylar (top)
-    rich_users = (await db.execute(
-        select(func.count(StudentCoin.id)).where(StudentCoin.current_balance > 100)
-    )).scalar() or 0
+    """Foydalanuvchi segmentlari — rollup'lar (user_daily_logins) + bugungi jonli delta"""
+    counts = await metrics_rollup.user_segments(db)
+    new_users = counts["new"]
+    active_last_week = counts["active"]
+    moderate_active = counts["moderate"]
+    subscribers = counts["subscribers"]
+    rich_users = counts["rich"]
+    total = counts["total"]
 
     return {
         "segments": [
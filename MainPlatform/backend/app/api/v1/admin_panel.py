@@ -17,7 +17,6 @@ from typing import Optional, List, Dict, Any
 from datetime import datetime, timezone, timedelta
 import os
 import logging
-import httpx
 
 from shared.database import get_db
 from shared.database.models import (
@@ -28,6 +27,13 @@ from shared.database.models import (
     SubscriptionPlanConfig, UserSubscription, SubscriptionStatus,
     PromoCode, PromoCodeUsage,
 )
+from app.middleware.request_context import invalidate_user_context
+from app.services import admin_browser
+from app.services.ai_cache_service import AICacheService
+from shared.services.tts_render_service import get_tts_renderer
+from shared.services.audio_cache_service import get_audio_cache_stats
+from shared.auth import get_crypto_stats
+from shared.services.http_client import get_http_client, get_http_metrics
 
 logger = logging.getLogger(__name__)
 security = HTTPBearer()
@@ -595,6 +601,7 @@ async def create_direct_story(
     db.add(story)
     await db.commit()
     await db.refresh(story)
+    get_tts_renderer().prerender(story.content, story.language or "uz", "female")
     
     return {
         "message": "Ertak muvaffaqiyatli yaratildi",
@@ -648,6 +655,8 @@ async def update_direct_story(
         story.test_limit = data.test_limit
     
     await db.commit()
+    if data.content is not None or data.language is not None:
+        get_tts_renderer().prerender(story.content, story.language or "uz", "female")
     
     return {"message": "Ertak yangilandi", "story_id": story_id}
 
@@ -888,49 +897,52 @@ async def list_users(
     status: Optional[str] = None,
     search: Optional[str] = None,
     limit: int = Query(50, ge=1, le=200),
-    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = None,
+    exact_count: bool = False,
     admin: Dict = Depends(verify_admin),
     db: AsyncSession = Depends(get_db)
 ):
-    """List users with filters"""
+    """
+    List users with filters — keyset (cursor) sahifalash.
+    total: filtrsiz — katalog statistikasi, filtr bilan — planner bahosi;
+    exact_count=true bo'lsa aniq COUNT.
+    """
     if not has_permission(admin, "users"):
         raise HTTPException(status_code=403, detail="Foydalanuvchilarni ko'rish uchun ruxsat yo'q")
-    stmt = select(User).order_by(User.created_at.desc())
-    count_stmt = select(func.count(User.id))
-    
+
+    user_role = account_status = None
     if role:
         try:
             user_role = UserRole(role.lower())
-            stmt = stmt.where(User.role == user_role)
-            count_stmt = count_stmt.where(User.role == user_role)
         except ValueError:
             pass
-    
     if status:
         try:
             account_status = AccountStatus(status.lower())
-            stmt = stmt.where(User.status == account_status)
-            count_stmt = count_stmt.where(User.status == account_status)
         except ValueError:
             pass
-    
-    if search:
-        search_filter = f"%{search}%"
-        search_cond = (
-            (User.first_name.ilike(search_filter)) |
-            (User.last_name.ilike(search_filter)) |
-            (User.email.ilike(search_filter)) |
-            (User.phone.ilike(search_filter))
-        )
-        stmt = stmt.where(search_cond)
-        count_stmt = count_stmt.where(search_cond)
-    
-    total = (await db.execute(count_stmt)).scalar() or 0
-    result = await db.execute(stmt.offset(offset).limit(limit))
-    users = result.scalars().all()
-    
+
+    stmt = admin_browser.users_query(user_role, account_status, search)
+    try:
+        users, has_more, next_cursor = await admin_browser.users_page(db, stmt, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    filtered = user_role is not None or account_status is not None or bool(search)
+    if not cursor and not has_more:
+        total = len(users)  # bitta sahifa — son aniq
+    elif exact_count:
+        total = (await db.execute(select(func.count()).select_from(stmt.subquery()))).scalar() or 0
+    elif filtered:
+        total = await admin_browser.estimate_rows(db, stmt)
+    else:
+        total = (await admin_browser.approximate_counts(db, ["users"]))["users"]
+
     return {
         "total": total,
+        "total_is_estimate": not exact_count and (bool(cursor) or has_more),
+        "has_more": has_more,
+        "next_cursor": next_cursor,
         "users": [
             {
                 "id": u.id,
@@ -1032,7 +1044,7 @@ async def create_user(
     )
     
     if data.password:
-        user.set_password(data.password)
+        await user.set_password_async(data.password)
     
     db.add(user)
     await db.commit()
@@ -1080,6 +1092,7 @@ async def update_user(
     
     user.updated_at = datetime.now(timezone.utc)
     await db.commit()
+    await invalidate_user_context(user_id)
     
     await _log_audit(db, admin["role"], "user.update", target_type="user", target_id=user_id, target_name=f"{user.first_name} {user.last_name}")
     
@@ -1113,6 +1126,7 @@ async def delete_user(
     user.deleted_at = datetime.now(timezone.utc)
     user.updated_at = datetime.now(timezone.utc)
     await db.commit()
+    await invalidate_user_context(user_id)
     
     await _log_audit(db, admin["role"], "user.delete", target_type="user", target_id=user_id, target_name=f"{user.first_name} {user.last_name}", action_type="danger")
     
@@ -1220,10 +1234,14 @@ async def _validate_table_name(table_name: str, db: AsyncSession) -> str:
 
 @router.get("/db/tables")
 async def list_database_tables(
+    exact: bool = False,
     admin: Dict = Depends(verify_admin),
     db: AsyncSession = Depends(get_db)
 ):
-    """List all database tables"""
+    """
+    List all database tables — qatorlar soni katalog statistikasidan (pg_class.reltuples),
+    exact=true bo'lsa har jadval uchun COUNT(*) (timeout bilan)
+    """
     if not has_permission(admin, "all"):
         raise HTTPException(status_code=403, detail="Super admin only")
     
@@ -1236,18 +1254,15 @@ async def list_database_tables(
     
     tables = [row[0] for row in result]
     
-    # Get row counts for each table
-    table_info = []
-    for t in tables:
-        try:
-            count_result = await db.execute(text(f'SELECT COUNT(*) FROM "{t}"'))
-            count = count_result.scalar() or 0
-            table_info.append({"name": t, "rows": count})
-        except Exception as e:
-            logger.warning(f"Table '{t}' uchun COUNT xatosi: {e}")
-            table_info.append({"name": t, "rows": 0})
+    if exact:
+        counts = {t: await admin_browser.exact_count(db, t) for t in tables}
+    else:
+        counts = await admin_browser.approximate_counts(db, tables)
     
-    return {"tables": table_info}
+    return {
+        "tables": [{"name": t, "rows": counts.get(t) or 0} for t in tables],
+        "approximate": not exact,
+    }
 
 
 @router.get("/db/tables/{table_name}")
@@ -1255,11 +1270,16 @@ async def get_table_data(
     table_name: str,
     limit: int = Query(50, ge=1, le=200),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = None,
+    exact_count: bool = False,
     search: Optional[str] = None,
     admin: Dict = Depends(verify_admin),
     db: AsyncSession = Depends(get_db)
 ):
-    """View table data"""
+    """
+    View table data — PK bo'lsa keyset (cursor) sahifalash, bo'lmasa offset.
+    total katalog statistikasidan; exact_count=true bo'lsa COUNT(*).
+    """
     if not has_permission(admin, "all"):
         raise HTTPException(status_code=403, detail="Super admin only")
     
@@ -1277,28 +1297,22 @@ async def get_table_data(
         if not columns:
             raise HTTPException(status_code=404, detail="Jadval topilmadi")
         
-        count_result = await db.execute(text(f'SELECT COUNT(*) FROM "{table_name}"'))
-        total = count_result.scalar()
-        
-        result = await db.execute(
-            text(f'SELECT * FROM "{table_name}" ORDER BY 1 DESC LIMIT :lim OFFSET :off'),
-            {"lim": limit, "off": offset}
-        )
+        try:
+            page = await admin_browser.table_page(db, table_name, limit, cursor=cursor, offset=offset)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
-        rows = []
-        for row in result:
-            row_dict = dict(row._mapping)
-            # Serialize datetime objects
-            for k, v in row_dict.items():
-                if isinstance(v, datetime):
-                    row_dict[k] = v.isoformat()
-            rows.append(row_dict)
+        if exact_count:
+            total = await admin_browser.exact_count(db, table_name)
+        else:
+            total = (await admin_browser.approximate_counts(db, [table_name]))[table_name]
         
         return {
             "table": table_name,
             "total": total,
+            "total_is_estimate": not exact_count,
             "columns": columns,
-            "rows": rows
+            **page,
         }
     except HTTPException:
         raise
@@ -1389,6 +1403,9 @@ async def update_table_row(
             params
         )
         await db.commit()
+        if table_name in ("users", "user_subscriptions"):
+            # Raw SQL ORM hook'larini chetlab o'tadi
+            await invalidate_user_context(row_id if table_name == "users" else None)
 
         return {"message": f"Qator yangilandi", "table": table_name, "id": row_id}
     except HTTPException:
@@ -1426,6 +1443,8 @@ async def delete_table_row(
             {"row_id": row_id}
         )
         await db.commit()
+        if table_name in ("users", "user_subscriptions"):
+            await invalidate_user_context(row_id if table_name == "users" else None)
         
         return {"message": "Qator o'chirildi", "table": table_name, "id": row_id}
     except Exception as e:
@@ -1454,9 +1473,8 @@ async def list_content_lessons(
         if language:
             params["language"] = language
         
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(f"{LESSIONS_API}/lessons", params=params, timeout=10)
-            return resp.json()
+        resp = await get_http_client("lessions").get(f"{LESSIONS_API}/lessons", params=params)
+        return resp.json()
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"Lessions service xatosi: {str(e)}")
 
@@ -1471,11 +1489,10 @@ async def create_content_lesson(
         raise HTTPException(status_code=403, detail="Ruxsat yo'q")
     
     try:
-        async with httpx.AsyncClient() as client:
-            resp = await client.post(f"{LESSIONS_API}/lessons", json=data, timeout=10)
-            if resp.status_code >= 400:
-                raise HTTPException(status_code=resp.status_code, detail=resp.text)
-            return resp.json()
+        resp = await get_http_client("lessions").post(f"{LESSIONS_API}/lessons", json=data)
+        if resp.status_code >= 400:
+            raise HTTPException(status_code=resp.status_code, detail=resp.text)
+        return resp.json()
     except HTTPException:
         raise
     except Exception as e:
@@ -1493,11 +1510,10 @@ async def update_content_lesson(
         raise HTTPException(status_code=403, detail="Ruxsat yo'q")
     
     try:
-        async with httpx.AsyncClient() as client:
-            resp = await client.put(f"{LESSIONS_API}/lessons/{lesson_id}", json=data, timeout=10)
-            if resp.status_code >= 400:
-                raise HTTPException(status_code=resp.status_code, detail=resp.text)
-            return resp.json()
+        resp = await get_http_client("lessions").request("PUT", f"{LESSIONS_API}/lessons/{lesson_id}", json=data)
+        if resp.status_code >= 400:
+            raise HTTPException(status_code=resp.status_code, detail=resp.text)
+        return resp.json()
     except HTTPException:
         raise
     except Exception as e:
@@ -1514,11 +1530,10 @@ async def delete_content_lesson(
         raise HTTPException(status_code=403, detail="Ruxsat yo'q")
     
     try:
-        async with httpx.AsyncClient() as client:
-            resp = await client.delete(f"{LESSIONS_API}/lessons/{lesson_id}", timeout=10)
-            if resp.status_code >= 400:
-                raise HTTPException(status_code=resp.status_code, detail=resp.text)
-            return resp.json()
+        resp = await get_http_client("lessions").request("DELETE", f"{LESSIONS_API}/lessons/{lesson_id}")
+        if resp.status_code >= 400:
+            raise HTTPException(status_code=resp.status_code, detail=resp.text)
+        return resp.json()
     except HTTPException:
         raise
     except Exception as e:
@@ -1542,9 +1557,8 @@ async def list_content_ertaklar(
         if age_group:
             params["age_group"] = age_group
         
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(f"{LESSIONS_API}/ertaklar", params=params, timeout=10)
-            return resp.json()
+        resp = await get_http_client("lessions").get(f"{LESSIONS_API}/ertaklar", params=params)
+        return resp.json()
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"Lessions service xatosi: {str(e)}")
 
@@ -1559,11 +1573,10 @@ async def create_content_ertak(
         raise HTTPException(status_code=403, detail="Ruxsat yo'q")
     
     try:
-        async with httpx.AsyncClient() as client:
-            resp = await client.post(f"{LESSIONS_API}/ertaklar", json=data, timeout=10)
-            if resp.status_code >= 400:
-                raise HTTPException(status_code=resp.status_code, detail=resp.text)
-            return resp.json()
+        resp = await get_http_client("lessions").post(f"{LESSIONS_API}/ertaklar", json=data)
+        if resp.status_code >= 400:
+            raise HTTPException(status_code=resp.status_code, detail=resp.text)
+        return resp.json()
     except HTTPException:
         raise
     except Exception as e:
@@ -1580,11 +1593,10 @@ async def delete_content_ertak(
         raise HTTPException(status_code=403, detail="Ruxsat yo'q")
     
     try:
-        async with httpx.AsyncClient() as client:
-            resp = await client.delete(f"{LESSIONS_API}/ertaklar/{ertak_id}", timeout=10)
-            if resp.status_code >= 400:
-                raise HTTPException(status_code=resp.status_code, detail=resp.text)
-            return resp.json()
+        resp = await get_http_client("lessions").request("DELETE", f"{LESSIONS_API}/ertaklar/{ertak_id}")
+        if resp.status_code >= 400:
+            raise HTTPException(status_code=resp.status_code, detail=resp.text)
+        return resp.json()
     except HTTPException:
         raise
     except Exception as e:
@@ -1652,6 +1664,19 @@ async def admin_health():
     }
 
 
+@router.get("/system/cache-stats")
+async def system_cache_stats(admin: Dict = Depends(verify_admin)):
+    """Shu worker'dagi kesh va pool ko'rsatkichlari (hit ratio, latency, navbatlar)"""
+    if not has_permission(admin, "all"):
+        raise HTTPException(status_code=403, detail="Ruxsat yo'q")
+    return {
+        "audio_cache": get_audio_cache_stats(),
+        "ai_cache": AICacheService.stats(),
+        "crypto": get_crypto_stats(),
+        "http": get_http_metrics(),
+    }
+
+
 # ============================================================================
 # PLATFORM CONTENT MANAGEMENT - for admins to manage static content
 # ============================================================================
@@ -2295,6 +2320,7 @@ async def assign_subscription(
     )
     db.add(subscription)
     await db.commit()
+    await invalidate_user_context(user_id)
     await db.refresh(subscription)
 
     await _log_audit(db, admin["role"], "subscription.assign", target_type="subscription", target_id=str(subscription.id), target_name=f"{user.first_name} {user.last_name} -> {plan.name}")
@@ -2332,6 +2358,7 @@ async def cancel_subscription(
         sub.updated_at = datetime.now(timezone.utc)
 
     await db.commit()
+    await invalidate_user_context(user_id)
 
     return {"message": "Obuna bekor qilindi", "user_id": user_id, "cancelled_count": len(subs)}
 
@@ -11,18 +11,11 @@ from shared.database import get_db
 from shared.database.models import User, UserRole
 from app.middleware.auth import get_current_user
 from app.core.config import settings
-from openai import AsyncAzureOpenAI
+from app.services.ai_service import ai_service
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-def get_azure_client():
-    return AsyncAzureOpenAI(
-        azure_endpoint=settings.AZURE_OPENAI_ENDPOINT,
-        api_key=settings.AZURE_OPENAI_KEY,
-        api_version=settings.AZURE_OPENAI_API_VERSION
-    )
-
 class AITestGenerateRequest(BaseModel):
     text: str = Field(..., description="Dars yoki matn", min_length=20)
     question_count: int = Field(default=5, ge=1, le=20)
@@ -63,16 +56,16 @@ async def generate_test(
         raise HTTPException(status_code=503, detail="Azure OpenAI not configured")
 
     try:
-        azure_client = get_azure_client()
         azure_model = settings.AZURE_OPENAI_DEPLOYMENT_NAME or "gpt-5-chat"
         logger.info(f"Using Azure OpenAI: endpoint={settings.AZURE_OPENAI_ENDPOINT}, model={azure_model}")
-        response = await azure_client.chat.completions.create(
+        # Keshsiz: "qayta yaratish" har safar yangi test qaytarishi kerak (temperature=0.7)
+        content = await ai_service.call_ai(
             model=azure_model,
             messages=messages,
             response_format={"type": "json_object"},
             temperature=0.7,
         )
-        data = json.loads(response.choices[0].message.content.strip())
+        data = json.loads(content.strip())
         logger.info("Azure OpenAI success")
         return {"success": True, "data": data.get("questions", [])}
     except Exception as azure_err:
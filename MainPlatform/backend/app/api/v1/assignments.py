@@ -20,7 +20,10 @@ from shared.database.models.assignment import (
     AssignmentType, AssignmentTargetType, SubmissionStatus, AssignmentCreatorRole,
 )
 from shared.database.models.in_app_notification import InAppNotification, InAppNotifType
+from shared.services.telegram_outbox import wake_telegram_outbox
 from app.middleware.auth import get_current_user
+from app.services.assignment_fanout import fan_out_assignment
+from app.services.gradebook_service import assignment_report
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -91,25 +94,6 @@ async def create_notification(
     ))
 
 
-async def notify_telegram(db: AsyncSession, user_id: str, message: str):
-    try:
-        from shared.database.models import TelegramUser
-        from app.core.config import settings
-        tg_res = await db.execute(select(TelegramUser).where(TelegramUser.user_id == user_id))
-        tg_user = tg_res.scalars().first()
-        if tg_user and tg_user.telegram_chat_id and tg_user.notifications_enabled:
-            import httpx
-            token = settings.TELEGRAM_BOT_TOKEN
-            if token:
-                async with httpx.AsyncClient(timeout=5) as client:
-                    await client.post(
-                        f"https://api.telegram.org/bot{token}/sendMessage",
-                        json={"chat_id": tg_user.telegram_chat_id, "text": message, "parse_mode": "Markdown"},
-                    )
-    except Exception as e:
-        logger.warning(f"Telegram notify failed for {user_id}: {e}")
-
-
 def assignment_dict(a: Assignment) -> dict:
     return {
         "id": a.id,
@@ -225,40 +209,28 @@ async def create_assignment(
             ))
             notified_students.add(sid)
 
-    # Submission yozuvlari + notificationlar
+    # Submission yozuvlari + notificationlar + Telegram navbati (har biri bitta INSERT)
     teacher_name = f"{current_user.first_name} {current_user.last_name}".strip()
     due_text = data.due_date.strftime("%d.%m.%Y %H:%M") if data.due_date else "Belgilanmagan"
-
-    for student_id in notified_students:
-        # Submission record yaratish (pending)
-        db.add(AssignmentSubmission(
-            assignment_id=assignment.id,
-            student_user_id=student_id,
-            status=SubmissionStatus.pending,
-        ))
-        # In-app notification
-        await create_notification(
-            db, student_id,
-            f"📝 Yangi vazifa: {data.title}",
-            f"{teacher_name} sizga yangi vazifa berdi.\nMuddati: {due_text}",
-            InAppNotifType.assignment_new,
-            "assignment", assignment.id, current_user.id,
-        )
+    tg_text = (
+        f"📝 *Yangi vazifa!*\n\n"
+        f"*{data.title}*\n"
+        f"O'qituvchi: {teacher_name}\n"
+        f"Muddati: {due_text}\n\n"
+        f"Platformaga kiring va vazifani bajaring."
+    )
+    await fan_out_assignment(
+        db, assignment.id, notified_students,
+        title=f"📝 Yangi vazifa: {data.title}",
+        message=f"{teacher_name} sizga yangi vazifa berdi.\nMuddati: {due_text}",
+        notif_type=InAppNotifType.assignment_new,
+        sender_id=current_user.id,
+        telegram_text=tg_text,
+    )
 
     await db.commit()
     await db.refresh(assignment)
-
-    # Telegram notifications (after commit)
-    tg_due = due_text
-    for student_id in notified_students:
-        tg_text = (
-            f"📝 *Yangi vazifa!*\n\n"
-            f"*{data.title}*\n"
-            f"O'qituvchi: {teacher_name}\n"
-            f"Muddati: {tg_due}\n\n"
-            f"Platformaga kiring va vazifani bajaring."
-        )
-        await notify_telegram(db, student_id, tg_text)
+    wake_telegram_outbox()
 
     logger.info(f"Assignment created: {assignment.title} by {current_user.id}, notified {len(notified_students)} students")
     return {
@@ -1295,40 +1267,33 @@ async def parent_assign_task(
     parent_name = f"{current_user.first_name} {current_user.last_name}".strip()
     due_text = data.due_date.strftime("%d.%m.%Y %H:%M") if data.due_date else "Belgilanmagan"
 
-    for sid in data.target_student_ids:
+    for sid in dict.fromkeys(data.target_student_ids):
         db.add(AssignmentTarget(
             assignment_id=assignment.id,
             target_type=AssignmentTargetType.student,
             target_id=sid,
         ))
-        db.add(AssignmentSubmission(
-            assignment_id=assignment.id,
-            student_user_id=sid,
-            status=SubmissionStatus.pending,
-        ))
-        await create_notification(
-            db, sid,
-            f"📝 Ota-onangizdan vazifa: {data.title}",
-            f"{parent_name} sizga vazifa berdi. Muddati: {due_text}",
-            InAppNotifType.parent_task,
-            "assignment", assignment.id, current_user.id,
-        )
-
-    await db.commit()
-    await db.refresh(assignment)
-
-    for sid in data.target_student_ids:
-        tg_text = (
+    assigned = await fan_out_assignment(
+        db, assignment.id, data.target_student_ids,
+        title=f"📝 Ota-onangizdan vazifa: {data.title}",
+        message=f"{parent_name} sizga vazifa berdi. Muddati: {due_text}",
+        notif_type=InAppNotifType.parent_task,
+        sender_id=current_user.id,
+        telegram_text=(
             f"📝 *Ota-onangizdan vazifa!*\n\n"
             f"*{data.title}*\n"
             f"Muddati: {due_text}\n\n"
             f"Platformaga kiring va vazifani bajaring."
-        )
-        await notify_telegram(db, sid, tg_text)
+        ),
+    )
+
+    await db.commit()
+    await db.refresh(assignment)
+    wake_telegram_outbox()
 
     return {
         "success": True,
-        "data": {"assignment": assignment_dict(assignment), "assigned_to": len(data.target_student_ids)},
+        "data": {"assignment": assignment_dict(assignment), "assigned_to": len(assigned)},
     }
 
 
@@ -1352,37 +1317,8 @@ async def get_assignment_report(
     if not assignment:
         raise HTTPException(status_code=404, detail="Vazifa topilmadi")
 
-    # 2. Fetch submissions
-    sub_stmt = (
-        select(AssignmentSubmission)
-        .where(AssignmentSubmission.assignment_id == assignment_id)
-        .order_by(AssignmentSubmission.score.desc(), AssignmentSubmission.submitted_at.asc())
-    )
-    sub_res = await db.execute(sub_stmt)
-    submissions = sub_res.scalars().all()
-
-    # 3. Process results with Ranks
-    results = []
-    # Rank is simply the index + 1 in the sorted list (since we sorted by score DESC)
-    for i, s in enumerate(submissions):
-        u_res = await db.execute(select(User).where(User.id == s.student_user_id))
-        user = u_res.scalars().first()
-        
-        meta = s.meta_data or {}
-        
-        results.append({
-            "student_id": s.student_user_id,
-            "student_first_name": user.first_name if user else "O'quvchi",
-            "student_last_name": user.last_name if user else "",
-            "correct_count": meta.get("correct", 0),
-            "total_questions": meta.get("total", 0),
-            "incorrect_count": meta.get("total", 0) - meta.get("correct", 0),
-            "time_spent_seconds": meta.get("time_spent_seconds", 0),
-            "score": s.score,
-            "status": s.status.value,
-            "rank": i + 1 if s.status == SubmissionStatus.graded else None,
-            "submitted_at": s.submitted_at.isoformat() if s.submitted_at else None
-        })
+    # 2. Submissions + o'quvchi ismlari bitta JOIN so'rovida, rank() window funksiyasi bilan
+    results = await assignment_report(db, assignment_id)
 
     return {
         "success": True,
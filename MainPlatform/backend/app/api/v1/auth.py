@@ -12,7 +12,7 @@ from datetime import datetime, timezone, date
 import logging
 
 from shared.database import get_db
-from shared.database.models import User, UserGeoLog, StudentProfile, Gender
+from shared.database.models import User, StudentProfile, Gender
 from shared.auth import create_access_token, create_refresh_token
 from ...core.config import settings
 from ...middleware.auth import get_current_user, get_optional_current_user
@@ -21,7 +21,8 @@ from ...schemas.auth import LoginRequest, RegisterRequest, TokenResponse, Create
 import secrets
 import string
 from ...schemas.rbac import ChildLoginRequest
-from ...utils.geoip import get_geo_from_ip, get_client_ip, parse_device_type, parse_browser, parse_os
+from ...utils.geoip import get_client_ip
+from ...services.geo_log_writer import record_geo_event
 
 logger = logging.getLogger(__name__)
 
@@ -170,18 +171,16 @@ async def _send_welcome_email_bg(user_id: str, email: str, first_name: str) -> N
         logger.warning(f"Welcome email failed for {email}: {e}")
 
 @router.post("/login")
-async def login(request: Request, data: LoginRequest, response: Response, background_tasks: BackgroundTasks, db: AsyncSession = Depends(get_db)):
+async def login(request: Request, data: LoginRequest, response: Response, db: AsyncSession = Depends(get_db)):
     """Login user"""
     service = AuthService(db)
     result = await service.login(data.email, data.password)
     
-    # Background: Geolokatsiya yozish
+    # Geolokatsiya: navbatga qo'yiladi, fon yozuvchisi paketlab saqlaydi
     user_data = result.get("user", {})
     user_id = user_data.get("id")
     if user_id:
-        background_tasks.add_task(
-            _track_geo, user_id, request
-        )
+        record_geo_event(user_id, get_client_ip(request), request.headers.get("user-agent", ""))
     
     # Set HttpOnly Cookies
     domain = ".alif24.uz" if request and request.url.hostname and "alif24.uz" in request.url.hostname else None
@@ -211,37 +210,6 @@ async def login(request: Request, data: LoginRequest, response: Response, backgr
     }
 
 
-async def _track_geo(user_id: str, request: Request):
-    """Background task: IP dan geo aniqlash va saqlash"""
-    try:
-        from shared.database import AsyncSessionLocal as async_session_factory
-        ip = get_client_ip(request)
-        ua = request.headers.get("user-agent", "")
-        geo = await get_geo_from_ip(ip)
-        
-        async with async_session_factory() as session:
-            geo_log = UserGeoLog(
-                user_id=user_id,
-                ip_address=ip,
-                country=geo.get("country"),
-                country_code=geo.get("country_code"),
-                region=geo.get("region"),
-                city=geo.get("city"),
-                latitude=geo.get("latitude"),
-                longitude=geo.get("longitude"),
-                isp=geo.get("isp"),
-                user_agent=ua[:500] if ua else None,
-                device_type=parse_device_type(ua),
-                browser=parse_browser(ua),
-                os=parse_os(ua),
-                action="login",
-            )
-            session.add(geo_log)
-            await session.commit()
-    except Exception as e:
-        logger.warning(f"Geo tracking failed for user {user_id}: {e}")
-
-
 @router.post("/refresh")
 async def refresh_token(request: Request, response: Response, data: RefreshTokenRequest = None, db: AsyncSession = Depends(get_db)):
     """Refresh access token - reads from cookie or request body"""
@@ -562,7 +530,7 @@ async def child_login(
         is_valid = False
         if hasattr(user, 'verify_pin') and user.verify_pin(data.pin):
             is_valid = True
-        elif hasattr(user, 'verify_password') and user.verify_password(data.pin):
+        elif await user.verify_password_async(data.pin):
             is_valid = True
             
         if not is_valid:
@@ -1198,7 +1166,7 @@ async def create_child(
         role=UserRole.student,
         parent_id=current_user.id
     )
-    child_user.set_password(password)
+    await child_user.set_password_async(password)
     child_user.set_pin(User.generate_pin())
     
     db.add(child_user)
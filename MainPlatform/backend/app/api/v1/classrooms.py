@@ -7,6 +7,7 @@ import logging
 from datetime import datetime, timezone, timedelta
 from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, or_, and_, exists
 from pydantic import BaseModel, Field
@@ -20,7 +21,11 @@ from shared.database.models.classroom import (
 )
 from shared.database.models.assignment import Assignment, AssignmentTarget, AssignmentSubmission, SubmissionStatus, AssignmentTargetType
 from shared.database.models.in_app_notification import InAppNotification, InAppNotifType
+from shared.services.telegram_outbox import enqueue_telegram, wake_telegram_outbox
 from app.middleware.auth import get_current_user
+from app.services.gradebook_service import (
+    classroom_assignments, gradebook_cell, gradebook_matrix, stream_gradebook_csv, stream_gradebook_xlsx,
+)
 from shared.subscription import require_feature, SubscriptionInfo
 from app.schemas.auth import CreateStudentRequest
 import secrets
@@ -95,22 +100,8 @@ async def create_notification(
 
 
 async def notify_telegram(db: AsyncSession, user_id: str, message: str):
-    try:
-        from shared.database.models import TelegramUser
-        from app.core.config import settings
-        tg_res = await db.execute(select(TelegramUser).where(TelegramUser.user_id == user_id))
-        tg_user = tg_res.scalars().first()
-        if tg_user and tg_user.telegram_chat_id and tg_user.notifications_enabled:
-            import httpx
-            token = settings.TELEGRAM_BOT_TOKEN
-            if token:
-                async with httpx.AsyncClient(timeout=5) as client:
-                    await client.post(
-                        f"https://api.telegram.org/bot{token}/sendMessage",
-                        json={"chat_id": tg_user.telegram_chat_id, "text": message, "parse_mode": "Markdown"},
-                    )
-    except Exception as e:
-        logger.warning(f"Telegram notify failed for {user_id}: {e}")
+    """Bitta foydalanuvchiga Telegram xabari — outbox navbati orqali (commit chaqiruvchida)"""
+    await enqueue_telegram(db, [user_id], message)
 
 
 def classroom_dict(c: Classroom, student_count: int = 0) -> dict:
@@ -496,8 +487,6 @@ async def invite_student(
         db, student_user.id, f"📚 Sinfga taklif: {classroom.name}", msg,
         InAppNotifType.classroom_invite, "invitation", invitation.id, current_user.id,
     )
-    await db.commit()
-
     subject_text = classroom.subject or "Ko'rsatilmagan"
     tg_msg = (
         f"📚 *Sinfga taklif!*\n\n"
@@ -506,6 +495,8 @@ async def invite_student(
         f"Qabul qilish uchun platformaga kiring."
     )
     await notify_telegram(db, student_user.id, tg_msg)
+    await db.commit()
+    wake_telegram_outbox()
 
     return {"success": True, "message": f"Taklif yuborildi: {student_user.first_name} {student_user.last_name}",
             "data": {"invitation_id": invitation.id}}
@@ -547,7 +538,7 @@ async def create_student_for_classroom(
             username=username,
             role=UserRole.student
         )
-        student_user.set_password(password)
+        await student_user.set_password_async(password)
         student_user.set_pin(User.generate_pin())
         
         db.add(student_user)
@@ -616,7 +607,7 @@ async def create_student_general(
             username=username,
             role=UserRole.student
         )
-        student_user.set_password(password)
+        await student_user.set_password_async(password)
         student_user.set_pin(User.generate_pin())
         
         db.add(student_user)
@@ -718,7 +709,7 @@ async def update_teacher_student(
     student_user.first_name = data.first_name
     student_user.last_name = data.last_name
     if data.password:
-        student_user.set_password(data.password)
+        await student_user.set_password_async(data.password)
         student_user.set_pin(data.password) # Sync pin too
         
     student_profile.grade = data.grade
@@ -853,9 +844,10 @@ async def add_student_direct(
         f"{teacher_name} sizni «{classroom.name}» sinfiga qo'shdi.",
         InAppNotifType.classroom_invite, "classroom", classroom_id, current_user.id,
     )
-    await db.commit()
     tg_text = f"📚 Siz *{classroom.name}* sinfiga qo'shildingiz!\nO'qituvchi: {teacher_name}"
     await notify_telegram(db, student_user_id, tg_text)
+    await db.commit()
+    wake_telegram_outbox()
     return {"success": True, "message": "O'quvchi sinfga qo'shildi"}
 
 
@@ -1141,6 +1133,17 @@ async def get_child_teachers(
 # GRADEBOOK (JURNAL) API
 # ============================================================
 
+async def _get_owned_classroom(classroom_id: str, current_user: User, db: AsyncSession) -> Classroom:
+    teacher = await get_teacher_profile(current_user, db)
+    cls_res = await db.execute(
+        select(Classroom).where(Classroom.id == classroom_id, Classroom.teacher_id == teacher.id)
+    )
+    classroom = cls_res.scalars().first()
+    if not classroom:
+        raise HTTPException(status_code=404, detail="Sinf topilmadi")
+    return classroom
+
+
 @router.get("/teachers/classrooms/{classroom_id}/gradebook")
 async def get_gradebook_matrix(
     classroom_id: str,
@@ -1151,122 +1154,66 @@ async def get_gradebook_matrix(
 ):
     """
     Electronic Gradebook (Jurnal) Matrix data.
-    Provides a grid of students vs assignments with their scores.
+    Ustunli format: scores[i][j] / statuses[i][j] — i o'quvchi, j vazifa indeksi;
+    statuses qiymati status_codes ro'yxatidagi indeks. meta_data qaytarilmaydi —
+    katak tafsiloti /gradebook/cell orqali olinadi.
     """
-    teacher = await get_teacher_profile(current_user, db)
-
-    # 1. Verify Classroom ownership
-    cls_res = await db.execute(
-        select(Classroom).where(Classroom.id == classroom_id, Classroom.teacher_id == teacher.id)
-    )
-    classroom = cls_res.scalars().first()
-    if not classroom:
-        raise HTTPException(status_code=404, detail="Sinf topilmadi")
-
-    # 2. Get active students in classroom
-    students_stmt = (
-        select(User.id, User.first_name, User.last_name)
-        .join(ClassroomStudent, ClassroomStudent.student_user_id == User.id)
-        .where(
-            ClassroomStudent.classroom_id == classroom_id,
-            ClassroomStudent.status == ClassroomStudentStatus.active
-        )
-        .order_by(User.last_name, User.first_name)
-    )
-    students_res = await db.execute(students_stmt)
-    students = [
-        {"id": row.id, "first_name": row.first_name, "last_name": row.last_name}
-        for row in students_res.fetchall()
-    ]
-    student_ids = [s["id"] for s in students]
-
-    # 3. Get assignments for this classroom
-    # We include assignments where:
-    # - classroom_id matches
-    # - OR it targets this classroom via AssignmentTarget
-    # - OR it targets any student in this classroom via AssignmentTarget
-    # and in all cases, the assignment must be created by this teacher (to avoid showing other teachers' work)
-    target_exists = exists().where(
-        and_(
-            AssignmentTarget.assignment_id == Assignment.id,
-            or_(
-                and_(
-                    AssignmentTarget.target_type == AssignmentTargetType.classroom,
-                    AssignmentTarget.target_id == classroom_id
-                ),
-                and_(
-                    AssignmentTarget.target_type == AssignmentTargetType.student,
-                    AssignmentTarget.target_id.in_(student_ids)
-                )
-            )
-        )
-    )
-
-    assign_stmt = (
-        select(Assignment)
-        .where(
-            or_(
-                Assignment.classroom_id == classroom_id,
-                target_exists
-            )
-        )
-    )
-    
-    if start_date:
-        assign_stmt = assign_stmt.where(Assignment.created_at >= start_date)
-    if end_date:
-        assign_stmt = assign_stmt.where(Assignment.created_at <= end_date)
-    
-    assign_stmt = assign_stmt.order_by(Assignment.created_at.asc())
-    assign_res = await db.execute(assign_stmt)
-    assignments = assign_res.scalars().all()
-    assignment_ids = [a.id for a in assignments]
-
-    # 4. Get submissions for these students and assignments
-    if student_ids and assignment_ids:
-        sub_stmt = select(AssignmentSubmission).where(
-            and_(
-                AssignmentSubmission.assignment_id.in_(assignment_ids),
-                AssignmentSubmission.student_user_id.in_(student_ids)
-            )
-        )
-        sub_res = await db.execute(sub_stmt)
-        submissions = sub_res.scalars().all()
-    else:
-        submissions = []
-
-    # 5. Build Matrix
-    matrix = {sid: {} for sid in student_ids}
-    for sub in submissions:
-        if sub.student_user_id in matrix:
-            # Fallback to meta_data if score is null
-            score = sub.score
-            if (score is None or score == 0) and sub.meta_data:
-                # Try common keys for scores in metadata, especially for automated tests
-                score = sub.meta_data.get("correct") or sub.meta_data.get("score") or score
-
-            matrix[sub.student_user_id][sub.assignment_id] = {
-                "score": score,
-                "status": sub.status.value,
-                "meta": sub.meta_data,
-                "id": sub.id
-            }
-
+    classroom = await _get_owned_classroom(classroom_id, current_user, db)
+    data = await gradebook_matrix(db, classroom_id, start_date, end_date)
     return {
         "success": True,
         "data": {
             "classroom": {"id": classroom.id, "name": classroom.name, "subject": classroom.subject},
-            "students": students,
-            "assignments": [
-                {
-                    "id": a.id,
-                    "title": a.title,
-                    "type": a.assignment_type.value,
-                    "max_score": a.max_score,
-                    "date": a.created_at.isoformat() if a.created_at else None,
-                    "due_date": a.due_date.isoformat() if a.due_date else None,
-                } for a in assignments
-            ],
-            "matrix": matrix
+            **data,
         }
     }
+
+
+@router.get("/teachers/classrooms/{classroom_id}/gradebook/cell")
+async def get_gradebook_cell(
+    classroom_id: str,
+    assignment_id: str = Query(...),
+    student_id: str = Query(...),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Jurnal katagi tafsiloti (meta_data, izoh) — talab bo'yicha"""
+    await _get_owned_classroom(classroom_id, current_user, db)
+    cell = await gradebook_cell(db, classroom_id, assignment_id, student_id)
+    if cell is None:
+        raise HTTPException(status_code=404, detail="Topshiriq topilmadi")
+    return {"success": True, "data": cell}
+
+
+@router.get("/teachers/classrooms/{classroom_id}/gradebook/export")
+async def export_gradebook(
+    classroom_id: str,
+    format: str = Query("csv", pattern="^(csv|xlsx)$"),
+    start_date: Optional[datetime] = Query(None),
+    end_date: Optional[datetime] = Query(None),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Jurnalni CSV/XLSX sifatida yuklab olish — qatorlar DB'dan o'qilishi bilan yoziladi.
+    Javob tanasi get_db sessiyasi yopilgandan keyin oqadi, shuning uchun generator
+    o'z sessiyasini ochadi.
+    """
+    classroom = await _get_owned_classroom(classroom_id, current_user, db)
+    assignments = await classroom_assignments(db, classroom_id, start_date, end_date)
+    bind = db.bind
+
+    def session_factory():
+        return AsyncSession(bind, expire_on_commit=False)
+
+    if format == "xlsx":
+        body = stream_gradebook_xlsx(session_factory, classroom_id, assignments)
+        media_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    else:
+        body = stream_gradebook_csv(session_factory, classroom_id, assignments)
+        media_type = "text/csv; charset=utf-8"
+    filename = f"jurnal_{classroom.id}.{format}"
+    return StreamingResponse(
+        body, media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
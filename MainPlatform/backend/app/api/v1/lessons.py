@@ -1,7 +1,7 @@
 import logging
 from typing import Optional, List, Any, Dict
 from datetime import datetime, timezone
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, desc, func, or_
 from pydantic import BaseModel, Field
@@ -11,6 +11,7 @@ from shared.database.models import User, UserRole, TeacherProfile, StudentProfil
 from shared.database.models.classroom import Classroom, ClassroomStudent, ClassroomStudentStatus
 from app.middleware.auth import get_current_user
 from shared.subscription import require_feature, SubscriptionInfo
+from shared.services.tts_render_service import get_tts_renderer
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -404,6 +405,7 @@ async def create_teacher_story(
     db.add(story)
     await db.commit()
     await db.refresh(story)
+    get_tts_renderer().prerender(story.content, story.language or "uz", "female")
     return {"success": True, "data": story_dict(story)}
 
 @router.get("/teachers/stories")
@@ -441,13 +443,16 @@ async def update_teacher_story(
     if not story:
         raise HTTPException(status_code=404, detail="Ertak topilmadi")
     
-    for k, v in data.model_dump(exclude_unset=True).items():
+    changes = data.model_dump(exclude_unset=True)
+    for k, v in changes.items():
         setattr(story, k, v)
         if k == "audio_url":
             story.has_audio = True if v else False
             
     await db.commit()
     await db.refresh(story)
+    if "content" in changes or "language" in changes:
+        get_tts_renderer().prerender(story.content, story.language or "uz", "female")
     return {"success": True, "data": story_dict(story)}
 
 @router.delete("/teachers/stories/{story_id}")
@@ -604,32 +609,28 @@ async def get_public_story(
 # TTS: AI ertak o'qish (OpenAI TTS)
 # ============================================================================
 
-import os
-import httpx
-from fastapi import Response as FastAPIResponse
-
-from shared.services.azure_speech_service import speech_service
+@router.get("/stories/{story_id}/tts")
 @router.post("/stories/{story_id}/tts")
 async def story_tts(
     story_id: str,
+    request: Request,
     db: AsyncSession = Depends(get_db),
 ):
-    """AI yordamida ertakni o'qib berish (Azure TTS) — auth kerak emas"""
+    """AI yordamida ertakni o'qib berish (Azure TTS) — auth kerak emas.
+    Gap-gap oldindan ovozlashtirilgan bo'laklardan (ETag/Range bilan) beriladi."""
     res = await db.execute(select(Story).where(Story.id == story_id))
     story = res.scalars().first()
     if not story:
         raise HTTPException(status_code=404, detail="Ertak topilmadi")
 
-    text = (story.content or "")[:4096]
+    text = story.content or ""
     if not text.strip():
         raise HTTPException(status_code=400, detail="Ertak matni bo'sh")
 
     lang = story.language or "uz"
-    logger.info(f"Azure TTS request: story={story_id}, lang={lang}, text_len={len(text)}")
 
     try:
-        audio_content = await speech_service.text_to_speech(text=text, language=lang, gender="female")
-        return FastAPIResponse(content=audio_content, media_type="audio/mpeg")
+        return await get_tts_renderer().audio_response(request, text, lang, "female", db)
     except HTTPException:
         raise
     except Exception as e:
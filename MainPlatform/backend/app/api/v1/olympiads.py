@@ -1539,6 +1539,7 @@ async def ai_generate_questions(
     """AI yordamida matndan test savollarini yaratadi"""
     from app.core.config import settings
     from openai import AsyncAzureOpenAI
+    from shared.services.http_client import get_http_client
     import json as _json
 
     text = request.get("text", "")
@@ -1561,6 +1562,7 @@ async def ai_generate_questions(
             azure_endpoint=settings.AZURE_OPENAI_ENDPOINT,
             api_key=settings.AZURE_OPENAI_KEY,
             api_version=settings.AZURE_OPENAI_API_VERSION,
+            http_client=get_http_client("azure_openai").pool,
         )
         response = await client.chat.completions.create(
             model=settings.AZURE_OPENAI_DEPLOYMENT_NAME or "gpt-5-chat",
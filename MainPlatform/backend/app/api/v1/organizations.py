@@ -570,7 +570,7 @@ async def create_student_in_org(
         status=AccountStatus.active,
     )
     if data.password:
-        new_user.set_password(data.password)
+        await new_user.set_password_async(data.password)
     
     db.add(new_user)
     await db.flush()
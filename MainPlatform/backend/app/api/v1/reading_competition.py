@@ -23,6 +23,7 @@ from shared.database.models.reading_competition import (
     ReadingSession, CompetitionResult,
     CompetitionStatus, TaskDay, SessionStatus, ResultGroup,
 )
+from shared.services.word_alignment import align_words, count_words
 from app.api.v1.admin_panel import verify_admin, has_permission
 
 logger = logging.getLogger(__name__)
@@ -82,10 +83,10 @@ class TestUpdate(BaseModel):
 
 
 def _count_words(text: str) -> int:
-    """Matndagi so'zlar sonini hisoblash"""
+    """Matndagi so'zlar sonini hisoblash — Olimp baholashidagi total_words bilan bir xil"""
     if not text:
         return 0
-    return len(text.split())
+    return count_words(text)
 
 
 def _serialize_competition(c: ReadingCompetition, tasks_count: int = 0, participants: int = 0) -> dict:
@@ -835,6 +836,11 @@ async def get_session_audio_details(
 
     session, user, task = row
 
+    # Har bir hikoya so'zi: correct / substituted / skipped (admin eshitganini tekshirishi uchun)
+    word_marks = []
+    if task.story_text and session.stt_transcript:
+        word_marks = align_words(task.story_text, session.stt_transcript).marks_payload()
+
     return {
         "session_id": session.id,
         "student_name": f"{user.first_name} {user.last_name}",
@@ -847,6 +853,7 @@ async def get_session_audio_details(
         "words_read": session.words_read,
         "total_words": session.total_words,
         "completion_percentage": session.completion_percentage,
+        "word_marks": word_marks,
         "reading_time_seconds": session.reading_time_seconds,
         "score_completion": session.score_completion,
         "score_words": session.score_words,
@@ -1,15 +1,16 @@
-from fastapi import APIRouter, Depends, Request, Header, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, Request, Header, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 from pydantic import BaseModel
 from typing import Optional
 import os
-import httpx
 import logging
 
-from shared.database import get_db
-from shared.database.models.telegram import TelegramUser
+from shared.database import get_db, AsyncSessionLocal
+from shared.database.models.telegram import TelegramUser, TelegramBroadcast
 from shared.services.telegram_bot_service import TelegramBotService
+from shared.services.telegram_broadcast import TelegramBroadcaster
+from shared.services.http_client import get_http_client
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
@@ -47,14 +48,24 @@ async def telegram_webhook(request: Request, db: AsyncSession = Depends(get_db))
         return {"status": "error", "message": str(e)}
 
 
+async def _run_broadcast_in_bg(broadcast_id: str) -> None:
+    """Fon vazifasi: xatolar broadcast yozuviga (status=failed) tushadi."""
+    try:
+        await TelegramBroadcaster(TELEGRAM_BOT_TOKEN).run(AsyncSessionLocal, broadcast_id)
+    except Exception:
+        logger.exception(f"Telegram broadcast {broadcast_id} background task failed")
+
+
 @router.post("/broadcast")
 async def broadcast_message(
     data: BroadcastRequest,
+    background_tasks: BackgroundTasks,
     admin: bool = Depends(verify_broadcast_admin),
     db: AsyncSession = Depends(get_db)
 ):
     """
     Barcha Telegram foydalanuvchilarga ommaviy xabar jo'natish (admin only).
+    Xabar fon vazifasida yuboriladi; holatni GET /broadcast/{broadcast_id} dan kuzating.
     
     Headers: X-Admin-Key: admin secret key
     Body: { "message": "Xabar matni", "parse_mode": "Markdown", "filter_type": "all" }
@@ -63,13 +74,54 @@ async def broadcast_message(
     if not TELEGRAM_BOT_TOKEN:
         return {"status": "error", "message": "Bot token not configured"}
     
-    service = TelegramBotService(db, TELEGRAM_BOT_TOKEN)
-    result = await service.broadcast_message(
+    broadcast = await TelegramBroadcaster.create(
+        db,
         message=data.message,
         parse_mode=data.parse_mode,
         filter_type=data.filter_type
     )
-    return result
+    background_tasks.add_task(_run_broadcast_in_bg, broadcast.id)
+    return {
+        "success": True,
+        "broadcast_id": broadcast.id,
+        "status": broadcast.status,
+        "total": broadcast.total,
+        "sent": 0,
+        "failed": 0,
+        "message": f"Xabar {broadcast.total} foydalanuvchiga yuborilmoqda."
+    }
+
+
+@router.get("/broadcast/{broadcast_id}")
+async def get_broadcast_status(
+    broadcast_id: str,
+    admin: bool = Depends(verify_broadcast_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    """Broadcast holati: yuborilgan / xato / jami"""
+    broadcast = await db.get(TelegramBroadcast, broadcast_id)
+    if not broadcast:
+        raise HTTPException(status_code=404, detail="Broadcast topilmadi")
+    return TelegramBroadcaster.summary(broadcast)
+
+
+@router.post("/broadcast/{broadcast_id}/resume")
+async def resume_broadcast(
+    broadcast_id: str,
+    background_tasks: BackgroundTasks,
+    admin: bool = Depends(verify_broadcast_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    """Uzilgan yoki xato bilan tugagan broadcast'ni saqlangan joyidan davom ettirish"""
+    if not TELEGRAM_BOT_TOKEN:
+        return {"status": "error", "message": "Bot token not configured"}
+    broadcast = await db.get(TelegramBroadcast, broadcast_id)
+    if not broadcast:
+        raise HTTPException(status_code=404, detail="Broadcast topilmadi")
+    if broadcast.status == "completed":
+        return TelegramBroadcaster.summary(broadcast)
+    background_tasks.add_task(_run_broadcast_in_bg, broadcast_id)
+    return {**TelegramBroadcaster.summary(broadcast), "message": "Broadcast davom ettirilmoqda."}
 
 
 @router.post("/register-commands")
@@ -101,15 +153,15 @@ async def set_webhook(
     
     webhook_url = "https://alif24.uz/api/v1/telegram/webhook"
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/setWebhook",
-                json={"url": webhook_url, "drop_pending_updates": True},
-                timeout=15.0
-            )
-            data = response.json()
-            logger.info(f"Telegram setWebhook response: {data}")
-            return {"status": "ok" if data.get("ok") else "error", "data": data}
+        response = await get_http_client("telegram").post(
+            f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/setWebhook",
+            json={"url": webhook_url, "drop_pending_updates": True},
+            timeout=15.0,
+            idempotent=True,
+        )
+        data = response.json()
+        logger.info(f"Telegram setWebhook response: {data}")
+        return {"status": "ok" if data.get("ok") else "error", "data": data}
     except Exception as e:
         logger.error(f"setWebhook error: {e}")
         return {"status": "error", "message": str(e)}
@@ -124,14 +176,14 @@ async def delete_webhook(
         return {"status": "error", "message": "Bot token not configured"}
     
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/deleteWebhook",
-                json={"drop_pending_updates": True},
-                timeout=15.0
-            )
-            data = response.json()
-            return {"status": "ok" if data.get("ok") else "error", "data": data}
+        response = await get_http_client("telegram").post(
+            f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/deleteWebhook",
+            json={"drop_pending_updates": True},
+            timeout=15.0,
+            idempotent=True,
+        )
+        data = response.json()
+        return {"status": "ok" if data.get("ok") else "error", "data": data}
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
@@ -145,12 +197,11 @@ async def get_webhook_info(
         return {"status": "error", "message": "Bot token not configured"}
     
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/getWebhookInfo",
-                timeout=15.0
-            )
-            return response.json()
+        response = await get_http_client("telegram").get(
+            f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/getWebhookInfo",
+            timeout=15.0,
+        )
+        return response.json()
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
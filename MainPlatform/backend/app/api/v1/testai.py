@@ -19,7 +19,8 @@ from shared.database.models.assignment import (
 )
 from shared.database.models.in_app_notification import InAppNotifType
 from app.middleware.auth import get_current_user
-from app.api.v1.assignments import create_notification, notify_telegram
+from app.services.assignment_fanout import fan_out_assignment
+from shared.services.telegram_outbox import wake_telegram_outbox
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -291,31 +292,23 @@ async def assign_test(data: AssignTestRequest, current_user: User = Depends(get_
             notified_students.add(sid)
             
     due_text = data.due_date.strftime("%d.%m.%Y %H:%M") if data.due_date else "Belgilanmagan"
-    for student_id in notified_students:
-        db.add(AssignmentSubmission(
-            assignment_id=assignment.id,
-            student_user_id=student_id,
-            status=SubmissionStatus.pending
-        ))
-        await create_notification(
-            db, student_id,
-            f"📝 Yangi test: {test.title}",
-            f"{teacher_name} sizga yangi test topshirig'ini yubordi.\nMuddati: {due_text}",
-            InAppNotifType.assignment_new,
-            "assignment", assignment.id, current_user.id
-        )
-        
-    await db.commit()
-    
-    for student_id in notified_students:
-        tg_text = (
+    await fan_out_assignment(
+        db, assignment.id, notified_students,
+        title=f"📝 Yangi test: {test.title}",
+        message=f"{teacher_name} sizga yangi test topshirig'ini yubordi.\nMuddati: {due_text}",
+        notif_type=InAppNotifType.assignment_new,
+        sender_id=current_user.id,
+        telegram_text=(
             f"📝 *Yangi test topshirig'i!*\n\n"
             f"*{test.title}*\n"
             f"O'qituvchi: {teacher_name}\n"
             f"Muddati: {due_text}\n\n"
             f"Platformaga kiring va testni yeching."
-        )
-        await notify_telegram(db, student_id, tg_text)
+        ),
+    )
+
+    await db.commit()
+    wake_telegram_outbox()
         
     return {"success": True, "assignment_id": assignment.id, "student_count": len(notified_students)}
 
@@ -412,31 +405,23 @@ async def assign_test_advanced(data: AssignTestAdvancedRequest, current_user: Us
             notified_students.add(sid)
     
     due_text = data.due_date.strftime("%d.%m.%Y %H:%M") if data.due_date else "Belgilanmagan"
-    for student_id in notified_students:
-        db.add(AssignmentSubmission(
-            assignment_id=assignment.id,
-            student_user_id=student_id,
-            status=SubmissionStatus.pending
-        ))
-        await create_notification(
-            db, student_id,
-            f"📝 Yangi test: {test.title}",
-            f"{teacher_name} sizga yangi test topshirig'ini yubordi.\nMuddati: {due_text}",
-            InAppNotifType.assignment_new,
-            "assignment", assignment.id, current_user.id
-        )
-    
-    await db.commit()
-    
-    for student_id in notified_students:
-        tg_text = (
+    await fan_out_assignment(
+        db, assignment.id, notified_students,
+        title=f"📝 Yangi test: {test.title}",
+        message=f"{teacher_name} sizga yangi test topshirig'ini yubordi.\nMuddati: {due_text}",
+        notif_type=InAppNotifType.assignment_new,
+        sender_id=current_user.id,
+        telegram_text=(
             f"📝 *Yangi test topshirig'i!*\n\n"
             f"*{test.title}*\n"
             f"O'qituvchi: {teacher_name}\n"
             f"Muddati: {due_text}\n\n"
             f"Platformaga kiring va testni yeching."
-        )
-        await notify_telegram(db, student_id, tg_text)
+        ),
+    )
+    
+    await db.commit()
+    wake_telegram_outbox()
     
     return {"success": True, "assignment_id": assignment.id, "student_count": len(notified_students)}
 
@@ -26,6 +26,26 @@ class Settings:
     JWT_REFRESH_EXPIRES_IN: str = os.getenv("JWT_REFRESH_EXPIRES_IN", "30d")
     JWT_ALGORITHM: str = "HS256"
 
+    # Request konteksti (User + obuna) keshi — har bir worker'da LRU,
+    # AUTH_CONTEXT_REDIS=true bo'lsa Redis ham umumiy qatlam sifatida
+    AUTH_CONTEXT_TTL_SECONDS: float = float(os.getenv("AUTH_CONTEXT_TTL_SECONDS", "30"))
+    AUTH_CONTEXT_MAX_ENTRIES: int = int(os.getenv("AUTH_CONTEXT_MAX_ENTRIES", "10000"))
+    AUTH_CONTEXT_REDIS: bool = os.getenv("AUTH_CONTEXT_REDIS", "false").lower() == "true"
+
+    # GeoIP — lokal IP diapazonlar fayli (CSV) va login geo loglarini paketlab yozish.
+    # Bo'sh bo'lsa geo ma'lumotlari yozilmaydi (DEBUG'da — namunaviy fayl)
+    GEOIP_DB_PATH: str = os.getenv("GEOIP_DB_PATH", "")
+    GEOIP_CACHE_SIZE: int = int(os.getenv("GEOIP_CACHE_SIZE", "10000"))
+    GEO_LOG_BATCH_SIZE: int = int(os.getenv("GEO_LOG_BATCH_SIZE", "200"))
+    GEO_LOG_FLUSH_SECONDS: float = float(os.getenv("GEO_LOG_FLUSH_SECONDS", "5"))
+    GEO_LOG_MAX_PENDING: int = int(os.getenv("GEO_LOG_MAX_PENDING", "10000"))
+
+    # Admin dashboard kunlik ko'rsatkichlari (daily_platform_metrics) — fon rollup job'i
+    METRICS_ROLLUP_ENABLED: bool = os.getenv("METRICS_ROLLUP_ENABLED", "true").lower() == "true"
+    METRICS_ROLLUP_INTERVAL_SECONDS: float = float(os.getenv("METRICS_ROLLUP_INTERVAL_SECONDS", "3600"))
+    METRICS_ROLLUP_LOOKBACK_DAYS: int = int(os.getenv("METRICS_ROLLUP_LOOKBACK_DAYS", "2"))
+    METRICS_ROLLUP_MAX_CATCHUP_DAYS: int = int(os.getenv("METRICS_ROLLUP_MAX_CATCHUP_DAYS", "31"))
+
     # OpenAI (legacy - not used, kept for compatibility)
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
     OPENAI_MODEL: str = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
@@ -37,6 +57,23 @@ class Settings:
     AZURE_OPENAI_API_VERSION: str = os.getenv("AZURE_OPENAI_API_VERSION", "2024-02-01")
     AZURE_OPENAI_REGION: str = os.getenv("AZURE_OPENAI_REGION", "eastus")
 
+    # AI javoblar keshi (ai_cache jadvali oldida xotira qatlami)
+    AI_CACHE_MEMORY_ENTRIES: int = int(os.getenv("AI_CACHE_MEMORY_ENTRIES", "2000"))
+    AI_CACHE_MEMORY_TTL_SECONDS: int = int(os.getenv("AI_CACHE_MEMORY_TTL_SECONDS", "3600"))
+    AI_CACHE_TTL_DAYS: int = int(os.getenv("AI_CACHE_TTL_DAYS", "30"))
+    AI_CACHE_MAX_ROWS: int = int(os.getenv("AI_CACHE_MAX_ROWS", "100000"))
+    AI_CACHE_WRITE_BEHIND_SECONDS: float = float(os.getenv("AI_CACHE_WRITE_BEHIND_SECONDS", "2"))
+    AI_CACHE_EVICT_INTERVAL_SECONDS: int = int(os.getenv("AI_CACHE_EVICT_INTERVAL_SECONDS", "3600"))
+
+    # SmartKids fayl o'qish natijalari (document_store): har bir worker'da LRU,
+    # DOC_STORE_BACKEND=redis|disk bo'lsa hamma worker o'qiy oladigan qatlam ham
+    DOC_STORE_BACKEND: str = os.getenv("DOC_STORE_BACKEND", "memory")
+    DOC_STORE_MEMORY_BYTES: int = int(os.getenv("DOC_STORE_MEMORY_BYTES", str(16 * 1024 * 1024)))
+    DOC_STORE_MAX_ENTRIES: int = int(os.getenv("DOC_STORE_MAX_ENTRIES", "5000"))
+    DOC_STORE_TTL_SECONDS: int = int(os.getenv("DOC_STORE_TTL_SECONDS", str(24 * 3600)))
+    DOC_STORE_DIR: str = os.getenv("DOC_STORE_DIR", "/tmp/doc_store")
+    DOC_STORE_DISK_MAX_BYTES: int = int(os.getenv("DOC_STORE_DISK_MAX_BYTES", str(512 * 1024 * 1024)))
+
     # Azure Speech (optional)
     AZURE_SPEECH_KEY: Optional[str] = os.getenv("AZURE_SPEECH_KEY", None)
     AZURE_SPEECH_REGION: str = os.getenv("AZURE_SPEECH_REGION", "westeurope")
@@ -3,9 +3,10 @@ MathKids Image Reader - Matematik masalalarni rasmdan o'qish
 """
 from fastapi import APIRouter, UploadFile, File, HTTPException
 from app.services.ai_service import ai_service
-import base64
 import logging
 from app.core.config import settings
+from shared.services.document_extraction import ExtractionError, UploadTooLarge
+from shared.services.image_pipeline import get_or_recognize, prepare_upload
 
 from sympy import sympify, latex as sympy_latex
 
@@ -98,11 +99,15 @@ async def read_math_image(image: UploadFile = File(...)):
     """
     Rasmdan matematik masalani o'qish
     """
+    # Rasm kichraytiriladi va JPEG'ga o'tkaziladi (try'dan tashqarida — 413/422 500 ga aylanmasin)
+    try:
+        prepared = await prepare_upload(image)
+    except UploadTooLarge:
+        raise HTTPException(status_code=413, detail="Rasm hajmi juda katta. Maksimal hajm: 50MB")
+    except ExtractionError as e:
+        raise HTTPException(status_code=422, detail=f"Rasmni o'qib bo'lmadi: {e}")
+
     try:
-        # Rasmni base64 ga encode qilish
-        image_bytes = await image.read()
-        encoded = base64.b64encode(image_bytes).decode("utf-8")
-        
         prompt = (
             "Rasmda matematik masala yoki ifoda bor. "
             "Matematik ifodalarni, tenglamalarni, formulalarni va masala matnini aniq va to'liq o'qing. "
@@ -111,22 +116,26 @@ async def read_math_image(image: UploadFile = File(...)):
             "Faqat masala matnini qaytaring, boshqa izoh yozmang."
         )
         
-        vision_messages = [{
-            "role": "user",
-            "content": [
-                {"type": "text", "text": prompt},
-                {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{encoded}"}}
-            ]
-        }]
+        async def recognize(prepared_image):
+            vision_messages = [{
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": prompt},
+                    {"type": "image_url", "image_url": {"url": prepared_image.data_url()}}
+                ]
+            }]
+            return await ai_service.call_ai(
+                messages=vision_messages,
+                max_tokens=1200,
+                temperature=0,  # deterministik o'qish: keshlangan javob qayta so'rovdagidek
+                cache=True,
+            )
         
         text_output = None
 
         try:
-            text_output = await ai_service.call_ai(
-                messages=vision_messages,
-                max_tokens=1200,
-                temperature=0.3
-            )
+            # O'sha masala rasmi qayta yuklansa — keshdan
+            text_output = await get_or_recognize(prepared, "math_ocr", recognize)
             logger.info("Azure math OCR success")
         except Exception as ai_err:
             logger.warning(f"AI math OCR failed: {ai_err}")
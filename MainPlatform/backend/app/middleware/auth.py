@@ -12,10 +12,10 @@ from datetime import datetime, timezone
 from typing import Optional
 
 from shared.database import get_db
-from shared.database.models import User, AccountStatus, UserSubscription, SubscriptionStatus
-from shared.auth import verify_token
+from shared.database.models import User, UserSubscription, SubscriptionStatus
 from ..core.config import settings
 from ..core.errors import UnauthorizedError, TokenExpiredError
+from .request_context import AuthContext, load_user_context, resolve_auth_context
 
 security = HTTPBearer(auto_error=False)
 
@@ -65,39 +65,31 @@ async def get_current_user(
 ) -> User:
     """Get current authenticated user using shared auth.
     Reads token from: 1) HttpOnly cookie  2) Authorization Bearer header
+
+    RequestContextMiddleware token'ni allaqachon decode qilgan va User'ni
+    keshdan olgan bo'lsa, shu natija qayta ishlatiladi (qo'shimcha SELECT yo'q).
     """
-    token = None
-    
-    # 1. Try HttpOnly cookie first
-    token = request.cookies.get("access_token")
-    
-    # 2. Fallback to Authorization Bearer header
-    if not token and credentials:
-        token = credentials.credentials
-    
-    if not token:
+    ctx: Optional[AuthContext] = getattr(request.state, "auth", None)
+    if ctx is None:
+        # Middleware o'tkazib yuborgan yo'llar (SKIP_PREFIXES) uchun
+        ctx = await resolve_auth_context(request, db)
+
+    if not ctx.token:
         raise UnauthorizedError("Not authenticated")
-    
-    payload = verify_token(token)
-    if not payload:
+    if not ctx.payload:
         raise TokenExpiredError("Token expired or invalid")
-    
-    user_id = payload.get("sub")
-    if not user_id:
+    if not ctx.user_id:
         raise UnauthorizedError("Invalid token payload")
-    
-    # Query user from shared database (8-digit string ID)
-    stmt = select(User).filter(User.id == user_id)
-    result = await db.execute(stmt)
-    user = result.scalars().first()
-    if not user:
+
+    user_ctx = ctx.user or await load_user_context(ctx.user_id, db)
+    if user_ctx.user is None:
         raise UnauthorizedError("User not found")
-    
+
     # Check account status
-    if user.status != AccountStatus.active:
+    if not user_ctx.is_active:
         raise UnauthorizedError("User account is deactivated")
-    
-    return user
+
+    return await user_ctx.attach(db)
 
 
 async def get_optional_current_user(
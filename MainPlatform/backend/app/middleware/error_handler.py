@@ -6,6 +6,7 @@ from fastapi import Request, status, HTTPException
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
 from app.core.errors import AppError
+from shared.auth.crypto_executor import CryptoBusyError
 from app.core.logging import logger
 from datetime import datetime, timezone
 import traceback
@@ -37,6 +38,20 @@ async def error_handler(request: Request, exc: Exception):
                 "timestamp": datetime.now(timezone.utc).isoformat()
             }
         )
+    if isinstance(exc, CryptoBusyError):
+        # Login to'lqini: kripto navbati to'lgan — mijoz biroz kutib qayta urinsin
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            headers={"Retry-After": str(exc.retry_after)},
+            content={
+                "success": False,
+                "error": {
+                    "code": "SERVER_BUSY",
+                    "message": "Server band, birozdan keyin qayta urinib ko'ring"
+                },
+                "timestamp": datetime.now(timezone.utc).isoformat()
+            }
+        )
     if isinstance(exc, RequestValidationError):
         return JSONResponse(
             status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
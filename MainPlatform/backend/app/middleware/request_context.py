@@ -0,0 +1,427 @@
+"""
+Request konteksti — JWT bir marta decode qilinadi, User va obuna
+ma'lumotlari qisqa TTL'li keshdan olinadi.
+
+RequestContextMiddleware (sof ASGI) har bir so'rov uchun yozadi:
+    request.state.auth          -> AuthContext (token, payload, UserContext)
+    request.state.subscription  -> SubscriptionInfo
+get_current_user() va subscription_deps shu holatdan o'qiydi, shuning uchun
+keshdagi foydalanuvchining so'rovi bitta ham auth SELECT'siz o'tadi.
+
+Kesh: har bir worker'da LRU (AUTH_CONTEXT_TTL_SECONDS), AUTH_CONTEXT_REDIS
+yoqilgan bo'lsa Redis ham. User yoki UserSubscription ORM orqali
+o'zgarganda commit'dan keyin yozuv o'chiriladi; rol, status va obunani
+o'zgartiradigan endpoint'lar invalidate_user_context() ni ham chaqiradi.
+Boshqa worker'lardagi LRU ko'pi bilan TTL muddatigacha eski qolishi mumkin.
+
+Keshga faqat CONTEXT_FIELDS dagi ustunlar yoziladi — password_hash,
+refresh_token, pin_code kabi auth sirlari hech qachon LRU yoki Redis'ga
+tushmaydi. Ular kerak bo'lgan joy (login, parol/PIN) User'ni o'zi SELECT qiladi.
+"""
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from datetime import date, datetime, timezone
+from enum import Enum
+from itertools import chain
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event, inspect as sa_inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, make_transient_to_detached
+from starlette.requests import HTTPConnection
+
+from shared.auth import verify_token
+from shared.database.models import AccountStatus, SubscriptionStatus, User, UserSubscription
+from shared.services.redis_service import get_redis
+from shared.subscription import SubscriptionInfo
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+REDIS_PREFIX = "authctx:"
+
+# get_current_user() qaytaradigan User'da yuklangan ustunlar. Sirlar
+# (password_hash, refresh_token, pin_code) va google_id bu ro'yxatga kirmaydi.
+CONTEXT_FIELDS = (
+    "id", "email", "email_verified", "phone", "phone_verified", "oauth_provider",
+    "marketing_emails_enabled", "username", "parent_id", "first_name", "last_name",
+    "avatar", "date_of_birth", "gender", "role", "status", "language", "timezone",
+    "reader_id", "category", "is_blacklisted", "last_login_at", "created_at",
+    "updated_at", "deleted_at",
+)
+
+
+@dataclass
+class UserContext:
+    """Keshlanadigan qism: CONTEXT_FIELDS ustunlari (yoki None) va obuna holati."""
+    user_id: str
+    user: Optional[Dict[str, Any]]
+    subscription: SubscriptionInfo
+
+    @property
+    def is_active(self) -> bool:
+        return self.user is not None and self.user.get("status") == AccountStatus.active
+
+    async def attach(self, db: AsyncSession) -> User:
+        """
+        Snapshot'ni SELECT'siz sessiyaga biriktirish (merge load=False).
+        CONTEXT_FIELDS dan tashqari ustunlar yuklanmagan bo'ladi.
+        """
+        user = User(**self.user)
+        make_transient_to_detached(user)
+        return await db.merge(user, load=False)
+
+
+@dataclass
+class AuthContext:
+    """Bitta so'rov uchun: token, decode qilingan payload va UserContext."""
+    token: Optional[str] = None
+    payload: Optional[Dict[str, Any]] = None
+    user_id: Optional[str] = None
+    user: Optional[UserContext] = None
+    load_failed: bool = False
+
+    @property
+    def subscription(self) -> SubscriptionInfo:
+        if not self.token:
+            return SubscriptionInfo(is_authenticated=False)
+        if self.user is not None:
+            return self.user.subscription if self.user.is_active else SubscriptionInfo()
+        # DB vaqtincha ishlamasa ham login qilgan deb hisoblaymiz (avvalgidek)
+        return SubscriptionInfo(is_authenticated=self.load_failed)
+
+
+class _ContextLRU:
+    """user_id -> (muddati, UserContext)"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._items: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, user_id: str) -> Optional[UserContext]:
+        item = self._items.get(user_id)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._items[user_id]
+            return None
+        self._items.move_to_end(user_id)
+        return value
+
+    def put(self, user_id: str, value: UserContext, ttl: float) -> None:
+        self._items[user_id] = (time.monotonic() + ttl, value)
+        self._items.move_to_end(user_id)
+        while len(self._items) > self.max_entries:
+            self._items.popitem(last=False)
+
+    def pop(self, user_id: str) -> None:
+        self._items.pop(user_id, None)
+
+    def clear(self) -> None:
+        self._items.clear()
+
+
+_cache = _ContextLRU(settings.AUTH_CONTEXT_MAX_ENTRIES)
+_session_factory = None
+# Yuklash davomida invalidatsiya bo'lsa, eski natija keshga yozilmaydi
+_invalidations = 0
+_background: set = set()
+_stats = {"hits": 0, "redis_hits": 0, "misses": 0, "invalidations": 0}
+
+
+def set_session_factory(factory) -> None:
+    """Testlar/benchmark uchun: miss bo'lganda ishlatiladigan sessiya fabrikasi"""
+    global _session_factory
+    _session_factory = factory
+
+
+def _get_session_factory():
+    if _session_factory is not None:
+        return _session_factory
+    from shared.database import session as db_session
+    return db_session.AsyncSessionLocal
+
+
+# --- Redis kodlash -----------------------------------------------------------
+
+_column_types: Optional[Dict[str, type]] = None
+
+
+def _python_types() -> Dict[str, type]:
+    global _column_types
+    if _column_types is None:
+        types = {}
+        for attr in sa_inspect(User).column_attrs:
+            try:
+                types[attr.key] = attr.columns[0].type.python_type
+            except NotImplementedError:
+                pass
+        _column_types = types
+    return _column_types
+
+
+def _encode_value(value):
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _decode_value(py_type: Optional[type], value):
+    if value is None or py_type is None:
+        return value
+    if issubclass(py_type, Enum):
+        return py_type(value)
+    if py_type is datetime:
+        return datetime.fromisoformat(value)
+    if py_type is date:
+        return date.fromisoformat(value)
+    return value
+
+
+def _dumps(ctx: UserContext) -> str:
+    user = None if ctx.user is None else {k: _encode_value(v) for k, v in ctx.user.items()}
+    return json.dumps({"user": user, "subscription": asdict(ctx.subscription)})
+
+
+def _loads(user_id: str, raw: str) -> UserContext:
+    data = json.loads(raw)
+    user = data["user"]
+    if user is not None:
+        types = _python_types()
+        # Eski formatdagi yozuvlardan ham faqat ruxsat etilgan ustunlar olinadi
+        user = {k: _decode_value(types.get(k), v) for k, v in user.items() if k in CONTEXT_FIELDS}
+    return UserContext(user_id, user, SubscriptionInfo(**data["subscription"]))
+
+
+def _redis():
+    return get_redis() if settings.AUTH_CONTEXT_REDIS else None
+
+
+# --- Yuklash -----------------------------------------------------------------
+
+async def _query_user_context(db: AsyncSession, user_id: str):
+    """(UserContext, kesh TTL) — 2 ta SELECT: User (CONTEXT_FIELDS) va faol obuna + tarif"""
+    user = (await db.execute(
+        select(*(getattr(User, name) for name in CONTEXT_FIELDS)).where(User.id == user_id)
+    )).first()
+    if user is None:
+        return UserContext(user_id, None, SubscriptionInfo()), settings.AUTH_CONTEXT_TTL_SECONDS
+
+    row = dict(user._mapping)
+    now = datetime.now(timezone.utc)
+    result = await db.execute(
+        select(UserSubscription)
+        .options(joinedload(UserSubscription.plan_config))
+        .where(
+            UserSubscription.user_id == user_id,
+            UserSubscription.status == SubscriptionStatus.active.value,
+            UserSubscription.expires_at > now,
+        )
+        .order_by(UserSubscription.expires_at.desc())
+        .limit(1)
+    )
+    active_sub = result.scalars().first()
+
+    ttl = settings.AUTH_CONTEXT_TTL_SECONDS
+    sub_info = SubscriptionInfo(is_authenticated=True)
+    if active_sub and active_sub.plan_config:
+        plan = active_sub.plan_config
+        expires_at = active_sub.expires_at
+        sub_info = SubscriptionInfo(
+            is_authenticated=True,
+            has_subscription=True,
+            plan_slug=plan.slug,
+            plan_name=plan.name,
+            features=plan.features or {},
+            expires_at=expires_at.isoformat() if expires_at else None,
+        )
+        if expires_at:
+            if expires_at.tzinfo is None:
+                expires_at = expires_at.replace(tzinfo=timezone.utc)
+            # Obuna tugagan zahoti keshdagi yozuv ham eskirsin
+            ttl = min(ttl, (expires_at - now).total_seconds())
+    return UserContext(user_id, row, sub_info), ttl
+
+
+async def load_user_context(user_id: str, db: Optional[AsyncSession] = None) -> UserContext:
+    """LRU -> Redis -> DB. db berilmasa o'z sessiyasini ochadi."""
+    ctx = _cache.get(user_id)
+    if ctx is not None:
+        _stats["hits"] += 1
+        return ctx
+
+    redis = _redis()
+    if redis is not None:
+        try:
+            raw = await redis.get(REDIS_PREFIX + user_id)
+            if raw:
+                ctx = _loads(user_id, raw)
+                _stats["redis_hits"] += 1
+                _cache.put(user_id, ctx, settings.AUTH_CONTEXT_TTL_SECONDS)
+                return ctx
+        except Exception as e:
+            logger.warning(f"Auth context Redis read failed: {e}")
+
+    _stats["misses"] += 1
+    generation = _invalidations
+    if db is not None:
+        ctx, ttl = await _query_user_context(db, user_id)
+    else:
+        async with _get_session_factory()() as own_db:
+            ctx, ttl = await _query_user_context(own_db, user_id)
+
+    if ttl > 0 and generation == _invalidations:
+        _cache.put(user_id, ctx, ttl)
+        if redis is not None:
+            try:
+                await redis.set(REDIS_PREFIX + user_id, _dumps(ctx), ex=max(1, int(ttl)))
+            except Exception as e:
+                logger.warning(f"Auth context Redis write failed: {e}")
+    return ctx
+
+
+def _bearer_token(authorization: Optional[str]) -> Optional[str]:
+    if not authorization:
+        return None
+    scheme, _, credentials = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not credentials:
+        return None
+    return credentials
+
+
+async def resolve_auth_context(conn: HTTPConnection, db: Optional[AsyncSession] = None) -> AuthContext:
+    """Token: 1) HttpOnly cookie  2) Authorization Bearer header"""
+    token = conn.cookies.get("access_token") or _bearer_token(conn.headers.get("authorization"))
+    ctx = AuthContext(token=token)
+    if not token:
+        return ctx
+    try:
+        ctx.payload = verify_token(token)
+    except Exception:
+        ctx.payload = None
+    if not ctx.payload:
+        return ctx
+    user_id = ctx.payload.get("sub")
+    if not user_id:
+        return ctx
+    ctx.user_id = str(user_id)
+    try:
+        ctx.user = await load_user_context(ctx.user_id, db)
+    except Exception as e:
+        ctx.load_failed = True
+        logger.warning(f"Auth context load failed for user {ctx.user_id}: {e}")
+    return ctx
+
+
+# --- Invalidatsiya -----------------------------------------------------------
+
+def _drop_local(user_id: Optional[str]) -> None:
+    global _invalidations
+    _invalidations += 1
+    _stats["invalidations"] += 1
+    if user_id is None:
+        _cache.clear()
+    else:
+        _cache.pop(user_id)
+
+
+async def invalidate_user_context(user_id: Optional[str] = None) -> None:
+    """
+    Rol, status yoki obuna o'zgarganda chaqiriladi (LRU + Redis).
+    user_id=None — butun LRU tozalanadi (Redis yozuvlari TTL bilan eskiradi).
+    """
+    _drop_local(user_id)
+    redis = _redis()
+    if redis is not None and user_id is not None:
+        try:
+            await redis.delete(REDIS_PREFIX + user_id)
+        except Exception as e:
+            logger.warning(f"Auth context Redis delete failed: {e}")
+
+
+def reset_user_context_cache() -> None:
+    _cache.clear()
+    for key in _stats:
+        _stats[key] = 0
+
+
+def get_user_context_stats() -> Dict[str, Any]:
+    return {**_stats, "entries": len(_cache)}
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_users(session, flush_context):
+    changed = session.info.setdefault("auth_context_changed", set())
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, User):
+            changed.add(obj.id)
+        elif isinstance(obj, UserSubscription):
+            changed.add(obj.user_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session):
+    changed = session.info.pop("auth_context_changed", None)
+    if not changed:
+        return
+    redis = _redis()
+    for user_id in changed:
+        _drop_local(user_id)
+    if redis is not None:
+        try:
+            task = asyncio.get_running_loop().create_task(
+                redis.delete(*[REDIS_PREFIX + user_id for user_id in changed])
+            )
+        except RuntimeError:
+            return
+        _background.add(task)
+        task.add_done_callback(_background.discard)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_users(session):
+    session.info.pop("auth_context_changed", None)
+
+
+# --- Middleware --------------------------------------------------------------
+
+class RequestContextMiddleware:
+    """
+    "Inject, Don't Block": hech qachon 401/403 bermaydi, faqat
+    request.state.auth va request.state.subscription ni to'ldiradi.
+    """
+
+    SKIP_PREFIXES = (
+        "/health", "/docs", "/openapi", "/api/uploads",
+        "/api/v1/health", "/api/v1/openapi",
+        # OAuth round-trip: /auth/google/login needs to run authlib which sets
+        # a state cookie — must not be blocked/short-circuited by this MW.
+        "/api/v1/auth/google",
+    )
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        state = scope.setdefault("state", {})
+        if scope["method"] == "OPTIONS" or scope["path"].startswith(self.SKIP_PREFIXES):
+            state["subscription"] = SubscriptionInfo()
+        else:
+            auth = await resolve_auth_context(HTTPConnection(scope))
+            state["auth"] = auth
+            state["subscription"] = auth.subscription
+        await self.app(scope, receive, send)
@@ -0,0 +1,243 @@
+"""
+Admin DB brauzeri va foydalanuvchilar ro'yxati — katta jadvallar uchun
+
+    approximate_counts()  — barcha jadvallar soni bitta katalog so'rovida
+                            (pg_class.reltuples, ANALYZE qilinmagan bo'lsa
+                            pg_stat_user_tables.n_live_tup); aniq COUNT(*) faqat
+                            so'ralganda va STATEMENT_TIMEOUT bilan
+    estimate_rows()       — filtrli so'rov uchun planner bahosi (EXPLAIN)
+    table_page()          — keyset (cursor) sahifalash: PK ustunlari bo'yicha
+                            ORDER BY ... DESC va WHERE (pk) < (:cursor) —
+                            OFFSET kabi oldingi qatorlarni o'qib tashlamaydi
+    users_page()          — (created_at, id) bo'yicha keyset + user_search_expr()
+                            ustidagi trigram indeks (pg_trgm, migratsiya 046)
+
+Cursor — oxirgi qator kalitlarining base64 JSON'i; mijoz uni faqat qaytaradi.
+Postgres bo'lmagan bazalarda (testlar, sqlite) sonlar aniq COUNT bilan olinadi.
+"""
+import base64
+import json
+import re
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import String, and_, func, literal_column, or_, select, text, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from shared.database.models import User
+
+EXACT_COUNT_TIMEOUT_MS = 5000
+_PHONE_LIKE = re.compile(r"^[\d\s()+\-]+$")
+
+
+def _is_postgres(db: AsyncSession) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def quote_ident(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+# ============================================================
+# CURSOR
+# ============================================================
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if value is None or isinstance(value, (int, float, str, bool)):
+        return value
+    return str(value)
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw = json.dumps([_jsonable(v) for v in values], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    """Noto'g'ri cursor -> ValueError (endpoint 400 qaytaradi)"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except Exception:
+        raise ValueError("Noto'g'ri cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Noto'g'ri cursor")
+    return values
+
+
+# ============================================================
+# SONLAR
+# ============================================================
+
+async def approximate_counts(db: AsyncSession, tables: Sequence[str]) -> Dict[str, Optional[int]]:
+    if not _is_postgres(db):
+        return {t: await exact_count(db, t) for t in tables}
+    result = await db.execute(text("""
+        SELECT c.relname,
+               CASE WHEN c.reltuples >= 0 THEN c.reltuples::bigint ELSE s.n_live_tup END
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid
+        WHERE n.nspname = 'public' AND c.relkind IN ('r', 'p')
+    """))
+    stats = {name: (int(rows) if rows is not None else None) for name, rows in result}
+    return {t: stats.get(t) for t in tables}
+
+
+async def exact_count(db: AsyncSession, table: str) -> Optional[int]:
+    """Aniq COUNT(*); Postgres'da STATEMENT_TIMEOUT dan oshsa None"""
+    stmt = text(f"SELECT COUNT(*) FROM {quote_ident(table)}")
+    if not _is_postgres(db):
+        return (await db.execute(stmt)).scalar() or 0
+    try:
+        async with db.begin_nested():
+            await db.execute(text(f"SET LOCAL statement_timeout = {int(EXACT_COUNT_TIMEOUT_MS)}"))
+            count = (await db.execute(stmt)).scalar() or 0
+            await db.execute(text("SET LOCAL statement_timeout TO DEFAULT"))
+            return count
+    except Exception:
+        return None
+
+
+async def estimate_rows(db: AsyncSession, stmt) -> int:
+    """Filtrli so'rov uchun taxminiy qatorlar soni (Postgres planner bahosi)"""
+    count_stmt = select(func.count()).select_from(stmt.order_by(None).subquery())
+    if not _is_postgres(db):
+        return (await db.execute(count_stmt)).scalar() or 0
+    compiled = stmt.order_by(None).compile(dialect=db.get_bind().dialect, compile_kwargs={"literal_binds": True})
+    # Qiymatlar dialekt tomonidan literal qilib ekranlangan; text() ':' ni parametr deb o'qimasin
+    conn = await db.connection()
+    plan = (await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}")).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+# ============================================================
+# JADVAL BRAUZERI
+# ============================================================
+
+async def primary_key(db: AsyncSession, table: str) -> List[Tuple[str, str]]:
+    """[(ustun, postgres turi)] — PK bo'lmasa bo'sh ro'yxat"""
+    if not _is_postgres(db):
+        rows = (await db.execute(text(f"PRAGMA table_info({quote_ident(table)})"))).all()
+        return [(r[1], r[2]) for r in sorted((r for r in rows if r[5]), key=lambda r: r[5])]
+    result = await db.execute(text("""
+        SELECT a.attname, format_type(a.atttypid, a.atttypmod)
+        FROM pg_index i
+        JOIN LATERAL unnest(i.indkey) WITH ORDINALITY AS k(attnum, ord) ON true
+        JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = k.attnum
+        WHERE i.indrelid = to_regclass(:tbl) AND i.indisprimary
+        ORDER BY k.ord
+    """), {"tbl": f"public.{quote_ident(table)}"})
+    return [(name, type_) for name, type_ in result]
+
+
+def _keyset_condition(db: AsyncSession, pk: Sequence[Tuple[str, str]]) -> str:
+    cols = ", ".join(quote_ident(name) for name, _ in pk)
+    if _is_postgres(db):
+        # Parametr har doim matn — asyncpg turini PK turiga SQL'da o'tkazamiz
+        values = ", ".join(f"CAST(CAST(:k{i} AS text) AS {type_})" for i, (_, type_) in enumerate(pk))
+    else:
+        values = ", ".join(f":k{i}" for i in range(len(pk)))
+    return f"({cols}) < ({values})"
+
+
+async def table_page(
+    db: AsyncSession,
+    table: str,
+    limit: int,
+    cursor: Optional[str] = None,
+    offset: int = 0,
+) -> Dict[str, Any]:
+    """Jadval sahifasi: PK bo'lsa keyset, bo'lmasa OFFSET (ORDER BY 1 DESC)"""
+    pk = await primary_key(db, table)
+    params: Dict[str, Any] = {"lim": limit + 1}
+    if pk:
+        order = ", ".join(f"{quote_ident(name)} DESC" for name, _ in pk)
+        where = ""
+        if cursor:
+            values = decode_cursor(cursor, len(pk))
+            params.update({f"k{i}": (str(v) if _is_postgres(db) else v) for i, v in enumerate(values)})
+            where = f"WHERE {_keyset_condition(db, pk)}"
+        sql = f"SELECT * FROM {quote_ident(table)} {where} ORDER BY {order} LIMIT :lim"
+    else:
+        params["off"] = offset
+        sql = f"SELECT * FROM {quote_ident(table)} ORDER BY 1 DESC LIMIT :lim OFFSET :off"
+
+    rows = [dict(r._mapping) for r in await db.execute(text(sql), params)]
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = None
+    if pk and has_more and rows:
+        next_cursor = encode_cursor([rows[-1][name] for name, _ in pk])
+    for row in rows:
+        for k, v in row.items():
+            if isinstance(v, datetime):
+                row[k] = v.isoformat()
+    return {
+        "rows": rows,
+        "has_more": has_more,
+        "next_cursor": next_cursor,
+        "keyset": bool(pk),
+    }
+
+
+# ============================================================
+# FOYDALANUVCHILAR
+# ============================================================
+
+def user_search_expr():
+    """Qidiruv ifodasi — migratsiya 046 dagi trigram indeks aynan shu ifoda ustida"""
+    # Literal'lar SQL ichida yoziladi (bind parametr emas) — aks holda generic plan
+    # ifodani indeks ifodasi bilan moslashtira olmaydi
+    empty, space = literal_column("''", String), literal_column("' '", String)
+    return func.lower(
+        func.coalesce(User.first_name, empty) + space + func.coalesce(User.last_name, empty) + space
+        + func.coalesce(User.email, empty) + space + func.coalesce(User.phone, empty)
+    )
+
+
+def normalize_search(term: str) -> str:
+    term = " ".join(term.split()).lower()
+    if _PHONE_LIKE.match(term) and sum(c.isdigit() for c in term) >= 3:
+        # "+998 (90) 123-45" -> "+9989012345": telefonlar bo'shliqsiz saqlanadi
+        term = re.sub(r"[\s()\-]", "", term)
+    return term
+
+
+def users_query(role=None, status=None, search: Optional[str] = None):
+    stmt = select(User)
+    if role is not None:
+        stmt = stmt.where(User.role == role)
+    if status is not None:
+        stmt = stmt.where(User.status == status)
+    if search:
+        stmt = stmt.where(user_search_expr().contains(normalize_search(search), autoescape=True))
+    return stmt
+
+
+async def users_page(
+    db: AsyncSession,
+    stmt,
+    limit: int,
+    cursor: Optional[str] = None,
+) -> Tuple[List[User], bool, Optional[str]]:
+    """(created_at DESC, id DESC) bo'yicha keyset sahifa"""
+    if cursor:
+        created_at, user_id = decode_cursor(cursor, 2)
+        created_at = datetime.fromisoformat(created_at) if created_at else None
+        if created_at is None:
+            # Postgres DESC tartibida NULL'lar birinchi keladi
+            stmt = stmt.where(or_(and_(User.created_at.is_(None), User.id < user_id), User.created_at.isnot(None)))
+        else:
+            # Qator qiymatlari taqqoslanishi — (created_at, id) indeksi bo'yicha diapazon skan
+            stmt = stmt.where(tuple_(User.created_at, User.id) < tuple_(created_at, user_id))
+    stmt = stmt.order_by(User.created_at.desc(), User.id.desc()).limit(limit + 1)
+    users = list((await db.execute(stmt)).scalars().all())
+    has_more = len(users) > limit
+    users = users[:limit]
+    next_cursor = encode_cursor([users[-1].created_at, users[-1].id]) if has_more and users else None
+    return users, has_more, next_cursor
@@ -1,12 +1,107 @@
+"""
+AI javoblar keshi
+
+    memory  — har bir worker'dagi LRU (AI_CACHE_MEMORY_ENTRIES ta yozuv,
+              AI_CACHE_MEMORY_TTL_SECONDS dan keyin eskiradi)
+    ai_cache — Postgres jadvali (AI_CACHE_TTL_DAYS dan eski yozuvlar miss)
+
+get_or_compute() bir xil prompt_hash uchun bir vaqtda kelgan miss'larni
+birlashtiradi (single-flight): birinchi so'rov AI'ni chaqiradi, qolganlari
+o'sha natijani kutadi. Yangi javoblar jadvalga darhol emas, fon vazifasi
+orqali (write-behind, bitta upsert bilan) yoziladi. evict_stale() eski va
+ortiqcha qatorlarni o'chiradi; start_ai_cache_eviction() (lifespan) uni har
+AI_CACHE_EVICT_INTERVAL_SECONDS da ishga tushiradi.
+"""
+import asyncio
 import hashlib
 import json
 import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
 from sqlalchemy.ext.asyncio import AsyncSession
 
 logger = logging.getLogger(__name__)
-from sqlalchemy import select, func
+from sqlalchemy import select, func, delete
 from ..models.ai_cache import AICache
-from typing import Optional, Dict, Any
+from ..core.config import settings
+from typing import Optional, Dict, Any, Awaitable, Callable
+
+
+class _TTLMemoryCache:
+    """prompt_hash -> (muddati, qiymat); yozuvlar soni bo'yicha LRU."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._items: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key: str):
+        item = self._items.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._items[key]
+            return None
+        self._items.move_to_end(key)
+        return value
+
+    def put(self, key: str, value, ttl_seconds: Optional[float] = None) -> None:
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        self._items[key] = (time.monotonic() + ttl, value)
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_entries:
+            self._items.popitem(last=False)
+
+    def pop(self, key: str) -> None:
+        self._items.pop(key, None)
+
+    def clear(self) -> None:
+        self._items.clear()
+
+
+_memory = _TTLMemoryCache(settings.AI_CACHE_MEMORY_ENTRIES, settings.AI_CACHE_MEMORY_TTL_SECONDS)
+_inflight: Dict[str, asyncio.Future] = {}
+_pending_writes: Dict[str, dict] = {}
+_writer_task: Optional[asyncio.Task] = None
+_eviction_task: Optional[asyncio.Task] = None
+_engine = None
+_stats = {"memory_hits": 0, "db_hits": 0, "coalesced": 0, "misses": 0}
+
+
+def _get_engine():
+    if _engine is not None:
+        return _engine
+    from shared.database import session as db_session
+    return db_session.engine
+
+
+def set_cache_engine(engine) -> None:
+    """Testlar uchun: ai_cache o'qish/yozishda ishlatiladigan engine"""
+    global _engine
+    _engine = engine
+
+
+def _upsert(engine):
+    if engine.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    stmt = insert(AICache.__table__)
+    return stmt.on_conflict_do_update(
+        index_elements=[AICache.__table__.c.prompt_hash],
+        set_={
+            "response_json": stmt.excluded.response_json,
+            "model_name": stmt.excluded.model_name,
+            "tokens_used": stmt.excluded.tokens_used,
+            "updated_at": func.now(),
+        },
+    )
+
 
 class AICacheService:
     @staticmethod
@@ -18,33 +113,41 @@ class AICacheService:
     @staticmethod
     async def get_cached_response(db: AsyncSession, prompt_hash: str) -> Optional[Dict[str, Any]]:
         """Retrieve cached response if exists (Async)"""
+        cached = _memory.get(prompt_hash)
+        if cached is not None:
+            _stats["memory_hits"] += 1
+            return cached
+
         stmt = select(AICache).filter(AICache.prompt_hash == prompt_hash)
         result = await db.execute(stmt)
         cache_entry = result.scalars().first()
-        
+
         if cache_entry:
             try:
-                return json.loads(cache_entry.response_json)
+                value = json.loads(cache_entry.response_json)
             except json.JSONDecodeError:
                 return None
+            _memory.put(prompt_hash, value)
+            return value
         return None
 
     @staticmethod
     async def set_cached_response(
-        db: AsyncSession, 
-        prompt_hash: str, 
-        response_data: Dict[str, Any], 
-        prompt_text: str = "", 
+        db: AsyncSession,
+        prompt_hash: str,
+        response_data: Dict[str, Any],
+        prompt_text: str = "",
         model: str = "gpt-4",
         tokens: int = 0
     ):
         """Save response to cache (Async)"""
+        _memory.put(prompt_hash, response_data)
         response_str = json.dumps(response_data)
-        
+
         stmt = select(AICache).filter(AICache.prompt_hash == prompt_hash)
         result = await db.execute(stmt)
         existing = result.scalars().first()
-        
+
         if existing:
             existing.response_json = response_str
             existing.updated_at = func.now()
@@ -57,9 +160,191 @@ class AICacheService:
                 tokens_used=tokens
             )
             db.add(new_cache)
-        
+
         try:
             await db.commit()
         except Exception as e:
             await db.rollback()
             logger.error(f"Cache Save Error: {e}")
+
+    @classmethod
+    async def get_or_compute(
+        cls,
+        prompt_hash: str,
+        compute: Callable[[], Awaitable[Any]],
+        prompt_text: str = "",
+        model: str = "gpt-4",
+        ttl_seconds: Optional[float] = None,
+    ) -> Any:
+        """
+        memory -> kutilayotgan so'rov (single-flight) -> ai_cache -> compute().
+        Qaytgan qiymat JSON'ga aylantiriladigan bo'lishi kerak va chaqiruvchilar
+        o'rtasida umumiy — uni o'zgartirmang.
+        """
+        cached = _memory.get(prompt_hash)
+        if cached is not None:
+            _stats["memory_hits"] += 1
+            return cached
+
+        inflight = _inflight.get(prompt_hash)
+        if inflight is not None:
+            _stats["coalesced"] += 1
+            # shield: kutayotgan so'rov bekor qilinsa umumiy future bekor bo'lmasin
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        _inflight[prompt_hash] = future
+        try:
+            value = await cls._load(prompt_hash)
+            if value is None:
+                _stats["misses"] += 1
+                value = await compute()
+                cls._schedule_write(prompt_hash, value, prompt_text, model)
+            else:
+                _stats["db_hits"] += 1
+            _memory.put(prompt_hash, value, ttl_seconds)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                future.exception()  # kutuvchi bo'lmasa "never retrieved" ogohlantirishi chiqmasin
+            raise
+        finally:
+            _inflight.pop(prompt_hash, None)
+
+    @staticmethod
+    async def _load(prompt_hash: str) -> Optional[Any]:
+        engine = _get_engine()
+        if engine is None:
+            return None
+        cutoff = datetime.now(timezone.utc) - timedelta(days=settings.AI_CACHE_TTL_DAYS)
+        try:
+            async with engine.connect() as conn:
+                result = await conn.execute(
+                    select(AICache.response_json).where(
+                        AICache.prompt_hash == prompt_hash,
+                        func.coalesce(AICache.updated_at, AICache.created_at) >= cutoff,
+                    )
+                )
+                response_json = result.scalar()
+        except Exception as e:
+            logger.warning(f"AI cache read failed: {e}")
+            return None
+        if response_json is None:
+            return None
+        try:
+            return json.loads(response_json)
+        except json.JSONDecodeError:
+            return None
+
+    @staticmethod
+    def _schedule_write(prompt_hash: str, value: Any, prompt_text: str, model: str) -> None:
+        global _writer_task
+        _pending_writes[prompt_hash] = {
+            "prompt_hash": prompt_hash,
+            "prompt_text": prompt_text[:1000] if prompt_text else "",
+            "response_json": json.dumps(value),
+            "model_name": model,
+            "tokens_used": 0,
+        }
+        if _writer_task is None or _writer_task.done():
+            _writer_task = asyncio.get_running_loop().create_task(AICacheService._write_behind())
+
+    @staticmethod
+    async def _write_behind() -> None:
+        await asyncio.sleep(settings.AI_CACHE_WRITE_BEHIND_SECONDS)
+        try:
+            await AICacheService.flush_pending()
+        except Exception as e:
+            logger.error(f"Cache Save Error: {e}")
+
+    @staticmethod
+    async def flush_pending() -> int:
+        """Kutilayotgan yozuvlarni bitta upsert bilan ai_cache ga yozish"""
+        global _pending_writes
+        engine = _get_engine()
+        if not _pending_writes or engine is None:
+            return 0
+        rows, _pending_writes = list(_pending_writes.values()), {}
+        try:
+            async with engine.begin() as conn:
+                await conn.execute(_upsert(engine), rows)
+        except Exception:
+            for row in rows:
+                _pending_writes.setdefault(row["prompt_hash"], row)
+            raise
+        return len(rows)
+
+    @staticmethod
+    async def evict_stale(
+        ttl_days: Optional[int] = None,
+        max_rows: Optional[int] = None,
+    ) -> int:
+        """TTL dan eski qatorlarni, keyin max_rows dan ortig'ini (eng eskisidan) o'chirish"""
+        engine = _get_engine()
+        if engine is None:
+            return 0
+        ttl_days = settings.AI_CACHE_TTL_DAYS if ttl_days is None else ttl_days
+        max_rows = settings.AI_CACHE_MAX_ROWS if max_rows is None else max_rows
+        last_used = func.coalesce(AICache.updated_at, AICache.created_at)
+        cutoff = datetime.now(timezone.utc) - timedelta(days=ttl_days)
+
+        async with engine.begin() as conn:
+            result = await conn.execute(delete(AICache).where(last_used < cutoff))
+            deleted = result.rowcount or 0
+            total = (await conn.execute(select(func.count()).select_from(AICache))).scalar() or 0
+            if total > max_rows:
+                oldest = select(AICache.id).order_by(last_used, AICache.id).limit(total - max_rows)
+                result = await conn.execute(delete(AICache).where(AICache.id.in_(oldest.scalar_subquery())))
+                deleted += result.rowcount or 0
+        if deleted:
+            _memory.clear()
+            logger.info(f"AI cache eviction: {deleted} rows")
+        return deleted
+
+    @staticmethod
+    def stats() -> Dict[str, Any]:
+        """Qatlamlar bo'yicha hit'lar, birlashtirilgan so'rovlar va hit ratio"""
+        lookups = sum(_stats.values())
+        hits = lookups - _stats["misses"]
+        return {
+            **_stats,
+            "hit_ratio": round(hits / lookups, 4) if lookups else None,
+            "memory_entries": len(_memory),
+            "inflight": len(_inflight),
+            "pending_writes": len(_pending_writes),
+        }
+
+
+async def _eviction_loop(interval: float) -> None:
+    while True:
+        try:
+            await AICacheService.evict_stale()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"AI cache eviction failed: {e}")
+        await asyncio.sleep(interval)
+
+
+def start_ai_cache_eviction(interval: Optional[float] = None) -> asyncio.Task:
+    """Lifespan startup: har AI_CACHE_EVICT_INTERVAL_SECONDS da evict_stale()"""
+    global _eviction_task
+    interval = settings.AI_CACHE_EVICT_INTERVAL_SECONDS if interval is None else interval
+    _eviction_task = asyncio.get_running_loop().create_task(_eviction_loop(interval))
+    return _eviction_task
+
+
+async def stop_ai_cache_eviction() -> None:
+    """Lifespan shutdown: eviction vazifasini to'xtatish"""
+    global _eviction_task
+    if _eviction_task is not None:
+        _eviction_task.cancel()
+        try:
+            await _eviction_task
+        except (asyncio.CancelledError, Exception):
+            pass
+    _eviction_task = None
@@ -1,6 +1,8 @@
+import json
 import logging
 from openai import AsyncOpenAI, AsyncAzureOpenAI
 from app.core.config import settings
+from app.services.ai_cache_service import AICacheService
 
 logger = logging.getLogger(__name__)
 
@@ -49,16 +51,41 @@ class AIService:
             return None
 
     @classmethod
-    async def call_ai(cls, messages, model=None, response_format=None, temperature=0.7, max_tokens=None):
+    async def call_ai(cls, messages, model=None, response_format=None, temperature=0.7, max_tokens=None, cache=False):
         """
         Centralized method to call AI.
+        cache=True: bir xil so'rov (model + messages + parametrlar) javobi
+        AICacheService orqali qayta ishlatiladi, bir vaqtdagi bir xil so'rovlar
+        bitta AI chaqiruvini kutadi.
+        Faqat deterministik (temperature=0) yoki javobi hamma uchun bir xil
+        bo'lishi kerak bo'lgan chaqiruvlar uchun — aks holda "qayta yaratish"
+        keshdagi eski javobni qaytaradi.
         """
+        model_name = model or settings.AZURE_OPENAI_DEPLOYMENT_NAME or "gpt-4o-1"
+
+        if cache:
+            prompt = json.dumps(messages, sort_keys=True, ensure_ascii=False)
+            params = json.dumps(
+                {"response_format": response_format, "temperature": temperature, "max_tokens": max_tokens},
+                sort_keys=True,
+            )
+            prompt_hash = AICacheService.generate_hash(prompt, params, model=model_name)
+            result = await AICacheService.get_or_compute(
+                prompt_hash,
+                lambda: cls._call_upstream(messages, model_name, response_format, temperature, max_tokens),
+                prompt_text=str(messages[-1].get("content", "")) if messages else "",
+                model=model_name,
+            )
+            return result["content"]
+
+        return (await cls._call_upstream(messages, model_name, response_format, temperature, max_tokens))["content"]
+
+    @classmethod
+    async def _call_upstream(cls, messages, model_name, response_format, temperature, max_tokens):
         client = cls.get_client()
         if not client:
             raise Exception("AI Client not initialized. Check configuration.")
 
-        model_name = model or settings.AZURE_OPENAI_DEPLOYMENT_NAME or "gpt-4o-1"
-        
         kwargs = {
             "model": model_name,
             "messages": messages,
@@ -72,7 +99,7 @@ class AIService:
 
         try:
             resp = await client.chat.completions.create(**kwargs)
-            return resp.choices[0].message.content
+            return {"content": resp.choices[0].message.content}
         except Exception as e:
             logger.error(f"AI Service: AI call failed: {e}")
             raise Exception(f"AI call failed: {e}")
@@ -0,0 +1,75 @@
+"""
+Vazifa fan-out — ko'p o'quvchiga bir vaqtda berish
+
+Har bir o'quvchi uchun alohida db.add / await o'rniga:
+    - AssignmentSubmission (pending) — bitta bulk INSERT
+    - InAppNotification — bitta bulk INSERT
+    - Telegram — telegram_outbox ga (bitta SELECT + bitta INSERT), shu tranzaksiyada
+Javob commit bilan qaytadi; Telegram xabarlarini fon worker'i yuboradi.
+
+    await fan_out_assignment(db, assignment.id, student_ids, title=..., message=...,
+                             notif_type=InAppNotifType.assignment_new,
+                             sender_id=current_user.id, telegram_text=tg_text)
+    await db.commit()
+    wake_telegram_outbox()
+"""
+from typing import Iterable, List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from shared.database.models.assignment import AssignmentSubmission, SubmissionStatus
+from shared.database.models.in_app_notification import InAppNotification, InAppNotifType
+from shared.services.telegram_outbox import enqueue_telegram
+
+
+async def bulk_notify(
+    db: AsyncSession,
+    user_ids: Iterable[str],
+    title: str,
+    message: str,
+    notif_type: InAppNotifType,
+    reference_type: Optional[str] = None,
+    reference_id: Optional[str] = None,
+    sender_id: Optional[str] = None,
+    telegram_text: Optional[str] = None,
+) -> int:
+    """In-app bildirishnomalar (bitta INSERT) + ixtiyoriy Telegram navbati; commit chaqiruvchida"""
+    user_ids = list(dict.fromkeys(u for u in user_ids if u))
+    if not user_ids:
+        return 0
+    await db.execute(insert(InAppNotification), [
+        {
+            "user_id": user_id, "title": title, "message": message, "notif_type": notif_type,
+            "reference_type": reference_type, "reference_id": reference_id, "sender_id": sender_id,
+        }
+        for user_id in user_ids
+    ])
+    if telegram_text:
+        await enqueue_telegram(db, user_ids, telegram_text)
+    return len(user_ids)
+
+
+async def fan_out_assignment(
+    db: AsyncSession,
+    assignment_id: str,
+    student_ids: Iterable[str],
+    title: str,
+    message: str,
+    notif_type: InAppNotifType = InAppNotifType.assignment_new,
+    sender_id: Optional[str] = None,
+    telegram_text: Optional[str] = None,
+) -> List[str]:
+    """Pending submission'lar + bildirishnomalar; takrorlanmagan o'quvchilar ro'yxati qaytadi"""
+    student_ids = list(dict.fromkeys(s for s in student_ids if s))
+    if not student_ids:
+        return student_ids
+    await db.execute(insert(AssignmentSubmission), [
+        {"assignment_id": assignment_id, "student_user_id": sid, "status": SubmissionStatus.pending}
+        for sid in student_ids
+    ])
+    await bulk_notify(
+        db, student_ids, title, message, notif_type,
+        "assignment", assignment_id, sender_id, telegram_text,
+    )
+    return student_ids
@@ -46,7 +46,7 @@ class AuthService:
             last_name=user_data.last_name,
             role=requested_role
         )
-        user.set_password(user_data.password)
+        await user.set_password_async(user_data.password)
         
         # Step 2 — Qo'shimcha ma'lumotlar
         if hasattr(user_data, 'date_of_birth') and user_data.date_of_birth:
@@ -159,7 +159,7 @@ class AuthService:
         if user.status != AccountStatus.active:
             raise UnauthorizedError("Account is deactivated")
         
-        if not user.verify_password(password):
+        if not await user.verify_password_async(password):
             logger.warning(f"Failed login attempt for {identifier}")
             raise UnauthorizedError("Invalid email, phone, id or password")
         
@@ -232,10 +232,10 @@ class AuthService:
         if not user:
             raise NotFoundError("User not found")
         
-        if not user.verify_password(current_password):
+        if not await user.verify_password_async(current_password):
             raise BadRequestError("Current password is incorrect")
         
-        user.set_password(new_password)
+        await user.set_password_async(new_password)
         await self.db.commit()
     
     async def get_profile(self, user_id: str):
@@ -0,0 +1,324 @@
+"""
+Document Store — SmartKids fayl o'qish (/smartkids/file/read) natijalari
+
+Qatlamlar:
+    memory — har bir worker'dagi LRU: umumiy hajm DOC_STORE_MEMORY_BYTES va
+             DOC_STORE_MAX_ENTRIES bilan cheklangan, yozuvlar
+             DOC_STORE_TTL_SECONDS dan keyin eskiradi
+    shared — ixtiyoriy, hamma worker o'qiy oladi (DOC_STORE_BACKEND):
+             redis — SETEX (TTL Redis'da)
+             disk  — DOC_STORE_DIR/<id>.txt, TTL fayl mtime bo'yicha, umumiy
+                     hajm DOC_STORE_DISK_MAX_BYTES dan oshsa eng eskilari o'chadi
+
+Kalit — fayl turi va baytlarning sha256'i: bir xil fayl qayta yuklansa matn
+qayta ajratilmaydi (dedup) va id o'zgarmaydi, GET esa upload qaysi worker'da
+bo'lganidan qat'i nazar ishlaydi (shared qatlam bo'lsa).
+get_document_store_stats() — hit/miss, dedup, baytlar va eviction'lar.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple, Union
+
+from shared.services.redis_service import get_redis
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+REDIS_PREFIX = "docstore:"
+_DOC_ID_RE = re.compile(r"[0-9a-f]{32}")
+
+
+def document_hasher(kind: str):
+    """sha256, fayl turi bilan boshlangan — yuklama bo'laklari bilan update() qilinadi"""
+    return hashlib.sha256(kind.encode() + b"\0")
+
+
+def document_id_from(digest) -> str:
+    return digest.hexdigest()[:32]
+
+
+def document_id(kind: str, content: bytes) -> str:
+    """Fayl turi + baytlar bo'yicha barqaror id (sha256 ning 128 biti)"""
+    digest = document_hasher(kind)
+    digest.update(content)
+    return document_id_from(digest)
+
+
+def _text_size(text: str) -> int:
+    # len(str) emas: kirill/emoji matnlar xotirada ko'proq joy oladi
+    return len(text.encode("utf-8"))
+
+
+class _DocumentLRU:
+    """doc_id -> (muddati, matn); yozuvlar soni va umumiy hajm (bayt) bo'yicha LRU."""
+
+    def __init__(self, max_bytes: int, max_entries: int, ttl_seconds: float):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.bytes = 0
+        self.evictions = 0
+        self.expired = 0
+        self._items: "OrderedDict[str, Tuple[float, int, str]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key: str) -> Optional[str]:
+        item = self._items.get(key)
+        if item is None:
+            return None
+        expires_at, _, text = item
+        if expires_at < time.monotonic():
+            self.pop(key)
+            self.expired += 1
+            return None
+        self._items.move_to_end(key)
+        return text
+
+    def put(self, key: str, text: str) -> None:
+        self.pop(key)
+        size = _text_size(text)
+        if size > self.max_bytes:
+            return
+        self._items[key] = (time.monotonic() + self.ttl_seconds, size, text)
+        self.bytes += size
+        while self.bytes > self.max_bytes or len(self._items) > self.max_entries:
+            _, (_, old_size, _) = self._items.popitem(last=False)
+            self.bytes -= old_size
+            self.evictions += 1
+
+    def pop(self, key: str) -> None:
+        item = self._items.pop(key, None)
+        if item is not None:
+            self.bytes -= item[1]
+
+    def clear(self) -> None:
+        self._items.clear()
+        self.bytes = 0
+
+
+class RedisDocumentBackend:
+    """Matn Redis'da (SETEX): hamma worker va konteynerlar uchun umumiy."""
+
+    name = "redis"
+
+    def __init__(self, ttl_seconds: float, redis=None):
+        self.ttl_seconds = int(ttl_seconds)
+        self._redis = redis
+
+    def _client(self):
+        return self._redis if self._redis is not None else get_redis()
+
+    async def get(self, doc_id: str) -> Optional[str]:
+        client = self._client()
+        if client is None:
+            return None
+        return await client.get(REDIS_PREFIX + doc_id)
+
+    async def put(self, doc_id: str, text: str) -> None:
+        client = self._client()
+        if client is not None:
+            await client.set(REDIS_PREFIX + doc_id, text, ex=self.ttl_seconds)
+
+
+class DiskDocumentBackend:
+    """Matn lokal diskda (bir xost/umumiy volume'dagi worker'lar uchun): <id>.txt."""
+
+    name = "disk"
+
+    def __init__(self, directory: str, ttl_seconds: float, max_bytes: int):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._written_since_prune = 0
+
+    def _path(self, doc_id: str) -> str:
+        return os.path.join(self.directory, f"{doc_id}.txt")
+
+    def _read(self, doc_id: str) -> Optional[str]:
+        path = self._path(doc_id)
+        try:
+            if os.path.getmtime(path) + self.ttl_seconds < time.time():
+                os.remove(path)
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _write(self, doc_id: str, text: str) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(doc_id)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+        # Katalogni har yozuvda emas, limitning ~10% i yozilganda tozalash
+        self._written_since_prune += _text_size(text)
+        if self._written_since_prune * 10 >= self.max_bytes:
+            self._written_since_prune = 0
+            self.prune()
+
+    def prune(self) -> int:
+        """Eskirgan fayllarni, keyin max_bytes dan ortig'ini (eng eskisidan) o'chirish"""
+        try:
+            entries = [e for e in os.scandir(self.directory) if e.name.endswith(".txt")]
+        except FileNotFoundError:
+            return 0
+        cutoff = time.time() - self.ttl_seconds
+        files, total, removed = [], 0, 0
+        for entry in entries:
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            if stat.st_mtime < cutoff:
+                removed += self._remove(entry.path)
+                continue
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+        files.sort()
+        for _, size, path in files:
+            if total <= self.max_bytes:
+                break
+            removed += self._remove(path)
+            total -= size
+        return removed
+
+    @staticmethod
+    def _remove(path: str) -> int:
+        try:
+            os.remove(path)
+            return 1
+        except FileNotFoundError:
+            return 0
+
+    async def get(self, doc_id: str) -> Optional[str]:
+        return await asyncio.to_thread(self._read, doc_id)
+
+    async def put(self, doc_id: str, text: str) -> None:
+        await asyncio.to_thread(self._write, doc_id, text)
+
+
+Backend = Union[RedisDocumentBackend, DiskDocumentBackend]
+
+
+class DocumentStore:
+    """memory LRU -> shared backend; get_or_extract() bir xil yuklamalarni birlashtiradi."""
+
+    def __init__(
+        self,
+        memory_bytes: int,
+        max_entries: int,
+        ttl_seconds: float,
+        backend: Optional[Backend] = None,
+    ):
+        self._memory = _DocumentLRU(memory_bytes, max_entries, ttl_seconds)
+        self.backend = backend
+        self._stats = {"memory_hits": 0, "shared_hits": 0, "misses": 0, "dedup": 0, "puts": 0, "errors": 0}
+
+    async def get(self, doc_id: str) -> Optional[str]:
+        if not _DOC_ID_RE.fullmatch(doc_id or ""):
+            return None
+        text = self._memory.get(doc_id)
+        if text is not None:
+            self._stats["memory_hits"] += 1
+            return text
+        if self.backend is not None:
+            try:
+                text = await self.backend.get(doc_id)
+            except Exception as e:
+                self._stats["errors"] += 1
+                logger.warning(f"Document store {self.backend.name} read failed: {e}")
+            if text is not None:
+                self._stats["shared_hits"] += 1
+                self._memory.put(doc_id, text)
+                return text
+        self._stats["misses"] += 1
+        return None
+
+    async def put(self, doc_id: str, text: str) -> None:
+        self._stats["puts"] += 1
+        self._memory.put(doc_id, text)
+        if self.backend is not None:
+            try:
+                await self.backend.put(doc_id, text)
+            except Exception as e:
+                self._stats["errors"] += 1
+                logger.warning(f"Document store {self.backend.name} write failed: {e}")
+
+    async def get_or_extract(
+        self,
+        doc_id: str,
+        extract: Callable[[], Awaitable[Optional[str]]],
+    ) -> Optional[str]:
+        """
+        Oldin yuklangan fayl bo'lsa (doc_id — mazmun hash'i) extract chaqirilmaydi.
+        extract None yoki bo'sh matn qaytarsa hech narsa saqlanmaydi.
+        """
+        text = await self.get(doc_id)
+        if text is not None:
+            self._stats["dedup"] += 1
+            return text
+        text = await extract()
+        if text and text.strip():
+            await self.put(doc_id, text)
+        return text
+
+    def clear_memory(self) -> None:
+        self._memory.clear()
+
+    def stats(self) -> Dict[str, object]:
+        lookups = self._stats["memory_hits"] + self._stats["shared_hits"] + self._stats["misses"]
+        hits = lookups - self._stats["misses"]
+        return {
+            **self._stats,
+            "hit_ratio": round(hits / lookups, 4) if lookups else None,
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory.bytes,
+            "memory_max_bytes": self._memory.max_bytes,
+            "memory_evictions": self._memory.evictions,
+            "memory_expired": self._memory.expired,
+            "backend": self.backend.name if self.backend is not None else "memory",
+        }
+
+
+def _backend_from_settings() -> Optional[Backend]:
+    name = settings.DOC_STORE_BACKEND.lower()
+    if name == "redis":
+        return RedisDocumentBackend(settings.DOC_STORE_TTL_SECONDS)
+    if name == "disk":
+        return DiskDocumentBackend(settings.DOC_STORE_DIR, settings.DOC_STORE_TTL_SECONDS,
+                                   settings.DOC_STORE_DISK_MAX_BYTES)
+    return None
+
+
+_store: Optional[DocumentStore] = None
+
+
+def get_document_store() -> DocumentStore:
+    global _store
+    if _store is None:
+        _store = DocumentStore(
+            settings.DOC_STORE_MEMORY_BYTES,
+            settings.DOC_STORE_MAX_ENTRIES,
+            settings.DOC_STORE_TTL_SECONDS,
+            _backend_from_settings(),
+        )
+    return _store
+
+
+def set_document_store(store: Optional[DocumentStore]) -> None:
+    """Store'ni almashtirish (testlar uchun); None — keyingi chaqiruvda settings'dan qayta"""
+    global _store
+    _store = store
+
+
+def get_document_store_stats() -> Dict[str, object]:
+    return get_document_store().stats()
@@ -0,0 +1,137 @@
+"""
+Login geo loglarini paketlab yozish (UserGeoLog)
+
+Login javobi hech narsa kutmaydi: record_geo_event() faqat IP, User-Agent
+va vaqtni xotiradagi navbatga qo'yadi. Fon vazifasi GEO_LOG_FLUSH_SECONDS
+da bir marta (yoki GEO_LOG_BATCH_SIZE ta yig'ilganda darhol) IP'larni lokal
+GeoIP bazasidan aniqlaydi va barcha qatorlarni bitta INSERT bilan yozadi.
+Navbat GEO_LOG_MAX_PENDING bilan cheklangan — DB uzoq ishlamasa eng eski
+hodisalar tashlab yuboriladi (stats()["dropped"]).
+"""
+import asyncio
+import logging
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import insert
+
+from shared.database.models.analytics import UserGeoLog
+from ..core.config import settings
+from ..utils.geoip import parse_browser, parse_device_type, parse_os, resolve_geo
+
+logger = logging.getLogger(__name__)
+
+_pending: deque = deque()
+_writer_task: Optional[asyncio.Task] = None
+_flush_lock: Optional[asyncio.Lock] = None
+_engine = None
+_stats = {"queued": 0, "written": 0, "dropped": 0, "batches": 0}
+
+
+def _get_engine():
+    if _engine is not None:
+        return _engine
+    from shared.database import session as db_session
+    return db_session.engine
+
+
+def set_geo_log_engine(engine) -> None:
+    """Testlar uchun: user_geo_logs yoziladigan engine"""
+    global _engine
+    _engine = engine
+
+
+def record_geo_event(user_id: str, ip: Optional[str], user_agent: Optional[str], action: str = "login") -> None:
+    """Hodisani navbatga qo'yish (sinxron, I/O yo'q) va yozuvchini rejalashtirish"""
+    global _writer_task
+    if len(_pending) >= settings.GEO_LOG_MAX_PENDING:
+        _pending.popleft()
+        _stats["dropped"] += 1
+    _pending.append({
+        "user_id": user_id,
+        "ip": ip,
+        "user_agent": user_agent[:500] if user_agent else None,
+        "action": action,
+        "created_at": datetime.now(timezone.utc),
+    })
+    _stats["queued"] += 1
+
+    loop = asyncio.get_running_loop()
+    if len(_pending) >= settings.GEO_LOG_BATCH_SIZE:
+        loop.create_task(_flush_logged())
+    if _writer_task is None or _writer_task.done() or _writer_task.get_loop() is not loop:
+        _writer_task = loop.create_task(_write_behind())
+
+
+def _to_row(event: Dict[str, Any]) -> Dict[str, Any]:
+    ip, ua = event["ip"], event["user_agent"] or ""
+    geo = resolve_geo(ip) if ip and ip != "unknown" else {}
+    return {
+        "user_id": event["user_id"],
+        "ip_address": ip,
+        "country": geo.get("country"),
+        "country_code": geo.get("country_code"),
+        "region": geo.get("region"),
+        "city": geo.get("city"),
+        "latitude": geo.get("latitude"),
+        "longitude": geo.get("longitude"),
+        "isp": geo.get("isp"),
+        "user_agent": event["user_agent"],
+        "device_type": parse_device_type(ua),
+        "browser": parse_browser(ua),
+        "os": parse_os(ua),
+        "action": event["action"],
+        "created_at": event["created_at"],
+    }
+
+
+async def _flush_logged() -> None:
+    try:
+        await flush_pending()
+    except Exception as e:
+        logger.warning(f"Geo log flush failed: {e}")
+
+
+async def _write_behind() -> None:
+    global _writer_task
+    while _pending:
+        await asyncio.sleep(settings.GEO_LOG_FLUSH_SECONDS)
+        await _flush_logged()
+    _writer_task = None
+
+
+async def flush_pending() -> int:
+    """Navbatdagi hodisalarni geo bilan boyitib, bitta INSERT bilan yozish"""
+    global _flush_lock
+    engine = _get_engine()
+    if not _pending or engine is None:
+        return 0
+    if _flush_lock is None:
+        _flush_lock = asyncio.Lock()
+    async with _flush_lock:
+        events: List[Dict[str, Any]] = []
+        while _pending and len(events) < settings.GEO_LOG_BATCH_SIZE * 10:
+            events.append(_pending.popleft())
+        if not events:
+            return 0
+        rows = [_to_row(event) for event in events]
+        try:
+            async with engine.begin() as conn:
+                await conn.execute(insert(UserGeoLog.__table__), rows)
+        except Exception:
+            # Keyingi urinishda qayta yoziladi (navbat chegarasigacha)
+            room = max(0, settings.GEO_LOG_MAX_PENDING - len(_pending))
+            _pending.extendleft(reversed(events[len(events) - room:] if room else []))
+            _stats["dropped"] += len(events) - min(room, len(events))
+            raise
+        _stats["written"] += len(rows)
+        _stats["batches"] += 1
+        return len(rows)
+
+
+def stats() -> Dict[str, Any]:
+    return {**_stats, "pending": len(_pending)}
+
+
+__all__ = ["record_geo_event", "flush_pending", "set_geo_log_engine", "stats"]
@@ -0,0 +1,391 @@
+"""
+Gradebook (Jurnal) va vazifa hisobotlari
+
+    assignment_report()   — bitta so'rov: submission LEFT JOIN User, baholanganlar
+                            orasida rank() window funksiyasi
+    gradebook_matrix()    — ixcham ustunli payload: o'quvchilar va vazifalar
+                            ro'yxati, scores[i][j] / statuses[i][j] massivlari
+                            (i — o'quvchi, j — vazifa indeksi), o'rtacha ball va
+                            reyting SQL'da (avg() OVER, dense_rank()); meta_data
+                            qaytarilmaydi — katak tafsiloti gradebook_cell() orqali
+    stream_gradebook_csv() / stream_gradebook_xlsx()
+                          — eksport: qatorlar DB'dan oqim bilan o'qilib darhol
+                            yoziladi, butun jadval xotirada yig'ilmaydi
+
+XLSX tashqi kutubxonasiz yoziladi: zipfile seekable bo'lmagan oqimga
+sheet XML'ini qator-qator siqib yozadi (inline string kataklar).
+"""
+import csv
+import io
+import zipfile
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence
+from xml.sax.saxutils import escape
+
+from sqlalchemy import and_, case, exists, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from shared.database.models import User
+from shared.database.models.assignment import (
+    Assignment, AssignmentSubmission, AssignmentTarget, AssignmentTargetType, SubmissionStatus,
+)
+from shared.database.models.classroom import ClassroomStudent, ClassroomStudentStatus
+
+STATUS_CODES = [s.value for s in SubmissionStatus]
+_STATUS_INDEX = {s: i for i, s in enumerate(SubmissionStatus)}
+EXPORT_FETCH_SIZE = 500
+
+
+def effective_score():
+    """score bo'sh yoki 0 bo'lsa avtomatik testlar meta_data'sidagi correct/score"""
+    s = AssignmentSubmission
+    meta = s.meta_data
+    return case(
+        (and_(s.score.isnot(None), s.score != 0), s.score),
+        else_=func.coalesce(
+            func.nullif(meta["correct"].as_float(), 0),
+            func.nullif(meta["score"].as_float(), 0),
+            s.score,
+        ),
+    )
+
+
+# ============================================================
+# ASSIGNMENT REPORT
+# ============================================================
+
+async def assignment_report(db: AsyncSession, assignment_id: str) -> List[Dict[str, Any]]:
+    s = AssignmentSubmission
+    graded = s.status == SubmissionStatus.graded
+    rank = func.rank().over(
+        partition_by=graded,
+        order_by=(s.score.desc().nulls_last(), s.submitted_at.asc()),
+    )
+    stmt = (
+        select(
+            s.student_user_id, s.score, s.status, s.submitted_at, s.meta_data,
+            User.first_name, User.last_name, rank.label("rank"),
+        )
+        .outerjoin(User, User.id == s.student_user_id)
+        .where(s.assignment_id == assignment_id)
+        .order_by(s.score.desc().nulls_last(), s.submitted_at.asc())
+    )
+    results = []
+    for row in (await db.execute(stmt)).all():
+        meta = row.meta_data or {}
+        results.append({
+            "student_id": row.student_user_id,
+            "student_first_name": row.first_name if row.first_name is not None else "O'quvchi",
+            "student_last_name": row.last_name or "",
+            "correct_count": meta.get("correct", 0),
+            "total_questions": meta.get("total", 0),
+            "incorrect_count": meta.get("total", 0) - meta.get("correct", 0),
+            "time_spent_seconds": meta.get("time_spent_seconds", 0),
+            "score": row.score,
+            "status": row.status.value,
+            "rank": row.rank if row.status == SubmissionStatus.graded else None,
+            "submitted_at": row.submitted_at.isoformat() if row.submitted_at else None,
+        })
+    return results
+
+
+# ============================================================
+# GRADEBOOK MATRIX
+# ============================================================
+
+def _students_stmt(classroom_id: str):
+    return (
+        select(User.id, User.first_name, User.last_name)
+        .join(ClassroomStudent, ClassroomStudent.student_user_id == User.id)
+        .where(
+            ClassroomStudent.classroom_id == classroom_id,
+            ClassroomStudent.status == ClassroomStudentStatus.active,
+        )
+    )
+
+
+def _active_student_ids(classroom_id: str):
+    return select(ClassroomStudent.student_user_id).where(
+        ClassroomStudent.classroom_id == classroom_id,
+        ClassroomStudent.status == ClassroomStudentStatus.active,
+    )
+
+
+async def classroom_assignments(
+    db: AsyncSession,
+    classroom_id: str,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+) -> List[Any]:
+    """Sinfga yoki sinfdagi o'quvchilarga berilgan vazifalar (yaratilgan vaqti bo'yicha)"""
+    target_exists = exists().where(
+        AssignmentTarget.assignment_id == Assignment.id,
+        or_(
+            and_(AssignmentTarget.target_type == AssignmentTargetType.classroom,
+                 AssignmentTarget.target_id == classroom_id),
+            and_(AssignmentTarget.target_type == AssignmentTargetType.student,
+                 AssignmentTarget.target_id.in_(_active_student_ids(classroom_id))),
+        ),
+    )
+    stmt = select(
+        Assignment.id, Assignment.title, Assignment.assignment_type, Assignment.max_score,
+        Assignment.created_at, Assignment.due_date,
+    ).where(or_(Assignment.classroom_id == classroom_id, target_exists))
+    if start_date:
+        stmt = stmt.where(Assignment.created_at >= start_date)
+    if end_date:
+        stmt = stmt.where(Assignment.created_at <= end_date)
+    return (await db.execute(stmt.order_by(Assignment.created_at.asc(), Assignment.id))).all()
+
+
+def _cells_stmt(classroom_id: str, assignment_ids: Sequence[str]):
+    """O'quvchi x vazifa kataklari: eff. ball, holat, o'quvchi o'rtachasi va reytingi"""
+    s = AssignmentSubmission
+    score = effective_score()
+    cells = (
+        select(
+            s.student_user_id.label("student_id"), s.assignment_id, s.status,
+            score.label("score"),
+            func.avg(score).over(partition_by=s.student_user_id).label("average"),
+        )
+        .where(s.assignment_id.in_(assignment_ids), s.student_user_id.in_(_active_student_ids(classroom_id)))
+        .subquery()
+    )
+    return select(
+        cells.c.student_id, cells.c.assignment_id, cells.c.status, cells.c.score, cells.c.average,
+        func.dense_rank().over(order_by=cells.c.average.desc().nulls_last()).label("rank"),
+    )
+
+
+async def gradebook_matrix(
+    db: AsyncSession,
+    classroom_id: str,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    students = (await db.execute(
+        _students_stmt(classroom_id).order_by(User.last_name, User.first_name, User.id)
+    )).all()
+    assignments = await classroom_assignments(db, classroom_id, start_date, end_date)
+
+    s_index = {row.id: i for i, row in enumerate(students)}
+    a_index = {row.id: j for j, row in enumerate(assignments)}
+    scores: List[List[Optional[float]]] = [[None] * len(assignments) for _ in students]
+    statuses: List[List[Optional[int]]] = [[None] * len(assignments) for _ in students]
+    averages: List[Optional[float]] = [None] * len(students)
+    ranks: List[Optional[int]] = [None] * len(students)
+
+    if students and assignments:
+        for cell in (await db.execute(_cells_stmt(classroom_id, list(a_index)))).all():
+            i, j = s_index.get(cell.student_id), a_index.get(cell.assignment_id)
+            if i is None or j is None:
+                continue
+            scores[i][j] = cell.score
+            statuses[i][j] = _STATUS_INDEX.get(cell.status)
+            if cell.average is not None:
+                averages[i] = round(float(cell.average), 2)
+                ranks[i] = cell.rank
+
+    return {
+        "students": {
+            "ids": [row.id for row in students],
+            "first_names": [row.first_name for row in students],
+            "last_names": [row.last_name for row in students],
+            "averages": averages,
+            "ranks": ranks,
+        },
+        "assignments": [
+            {
+                "id": a.id,
+                "title": a.title,
+                "type": a.assignment_type.value if hasattr(a.assignment_type, "value") else a.assignment_type,
+                "max_score": a.max_score,
+                "date": a.created_at.isoformat() if a.created_at else None,
+                "due_date": a.due_date.isoformat() if a.due_date else None,
+            }
+            for a in assignments
+        ],
+        "status_codes": STATUS_CODES,
+        "scores": scores,
+        "statuses": statuses,
+    }
+
+
+async def gradebook_cell(db: AsyncSession, classroom_id: str, assignment_id: str, student_id: str) -> Optional[Dict]:
+    """Bitta katak tafsiloti (meta_data bilan) — faqat sinfning faol o'quvchisi uchun"""
+    s = AssignmentSubmission
+    sub = (await db.execute(
+        select(s).where(
+            s.assignment_id == assignment_id,
+            s.student_user_id == student_id,
+            s.student_user_id.in_(_active_student_ids(classroom_id)),
+        )
+    )).scalars().first()
+    if sub is None:
+        return None
+    return {
+        "id": sub.id,
+        "score": sub.score,
+        "status": sub.status.value,
+        "feedback": sub.feedback,
+        "meta": sub.meta_data,
+        "submitted_at": sub.submitted_at.isoformat() if sub.submitted_at else None,
+        "graded_at": sub.graded_at.isoformat() if sub.graded_at else None,
+    }
+
+
+# ============================================================
+# STREAMING EXPORT
+# ============================================================
+
+async def _export_rows(db: AsyncSession, classroom_id: str, assignments: Sequence[Any]) -> AsyncIterator[List]:
+    """[familiya, ism, ball_1..ball_n, o'rtacha] — o'quvchilar tartibida, DB'dan oqim bilan"""
+    a_index = {a.id: j for j, a in enumerate(assignments)}
+    s = AssignmentSubmission
+    score = effective_score()
+    stmt = (
+        _students_stmt(classroom_id)
+        .add_columns(s.assignment_id, score.label("score"))
+        .outerjoin(s, and_(s.student_user_id == User.id, s.assignment_id.in_(list(a_index) or [""])))
+        .order_by(User.last_name, User.first_name, User.id)
+    )
+
+    current_id, row = None, None
+
+    def _finish(row):
+        values = [v for v in row[2:] if v is not None]
+        return row + [round(sum(values) / len(values), 2) if values else None]
+
+    result = await db.stream(stmt.execution_options(yield_per=EXPORT_FETCH_SIZE))
+    async for cell in result:
+        if cell.id != current_id:
+            if row is not None:
+                yield _finish(row)
+            current_id = cell.id
+            row = [cell.last_name, cell.first_name] + [None] * len(assignments)
+        j = a_index.get(cell.assignment_id)
+        if j is not None and cell.score is not None:
+            row[2 + j] = cell.score
+    if row is not None:
+        yield _finish(row)
+
+
+def _header(assignments: Sequence[Any]) -> List[str]:
+    return ["Familiya", "Ism"] + [a.title for a in assignments] + ["O'rtacha"]
+
+
+async def stream_gradebook_csv(session_factory, classroom_id: str, assignments: Sequence[Any]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write("\ufeff")  # Excel UTF-8 ni tanisin
+    writer.writerow(_header(assignments))
+    async with session_factory() as db:
+        count = 0
+        async for row in _export_rows(db, classroom_id, assignments):
+            writer.writerow(["" if v is None else v for v in row])
+            count += 1
+            if count % 100 == 0:
+                yield buffer.getvalue().encode("utf-8")
+                buffer.seek(0)
+                buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+
+class _ChunkSink(io.RawIOBase):
+    """zipfile yozadigan seekable bo'lmagan oqim; yig'ilgan baytlar drain() bilan olinadi"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _column_name(index: int) -> str:
+    name = ""
+    index += 1
+    while index:
+        index, rem = divmod(index - 1, 26)
+        name = chr(65 + rem) + name
+    return name
+
+
+def _xlsx_row(number: int, values: Sequence[Any]) -> str:
+    cells = []
+    for col, value in enumerate(values):
+        ref = f"{_column_name(col)}{number}"
+        if value is None:
+            continue
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            cells.append(f'<c r="{ref}"><v>{value}</v></c>')
+        else:
+            cells.append(f'<c r="{ref}" t="inlineStr"><is><t>{escape(str(value))}</t></is></c>')
+    return f'<row r="{number}">{"".join(cells)}</row>'
+
+
+_XLSX_STATIC = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/'
+        'officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    "xl/workbook.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Jurnal" sheetId="1" r:id="rId1"/></sheets></workbook>'
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/'
+        'worksheet" Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+
+async def stream_gradebook_xlsx(session_factory, classroom_id: str, assignments: Sequence[Any]) -> AsyncIterator[bytes]:
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, content in _XLSX_STATIC.items():
+            zf.writestr(name, content)
+        yield sink.drain()
+
+        with zf.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            sheet.write(_xlsx_row(1, _header(assignments)).encode("utf-8"))
+            number = 1
+            async with session_factory() as db:
+                async for row in _export_rows(db, classroom_id, assignments):
+                    number += 1
+                    sheet.write(_xlsx_row(number, row).encode("utf-8"))
+                    if number % 100 == 0:
+                        yield sink.drain()
+            sheet.write(b"</sheetData></worksheet>")
+    yield sink.drain()
@@ -0,0 +1,399 @@
+"""
+Kunlik platforma ko'rsatkichlari (daily_platform_metrics) — rollup va o'qish
+
+Admin dashboard har yuklanishda users / user_geo_logs / user_subscriptions /
+coin_transactions ustida o'nlab COUNT/SUM qilmasligi uchun:
+
+    rollup_day()        — bitta UTC kunni hisoblab yozadi (idempotent: qator
+                          almashtiriladi). Barcha filtrlar created_at oralig'i
+                          (>= kun boshi, < keyingi kun) — indeks ishlatiladi
+    rollup_pending()    — fon job'i: oxirgi hisoblangan kundan (lookback bilan
+                          qayta) kechagacha; kechagi qatorga holat snapshot'i
+    backfill()          — rebuild_daily_metrics.py uchun ixtiyoriy oraliq
+
+    platform_overview() / platform_trends() / user_segments()
+                        — hisoblangan kunlar rollup'dan, oxirgi hisoblangan
+                          kundan keyingi kunlar (odatda bugun; yarim tundan
+                          keyingi rollup'gacha kecha ham) kunma-kun jonli delta
+
+Rollup'lar METRICS_ROLLUP_INTERVAL_SECONDS gacha eskirgan bo'lishi mumkin;
+hali hisoblanmagan kunlar har doim jonli. Jami foydalanuvchilar va jami
+daromad kumulyativ ustunlardan (users_total, revenue_total) olinadi, shuning
+uchun catch-up oynasidan (METRICS_ROLLUP_MAX_CATCHUP_DAYS) oldingi tarix ham
+hisobga kiradi.
+"""
+import asyncio
+import logging
+from collections import Counter
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, distinct, func, insert, literal, select, union
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from shared.database.models import (
+    User, AccountStatus, StudentCoin, CoinTransaction, UserSubscription, SubscriptionStatus,
+)
+from shared.database.models.analytics import DailyPlatformMetrics, UserDailyLogin, UserGeoLog
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+COIN_RICH_THRESHOLD = 100
+
+
+def day_bounds(day: date) -> Tuple[datetime, datetime]:
+    start = datetime.combine(day, time.min, tzinfo=timezone.utc)
+    return start, start + timedelta(days=1)
+
+
+def _as_date(value) -> date:
+    # SQLite func.max / ba'zi drayverlar Date'ni matn sifatida qaytaradi
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _role_key(role) -> str:
+    return role.value if hasattr(role, "value") else (role or "unknown")
+
+
+# ============================================================
+# HISOBLASH
+# ============================================================
+
+async def _registrations(db: AsyncSession, start: Optional[datetime], end: datetime) -> Dict[str, int]:
+    stmt = select(User.role, func.count(User.id)).where(User.created_at < end).group_by(User.role)
+    if start is not None:
+        stmt = stmt.where(User.created_at >= start)
+    return {_role_key(role): count for role, count in (await db.execute(stmt)).all()}
+
+
+async def _revenue_total(db: AsyncSession, end: datetime) -> int:
+    """end gacha yaratilgan obunalardan jami daromad"""
+    return int((await db.execute(
+        select(func.coalesce(func.sum(UserSubscription.amount_paid), 0)).where(
+            UserSubscription.amount_paid > 0, UserSubscription.created_at < end,
+        )
+    )).scalar() or 0)
+
+
+async def _window_events(db: AsyncSession, start: datetime, end: datetime) -> Dict[str, int]:
+    """[start, end) oralig'idagi hodisalar: yangi foydalanuvchilar, loginlar, daromad, coinlar"""
+    new_by_role = await _registrations(db, start, end)
+    logins, unique_logins = (await db.execute(
+        select(func.count(UserGeoLog.id), func.count(distinct(UserGeoLog.user_id))).where(
+            UserGeoLog.action == "login", UserGeoLog.created_at >= start, UserGeoLog.created_at < end,
+        )
+    )).one()
+    revenue, started = (await db.execute(
+        select(
+            func.coalesce(func.sum(UserSubscription.amount_paid).filter(UserSubscription.amount_paid > 0), 0),
+            func.count(UserSubscription.id),
+        ).where(UserSubscription.created_at >= start, UserSubscription.created_at < end)
+    )).one()
+    earned, spent = (await db.execute(
+        select(
+            func.coalesce(func.sum(CoinTransaction.amount).filter(CoinTransaction.amount > 0), 0),
+            func.coalesce(-func.sum(CoinTransaction.amount).filter(CoinTransaction.amount < 0), 0),
+        ).where(CoinTransaction.created_at >= start, CoinTransaction.created_at < end)
+    )).one()
+    return {
+        "new_users": sum(new_by_role.values()),
+        "new_by_role": new_by_role,
+        "logins": logins or 0,
+        "unique_logins": unique_logins or 0,
+        "revenue": int(revenue or 0),
+        "subscriptions_started": started or 0,
+        "coins_earned": int(earned or 0),
+        "coins_spent": int(spent or 0),
+    }
+
+
+async def _state_snapshot(db: AsyncSession) -> Dict[str, int]:
+    """Hozirgi holat: faol foydalanuvchilar, obunalar, coinlar"""
+    active_users = (await db.execute(
+        select(func.count(User.id)).where(User.status == AccountStatus.active)
+    )).scalar() or 0
+    active_subscriptions, subscribers = (await db.execute(
+        select(func.count(UserSubscription.id), func.count(distinct(UserSubscription.user_id))).where(
+            UserSubscription.status == SubscriptionStatus.active
+        )
+    )).one()
+    circulation, rich = (await db.execute(
+        select(
+            func.coalesce(func.sum(StudentCoin.current_balance), 0),
+            func.count(StudentCoin.id).filter(StudentCoin.current_balance > COIN_RICH_THRESHOLD),
+        )
+    )).one()
+    return {
+        "active_users": active_users,
+        "active_subscriptions": active_subscriptions or 0,
+        "subscribers": subscribers or 0,
+        "coins_in_circulation": int(circulation or 0),
+        "coin_rich_users": rich or 0,
+    }
+
+
+async def rollup_day(db: AsyncSession, day: date, snapshot: bool = False) -> Dict[str, Any]:
+    """Bitta kunni qayta hisoblab yozish (commit chaqiruvchida)"""
+    start, end = day_bounds(day)
+    row = await _window_events(db, start, end)
+    users_by_role = await _registrations(db, None, end)
+    row.update(day=day, users_total=sum(users_by_role.values()), users_by_role=users_by_role,
+               revenue_total=await _revenue_total(db, end), computed_at=datetime.now(timezone.utc))
+    if snapshot:
+        row.update(await _state_snapshot(db))
+
+    await db.execute(delete(DailyPlatformMetrics).where(DailyPlatformMetrics.day == day))
+    await db.execute(insert(DailyPlatformMetrics).values(**row))
+    await db.execute(delete(UserDailyLogin).where(UserDailyLogin.day == day))
+    await db.execute(insert(UserDailyLogin).from_select(
+        ["day", "user_id"],
+        select(literal(day, DailyPlatformMetrics.day.type), UserGeoLog.user_id).distinct().where(
+            UserGeoLog.action == "login", UserGeoLog.created_at >= start, UserGeoLog.created_at < end,
+        ),
+    ))
+    return row
+
+
+async def backfill(db: AsyncSession, start: date, end: date) -> int:
+    """[start, end] kunlarini hisoblash; oxirgi kunga holat snapshot'i. Har kun alohida commit."""
+    days = 0
+    day = start
+    while day <= end:
+        await rollup_day(db, day, snapshot=day == end)
+        await db.commit()
+        days += 1
+        day += timedelta(days=1)
+    return days
+
+
+async def rollup_pending(db: AsyncSession, today: Optional[date] = None) -> int:
+    """Fon job'i: hisoblanmagan kunlar + oxirgi LOOKBACK kun (kechikkan qatorlar uchun)"""
+    today = today or datetime.now(timezone.utc).date()
+    yesterday = today - timedelta(days=1)
+    last = (await db.execute(select(func.max(DailyPlatformMetrics.day)))).scalar()
+    if last is None:
+        start = today - timedelta(days=settings.METRICS_ROLLUP_MAX_CATCHUP_DAYS)
+    else:
+        last = _as_date(last)
+        start = min(last + timedelta(days=1), today - timedelta(days=settings.METRICS_ROLLUP_LOOKBACK_DAYS))
+        start = max(start, today - timedelta(days=settings.METRICS_ROLLUP_MAX_CATCHUP_DAYS))
+    if start > yesterday:
+        return 0
+    return await backfill(db, start, yesterday)
+
+
+# ============================================================
+# O'QISH (dashboard)
+# ============================================================
+
+async def _latest(db: AsyncSession) -> Optional[DailyPlatformMetrics]:
+    return (await db.execute(
+        select(DailyPlatformMetrics).order_by(DailyPlatformMetrics.day.desc()).limit(1)
+    )).scalars().first()
+
+
+def _live_since(latest: Optional[DailyPlatformMetrics], today: date) -> date:
+    """Rollup'da hali yo'q birinchi kun (oxirgi hisoblangan kundan keyingisi, bugundan kech emas)"""
+    if latest is None:
+        return today
+    return min(_as_date(latest.day) + timedelta(days=1), today)
+
+
+async def _live_days(db: AsyncSession, since: date, today: date) -> List[Tuple[date, Dict[str, Any]]]:
+    """[since, today] kunlarining jonli hodisalari — odatda 1-2 kun"""
+    days = []
+    day = since
+    while day <= today:
+        days.append((day, await _window_events(db, *day_bounds(day))))
+        day += timedelta(days=1)
+    return days
+
+
+async def _totals(db: AsyncSession, today: date):
+    """
+    (jonli kunlar [(kun, hodisalar)], jami foydalanuvchilar rol bo'yicha,
+    holat snapshot'i, jami daromad)
+    """
+    latest = await _latest(db)
+    if latest is None or latest.active_users is None:
+        # Birinchi rollup'gacha — jonli hisob
+        end = day_bounds(today)[1]
+        live = await _live_days(db, today, today)
+        return live, await _registrations(db, None, end), await _state_snapshot(db), await _revenue_total(db, end)
+
+    live = await _live_days(db, _live_since(latest, today), today)
+    users_by_role = Counter(latest.users_by_role or {})
+    revenue = latest.revenue_total
+    if revenue is None:
+        # revenue_total'dan oldingi rollup qatori — bir martalik jonli SUM
+        revenue = await _revenue_total(db, day_bounds(_as_date(latest.day))[1])
+    for _, events in live:
+        users_by_role.update(events["new_by_role"])
+        revenue += events["revenue"]
+    snapshot = {
+        "active_users": latest.active_users,
+        "active_subscriptions": latest.active_subscriptions or 0,
+        "subscribers": latest.subscribers or 0,
+        "coins_in_circulation": int(latest.coins_in_circulation or 0),
+        "coin_rich_users": latest.coin_rich_users or 0,
+    }
+    return live, dict(users_by_role), snapshot, int(revenue)
+
+
+def _live_sum(live: List[Tuple[date, Dict[str, Any]]], key: str, since: date) -> int:
+    return sum(events[key] for day, events in live if day >= since)
+
+
+async def _rollup_sum(db: AsyncSession, column, since: Optional[date] = None, until: Optional[date] = None) -> int:
+    stmt = select(func.coalesce(func.sum(column), 0))
+    if since is not None:
+        stmt = stmt.where(DailyPlatformMetrics.day >= since)
+    if until is not None:
+        stmt = stmt.where(DailyPlatformMetrics.day < until)
+    return int((await db.execute(stmt)).scalar() or 0)
+
+
+async def platform_overview(db: AsyncSession, now: Optional[datetime] = None) -> Dict[str, Any]:
+    today = (now or datetime.now(timezone.utc)).date()
+    live, users_by_role, snapshot, revenue = await _totals(db, today)
+    live_since, today_events = live[0][0], live[-1][1]
+    week_ago, month_ago = today - timedelta(days=7), today - timedelta(days=30)
+
+    d = DailyPlatformMetrics
+    new_week, new_month = (await db.execute(
+        select(
+            func.coalesce(func.sum(d.new_users).filter(d.day >= week_ago), 0),
+            func.coalesce(func.sum(d.new_users).filter(d.day >= month_ago), 0),
+        ).where(d.day < live_since)
+    )).one()
+
+    total_users = sum(users_by_role.values())
+    active_subs = snapshot["active_subscriptions"]
+    return {
+        "total_users": total_users,
+        "total_students": users_by_role.get("student", 0),
+        "total_parents": users_by_role.get("parent", 0),
+        "total_teachers": users_by_role.get("teacher", 0),
+        "active_users": snapshot["active_users"],
+        "coins_in_circulation": snapshot["coins_in_circulation"],
+        "active_subscriptions": active_subs,
+        "total_revenue": revenue,
+        "new_users": {
+            "today": today_events["new_users"],
+            "this_week": int(new_week or 0) + _live_sum(live, "new_users", week_ago),
+            "this_month": int(new_month or 0) + _live_sum(live, "new_users", month_ago),
+        },
+        "logins": {
+            "today_total": today_events["logins"],
+            "today_unique": today_events["unique_logins"],
+        },
+        "conversion_rate": round((active_subs / total_users * 100), 1) if total_users > 0 else 0,
+    }
+
+
+async def platform_trends(db: AsyncSession, days: int, now: Optional[datetime] = None) -> Dict[str, Any]:
+    today = (now or datetime.now(timezone.utc)).date()
+    start_date = today - timedelta(days=days)
+    live_since = _live_since(await _latest(db), today)
+    rows = (await db.execute(
+        select(DailyPlatformMetrics.day, DailyPlatformMetrics.new_users, DailyPlatformMetrics.new_by_role,
+               DailyPlatformMetrics.logins, DailyPlatformMetrics.unique_logins)
+        .where(DailyPlatformMetrics.day >= start_date, DailyPlatformMetrics.day < live_since)
+        .order_by(DailyPlatformMetrics.day)
+    )).all()
+    live = await _live_days(db, max(live_since, start_date), today)
+
+    registrations = [{"date": str(r.day), "count": r.new_users} for r in rows if r.new_users]
+    logins = [{"date": str(r.day), "unique_users": r.unique_logins, "total_logins": r.logins}
+              for r in rows if r.logins]
+    by_role = Counter()
+    for r in rows:
+        by_role.update(r.new_by_role or {})
+    for day, events in live:
+        by_role.update(events["new_by_role"])
+        if events["new_users"]:
+            registrations.append({"date": str(day), "count": events["new_users"]})
+        if events["logins"]:
+            logins.append({"date": str(day), "unique_users": events["unique_logins"],
+                           "total_logins": events["logins"]})
+    return {"registrations": registrations, "logins": logins, "by_role": dict(by_role)}
+
+
+async def _distinct_logins(db: AsyncSession, since: date, until: date, live_since: date) -> int:
+    """[since, until) kunlarida login qilgan unique foydalanuvchilar (live_since dan — jonli geo log)"""
+    parts = []
+    rolled_until = min(until, live_since)
+    if since < rolled_until:
+        parts.append(select(UserDailyLogin.user_id).where(
+            UserDailyLogin.day >= since, UserDailyLogin.day < rolled_until))
+    live_start = max(since, live_since)
+    if live_start < until:
+        parts.append(select(UserGeoLog.user_id).where(
+            UserGeoLog.action == "login",
+            UserGeoLog.created_at >= day_bounds(live_start)[0], UserGeoLog.created_at < day_bounds(until)[0],
+        ))
+    if not parts:
+        return 0
+    users = union(*parts).subquery() if len(parts) > 1 else parts[0].distinct().subquery()
+    return (await db.execute(select(func.count()).select_from(users))).scalar() or 0
+
+
+async def user_segments(db: AsyncSession, now: Optional[datetime] = None) -> Dict[str, Any]:
+    today = (now or datetime.now(timezone.utc)).date()
+    week_ago, month_ago = today - timedelta(days=7), today - timedelta(days=30)
+    live, users_by_role, snapshot, _ = await _totals(db, today)
+    live_since = live[0][0]
+    new_users = (await _rollup_sum(db, DailyPlatformMetrics.new_users, since=week_ago, until=live_since)
+                 + _live_sum(live, "new_users", week_ago))
+    return {
+        "new": new_users,
+        "active": await _distinct_logins(db, week_ago, today + timedelta(days=1), live_since),
+        "moderate": await _distinct_logins(db, month_ago, week_ago, live_since),
+        "subscribers": snapshot["subscribers"],
+        "rich": snapshot["coin_rich_users"],
+        "total": sum(users_by_role.values()),
+    }
+
+
+# ============================================================
+# FON JOB
+# ============================================================
+
+_task: Optional[asyncio.Task] = None
+
+
+async def _run(session_factory) -> None:
+    while True:
+        try:
+            async with session_factory() as db:
+                days = await rollup_pending(db)
+            if days:
+                logger.info(f"Daily metrics rollup: {days} kun hisoblandi")
+        except asyncio.CancelledError:
+            raise
+        except IntegrityError:
+            # Boshqa worker jarayoni shu kunni bir vaqtda yozdi — keyingi aylanishda qayta
+            logger.info("Daily metrics rollup: parallel yozuv, keyingi aylanishda davom etadi")
+        except Exception as e:
+            logger.error(f"Daily metrics rollup failed: {e}")
+        await asyncio.sleep(settings.METRICS_ROLLUP_INTERVAL_SECONDS)
+
+
+def start_metrics_rollup(session_factory) -> asyncio.Task:
+    """Lifespan startup: har METRICS_ROLLUP_INTERVAL_SECONDS da rollup_pending()"""
+    global _task
+    _task = asyncio.get_running_loop().create_task(_run(session_factory))
+    return _task
+
+
+async def stop_metrics_rollup() -> None:
+    global _task
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except (asyncio.CancelledError, Exception):
+            pass
+    _task = None
@@ -1,22 +1,28 @@
 from typing import List, Optional, Tuple, Dict
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, func, desc, and_, cast, String
-from datetime import datetime, timezone
+from sqlalchemy import select, update, func, desc, and_, cast, String, text
+from sqlalchemy.orm.attributes import get_history
+from datetime import datetime, timezone, timedelta
+import uuid
 
 from shared.database.models import User, UserRole, AccountStatus, TeacherProfile, OrganizationProfile
 from shared.database.models.book import BookReadingRecord
 from shared.database.models.reading_rating import ReadingRating, RatingPeriod
 from shared.database.models.classroom import Classroom, ClassroomStudent
 
-def get_period_keys() -> Dict[RatingPeriod, str]:
-    now = datetime.now(timezone.utc)
+def get_record_period_keys(dt: datetime) -> Dict[RatingPeriod, str]:
+    """Period keys (2026-W22, 2026-06, 2026, "") for the given moment, in UTC."""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    else:
+        dt = dt.astimezone(timezone.utc)
     # weekly: 2026-W22
-    year, week, _ = now.isocalendar()
+    year, week, _ = dt.isocalendar()
     weekly_key = f"{year}-W{week:02d}"
     # monthly: 2026-06
-    monthly_key = f"{now.year}-{now.month:02d}"
+    monthly_key = f"{dt.year}-{dt.month:02d}"
     # yearly: 2026
-    yearly_key = str(now.year)
+    yearly_key = str(dt.year)
     
     return {
         RatingPeriod.weekly: weekly_key,
@@ -25,6 +31,130 @@ def get_period_keys() -> Dict[RatingPeriod, str]:
         RatingPeriod.all_time: ""
     }
 
+def get_period_keys() -> Dict[RatingPeriod, str]:
+    return get_record_period_keys(datetime.now(timezone.utc))
+
+def get_previous_period_keys(dt: datetime) -> Dict[RatingPeriod, Optional[str]]:
+    """Keys of the period immediately before the one containing dt (all_time has none)."""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    else:
+        dt = dt.astimezone(timezone.utc)
+    prev_month_day = dt.replace(day=1) - timedelta(days=1)
+    return {
+        RatingPeriod.weekly: get_record_period_keys(dt - timedelta(days=7))[RatingPeriod.weekly],
+        RatingPeriod.monthly: get_record_period_keys(prev_month_day)[RatingPeriod.monthly],
+        RatingPeriod.yearly: str(dt.year - 1),
+        RatingPeriod.all_time: None
+    }
+
+def compute_rating_deltas(
+    old: Optional[Tuple[Optional[datetime], int]],
+    new: Optional[Tuple[Optional[datetime], int]]
+) -> Dict[Tuple[RatingPeriod, str], Dict]:
+    """
+    Per-(period, period_key) change caused by a record moving from `old` to `new`.
+    Each side is (completed_at, max_score) of a counted record, or None if it was/is not counted.
+    Rows with no net change are dropped, so re-saving an identical record is a no-op.
+    """
+    deltas: Dict[Tuple[RatingPeriod, str], Dict] = {}
+    for sign, contribution in ((-1, old), (1, new)):
+        if not contribution or not contribution[0]:
+            continue
+        completed_at, score = contribution
+        keys = get_record_period_keys(completed_at)
+        prev_keys = get_previous_period_keys(completed_at)
+        for period, p_key in keys.items():
+            delta = deltas.setdefault(
+                (period, p_key), {"books": 0, "score": 0, "prev_key": prev_keys[period]}
+            )
+            delta["books"] += sign
+            delta["score"] += sign * (score or 0)
+    return {k: d for k, d in deltas.items() if d["books"] or d["score"]}
+
+def _committed_value(record, attr: str):
+    """Value of attr as last flushed to the DB (None for a new, pending record)."""
+    hist = get_history(record, attr)
+    if hist.deleted:
+        return hist.deleted[0]
+    if hist.unchanged:
+        return hist.unchanged[0]
+    return None
+
+# Bitta yozuvning o'zgarishini barcha davr qatorlariga bitta atomik upsert bilan qo'llash.
+# Yangi davr qatori birinchi marta yaratilganda previous_score oldingi davrdan olinadi (lazy rollover).
+_APPLY_RATING_DELTAS_SQL = text("""
+    INSERT INTO reading_ratings AS rr
+        (id, student_id, period, period_key, total_books, total_score, previous_score, created_at, updated_at)
+    SELECT v.id, :student_id, v.period, v.period_key, v.books, v.score,
+           COALESCE(prev.total_score, 0), now(), now()
+    FROM unnest(
+        CAST(:ids AS varchar[]), CAST(:periods AS varchar[]), CAST(:period_keys AS varchar[]),
+        CAST(:prev_keys AS varchar[]), CAST(:books AS integer[]), CAST(:scores AS integer[])
+    ) AS v(id, period, period_key, prev_key, books, score)
+    LEFT JOIN reading_ratings prev
+        ON prev.student_id = :student_id
+        AND prev.period = v.period
+        AND prev.period_key = v.prev_key
+    ON CONFLICT (student_id, period, period_key) DO UPDATE SET
+        total_books = rr.total_books + EXCLUDED.total_books,
+        total_score = rr.total_score + EXCLUDED.total_score,
+        updated_at = now()
+""")
+
+# Barcha agregatlarni book_reading_records dan bitta set-based so'rov bilan qayta qurish.
+# Hech qanday hisoblangan yozuvi qolmagan qatorlar nolga tushiriladi.
+_REBUILD_RATINGS_SQL = text("""
+    WITH counted AS (
+        SELECT student_user_id AS student_id, max_score,
+               completed_at AT TIME ZONE 'UTC' AS ts
+        FROM book_reading_records
+        WHERE is_counted = true AND completed_at IS NOT NULL
+    ),
+    agg AS (
+        SELECT student_id, 'weekly' AS period,
+               to_char(date_trunc('week', ts), 'IYYY-"W"IW') AS period_key,
+               to_char(date_trunc('week', ts) - interval '7 days', 'IYYY-"W"IW') AS prev_key,
+               count(*) AS books, sum(max_score) AS score
+        FROM counted GROUP BY student_id, date_trunc('week', ts)
+        UNION ALL
+        SELECT student_id, 'monthly',
+               to_char(date_trunc('month', ts), 'YYYY-MM'),
+               to_char(date_trunc('month', ts) - interval '1 month', 'YYYY-MM'),
+               count(*), sum(max_score)
+        FROM counted GROUP BY student_id, date_trunc('month', ts)
+        UNION ALL
+        SELECT student_id, 'yearly',
+               to_char(date_trunc('year', ts), 'YYYY'),
+               to_char(date_trunc('year', ts) - interval '1 year', 'YYYY'),
+               count(*), sum(max_score)
+        FROM counted GROUP BY student_id, date_trunc('year', ts)
+        UNION ALL
+        SELECT student_id, 'all_time', '', NULL, count(*), sum(max_score)
+        FROM counted GROUP BY student_id
+    ),
+    upserted AS (
+        INSERT INTO reading_ratings AS rr
+            (id, student_id, period, period_key, total_books, total_score, previous_score, created_at, updated_at)
+        SELECT gen_random_uuid()::text, a.student_id, a.period, a.period_key, a.books, a.score,
+               COALESCE(p.score, 0), now(), now()
+        FROM agg a
+        LEFT JOIN agg p
+            ON p.student_id = a.student_id
+            AND p.period = a.period
+            AND p.period_key = a.prev_key
+        ON CONFLICT (student_id, period, period_key) DO UPDATE SET
+            total_books = EXCLUDED.total_books,
+            total_score = EXCLUDED.total_score,
+            previous_score = EXCLUDED.previous_score,
+            updated_at = now()
+        RETURNING rr.id
+    )
+    UPDATE reading_ratings SET total_books = 0, total_score = 0, updated_at = now()
+    WHERE id NOT IN (SELECT id FROM upserted)
+      AND (total_books <> 0 OR total_score <> 0)
+""")
+
 class RatingService:
     def __init__(self, db: AsyncSession):
         self.db = db
@@ -34,6 +164,14 @@ class RatingService:
         Process a new or updated reading record.
         Calculates max_score and updates aggregates.
         """
+        # Yozuvning avvalgi hissasi (agar u oldin hisoblangan bo'lsa) — delta uchun kerak
+        old_contribution = None
+        if _committed_value(record, "is_counted"):
+            old_contribution = (
+                _committed_value(record, "completed_at"),
+                _committed_value(record, "max_score") or 0
+            )
+
         quiz = record.quiz_score or 0
         test = record.test_score or 0
         max_s = max(quiz, test)
@@ -48,94 +186,48 @@ class RatingService:
             
         await self.db.flush()
         
-        if record.is_counted:
-            await self._update_student_ratings(record.student_user_id)
+        new_contribution = (record.completed_at, record.max_score) if record.is_counted else None
+        if old_contribution or new_contribution:
+            await self._update_student_ratings(record.student_user_id, old_contribution, new_contribution)
             
         return record
 
-    async def _update_student_ratings(self, student_id: str):
+    async def _update_student_ratings(
+        self,
+        student_id: str,
+        old: Optional[Tuple[Optional[datetime], int]],
+        new: Optional[Tuple[Optional[datetime], int]]
+    ):
         """
-        Update the aggregated ReadingRating for a student.
-        Calculates from all BookReadingRecord of the student.
+        Apply one record's delta to the student's ReadingRating rows.
+        Cost does not depend on how many books the student has already read:
+        the weekly/monthly/yearly rows keyed by the record's completed_at date
+        and the all_time row are adjusted in a single INSERT ... ON CONFLICT.
         """
-        period_keys = get_period_keys()
-        
-        # Fetch all counted records
-        stmt = select(BookReadingRecord).where(
-            and_(
-                BookReadingRecord.student_user_id == student_id,
-                BookReadingRecord.is_counted == True
-            )
-        )
-        result = await self.db.execute(stmt)
-        records = result.scalars().all()
-        
-        # We need to aggregate by period
-        aggregates = {
-            RatingPeriod.weekly: {"books": 0, "score": 0},
-            RatingPeriod.monthly: {"books": 0, "score": 0},
-            RatingPeriod.yearly: {"books": 0, "score": 0},
-            RatingPeriod.all_time: {"books": 0, "score": 0},
-        }
-        
-        for r in records:
-            if not r.completed_at:
-                continue
-            
-            r_date = r.completed_at
-            if r_date.tzinfo is None:
-                r_date = r_date.replace(tzinfo=timezone.utc)
-            
-            # calculate keys for the record date
-            y, w, _ = r_date.isocalendar()
-            r_weekly = f"{y}-W{w:02d}"
-            r_monthly = f"{r_date.year}-{r_date.month:02d}"
-            r_yearly = str(r_date.year)
-            
-            # Add to all_time
-            aggregates[RatingPeriod.all_time]["books"] += 1
-            aggregates[RatingPeriod.all_time]["score"] += r.max_score
-            
-            if r_weekly == period_keys[RatingPeriod.weekly]:
-                aggregates[RatingPeriod.weekly]["books"] += 1
-                aggregates[RatingPeriod.weekly]["score"] += r.max_score
-                
-            if r_monthly == period_keys[RatingPeriod.monthly]:
-                aggregates[RatingPeriod.monthly]["books"] += 1
-                aggregates[RatingPeriod.monthly]["score"] += r.max_score
-                
-            if r_yearly == period_keys[RatingPeriod.yearly]:
-                aggregates[RatingPeriod.yearly]["books"] += 1
-                aggregates[RatingPeriod.yearly]["score"] += r.max_score
-                
-        # Update or create ReadingRating rows
-        for period, agg in aggregates.items():
-            p_key = period_keys[period]
-            
-            stmt_rating = select(ReadingRating).where(
-                and_(
-                    ReadingRating.student_id == student_id,
-                    cast(ReadingRating.period, String) == period.value,
-                    ReadingRating.period_key == p_key
-                )
-            )
-            res = await self.db.execute(stmt_rating)
-            rating = res.scalars().first()
-            
-            if not rating:
-                rating = ReadingRating(
-                    student_id=student_id,
-                    period=period,
-                    period_key=p_key,
-                    total_books=agg["books"],
-                    total_score=agg["score"]
-                )
-                self.db.add(rating)
-            else:
-                rating.total_books = agg["books"]
-                rating.total_score = agg["score"]
-                
-        await self.db.flush()
+        deltas = compute_rating_deltas(old, new)
+        if not deltas:
+            return
+
+        items = list(deltas.items())
+        await self.db.execute(_APPLY_RATING_DELTAS_SQL, {
+            "student_id": student_id,
+            "ids": [str(uuid.uuid4()) for _ in items],
+            "periods": [period.value for (period, _), _ in items],
+            "period_keys": [p_key for (_, p_key), _ in items],
+            "prev_keys": [d["prev_key"] for _, d in items],
+            "books": [d["books"] for _, d in items],
+            "scores": [d["score"] for _, d in items],
+        })
+
+    async def rebuild_all_ratings(self) -> int:
+        """
+        Backfill / reconcile: recompute every ReadingRating row from
+        book_reading_records in one set-based statement.
+        Returns the number of stale rows that were reset to zero.
+        Caller is responsible for committing.
+        """
+        result = await self.db.execute(_REBUILD_RATINGS_SQL)
+        return result.rowcount or 0
 
     async def get_student_leaderboard(
         self,
@@ -9,12 +9,13 @@ FIX: Previously returned HTTP 200 with {"error": "..."} on failures.
      - 500: AI processing failure
 """
 from fastapi import APIRouter, UploadFile, File, HTTPException
-import base64
 import os
 import logging
 from app.core.config import settings
 
 from app.services.ai_service import ai_service
+from shared.services.document_extraction import ExtractionError, UploadTooLarge
+from shared.services.image_pipeline import get_or_recognize, prepare_upload
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -31,24 +32,26 @@ def clean_text_for_tts(text):
 async def read_image(file: UploadFile = File(...)):
     """
     Read text from uploaded image using Azure OpenAI GPT Vision.
+    Rasm AI'ga yuborishdan oldin kichraytiriladi (image_pipeline); o'sha
+    sahifa qayta yuklansa AI chaqirilmaydi.
     
     Returns: {"text": "extracted text..."}
     Raises:
         413 - File exceeds 50MB limit
+        422 - File is not a readable image
         500 - AI processing error
     """
-    # Fayl hajmini tekshirish (50MB gacha)
-    max_size = 50 * 1024 * 1024  # 50MB
-    image_bytes = await file.read()
-    
-    if len(image_bytes) > max_size:
+    # Fayl hajmi (50MB gacha) spool paytida tekshiriladi
+    try:
+        prepared = await prepare_upload(file)
+    except UploadTooLarge:
         # FIX: Was returning 200 — now properly raises 413
         raise HTTPException(
             status_code=413,
             detail=f"Rasm hajmi juda katta. Maksimal hajm: 50MB"
         )
-
-    encoded = base64.b64encode(image_bytes).decode("utf-8")
+    except ExtractionError as e:
+        raise HTTPException(status_code=422, detail=f"Rasmni o'qib bo'lmadi: {e}")
 
     prompt = (
         "Rasm ichidagi matnni aniqlang va to'liq matn shaklida qaytaring. "
@@ -58,20 +61,23 @@ async def read_image(file: UploadFile = File(...)):
         "Faqat matnni qaytaring, tahlil yozmang."
     )
 
-    try:
+    async def recognize(image):
         vision_messages = [{
             "role": "user",
             "content": [
                 {"type": "text", "text": prompt},
-                {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{encoded}"}}
+                {"type": "image_url", "image_url": {"url": image.data_url()}}
             ]
         }]
-        
-        text_output = await ai_service.call_ai(
+        return await ai_service.call_ai(
             messages=vision_messages,
             max_tokens=1200,
-            temperature=0.3
+            temperature=0,  # deterministik o'qish: keshlangan javob qayta so'rovdagidek
+            cache=True,
         )
+
+    try:
+        text_output = await get_or_recognize(prepared, "smartkids_ocr", recognize)
         logger.info("Vision OCR success")
         
         # Matn uzunligini cheklash (250 so'z)
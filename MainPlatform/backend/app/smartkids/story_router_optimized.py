@@ -17,7 +17,6 @@ from shared.database import get_db
 from ..models.reading_analysis import ReadingAnalysis
 from ..core.config import settings
 from langdetect import detect, LangDetectException
-from ..services.ai_cache_service import AICacheService
 
 from ..services.ai_service import ai_service
 
@@ -62,22 +61,14 @@ def get_system_prompt(language: str, prompt_type: str):
     return base + prompts.get(prompt_type, {}).get(language, prompts.get(prompt_type, {}).get("uz-UZ", ""))
 
 @router.post("/chat-and-ask")
-async def chat_and_ask_question(request: ChatRequest, db: AsyncSession = Depends(get_db)):
+async def chat_and_ask_question(request: ChatRequest):
     """
     1. Analyze child's answer (if any)
     2. Generate next question
-    3. Uses Semantic Caching (Async)
+    3. Not cached (temperature=0.7): every turn gets a fresh reply
     """
     try:
-        # 1. Check Cache
-        last_user_msg = request.conversation_history[-1]['content'] if request.conversation_history else "START"
-        story_hash_key = AICacheService.generate_hash(last_user_msg, request.story_text[:100], model=deployment_name)
-        
-        cached = await AICacheService.get_cached_response(db, story_hash_key)
-        if cached:
-            return cached
-
-        # 2. Construct Prompt (Secure & Optimized)
+        # 1. Construct Prompt (Secure & Optimized)
         truncated_story = request.story_text[:3000] 
         system_prompt = get_system_prompt(request.language, "chat-and-ask")
         
@@ -86,7 +77,7 @@ async def chat_and_ask_question(request: ChatRequest, db: AsyncSession = Depends
             {"role": "user", "content": f"Story: {truncated_story}\n\nChat History: {json.dumps(request.conversation_history[-4:])}"}
         ]
 
-        # 3. Call AI with JSON Mode (Async)
+        # 2. Call AI with JSON Mode (Async)
         content = await ai_service.call_ai(
             model=deployment_name,
             messages=messages,
@@ -94,12 +85,7 @@ async def chat_and_ask_question(request: ChatRequest, db: AsyncSession = Depends
             temperature=0.7
         )
 
-        result = json.loads(content)
-        
-        # 4. Save to Cache
-        await AICacheService.set_cached_response(db, story_hash_key, result, prompt_text=messages[1]['content'])
-        
-        return result
+        return json.loads(content)
 
     except Exception as e:
         # Fallback to keep app running if AI fails
@@ -1,14 +1,39 @@
 """
-GeoIP Utility - IP manzildan joylashuv aniqlash (Background task)
-ip-api.com (bepul, 45 req/min) yoki fallback sifatida faqat IP saqlash
+GeoIP Utility - IP manzildan joylashuv aniqlash (lokal diapazonlar bazasi)
+
+IP diapazonlar CSV fayli (settings.GEOIP_DB_PATH) xotiraga yuklanadi:
+boshlanish manzillari saralangan massivda, qidiruv — binary search (bisect).
+Takroriy IP'lar uchun oldida LRU kesh. Tashqi HTTP so'rov yo'q — login
+tezligi provayder limitiga va internetga bog'liq emas.
+
+CSV ustunlari (# bilan boshlangan qatorlar — izoh):
+    ip_start,ip_end,country_code,country,region,city,latitude,longitude,isp
+ip_start/ip_end — nuqtali manzil ("84.54.64.0") yoki butun son (IP2Location
+LITE kabi eksportlar); IPv4 va IPv6 alohida indekslanadi.
+GEOIP_DB_PATH sozlanmagan bo'lsa geo maydonlari bo'sh yoziladi (ogohlantirish
+bilan). app/data/geoip_sample.csv (SAMPLE_DB_PATH) — 17 qatorli o'ylab
+topilgan namunaviy fayl, faqat testlar va DEBUG rejimi uchun; production'da
+undan olingan shahar/ISP user_geo_logs ga soxta ma'lumot bo'lib tushardi.
 """
-import httpx
+import bisect
+import csv
+import ipaddress
 import logging
+import os
 import re
-from typing import Optional, Dict
+import threading
+from array import array
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ..core.config import settings
 
 logger = logging.getLogger(__name__)
 
+SAMPLE_DB_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "geoip_sample.csv")
+
+GEO_FIELDS = ("country", "country_code", "region", "city", "latitude", "longitude", "isp")
+
 # User-Agent parsing (basic)
 MOBILE_RE = re.compile(r'(iPhone|iPad|Android|Mobile|webOS)', re.I)
 TABLET_RE = re.compile(r'(iPad|Tablet|PlayBook)', re.I)
@@ -46,38 +71,150 @@ def parse_os(user_agent: str) -> str:
     return "Other"
 
 
-async def get_geo_from_ip(ip: str) -> Dict:
-    """
-    IP manzildan geolokatsiyani aniqlash (ip-api.com). 
-    Bepul limit: 45 so'rov/daqiqa.
-    Fallback: faqat IP saqlash (hech qanday exception)
-    """
-    result = {
-        "country": None, "country_code": None, "region": None,
-        "city": None, "latitude": None, "longitude": None, "isp": None,
-    }
-
-    # Skip local/private IPs
-    if not ip or ip in ("127.0.0.1", "::1", "localhost") or ip.startswith(("10.", "192.168.", "172.")):
-        return result
+def empty_geo() -> Dict:
+    return dict.fromkeys(GEO_FIELDS)
+
+
+def _parse_ip(value: str) -> Tuple[int, int]:
+    """"84.54.64.0" yoki "1412841472" -> (versiya, butun son)"""
+    value = value.strip()
+    if value.isdigit():
+        n = int(value)
+        return (4 if n < 2 ** 32 else 6), n
+    addr = ipaddress.ip_address(value)
+    return addr.version, int(addr)
+
+
+class GeoIPDatabase:
+    """Saralangan, kesishmaydigan IP diapazonlar + bisect qidiruv + LRU."""
+
+    def __init__(self, ranges: Iterable[Tuple[int, int, int, tuple]], cache_size: int = 10000):
+        by_version: Dict[int, List[Tuple[int, int, tuple]]] = {4: [], 6: []}
+        interned: Dict[tuple, tuple] = {}
+        for version, start, end, record in ranges:
+            # Bir xil shahar/provayder yozuvlari bitta tuple'ga tushadi (xotira)
+            by_version[version].append((start, end, interned.setdefault(record, record)))
+
+        self._starts: Dict[int, object] = {}
+        self._ends: Dict[int, object] = {}
+        self._records: Dict[int, List[tuple]] = {}
+        for version, items in by_version.items():
+            items.sort(key=lambda item: item[0])
+            # IPv4 — ixcham 32-bit massiv; IPv6 128-bit bo'lgani uchun oddiy list
+            typecode = ("I" if array("I").itemsize >= 4 else "L") if version == 4 else None
+            starts = [item[0] for item in items]
+            ends = [item[1] for item in items]
+            self._starts[version] = array(typecode, starts) if typecode else starts
+            self._ends[version] = array(typecode, ends) if typecode else ends
+            self._records[version] = [item[2] for item in items]
+
+        self.size = sum(len(items) for items in by_version.values())
+        self.lookup = lru_cache(maxsize=cache_size)(self._lookup)
+
+    def _lookup(self, ip: str) -> Optional[tuple]:
+        try:
+            addr = ipaddress.ip_address(ip.strip())
+        except (AttributeError, ValueError):
+            return None
+        if addr.version == 6 and addr.ipv4_mapped is not None:
+            addr = addr.ipv4_mapped
+        if not addr.is_global:
+            return None
+        n = int(addr)
+        starts = self._starts[addr.version]
+        i = bisect.bisect_right(starts, n) - 1
+        if i < 0 or n > self._ends[addr.version][i]:
+            return None
+        return self._records[addr.version][i]
+
+    def resolve(self, ip: str) -> Dict:
+        record = self.lookup(ip)
+        return dict(zip(GEO_FIELDS, record)) if record else empty_geo()
+
+    def cache_info(self) -> Dict:
+        info = self.lookup.cache_info()
+        return {"ranges": self.size, "hits": info.hits, "misses": info.misses, "cached": info.currsize}
 
+
+def _float_or_none(value: Optional[str]) -> Optional[float]:
     try:
-        async with httpx.AsyncClient(timeout=3.0) as client:
-            resp = await client.get(f"http://ip-api.com/json/{ip}?fields=status,country,countryCode,regionName,city,lat,lon,isp&lang=en")
-            if resp.status_code == 200:
-                data = resp.json()
-                if data.get("status") == "success":
-                    result["country"] = data.get("country")
-                    result["country_code"] = data.get("countryCode")
-                    result["region"] = data.get("regionName")
-                    result["city"] = data.get("city")
-                    result["latitude"] = data.get("lat")
-                    result["longitude"] = data.get("lon")
-                    result["isp"] = data.get("isp")
-    except Exception as e:
-        logger.debug(f"GeoIP lookup failed for {ip}: {e}")
-
-    return result
+        return float(value) if value not in (None, "") else None
+    except ValueError:
+        return None
+
+
+def load_geoip_csv(path: str, cache_size: Optional[int] = None) -> GeoIPDatabase:
+    """CSV diapazonlar faylini o'qish; buzilgan qatorlar o'tkazib yuboriladi"""
+    def _rows():
+        skipped = 0
+        with open(path, newline="", encoding="utf-8") as f:
+            lines = (line for line in f if line.strip() and not line.lstrip().startswith("#"))
+            for row in csv.DictReader(lines):
+                try:
+                    version, start = _parse_ip(row["ip_start"])
+                    end_version, end = _parse_ip(row["ip_end"])
+                    if version != end_version or end < start:
+                        raise ValueError("bad range")
+                except (KeyError, ValueError, AttributeError):
+                    skipped += 1
+                    continue
+                record = (
+                    row.get("country") or None,
+                    row.get("country_code") or None,
+                    row.get("region") or None,
+                    row.get("city") or None,
+                    _float_or_none(row.get("latitude")),
+                    _float_or_none(row.get("longitude")),
+                    row.get("isp") or None,
+                )
+                yield version, start, end, record
+        if skipped:
+            logger.warning(f"GeoIP: {skipped} invalid rows skipped in {path}")
+
+    return GeoIPDatabase(_rows(), settings.GEOIP_CACHE_SIZE if cache_size is None else cache_size)
+
+
+_db: Optional[GeoIPDatabase] = None
+_db_lock = threading.Lock()
+
+
+def get_geoip_db() -> Optional[GeoIPDatabase]:
+    """Jarayondagi yagona bazani (birinchi chaqiruvda) yuklash; fayl bo'lmasa bo'sh baza"""
+    global _db
+    if _db is None:
+        with _db_lock:
+            if _db is None:
+                path = settings.GEOIP_DB_PATH
+                if not path and settings.DEBUG:
+                    path = SAMPLE_DB_PATH
+                    logger.warning(f"GeoIP: GEOIP_DB_PATH not set, DEBUG uses the sample ranges ({path})")
+                if not path:
+                    logger.error("GeoIP: GEOIP_DB_PATH is not set — login geo fields will be written empty")
+                    _db = GeoIPDatabase([], cache_size=0)
+                    return _db
+                try:
+                    _db = load_geoip_csv(path)
+                    logger.info(f"GeoIP: {_db.size} ranges loaded from {path}")
+                except OSError as e:
+                    logger.error(f"GeoIP database not available ({path}): {e} — login geo fields will be written empty")
+                    _db = GeoIPDatabase([], cache_size=0)
+    return _db
+
+
+def set_geoip_db(db: Optional[GeoIPDatabase]) -> None:
+    """Testlar uchun: bazani almashtirish (None — keyingi chaqiruvda qayta yuklanadi)"""
+    global _db
+    _db = db
+
+
+def resolve_geo(ip: str) -> Dict:
+    """IP -> {country, country_code, region, city, latitude, longitude, isp}; topilmasa None'lar"""
+    return get_geoip_db().resolve(ip) if ip else empty_geo()
+
+
+async def get_geo_from_ip(ip: str) -> Dict:
+    """Eski chaqiruvlar uchun: resolve_geo() ning async nomi (tarmoq so'rovi yo'q)"""
+    return resolve_geo(ip)
 
 
 def get_client_ip(request) -> str:
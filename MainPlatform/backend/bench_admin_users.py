@@ -0,0 +1,123 @@
+"""
+Benchmark: admin foydalanuvchilar ro'yxati va DB brauzeri katta users jadvalida.
+
+    offset  — avvalgi list_users: ORDER BY created_at DESC OFFSET n LIMIT 20
+    keyset  — admin_browser.users_page(): WHERE (created_at, id) < cursor
+    count   — COUNT(*) vs approximate_counts() (Postgres'da pg_class.reltuples)
+    search  — '%x%' qidiruvi user_search_expr() ustida (Postgres'da pg_trgm indeks)
+
+Default — vaqtinchalik sqlite (aiosqlite) bazasi, BENCH_ROWS foydalanuvchi bilan;
+sqlite'da approximate_counts() aniq COUNT'ga tushadi va trigram indeks yo'q.
+Postgres'da o'lchash uchun BENCH_DATABASE_URL=postgresql+asyncpg://... (046
+migratsiyasi qo'llangan bo'lishi kerak; oxirida faqat benchmark yozuvlari o'chiriladi).
+
+    cd MainPlatform/backend
+    python bench_admin_users.py
+    BENCH_ROWS=200000 python bench_admin_users.py
+"""
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+try:
+    from dotenv import load_dotenv
+    load_dotenv(os.path.join(os.path.dirname(__file__), '.env'))
+except ImportError:
+    pass
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from sqlalchemy import Index, delete, func, insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from shared.database.base import Base
+from shared.database.models import AccountStatus, User, UserRole
+from app.services import admin_browser
+
+ROWS = int(os.getenv("BENCH_ROWS", "1000000"))
+BATCH = 5000
+PAGE = 20
+DATABASE_URL = os.getenv("BENCH_DATABASE_URL", "sqlite+aiosqlite:///bench_admin_users.sqlite3")
+ROLES = [UserRole.student, UserRole.student, UserRole.student, UserRole.parent, UserRole.teacher]
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def _user_rows(start, stop):
+    # "b" prefiksli ID'lar — haqiqiy ID'lar raqamli
+    return [{
+        "id": f"b{i:07d}", "first_name": f"Ism{i % 997}", "last_name": f"Fam{i % 1013}",
+        "email": f"bench{i}@example.uz", "phone": f"+99890{i:07d}",
+        "role": ROLES[i % len(ROLES)], "status": AccountStatus.active,
+        "created_at": START + timedelta(seconds=i * 17),
+    } for i in range(start, stop)]
+
+
+async def timed(fn, repeat=3):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = await fn()
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+async def main():
+    engine = create_async_engine(DATABASE_URL)
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+    keyset_index = Index("ix_users_created_id", User.created_at, User.id)
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda c: Base.metadata.create_all(c, tables=[User.__table__]))
+        await conn.run_sync(lambda c: keyset_index.create(c, checkfirst=True))
+    async with sessions() as db:
+        for start in range(0, ROWS, BATCH):
+            await db.execute(insert(User), _user_rows(start, min(start + BATCH, ROWS)))
+        await db.commit()
+
+    try:
+        print(f"{ROWS} users, page {PAGE}, {engine.dialect.name}")
+        print(f"{'case':>28} {'ms':>9}")
+        order = (User.created_at.desc(), User.id.desc())
+        async with sessions() as db:
+            for depth in (0, ROWS // 10, ROWS // 2, ROWS - PAGE):
+                ms, _ = await timed(lambda: db.execute(
+                    select(User).order_by(*order).offset(depth).limit(PAGE)))
+                print(f"{'offset ' + str(depth):>28} {ms:>9.1f}")
+
+                # Shu sahifaga olib keladigan cursor (oldingi sahifaning oxirgi qatori)
+                cursor = None
+                if depth:
+                    prev = (await db.execute(select(User.created_at, User.id).order_by(*order)
+                                             .offset(depth - 1).limit(1))).one()
+                    cursor = admin_browser.encode_cursor([prev.created_at, prev.id])
+                ms, _ = await timed(lambda: admin_browser.users_page(
+                    db, admin_browser.users_query(), PAGE, cursor))
+                print(f"{'keyset ' + str(depth):>28} {ms:>9.1f}")
+                db.expunge_all()
+
+            ms, _ = await timed(lambda: db.execute(select(func.count(User.id))))
+            print(f"{'COUNT(*)':>28} {ms:>9.1f}")
+            ms, _ = await timed(lambda: admin_browser.approximate_counts(db, ["users"]))
+            print(f"{'approximate_counts':>28} {ms:>9.1f}")
+
+            for term in ("ism42", "bench123456@", "+998 (90) 000-12"):
+                stmt = admin_browser.users_query(search=term)
+                ms, (users, _, _) = await timed(lambda: admin_browser.users_page(db, stmt, PAGE))
+                print(f"{'search ' + repr(term):>28} {ms:>9.1f}  ({len(users)} rows)")
+                ms, total = await timed(lambda: admin_browser.estimate_rows(db, stmt), repeat=1)
+                print(f"{'  estimate_rows':>28} {ms:>9.1f}  (~{total})")
+                db.expunge_all()
+    finally:
+        async with sessions() as db:
+            await db.execute(delete(User).where(User.id.like("b%")))
+            await db.commit()
+        await engine.dispose()
+        if DATABASE_URL.startswith("sqlite") and os.path.exists("bench_admin_users.sqlite3"):
+            os.remove("bench_admin_users.sqlite3")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
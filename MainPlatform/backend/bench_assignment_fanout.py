@@ -0,0 +1,111 @@
+"""
+Benchmark: 1000 o'quvchiga vazifa berish — javob vaqti.
+
+    legacy  — avvalgi create_assignment: har o'quvchi uchun db.add + notification,
+              commit'dan keyin har biriga TelegramUser SELECT + sendMessage
+              (Telegram RTT TELEGRAM_RTT_MS bilan taqlid qilinadi)
+    fan-out — fan_out_assignment(): submission'lar, bildirishnomalar va outbox
+              bittadan INSERT, Telegram javobdan keyin worker'da
+
+Default — vaqtinchalik sqlite (aiosqlite) bazasi; Postgres'da o'lchash uchun
+BENCH_DATABASE_URL=postgresql+asyncpg://... (yetishmayotgan jadvallar yaratiladi,
+oxirida faqat benchmark yozuvlari o'chiriladi).
+
+    cd MainPlatform/backend
+    python bench_assignment_fanout.py
+"""
+import asyncio
+import os
+import sys
+import time
+
+try:
+    from dotenv import load_dotenv
+    load_dotenv(os.path.join(os.path.dirname(__file__), '.env'))
+except ImportError:
+    pass
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from shared.database.base import Base
+from shared.database.models import TelegramOutbox, TelegramUser, User, UserRole
+from shared.database.models.assignment import (
+    Assignment, AssignmentCreatorRole, AssignmentSubmission, SubmissionStatus,
+)
+from shared.database.models.in_app_notification import InAppNotification, InAppNotifType
+from app.services.assignment_fanout import fan_out_assignment
+
+TARGETS = 1000
+TELEGRAM_RTT_MS = 40
+DATABASE_URL = os.getenv("BENCH_DATABASE_URL", "sqlite+aiosqlite:///bench_fanout.sqlite3")
+TABLES = [User.__table__, TelegramUser.__table__, TelegramOutbox.__table__, Assignment.__table__,
+          AssignmentSubmission.__table__, InAppNotification.__table__]
+
+
+async def legacy(db, assignment_id, student_ids):
+    for sid in student_ids:
+        db.add(AssignmentSubmission(assignment_id=assignment_id, student_user_id=sid, status=SubmissionStatus.pending))
+        db.add(InAppNotification(user_id=sid, title="Yangi vazifa", message="Muddati: ertaga",
+                                 notif_type=InAppNotifType.assignment_new, reference_type="assignment",
+                                 reference_id=assignment_id, sender_id="b0000000"))
+    await db.commit()
+    for sid in student_ids:
+        tg = (await db.execute(select(TelegramUser).where(TelegramUser.user_id == sid))).scalars().first()
+        if tg and tg.notifications_enabled:
+            await asyncio.sleep(TELEGRAM_RTT_MS / 1000)  # sendMessage
+
+
+async def fan_out(db, assignment_id, student_ids):
+    await fan_out_assignment(db, assignment_id, student_ids, title="Yangi vazifa", message="Muddati: ertaga",
+                             notif_type=InAppNotifType.assignment_new, sender_id="b0000000",
+                             telegram_text="*Yangi vazifa!*")
+    await db.commit()
+
+
+async def main():
+    engine = create_async_engine(DATABASE_URL)
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+    student_ids = [f"b{i:07d}" for i in range(1, TARGETS + 1)]
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda c: Base.metadata.create_all(c, tables=TABLES))
+    async with sessions() as db:
+        db.add(User(id="b0000000", first_name="Bench", last_name="Teacher", role=UserRole.teacher))
+        for i, sid in enumerate(student_ids):
+            db.add(User(id=sid, first_name="Bench", last_name="Student", role=UserRole.student))
+            if i % 2 == 0:
+                db.add(TelegramUser(user_id=sid, telegram_chat_id=f"9{i:08d}"))
+        await db.commit()
+
+    try:
+        print(f"{TARGETS} targets, Telegram RTT {TELEGRAM_RTT_MS} ms, {engine.dialect.name}")
+        print(f"{'mode':>8} {'response ms':>12}")
+        for mode, fn in (("legacy", legacy), ("fan-out", fan_out)):
+            async with sessions() as db:
+                assignment = Assignment(created_by="b0000000", creator_role=AssignmentCreatorRole.teacher,
+                                        title=f"Bench {mode}")
+                db.add(assignment)
+                await db.flush()
+                started = time.perf_counter()
+                await fn(db, assignment.id, student_ids)
+                print(f"{mode:>8} {(time.perf_counter() - started) * 1000:>12.0f}")
+    finally:
+        async with sessions() as db:
+            # Faqat benchmark yozuvlari ("b" prefiksli ID'lar — haqiqiy ID'lar raqamli)
+            await db.execute(delete(TelegramOutbox).where(TelegramOutbox.user_id.like("b%")))
+            await db.execute(delete(InAppNotification).where(InAppNotification.user_id.like("b%")))
+            await db.execute(delete(AssignmentSubmission).where(AssignmentSubmission.student_user_id.like("b%")))
+            await db.execute(delete(Assignment).where(Assignment.created_by == "b0000000"))
+            await db.execute(delete(TelegramUser).where(TelegramUser.user_id.like("b%")))
+            await db.execute(delete(User).where(User.id.like("b%")))
+            await db.commit()
+        await engine.dispose()
+        if DATABASE_URL.startswith("sqlite") and os.path.exists("bench_fanout.sqlite3"):
+            os.remove("bench_fanout.sqlite3")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,93 @@
+"""
+Benchmark: oddiy autentifikatsiyalangan GET so'rovining requests/sec ko'rsatkichi
+— request konteksti keshisiz (AUTH_CONTEXT_TTL_SECONDS=0, har so'rovda User +
+obuna SELECT) va kesh bilan.
+
+Vaqtinchalik foydalanuvchi yaratiladi, ilova uvicorn'siz (httpx ASGITransport)
+chaqiriladi, oxirida foydalanuvchi o'chiriladi.
+
+    cd MainPlatform/backend
+    python bench_auth_context.py
+"""
+import asyncio
+import os
+import sys
+import time
+
+try:
+    from dotenv import load_dotenv
+    load_dotenv(os.path.join(os.path.dirname(__file__), '.env'))
+except ImportError:
+    pass
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+import httpx
+from fastapi import Depends, FastAPI, Request
+from sqlalchemy import delete
+
+from shared.auth import create_access_token
+from shared.database.session import AsyncSessionLocal
+from shared.database.models import User, UserRole
+from app.core.config import settings
+from app.middleware.auth import get_current_user
+from app.middleware.request_context import RequestContextMiddleware, reset_user_context_cache
+
+REQUESTS = 2000
+CONCURRENCY = 20
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(RequestContextMiddleware)
+
+    @app.get("/api/v1/bench/me")
+    async def me(request: Request, user: User = Depends(get_current_user)):
+        sub = request.state.subscription
+        return {"id": user.id, "role": user.role.value, "plan": sub.plan_slug}
+
+    return app
+
+
+async def run(client: httpx.AsyncClient, token: str) -> float:
+    headers = {"Authorization": f"Bearer {token}"}
+    queue = iter(range(REQUESTS))
+
+    async def worker():
+        for _ in queue:
+            resp = await client.get("/api/v1/bench/me", headers=headers)
+            resp.raise_for_status()
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(CONCURRENCY)])
+    return REQUESTS / (time.perf_counter() - started)
+
+
+async def main():
+    async with AsyncSessionLocal() as db:
+        user = User(first_name="Bench", last_name="Auth", role=UserRole.student)
+        db.add(user)
+        await db.commit()
+        user_id = user.id
+
+    token = create_access_token({"sub": user_id})
+    transport = httpx.ASGITransport(app=build_app())
+    ttl = settings.AUTH_CONTEXT_TTL_SECONDS
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            print(f"{'mode':>12} {'req/s':>10}")
+            for mode, mode_ttl in (("no cache", 0), ("cached", ttl)):
+                settings.AUTH_CONTEXT_TTL_SECONDS = mode_ttl
+                reset_user_context_cache()
+                await run(client, token)  # isitish
+                print(f"{mode:>12} {await run(client, token):>10.0f}")
+    finally:
+        settings.AUTH_CONTEXT_TTL_SECONDS = ttl
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(User).where(User.id == user_id))
+            await db.commit()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
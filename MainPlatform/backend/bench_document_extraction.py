@@ -0,0 +1,183 @@
+"""
+Benchmark: katta PDF'dan SmartKids uchun birinchi 250 so'zni olish.
+
+    legacy — avvalgi read_file: await file.read() (butun fayl xotiraga),
+             pypdf event loop ichida, barcha sahifalar, keyin words[:250]
+    engine — shared.services.document_extraction: spooled_upload (diskka,
+             bo'laklab) + extract_document(max_words=250) process pool'da,
+             250 so'z yig'ilgach to'xtaydi
+
+Har bir yo'l alohida jarayonda ishga tushiriladi (peak RSS toza bo'lishi uchun)
+va o'lchanadi: birinchi 250 so'zgacha vaqt, event loop'ning eng uzun bloklanishi
+(asyncio ticker), asosiy jarayon va pool worker'lari peak RSS.
+PDF sintetik: BENCH_PAGES sahifa, har birida ~600 so'z.
+
+    cd MainPlatform/backend
+    python bench_document_extraction.py
+    BENCH_PAGES=1500 python bench_document_extraction.py
+"""
+import asyncio
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    from dotenv import load_dotenv
+    load_dotenv(os.path.join(os.path.dirname(__file__), '.env'))
+except ImportError:
+    pass
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+PAGES = int(os.getenv("BENCH_PAGES", "400"))
+LINES_PER_PAGE = 50
+WORDS_PER_LINE = 12
+MAX_WORDS = 250
+
+
+def write_pdf(path: str, pages: int) -> None:
+    """Oddiy matnli PDF (Helvetica, har sahifada LINES_PER_PAGE qator)"""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # Pages — kids ma'lum bo'lgach
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    kids = []
+    word = 0
+    for _ in range(pages):
+        lines = []
+        for _ in range(LINES_PER_PAGE):
+            lines.append(" ".join(f"soz{(word + k) % 997}" for k in range(WORDS_PER_LINE)))
+            word += WORDS_PER_LINE
+        body = "BT /F1 9 Tf 36 760 Td 14 TL " + " ".join(f"({line}) Tj T*" for line in lines) + " ET"
+        stream = body.encode()
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_ref = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_ref
+        )
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % k for k in kids), len(kids))
+
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = []
+        for number, obj in enumerate(objects, start=1):
+            offsets.append(f.tell())
+            f.write(b"%d 0 obj\n%s\nendobj\n" % (number, obj))
+        xref = f.tell()
+        f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+        for offset in offsets:
+            f.write(b"%010d 00000 n \n" % offset)
+        f.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+
+
+async def _ticker(state):
+    last = time.perf_counter()
+    while True:
+        await asyncio.sleep(0.005)
+        now = time.perf_counter()
+        state["max_lag_ms"] = max(state["max_lag_ms"], (now - last - 0.005) * 1000)
+        last = now
+
+
+async def _legacy(path: str) -> str:
+    import pypdf
+    from starlette.datastructures import UploadFile
+
+    with open(path, "rb") as f:
+        upload = UploadFile(file=f, filename="kitob.pdf")
+        content = await upload.read()
+        reader = pypdf.PdfReader(io.BytesIO(content))
+        text = ""
+        for page in reader.pages:
+            text += page.extract_text() or ""
+    return " ".join(text.split()[:MAX_WORDS])
+
+
+async def _engine(path: str) -> str:
+    from starlette.datastructures import UploadFile
+    from shared.services.document_extraction import extract_document, spooled_upload
+
+    with open(path, "rb") as f:
+        upload = UploadFile(file=f, filename="kitob.pdf")
+        async with spooled_upload(upload) as spooled:
+            result = await extract_document(spooled.path, "pdf", max_words=MAX_WORDS)
+    return result.text
+
+
+async def _measure(mode: str, path: str) -> dict:
+    # Ikkala rejimda bir xil importlar (o'lchovdan oldin) — farq faqat o'qish yo'lidan
+    import pypdf  # noqa: F401
+    import starlette.datastructures  # noqa: F401
+    from shared.services import document_extraction
+
+    if mode == "engine":
+        # Pool ishga tushishi o'lchovga kirmasin (production'da worker'lar allaqachon tirik)
+        from shared.services.document_extraction import extract_document
+        with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as warm:
+            warm.write("salom")
+        await extract_document(warm.name, "txt")
+        os.remove(warm.name)
+
+    state = {"max_lag_ms": 0.0}
+    ticker = asyncio.create_task(_ticker(state))
+    await asyncio.sleep(0.02)
+    started = time.perf_counter()
+    text = await (_legacy(path) if mode == "legacy" else _engine(path))
+    elapsed = time.perf_counter() - started
+    await asyncio.sleep(0.02)  # ticker oxirgi bloklanishni ham yozib olsin
+    ticker.cancel()
+    return {
+        "seconds": elapsed,
+        "words": len(text.split()),
+        "max_loop_lag_ms": state["max_lag_ms"],
+        "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "workers_rss_mb": _workers_peak_rss_mb(document_extraction),
+    }
+
+
+def _workers_peak_rss_mb(module) -> float:
+    """Tirik pool worker'larining peak RSS (Linux /proc VmHWM) — RUSAGE_CHILDREN ularni sanamaydi"""
+    executor = module._pool._executor
+    peak = 0.0
+    for pid in getattr(executor, "_processes", None) or {}:
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmHWM:"):
+                        peak = max(peak, int(line.split()[1]) / 1024)
+        except OSError:
+            pass
+    return peak
+
+
+def main():
+    if len(sys.argv) == 4 and sys.argv[1] == "--run":
+        print(json.dumps(asyncio.run(_measure(sys.argv[2], sys.argv[3]))))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "kitob.pdf")
+        write_pdf(path, PAGES)
+        size_mb = os.path.getsize(path) / (1024 * 1024)
+        print(f"PDF: {PAGES} sahifa, {size_mb:.1f} MB, ~{PAGES * LINES_PER_PAGE * WORDS_PER_LINE:,} so'z")
+        for mode in ("legacy", "engine"):
+            out = subprocess.run([sys.executable, __file__, "--run", mode, path],
+                                 capture_output=True, text=True, check=True)
+            r = json.loads(out.stdout.strip().splitlines()[-1])
+            print(f"  {mode:<7} 250 so'zgacha {r['seconds'] * 1000:8.1f}ms  so'zlar={r['words']}  "
+                  f"event loop bloklandi {r['max_loop_lag_ms']:8.1f}ms  "
+                  f"peak RSS {r['rss_mb']:.0f} MB (pool worker {r['workers_rss_mb']:.0f} MB)")
+
+
+if __name__ == "__main__":
+    main()
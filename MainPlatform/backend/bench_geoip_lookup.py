@@ -0,0 +1,71 @@
+"""
+Benchmark: lokal GeoIP qidiruvi — lookups/sec (bisect, LRU'siz va LRU bilan).
+
+RANGES ta sintetik IPv4 diapazon generatsiya qilinadi (to'liq GeoIP bazalari
+hajmida), so'ng LOOKUPS ta tasodifiy IP qidiriladi. LRU rejimida IP'lar
+UNIQUE_IPS ta "faol foydalanuvchi" to'plamidan olinadi — takroriy login'lar.
+Taqqoslash uchun: oldingi ip-api.com chaqiruvi har login'da ~50-300 ms edi.
+
+    cd MainPlatform/backend
+    python bench_geoip_lookup.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from app.core.config import settings
+from app.utils.geoip import SAMPLE_DB_PATH, GeoIPDatabase, load_geoip_csv
+
+RANGES = 300_000
+LOOKUPS = 200_000
+UNIQUE_IPS = 5_000
+
+
+def synthetic_ranges(n: int):
+    rnd = random.Random(42)
+    step = (2 ** 32 - 2 ** 24) // n
+    cities = [("Uzbekistan", "UZ", f"Region {i % 14}", f"City {i}", 41.0, 69.0, f"ISP {i % 40}") for i in range(500)]
+    for i in range(n):
+        start = 2 ** 24 + i * step
+        yield 4, start, start + rnd.randint(step // 2, step - 1), cities[i % len(cities)]
+
+
+def run(db: GeoIPDatabase, ips) -> float:
+    started = time.perf_counter()
+    for ip in ips:
+        db.resolve(ip)
+    return len(ips) / (time.perf_counter() - started)
+
+
+def main():
+    rnd = random.Random(7)
+    started = time.perf_counter()
+    db_uncached = GeoIPDatabase(synthetic_ranges(RANGES), cache_size=0)
+    print(f"load {RANGES} ranges: {(time.perf_counter() - started) * 1000:.0f} ms")
+    db_cached = GeoIPDatabase(synthetic_ranges(RANGES), cache_size=settings.GEOIP_CACHE_SIZE)
+
+    random_ips = [f"{rnd.randint(1, 223)}.{rnd.randint(0, 255)}.{rnd.randint(0, 255)}.{rnd.randint(1, 254)}"
+                  for _ in range(LOOKUPS)]
+    active = random_ips[:UNIQUE_IPS]
+    repeated = [rnd.choice(active) for _ in range(LOOKUPS)]
+
+    print(f"{'mode':>22} {'lookups/s':>12} {'us/lookup':>10}")
+    for mode, db, ips in (
+        ("bisect, unique IPs", db_uncached, random_ips),
+        ("bisect, repeated IPs", db_uncached, repeated),
+        ("bisect+LRU, repeated", db_cached, repeated),
+    ):
+        rate = run(db, ips)
+        print(f"{mode:>22} {rate:>12.0f} {1e6 / rate:>10.2f}")
+    print(db_cached.cache_info())
+
+    sample = load_geoip_csv(SAMPLE_DB_PATH)
+    print(f"sample file: {sample.size} ranges, 84.54.70.1 -> {sample.resolve('84.54.70.1')['city']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Benchmark: SmartKids rasm OCR (/smartkids/image/read) — AI'ga yuboriladigan
+payload hajmi va end-to-end latency.
+
+    legacy   — avvalgi read_image: await file.read(), xom baytlar base64
+    pipeline — image_pipeline: spool + pool'da decode/EXIF/resize/grayscale
+               JPEG + sha256 natija keshi (read_image router orqali)
+
+Vision backend stub: latency = BENCH_MODEL_MS + payload / BENCH_UPLINK_MBPS
+(AI'ga upload vaqti). Ssenariy: BENCH_PHOTOS ta 12 MP telefon rasmi
+(sensor shovqini bilan, EXIF Orientation=6), keyin har biri messenger
+orqali qayta siqilgan nusxada yana yuklanadi (bu boshqa bayt — kesh
+hit emas, tejash faqat kichikroq payload'da).
+
+Eslatma: gpt-4o "high" detail tokenlari ikkala yo'lda bir xil — model rasmni
+baribir 2048 / 768 gacha kichraytiradi; tejash upload va latency'da.
+
+    cd MainPlatform/backend
+    python bench_image_pipeline.py
+    BENCH_UPLINK_MBPS=100 python bench_image_pipeline.py
+"""
+import asyncio
+import base64
+import io
+import os
+import random
+import statistics
+import sys
+import time
+
+try:
+    from dotenv import load_dotenv
+    load_dotenv(os.path.join(os.path.dirname(__file__), '.env'))
+except ImportError:
+    pass
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from PIL import Image, ImageDraw, ImageFont  # noqa: E402
+from starlette.datastructures import UploadFile  # noqa: E402
+
+PHOTOS = int(os.getenv("BENCH_PHOTOS", "6"))
+MODEL_MS = float(os.getenv("BENCH_MODEL_MS", "1500"))
+UPLINK_MBPS = float(os.getenv("BENCH_UPLINK_MBPS", "20"))
+
+
+def photo(seed: int) -> Image.Image:
+    """4032x3024 kitob sahifasi surati: notekis yorug'lik + sensor shovqini"""
+    rng = random.Random(seed)
+    page = Image.new("L", (4032, 3024), 215)
+    draw = ImageDraw.Draw(page)
+    font = ImageFont.load_default(size=72)
+    for y in range(220, 2800, 105):
+        words = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(2, 9)))
+                 for _ in range(10)]
+        draw.text((260, y), " ".join(words), fill=35, font=font)
+    noise = Image.effect_noise(page.size, 18)
+    light = Image.linear_gradient("L").resize(page.size).point(lambda p: 40 + p // 4)
+    gray = Image.blend(Image.blend(page, noise, 0.12), light, 0.15)
+    return Image.merge("RGB", (gray, gray.point(lambda p: p * 0.97), gray.point(lambda p: p * 0.9)))
+
+
+def camera_jpeg(image: Image.Image) -> bytes:
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    buffer = io.BytesIO()
+    image.transpose(Image.Transpose.ROTATE_90).save(buffer, "JPEG", quality=92, exif=exif)
+    return buffer.getvalue()
+
+
+def messenger_jpeg(image: Image.Image) -> bytes:
+    # Telegram/WhatsApp: uzun tomoni 1280, quality ~70, EXIF olib tashlangan
+    copy = image.copy()
+    copy.thumbnail((1280, 1280))
+    buffer = io.BytesIO()
+    copy.save(buffer, "JPEG", quality=70)
+    return buffer.getvalue()
+
+
+class StubVision:
+    calls = 0
+    payload_bytes = []
+
+    @classmethod
+    async def call_ai(cls, messages, **kwargs):
+        url = messages[0]["content"][1]["image_url"]["url"]
+        cls.calls += 1
+        cls.payload_bytes.append(len(url))
+        await asyncio.sleep(MODEL_MS / 1000 + len(url) / (UPLINK_MBPS * 125_000))
+        return "Bir bor ekan, bir yo'q ekan."
+
+
+async def legacy_read(file: UploadFile) -> str:
+    image_bytes = await file.read()
+    encoded = base64.b64encode(image_bytes).decode("utf-8")
+    messages = [{"role": "user", "content": [
+        {"type": "text", "text": "..."},
+        {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{encoded}"}},
+    ]}]
+    return await StubVision.call_ai(messages)
+
+
+async def run(mode: str, uploads) -> dict:
+    from app.smartkids import image_reader_router
+
+    image_reader_router.ai_service = StubVision
+    StubVision.calls, StubVision.payload_bytes = 0, []
+    latencies = []
+    for data in uploads:
+        upload = UploadFile(file=io.BytesIO(data), filename="rasm.jpg")
+        started = time.perf_counter()
+        if mode == "legacy":
+            await legacy_read(upload)
+        else:
+            await image_reader_router.read_image(upload)
+        latencies.append(time.perf_counter() - started)
+    return {
+        "calls": StubVision.calls,
+        "payload": statistics.mean(StubVision.payload_bytes),
+        "mean": statistics.mean(latencies),
+        "first": statistics.mean(latencies[:PHOTOS]),
+        "repeat": statistics.mean(latencies[PHOTOS:]),
+        "repeat_p50": statistics.median(latencies[PHOTOS:]),
+    }
+
+
+async def main():
+    from shared.services.image_pipeline import get_image_pipeline_stats, prepare_upload
+
+    images = [photo(seed) for seed in range(PHOTOS)]
+    uploads = [camera_jpeg(image) for image in images] + [messenger_jpeg(image) for image in images]
+    source = statistics.mean(len(data) for data in uploads[:PHOTOS])
+    print(f"{PHOTOS} ta rasm (o'rtacha {source / 1e6:.1f} MB) + {PHOTOS} ta qayta yuklash; "
+          f"stub: {MODEL_MS:.0f}ms + upload {UPLINK_MBPS:.0f} Mbit/s")
+
+    # Pool ishga tushishi o'lchovga kirmasin (production'da worker'lar allaqachon tirik); kesh bo'sh qoladi
+    await prepare_upload(UploadFile(file=io.BytesIO(messenger_jpeg(photo(999))), filename="w.jpg"))
+
+    for mode in ("legacy", "pipeline"):
+        r = await run(mode, uploads)
+        print(f"  {mode:<9} AI chaqiruvlari={r['calls']:>2}  payload (base64) {r['payload'] / 1e3:8.0f} KB  "
+              f"latency: yangi {r['first'] * 1000:6.0f}ms  qayta {r['repeat'] * 1000:6.0f}ms "
+              f"(p50 {r['repeat_p50'] * 1000:5.0f}ms)  "
+              f"o'rtacha {r['mean'] * 1000:6.0f}ms")
+    stats = get_image_pipeline_stats()
+    print(f"  kesh: hit={stats['hits']} miss={stats['misses']}  "
+          f"pool={stats['pool']['executor']}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
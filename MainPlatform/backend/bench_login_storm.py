@@ -0,0 +1,105 @@
+"""
+Benchmark: login "bo'roni" paytida boshqa endpoint'ning (/ping) latency'si —
+bcrypt event loop ichida (inline) va kripto pool'da (executor).
+
+DB kerak emas: ilova faqat bcrypt tekshiruvini bajaradi va httpx
+ASGITransport orqali chaqiriladi. Bir vaqtda LOGINS ta login va PINGS ta
+/ping yuboriladi; /ping p50/p99 va login throughput chiqariladi.
+
+    cd MainPlatform/backend
+    python bench_login_storm.py
+"""
+import asyncio
+import os
+import sys
+import time
+
+try:
+    from dotenv import load_dotenv
+    load_dotenv(os.path.join(os.path.dirname(__file__), '.env'))
+except ImportError:
+    pass
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+import httpx
+from fastapi import FastAPI
+
+from shared.auth import CryptoBusyError, get_crypto_stats, hash_password, verify_password
+from shared.auth.password import BCRYPT_ROUNDS
+from shared.auth.crypto_executor import configure_crypto_pool, run_crypto
+
+LOGINS = 40
+PINGS = 200
+PASSWORD = "bench-password"
+
+
+def build_app(mode: str) -> FastAPI:
+    app = FastAPI()
+    stored = hash_password(PASSWORD)
+
+    @app.post("/login")
+    async def login():
+        if mode == "inline":
+            ok = verify_password(PASSWORD, stored)
+        else:
+            try:
+                ok = await run_crypto(verify_password, PASSWORD, stored)
+            except CryptoBusyError:
+                return {"ok": False, "busy": True}
+        return {"ok": ok}
+
+    @app.get("/ping")
+    async def ping():
+        return {"pong": True}
+
+    return app
+
+
+def _pct(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+async def run(mode: str) -> dict:
+    configure_crypto_pool()
+    transport = httpx.ASGITransport(app=build_app(mode))
+    ping_ms = []
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def do_login():
+            (await client.post("/login")).raise_for_status()
+
+        async def do_ping(i: int):
+            # ping'lar bo'ron davomida tarqaladi; latency rejalashtirilgan vaqtdan
+            # o'lchanadi — bloklangan loop'da sleep'dan uyg'onish ham kechikadi
+            scheduled = started + 0.01 * i
+            await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+            (await client.get("/ping")).raise_for_status()
+            ping_ms.append((time.perf_counter() - scheduled) * 1000)
+
+        started = time.perf_counter()
+        logins = asyncio.gather(*[do_login() for _ in range(LOGINS)])
+        pings = asyncio.gather(*[do_ping(i) for i in range(PINGS)])
+        await pings
+        await logins
+        elapsed = time.perf_counter() - started
+
+    return {
+        "login/s": LOGINS / elapsed,
+        "ping p50": _pct(ping_ms, 0.50),
+        "ping p99": _pct(ping_ms, 0.99),
+    }
+
+
+async def main():
+    print(f"bcrypt rounds={BCRYPT_ROUNDS}, logins={LOGINS}, pings={PINGS}")
+    print(f"{'mode':>10} {'login/s':>10} {'ping p50 ms':>12} {'ping p99 ms':>12}")
+    for mode in ("inline", "executor"):
+        r = await run(mode)
+        print(f"{mode:>10} {r['login/s']:>10.1f} {r['ping p50']:>12.1f} {r['ping p99']:>12.1f}")
+    print(get_crypto_stats())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,105 @@
+"""
+Benchmark: bitta kitob natijasini yuborish (process_reading_record) narxi
+o'quvchining tarixi o'sishi bilan o'zgarmasligini ko'rsatadi.
+
+Vaqtinchalik o'quvchi va kitob yaratiladi, tarixga N ta yozuv qo'shiladi va
+har bir bosqichda yangi yozuvni qayta ishlash vaqti o'lchanadi. Hammasi bitta
+tranzaksiya ichida bajariladi va oxirida rollback qilinadi.
+
+    cd MainPlatform/backend
+    python bench_reading_ratings.py
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timezone, timedelta
+
+try:
+    from dotenv import load_dotenv
+    load_dotenv(os.path.join(os.path.dirname(__file__), '.env'))
+except ImportError:
+    pass
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from sqlalchemy import insert
+
+from shared.database.session import AsyncSessionLocal
+from shared.database.id_generator import generate_8_digit_id
+from shared.database.models import User, UserRole
+from shared.database.models.book import Book, BookReadingRecord
+from app.services.rating_service import RatingService
+
+HISTORY_SIZES = [0, 100, 1_000, 10_000, 50_000]
+SAMPLES = 50
+
+_used_ids = set()
+
+
+def _unique_id() -> str:
+    # 50k yozuvda 8 xonali tasodifiy ID lar to'qnashishi mumkin
+    while True:
+        new_id = generate_8_digit_id()
+        if new_id not in _used_ids:
+            _used_ids.add(new_id)
+            return new_id
+
+
+async def main():
+    async with AsyncSessionLocal() as db:
+        student = User(first_name="Bench", last_name="Reader", role=UserRole.student)
+        book = Book(title="Benchmark kitob")
+        db.add_all([student, book])
+        await db.flush()
+
+        service = RatingService(db)
+        now = datetime.now(timezone.utc)
+        history = 0
+
+        print(f"{'history':>10} {'p50 ms':>10} {'p95 ms':>10}")
+        for size in HISTORY_SIZES:
+            # Tarixni kerakli hajmgacha to'ldiramiz (o'tgan kunlarga tarqatilgan)
+            if size > history:
+                rows = [{
+                    "id": _unique_id(),
+                    "student_user_id": student.id,
+                    "book_id": book.id,
+                    "quiz_score": 80,
+                    "test_score": 0,
+                    "max_score": 80,
+                    "is_counted": True,
+                    "source_type": "library",
+                    "completed_at": now - timedelta(days=i % 1000),
+                } for i in range(history, size)]
+                for i in range(0, len(rows), 5_000):
+                    await db.execute(insert(BookReadingRecord), rows[i:i + 5_000])
+                history = size
+
+            timings = []
+            for _ in range(SAMPLES):
+                record = BookReadingRecord(
+                    student_user_id=student.id,
+                    book_id=book.id,
+                    quiz_score=90,
+                    test_score=0,
+                    source_type="library",
+                    completed_at=now,
+                )
+                db.add(record)
+                started = time.perf_counter()
+                await service.process_reading_record(record)
+                timings.append((time.perf_counter() - started) * 1000)
+            history += SAMPLES
+
+            timings.sort()
+            p95 = timings[int(len(timings) * 0.95) - 1]
+            print(f"{size:>10} {statistics.median(timings):>10.2f} {p95:>10.2f}")
+
+        await db.rollback()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -7,6 +7,7 @@ Uses shared database, auth, and payments modules
 
 import sys
 import os
+import asyncio
 import logging
 from pathlib import Path
 
@@ -28,10 +29,19 @@ from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 
-from shared.database import init_db
+from shared.database import init_db, AsyncSessionLocal
+from shared.services.telegram_broadcast import resume_unfinished_broadcasts
+from shared.services.telegram_outbox import start_telegram_outbox, stop_telegram_outbox
+from shared.services.http_client import close_http_clients
+from shared.services.audio_cache_service import start_audio_cache_maintenance, stop_audio_cache_maintenance
 from app.core.config import settings
 from app.core.errors import AppError
+from app.services.ai_cache_service import AICacheService, start_ai_cache_eviction, stop_ai_cache_eviction
+from app.services import geo_log_writer
+from app.services.metrics_rollup import start_metrics_rollup, stop_metrics_rollup
+from app.utils.geoip import get_geoip_db
 from app.middleware.error_handler import error_handler
+from shared.auth.crypto_executor import CryptoBusyError
 
 # Rate Limiter Setup
 IS_SERVERLESS = bool(os.getenv("VERCEL"))
@@ -71,8 +81,48 @@ if settings.SENTRY_DSN:
 async def lifespan(app: FastAPI):
     # Startup: Initialize shared database
     await init_db()
+    # GeoIP diapazonlarini birinchi login'dan oldin yuklab qo'yish
+    await asyncio.to_thread(get_geoip_db)
+    # Uzilib qolgan Telegram broadcast'larni fonda davom ettirish (claim atomik — bitta worker oladi)
+    if settings.TELEGRAM_BOT_TOKEN and AsyncSessionLocal is not None:
+        app.state.broadcast_resume_task = asyncio.create_task(
+            resume_unfinished_broadcasts(AsyncSessionLocal, settings.TELEGRAM_BOT_TOKEN)
+        )
+        # Vazifa/taklif xabarlari navbati (telegram_outbox)
+        start_telegram_outbox(AsyncSessionLocal, settings.TELEGRAM_BOT_TOKEN)
+    # Admin dashboard uchun kunlik ko'rsatkichlar (daily_platform_metrics)
+    if settings.METRICS_ROLLUP_ENABLED and AsyncSessionLocal is not None:
+        start_metrics_rollup(AsyncSessionLocal)
+    # TTS audio keshi: inline qatorlarni blob'ga ko'chirish va eviction
+    if AsyncSessionLocal is not None:
+        start_audio_cache_maintenance(AsyncSessionLocal)
+    # ai_cache jadvali: TTL dan eski va AI_CACHE_MAX_ROWS dan ortiq qatorlar
+    if AsyncSessionLocal is not None:
+        start_ai_cache_eviction()
     yield
-    # Shutdown
+    resume_task = getattr(app.state, "broadcast_resume_task", None)
+    if resume_task is not None and not resume_task.done():
+        resume_task.cancel()
+        try:
+            await resume_task
+        except (asyncio.CancelledError, Exception):
+            pass
+    await stop_metrics_rollup()
+    await stop_audio_cache_maintenance()
+    await stop_ai_cache_eviction()
+    await stop_telegram_outbox()
+    # Shutdown: write-behind'dagi AI javoblarini yozib qo'yish
+    try:
+        await AICacheService.flush_pending()
+    except Exception as e:
+        logger.error(f"AI cache flush on shutdown failed: {e}")
+    # Navbatdagi login geo loglari
+    try:
+        while await geo_log_writer.flush_pending():
+            pass
+    except Exception as e:
+        logger.error(f"Geo log flush on shutdown failed: {e}")
+    await close_http_clients()
 
 tags_metadata = [
     {"name": "auth", "description": "Authentication (Login, Register, Refresh Token)"},
@@ -105,6 +155,7 @@ app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
 # Error Handlers
 app.add_exception_handler(AppError, error_handler)
+app.add_exception_handler(CryptoBusyError, error_handler)
 app.add_exception_handler(Exception, error_handler)
 
 # CORS
@@ -165,113 +216,15 @@ async def add_security_headers(request, call_next):
 
 
 # ============================================================================
-# SUBSCRIPTION CHECK MIDDLEWARE
-# Obunasi yo'q foydalanuvchilar faqat ochiq URL'larga kira oladi
+# REQUEST CONTEXT MIDDLEWARE
+# JWT bir marta decode qilinadi; User va obuna (features) keshdan olinib
+# request.state.auth / request.state.subscription ga yoziladi.
+# Foydalanuvchini HECH QACHON bloklamaydi — ruxsatni endpoint'lar Depends() orqali tekshiradi.
 # ============================================================================
 
-from starlette.middleware.base import BaseHTTPMiddleware
-from shared.database import get_db as _get_db_session
-from shared.auth import verify_token as _verify_token
-from shared.database.models import UserSubscription, SubscriptionStatus
-from shared.database.models.subscription import SubscriptionPlanConfig
-from sqlalchemy import select as _select
-from sqlalchemy.orm import selectinload as _selectinload
-from datetime import datetime as _dt, timezone as _tz
-from shared.subscription import SubscriptionInfo
-
-class SubscriptionInfoMiddleware(BaseHTTPMiddleware):
-    """
-    Professional subscription middleware: "Inject, Don't Block"
-    Foydalanuvchini HECH QACHON bloklamaydi (403 bermaydi).
-    Faqat request.state.subscription ga joriy obuna va ruxsatlarni (features) yozadi.
-    Zarur bo'lsa, Endpoints o'zlari Depends() orqali ruxsat tekshiradi.
-    """
-    
-    # Static va tekshirish kerakmas api'lar
-    SKIP_PREFIXES = (
-        "/health", "/docs", "/openapi", "/api/uploads",
-        "/api/v1/health", "/api/v1/openapi",
-        # OAuth round-trip: /auth/google/login needs to run authlib which sets
-        # a state cookie — must not be blocked/short-circuited by this MW.
-        "/api/v1/auth/google",
-    )
+from app.middleware.request_context import RequestContextMiddleware
 
-    async def dispatch(self, request: Request, call_next):
-        path = request.url.path
-
-        # 1. Tizim resurslari — o'tkazamiz
-        if any(path.startswith(p) for p in self.SKIP_PREFIXES):
-            request.state.subscription = SubscriptionInfo() # Default, bo'sh
-            return await call_next(request)
-
-        # 2. CORS
-        if request.method == "OPTIONS":
-            request.state.subscription = SubscriptionInfo()
-            return await call_next(request)
-
-        # 3. Token qidirish
-        token = request.cookies.get("access_token")
-        if not token:
-            auth_header = request.headers.get("authorization", "")
-            if auth_header.startswith("Bearer "):
-                token = auth_header[7:]
-
-        # Token umuman topilmadi — u mehmondir (login qilinmagan)
-        if not token:
-            request.state.subscription = SubscriptionInfo(is_authenticated=False)
-            return await call_next(request)
-
-        # 4. Token haqiqiyligini tekshirish
-        try:
-            payload = _verify_token(token)
-            if not payload:
-                request.state.subscription = SubscriptionInfo()
-                return await call_next(request)
-            user_id = payload.get("sub")
-            if not user_id:
-                request.state.subscription = SubscriptionInfo()
-                return await call_next(request)
-        except Exception:
-            request.state.subscription = SubscriptionInfo()
-            return await call_next(request)
-
-        # 5. Token to'g'ri (Login qilgan yuzer kirdi). Endi tarifini topamiz.
-        sub_info = SubscriptionInfo(is_authenticated=True)
-        try:
-            async for db in _get_db_session():
-                result = await db.execute(
-                    _select(UserSubscription)
-                    .options(_selectinload(UserSubscription.plan_config))
-                    .where(
-                        UserSubscription.user_id == user_id,
-                        UserSubscription.status == SubscriptionStatus.active.value,
-                        UserSubscription.expires_at > _dt.now(_tz.utc),
-                    )
-                    .order_by(UserSubscription.expires_at.desc())
-                    .limit(1)
-                )
-                active_sub = result.scalars().first()
-
-                if active_sub and active_sub.plan_config:
-                    # Haqiqiy plan/tarif topildi!
-                    plan = active_sub.plan_config
-                    sub_info = SubscriptionInfo(
-                        is_authenticated=True,
-                        has_subscription=True,
-                        plan_slug=plan.slug,
-                        plan_name=plan.name,
-                        features=plan.features or {},
-                        expires_at=active_sub.expires_at.isoformat() if active_sub.expires_at else None,
-                    )
-                break
-        except Exception as e:
-            logger.warning(f"Subscription query failed for user {user_id}: {e}")
-
-        # State ga joylaymiz, va keyingi jarayonga yo'l beramiz
-        request.state.subscription = sub_info
-        return await call_next(request)
-
-app.add_middleware(SubscriptionInfoMiddleware)
+app.add_middleware(RequestContextMiddleware)
 
 # Include Routers
 from app.api.v1 import auth, dashboard, admin_panel, verification, health, feedback, telegram, oauth_google, admin_email
@@ -0,0 +1,60 @@
+"""
+daily_platform_metrics / user_daily_logins ni to'ldirish (backfill).
+
+Migratsiyadan keyin yoki rollup job'i uzoq ishlamagan bo'lsa ishga tushiriladi.
+Default — users jadvalidagi eng birinchi ro'yxatdan o'tish kunidan kechagacha:
+
+    cd MainPlatform/backend
+    python rebuild_daily_metrics.py
+    python rebuild_daily_metrics.py --days 90
+    python rebuild_daily_metrics.py --from 2025-09-01 --to 2025-12-31
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+
+# `.env` fayldan bevosita o'qiymiz
+try:
+    from dotenv import load_dotenv
+    load_dotenv(os.path.join(os.path.dirname(__file__), '.env'))
+except ImportError:
+    pass
+
+# Ota papkani path ga qo'shamiz to shared ni import qila olish uchun
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from sqlalchemy import select, func
+
+from shared.database.session import AsyncSessionLocal
+from shared.database.models import User
+from app.services.metrics_rollup import backfill
+
+
+async def main(args):
+    yesterday = datetime.now(timezone.utc).date() - timedelta(days=1)
+    end = date.fromisoformat(args.to) if args.to else yesterday
+    async with AsyncSessionLocal() as db:
+        if args.start:
+            start = date.fromisoformat(args.start)
+        elif args.days:
+            start = end - timedelta(days=args.days - 1)
+        else:
+            first = (await db.execute(select(func.min(User.created_at)))).scalar()
+            start = first.date() if first else end
+
+        started = time.perf_counter()
+        days = await backfill(db, start, end)
+        elapsed = time.perf_counter() - started
+        print(f"Kunlik ko'rsatkichlar: {start} — {end}, {days} kun hisoblandi ({elapsed:.2f}s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="daily_platform_metrics backfill")
+    parser.add_argument("--days", type=int, help="oxirgi N kun")
+    parser.add_argument("--from", dest="start", help="boshlanish kuni (YYYY-MM-DD)")
+    parser.add_argument("--to", help="oxirgi kun (YYYY-MM-DD), default — kecha")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,46 @@
+"""
+ReadingRating agregatlarini qayta qurish (backfill / reconcile).
+
+book_reading_records dagi barcha hisoblangan yozuvlardan weekly/monthly/yearly/all_time
+qatorlarini bitta set-based SQL so'rov bilan qayta hisoblaydi. Inkremental yangilanishlar
+bilan farq paydo bo'lsa yoki migratsiyadan keyin ishga tushiriladi:
+
+    cd MainPlatform/backend
+    python rebuild_reading_ratings.py
+"""
+import asyncio
+import os
+import sys
+import time
+
+# `.env` fayldan bevosita o'qiymiz
+try:
+    from dotenv import load_dotenv
+    load_dotenv(os.path.join(os.path.dirname(__file__), '.env'))
+except ImportError:
+    pass
+
+# Ota papkani path ga qo'shamiz to shared ni import qila olish uchun
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from sqlalchemy import select, func
+
+from shared.database.session import AsyncSessionLocal
+from shared.database.models.reading_rating import ReadingRating
+from app.services.rating_service import RatingService
+
+
+async def main():
+    async with AsyncSessionLocal() as db:
+        started = time.perf_counter()
+        reset = await RatingService(db).rebuild_all_ratings()
+        await db.commit()
+        elapsed = time.perf_counter() - started
+
+        total = (await db.execute(select(func.count(ReadingRating.id)))).scalar() or 0
+        print(f"Reytinglar qayta qurildi: {total} qator, {reset} ta eskirgan qator nolga tushirildi ({elapsed:.2f}s)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
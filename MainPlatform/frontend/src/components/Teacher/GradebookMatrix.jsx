@@ -22,13 +22,16 @@ const GradebookMatrix = ({ classroomId }) => {
     fetchGradebook();
   }, [classroomId, startDate, viewMode]);
 
+  const getEndDate = () => {
+    const end = new Date(startDate);
+    end.setDate(end.getDate() + (viewMode === 'week' ? 7 : 30));
+    return end;
+  };
+
   const fetchGradebook = async () => {
     setLoading(true);
     try {
-      const end = new Date(startDate);
-      end.setDate(end.getDate() + (viewMode === 'week' ? 7 : 30));
-      
-      const res = await teacherService.getGradebook(classroomId, startDate.toISOString(), end.toISOString());
+      const res = await teacherService.getGradebook(classroomId, startDate.toISOString(), getEndDate().toISOString());
       setData(res.data);
     } catch (err) {
       console.error("Gradebook fetch error:", err);
@@ -37,6 +40,12 @@ const GradebookMatrix = ({ classroomId }) => {
     }
   };
 
+  const handleExport = (format) => {
+    window.location.href = teacherService.getGradebookExportUrl(
+      classroomId, format, startDate.toISOString(), getEndDate().toISOString()
+    );
+  };
+
   const handleNext = () => {
     const next = new Date(startDate);
     next.setDate(next.getDate() + (viewMode === 'week' ? 7 : 30));
@@ -69,26 +78,28 @@ const GradebookMatrix = ({ classroomId }) => {
     );
   }
 
-  const allStudents = data?.students || [];
+  // Ustunli format: scores[i][j] / statuses[i][j] — i o'quvchi, j vazifa indeksi
+  const columns = data?.students || { ids: [] };
   const assignments = data?.assignments || [];
-  const matrix = data?.matrix || {};
+  const scores = data?.scores || [];
+  const statuses = data?.statuses || [];
+  const statusCodes = data?.status_codes || [];
 
-  const studentsWithStats = allStudents.map(student => {
-    const studentMatrix = matrix[student.id] || {};
-    const scores = Object.values(studentMatrix).map(m => m.score).filter(s => s !== null);
-    const avg = scores.length > 0 ? scores.reduce((a, b) => a + b, 0) / scores.length : 0;
-    return { ...student, avg, scoresCount: scores.length };
-  });
+  const allStudents = columns.ids.map((id, i) => ({
+    id,
+    index: i,
+    first_name: columns.first_names[i] || '',
+    last_name: columns.last_names[i] || '',
+    avg: columns.averages[i] ?? 0,
+    rank: columns.ranks[i],
+    scoresCount: (scores[i] || []).filter(s => s !== null).length,
+  }));
 
-  const rankedStudents = [...studentsWithStats].sort((a, b) => b.avg - a.avg);
+  const rankedStudents = [...allStudents].sort((a, b) => b.avg - a.avg);
   const students = rankedStudents.filter(s => 
     `${s.first_name} ${s.last_name}`.toLowerCase().includes(searchTerm.toLowerCase())
   );
 
-  const getRank = (studentId) => {
-    return rankedStudents.findIndex(s => s.id === studentId) + 1;
-  };
-
   // Generate 3-day window for the picker
   const dayWindow = [0, 1, 2].map(offset => {
     const d = new Date(startDate);
@@ -157,6 +168,10 @@ const GradebookMatrix = ({ classroomId }) => {
             >Oy</button>
           </div>
 
+          <button onClick={() => handleExport('xlsx')} title="Excel" className="p-2 bg-white/5 hover:bg-white/10 rounded-xl text-white/40 transition-all border border-white/10 shrink-0">
+            <Download size={16} />
+          </button>
+
           <button onClick={fetchGradebook} className="p-2 bg-white/5 hover:bg-white/10 rounded-xl text-white/40 transition-all border border-white/10 shrink-0">
             <RotateCcw size={16} />
           </button>
@@ -202,8 +217,9 @@ const GradebookMatrix = ({ classroomId }) => {
                 </tr>
               ) : (
                 students.map((student) => {
-                  const studentMatrix = matrix[student.id] || {};
-                  const rank = getRank(student.id);
+                  const rowScores = scores[student.index] || [];
+                  const rowStatuses = statuses[student.index] || [];
+                  const rank = student.rank;
 
                   return (
                     <tr key={student.id} className="hover:bg-white/[0.02] transition-colors group">
@@ -227,14 +243,15 @@ const GradebookMatrix = ({ classroomId }) => {
                       </td>
 
                       {/* Scores */}
-                      {assignments.map(a => {
-                        const sub = studentMatrix[a.id];
+                      {assignments.map((a, j) => {
+                        const score = rowScores[j];
+                        const status = rowStatuses[j] != null ? statusCodes[rowStatuses[j]] : null;
                         return (
                           <td key={a.id} className="p-3 text-center border-r border-white/5 transition-all relative group/cell">
-                            <div className={`font-bold text-xl tracking-tighter ${getScoreColor(sub?.score, a.max_score)}`}>
-                              {sub?.score !== undefined ? sub.score : '-'}
+                            <div className={`font-bold text-xl tracking-tighter ${getScoreColor(score, a.max_score)}`}>
+                              {score !== null && score !== undefined ? score : '-'}
                             </div>
-                            {sub?.status === 'pending' && <div className="absolute right-2 top-2 w-1 h-1 rounded-full bg-yellow-500 animate-pulse" />}
+                            {status === 'pending' && <div className="absolute right-2 top-2 w-1 h-1 rounded-full bg-yellow-500 animate-pulse" />}
                             <div className="absolute inset-0 flex items-center justify-center opacity-0 group-hover/cell:opacity-100 bg-indigo-600/10 backdrop-blur-[1px] transition-all cursor-pointer">
                                <Edit size={14} className="text-white/60" />
                             </div>
@@ -250,7 +267,7 @@ const GradebookMatrix = ({ classroomId }) => {
                       </td>
                       <td className="p-3 text-center bg-indigo-500/10">
                         <div className="font-bold text-xl text-white">
-                          #{rank}
+                          {rank ? `#${rank}` : '-'}
                         </div>
                         <div className="text-[8px] text-indigo-400 uppercase font-black">O'rin</div>
                       </td>
@@ -1,4 +1,4 @@
-import { useEffect, useState } from 'react';
+import { useEffect, useRef, useState } from 'react';
 import { Database, Pencil, Trash2, Save, X, ChevronLeft, ChevronRight } from 'lucide-react';
 import adminService from '../../services/adminService';
 
@@ -9,6 +9,8 @@ export default function DatabasePage() {
     const [loading, setLoading] = useState(true);
     const [dataLoading, setDataLoading] = useState(false);
     const [offset, setOffset] = useState(0);
+    // Keyset sahifalash: har sahifa boshlanishi uchun server bergan cursor (PK'siz jadvallarda offset)
+    const cursors = useRef({ 0: null });
     const [editingRow, setEditingRow] = useState(null);
     const [editValues, setEditValues] = useState({});
     const [saving, setSaving] = useState(false);
@@ -37,8 +39,11 @@ export default function DatabasePage() {
     const loadTableData = async () => {
         try {
             setDataLoading(true);
-            const { data } = await adminService.getTableData(selectedTable, { limit, offset });
+            const params = { limit, offset };
+            if (offset > 0 && cursors.current[offset]) params.cursor = cursors.current[offset];
+            const { data } = await adminService.getTableData(selectedTable, params);
             setTableData(data);
+            cursors.current[offset + limit] = data.next_cursor;
         } catch (err) {
             console.error(err);
         } finally {
@@ -89,6 +94,8 @@ export default function DatabasePage() {
     const columns = tableData?.columns || [];
     const rows = tableData?.rows || [];
     const total = tableData?.total || 0;
+    const totalLabel = `${tableData?.total_is_estimate ? '~' : ''}${total}`;
+    const hasMore = Boolean(tableData?.has_more);
 
     return (
         <div className="flex gap-4 h-[calc(100vh-120px)]">
@@ -109,7 +116,7 @@ export default function DatabasePage() {
                                 }`}
                         >
                             <span className="truncate">{t.name}</span>
-                            <span className="text-xs opacity-50">{t.rows}</span>
+                            <span className="text-xs opacity-50">{t.rows > 0 ? `~${t.rows}` : t.rows}</span>
                         </button>
                     ))}
                 </div>
@@ -120,7 +127,7 @@ export default function DatabasePage() {
                 <div className="px-4 py-3 border-b border-gray-800 flex items-center justify-between">
                     <div>
                         <h2 className="text-white font-medium">{selectedTable || 'Jadval tanlang'}</h2>
-                        <p className="text-gray-500 text-xs">{selectedTable ? `${total} ta qator • ${columns.length} ta ustun` : 'Chap paneldan jadval tanlang'}</p>
+                        <p className="text-gray-500 text-xs">{selectedTable ? `${totalLabel} ta qator • ${columns.length} ta ustun` : 'Chap paneldan jadval tanlang'}</p>
                     </div>
                 </div>
 
@@ -183,12 +190,12 @@ export default function DatabasePage() {
                 </div>
 
                 {/* Pagination */}
-                {total > limit && (
+                {(offset > 0 || hasMore) && (
                     <div className="flex items-center justify-between px-4 py-2 border-t border-gray-800">
-                        <span className="text-gray-500 text-xs">{offset + 1}–{Math.min(offset + limit, total)} / {total}</span>
+                        <span className="text-gray-500 text-xs">{offset + 1}–{offset + rows.length} / {totalLabel}</span>
                         <div className="flex gap-2">
                             <button onClick={() => setOffset(Math.max(0, offset - limit))} disabled={offset === 0} className="p-1.5 bg-gray-800 rounded text-gray-400 hover:text-white disabled:opacity-30"><ChevronLeft className="w-4 h-4" /></button>
-                            <button onClick={() => setOffset(offset + limit)} disabled={offset + limit >= total} className="p-1.5 bg-gray-800 rounded text-gray-400 hover:text-white disabled:opacity-30"><ChevronRight className="w-4 h-4" /></button>
+                            <button onClick={() => setOffset(offset + limit)} disabled={!hasMore} className="p-1.5 bg-gray-800 rounded text-gray-400 hover:text-white disabled:opacity-30"><ChevronRight className="w-4 h-4" /></button>
                         </div>
                     </div>
                 )}
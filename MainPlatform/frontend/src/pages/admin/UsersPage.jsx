@@ -1,4 +1,4 @@
-import { useEffect, useState } from 'react';
+import { useEffect, useRef, useState } from 'react';
 import { Search, Plus, Pencil, Trash2, Eye, X, ChevronLeft, ChevronRight } from 'lucide-react';
 import adminService from '../../services/adminService';
 
@@ -13,6 +13,10 @@ export default function UsersPage() {
     const [roleFilter, setRoleFilter] = useState('');
     const [statusFilter, setStatusFilter] = useState('');
     const [offset, setOffset] = useState(0);
+    const [hasMore, setHasMore] = useState(false);
+    const [totalIsEstimate, setTotalIsEstimate] = useState(false);
+    // Keyset sahifalash: har sahifa boshlanishi uchun server bergan cursor
+    const cursors = useRef({ 0: null });
     const limit = 20;
 
     // Modal states
@@ -31,13 +35,17 @@ export default function UsersPage() {
     const loadUsers = async () => {
         try {
             setLoading(true);
-            const params = { limit, offset };
+            const params = { limit };
+            if (offset > 0 && cursors.current[offset]) params.cursor = cursors.current[offset];
             if (search) params.search = search;
             if (roleFilter) params.role = roleFilter;
             if (statusFilter) params.status = statusFilter;
             const { data } = await adminService.getUsers(params);
             setUsers(data.users);
-            setTotal(data.total);
+            setTotal(data.total ?? 0);
+            setHasMore(data.has_more);
+            setTotalIsEstimate(data.total_is_estimate);
+            cursors.current[offset + limit] = data.next_cursor;
         } catch (err) {
             console.error(err);
         } finally {
@@ -125,7 +133,7 @@ export default function UsersPage() {
             <div className="flex flex-wrap items-center justify-between gap-4 mb-6">
                 <div>
                     <h1 className="text-2xl font-bold text-white">Foydalanuvchilar</h1>
-                    <p className="text-gray-500 text-sm">{total} ta topildi</p>
+                    <p className="text-gray-500 text-sm">{totalIsEstimate ? '~' : ''}{total} ta topildi</p>
                 </div>
                 <button onClick={() => setCreateModal(true)} className="flex items-center gap-2 px-4 py-2.5 bg-emerald-600 text-white rounded-xl text-sm font-medium hover:bg-emerald-700 transition-colors">
                     <Plus className="w-4 h-4" /> Yangi
@@ -196,12 +204,12 @@ export default function UsersPage() {
                 </div>
 
                 {/* Pagination */}
-                {total > limit && (
+                {(offset > 0 || hasMore) && (
                     <div className="flex items-center justify-between px-4 py-3 border-t border-gray-800">
-                        <span className="text-gray-500 text-xs">{offset + 1}–{Math.min(offset + limit, total)} / {total}</span>
+                        <span className="text-gray-500 text-xs">{offset + 1}–{offset + users.length} / {totalIsEstimate ? '~' : ''}{total}</span>
                         <div className="flex gap-2">
                             <button onClick={() => setOffset(Math.max(0, offset - limit))} disabled={offset === 0} className="p-2 bg-gray-800 rounded-lg text-gray-400 hover:text-white disabled:opacity-30"><ChevronLeft className="w-4 h-4" /></button>
-                            <button onClick={() => setOffset(offset + limit)} disabled={offset + limit >= total} className="p-2 bg-gray-800 rounded-lg text-gray-400 hover:text-white disabled:opacity-30"><ChevronRight className="w-4 h-4" /></button>
+                            <button onClick={() => setOffset(offset + limit)} disabled={!hasMore} className="p-2 bg-gray-800 rounded-lg text-gray-400 hover:text-white disabled:opacity-30"><ChevronRight className="w-4 h-4" /></button>
                         </div>
                     </div>
                 )}
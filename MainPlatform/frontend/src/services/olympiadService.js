@@ -118,6 +118,7 @@ const olympiadService = {
     getOlympiadStages: (olympiadId) => api.get(`/multi-stage/admin/${olympiadId}/stages`),
     getMultiStageStats: (olympiadId, params = {}) => api.get(`/multi-stage/admin/${olympiadId}/stats`, { params }),
     finalizeStage: (olympiadId, stageId) => api.post(`/multi-stage/admin/${olympiadId}/stages/${stageId}/finalize`),
+    getStageFinalization: (olympiadId, stageId) => api.get(`/multi-stage/admin/${olympiadId}/stages/${stageId}/finalize`),
 };
 
 export default olympiadService;
@@ -340,6 +340,15 @@ class TeacherService {
         return apiService.get(`/teachers/classrooms/${classroomId}/gradebook`, params);
     }
 
+    getGradebookExportUrl(classroomId, format = 'csv', startDate = null, endDate = null) {
+        // Cookie orqali autentifikatsiya — oddiy havola bilan yuklab olinadi (oqimli javob)
+        const url = new URL(apiService._resolveUrl(`/teachers/classrooms/${classroomId}/gradebook/export`));
+        url.searchParams.append('format', format);
+        if (startDate) url.searchParams.append('start_date', startDate);
+        if (endDate) url.searchParams.append('end_date', endDate);
+        return url.toString();
+    }
+
     async getAssignmentReport(assignmentId) {
         return apiService.get(`/teachers/assignments/${assignmentId}/report`);
     }
@@ -72,5 +72,39 @@ class Settings:
     READING_MAX_READ_PERCENT: float = 100.0
     READING_MIN_SECONDS_PER_WORD: float = float(os.getenv("READING_MIN_SECONDS_PER_WORD", "0.20"))  # < 0.2s/word ≈ > 300wpm => reject
 
+    # Live leaderboard WebSocket fan-out.
+    # Each socket gets its own bounded queue + writer task; a socket that can't
+    # keep up (queue full or send slower than the timeout) is dropped instead
+    # of delaying everyone else. leaderboard_update bursts are coalesced.
+    WS_SEND_TIMEOUT_SECONDS: float = float(os.getenv("WS_SEND_TIMEOUT_SECONDS", "2"))
+    WS_CLIENT_QUEUE_SIZE: int = int(os.getenv("WS_CLIENT_QUEUE_SIZE", "8"))
+    WS_LEADERBOARD_MAX_PUSHES_PER_SECOND: float = float(os.getenv("WS_LEADERBOARD_MAX_PUSHES_PER_SECOND", "2"))
+
+    # Compiled answer keys used by submit grading (app/olimp/grading.py).
+    # Admin question edits invalidate immediately; the TTL bounds staleness
+    # for SavedTest changes made from TestAI.
+    OLYMPIAD_ANSWER_KEY_TTL_SECONDS: int = int(os.getenv("OLYMPIAD_ANSWER_KEY_TTL_SECONDS", "300"))
+
+    # Reading voice analysis queue (app/reading/analysis.py).
+    # Upload enqueues one job per session; an in-process worker streams the
+    # audio from storage to STT with at most READING_ANALYSIS_CONCURRENCY
+    # jobs in flight, so a finishing-minute burst queues instead of holding
+    # hundreds of requests open. READING_STT_BACKEND=fake — local/test STT
+    # that reads the "audio" bytes as the transcript.
+    READING_ANALYSIS_ENABLED: bool = os.getenv("READING_ANALYSIS_ENABLED", "true").lower() == "true"
+    READING_STT_BACKEND: str = os.getenv("READING_STT_BACKEND", "azure")
+    READING_ANALYSIS_CONCURRENCY: int = int(os.getenv("READING_ANALYSIS_CONCURRENCY", "8"))
+    READING_ANALYSIS_MAX_ATTEMPTS: int = int(os.getenv("READING_ANALYSIS_MAX_ATTEMPTS", "4"))
+    READING_ANALYSIS_RETRY_BASE_SECONDS: float = float(os.getenv("READING_ANALYSIS_RETRY_BASE_SECONDS", "5"))
+    READING_ANALYSIS_LEASE_SECONDS: int = int(os.getenv("READING_ANALYSIS_LEASE_SECONDS", "180"))
+    READING_ANALYSIS_POLL_SECONDS: float = float(os.getenv("READING_ANALYSIS_POLL_SECONDS", "2"))
+
+    # Multi-stage finalization (app/olimp/stage_finalization.py).
+    # Scope groups are ranked in SQL, ~STAGE_FINALIZE_CHUNK_ROWS results per
+    # transaction; a running job without a heartbeat for
+    # STAGE_FINALIZE_STALE_SECONDS is taken over on the next POST or startup.
+    STAGE_FINALIZE_CHUNK_ROWS: int = int(os.getenv("STAGE_FINALIZE_CHUNK_ROWS", "50000"))
+    STAGE_FINALIZE_STALE_SECONDS: int = int(os.getenv("STAGE_FINALIZE_STALE_SECONDS", "300"))
+
 
 settings = Settings()
\ No newline at end of file
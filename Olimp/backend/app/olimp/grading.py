@@ -0,0 +1,220 @@
+"""
+Olympiad grading engine — oldindan kompilyatsiya qilingan javob kaliti
+
+Olimpiadaning barcha savollari (OlympiadQuestion + `olympiad:{id}` SavedTest
+savollari, `testai_{st_id}_{idx}`) bir marta yuklanib, ixcham massivlarga
+yig'iladi: question_id -> indeks, va parallel `array` lar (to'g'ri javob,
+ball, variantlar soni, native belgisi). submit bitta o'tishda, har bir javob
+uchun DB'ga murojaat qilmasdan baholanadi.
+
+Kesh har bir worker xotirasida. Admin savolni qo'shsa/tahrirlasa/o'chirsa yoki
+invalidate qilsa invalidate_answer_key() chaqiriladi: lokal nusxa o'chadi va
+Redis bo'lsa `olimp:grading:{id}:v` versiyasi oshiriladi — boshqa worker'lar
+keyingi baholashda versiya farqini ko'rib qayta yuklaydi. SavedTest'lar TestAI
+servisidan o'zgaradi, shuning uchun kesh OLYMPIAD_ANSWER_KEY_TTL_SECONDS dan
+keyin baribir yangilanadi.
+"""
+import logging
+import time
+from array import array
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from shared.database.models import OlympiadQuestion
+from shared.database.models.saved_test import SavedTest
+from shared.services.redis_service import get_redis
+from app.core.config import settings
+
+logger = logging.getLogger("olimp")
+
+TESTAI_PREFIX = "testai_"
+SAVED_TEST_DEFAULT_POINTS = 5
+
+# (question_id, n_options) -> shuffled_index -> original_index
+OptionPermutation = Callable[[str, int], Sequence[int]]
+
+
+def _to_int(value) -> Optional[int]:
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        return None
+
+
+class AnswerKey:
+    """Bitta olimpiadaning kompilyatsiya qilingan javob kaliti."""
+
+    __slots__ = ("index", "correct", "has_correct", "points", "n_options", "native", "version", "loaded_at")
+
+    def __init__(self, version: Optional[str] = None):
+        self.index: Dict[str, int] = {}
+        self.correct = array("q")
+        self.has_correct = bytearray()
+        self.points = array("q")
+        self.n_options = array("q")
+        self.native = bytearray()
+        self.version = version
+        self.loaded_at = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def add(self, question_id: str, correct_answer, points, n_options: int, native: bool) -> None:
+        correct = _to_int(correct_answer)
+        self.index[question_id] = len(self.correct)
+        self.correct.append(correct if correct is not None else 0)
+        self.has_correct.append(correct is not None)
+        self.points.append(int(points or 0))
+        self.n_options.append(n_options)
+        self.native.append(native)
+
+    def position(self, question_id) -> Optional[int]:
+        """Savol indeksi; `testai_{st}_{idx}` ning kanonik bo'lmagan yozilishi ham qabul qilinadi."""
+        qid = str(question_id)
+        pos = self.index.get(qid)
+        if pos is not None or not qid.startswith(TESTAI_PREFIX):
+            return pos
+        parts = qid.split("_")
+        if len(parts) < 3:
+            return None
+        idx = _to_int(parts[2])
+        if idx is None:
+            return None
+        return self.index.get(f"{TESTAI_PREFIX}{parts[1]}_{idx}")
+
+
+def compile_answer_key(questions, saved_tests, version: Optional[str] = None) -> AnswerKey:
+    """OlympiadQuestion va SavedTest obyektlaridan AnswerKey qurish."""
+    key = AnswerKey(version)
+    for q in questions:
+        key.add(q.id, q.correct_answer, q.points, len(q.options or []), True)
+    for st in saved_tests:
+        for idx, st_q in enumerate(st.questions or []):
+            correct = st_q.get("correct") if st_q.get("correct") is not None else st_q.get("answer_index")
+            key.add(
+                f"{TESTAI_PREFIX}{st.id}_{idx}",
+                correct,
+                st_q.get("points", SAVED_TEST_DEFAULT_POINTS),
+                len(st_q.get("options") or []),
+                False,
+            )
+    return key
+
+
+@dataclass
+class GradeResult:
+    total_score: int = 0
+    total_points: int = 0
+    correct_count: int = 0
+    wrong_count: int = 0
+    details: List[dict] = field(default_factory=list)
+    # OlympiadAnswer satrlari uchun: (question_id, selected_answer, is_correct, points)
+    native_answers: List[tuple] = field(default_factory=list)
+
+
+def grade_submission(key: AnswerKey, answers, option_permutation: Optional[OptionPermutation] = None) -> GradeResult:
+    """
+    Butun submission'ni bitta o'tishda baholash. Kalitda yo'q savollar o'tkazib
+    yuboriladi. option_permutation berilsa (JWT bilan kelgan so'rov), aralashtirilgan
+    variant indeksi asl indeksga qaytariladi.
+    """
+    result = GradeResult()
+    index = key.index
+    correct_arr, has_correct, points_arr = key.correct, key.has_correct, key.points
+    n_options_arr, native_arr = key.n_options, key.native
+    details = result.details
+
+    for answer in answers:
+        question_id = answer.question_id
+        pos = index.get(question_id)
+        if pos is None:
+            pos = key.position(question_id)
+            if pos is None:
+                continue
+
+        submitted = answer.answer_index
+        submitted_original = submitted
+        submitted_int = _to_int(submitted)
+        n_options = n_options_arr[pos]
+        if (
+            option_permutation is not None
+            and submitted_int is not None
+            and n_options >= 2
+            and 0 <= submitted_int < n_options
+        ):
+            submitted_original = option_permutation(question_id, n_options)[submitted_int]
+            submitted_int = submitted_original
+
+        is_correct = (
+            submitted_int is not None
+            and has_correct[pos]
+            and submitted_int == correct_arr[pos]
+        )
+        max_points = points_arr[pos]
+        points = max_points if is_correct else 0
+
+        result.total_score += points
+        result.total_points += max_points
+        if is_correct:
+            result.correct_count += 1
+        else:
+            result.wrong_count += 1
+
+        details.append({
+            "question_id": question_id,
+            "submitted_answer": submitted,
+            "original_answer_index": submitted_original,
+            "is_correct": is_correct,
+            "points_earned": points
+        })
+        if native_arr[pos]:
+            result.native_answers.append((question_id, submitted_original, is_correct, points))
+
+    return result
+
+
+_VERSION_KEY = "olimp:grading:{}:v"
+_cache: Dict[str, AnswerKey] = {}
+
+
+async def _shared_version(olympiad_id: str) -> Optional[str]:
+    redis = get_redis()
+    if redis is None:
+        return None
+    try:
+        return await redis.get(_VERSION_KEY.format(olympiad_id)) or "0"
+    except Exception as e:
+        logger.warning(f"Grading key version read failed: {e}")
+        return None
+
+
+async def get_answer_key(olympiad_id: str, db: AsyncSession) -> AnswerKey:
+    """Keshdagi kalit (versiya va TTL tekshiriladi) yoki DB'dan yangi kompilyatsiya."""
+    version = await _shared_version(olympiad_id)
+    key = _cache.get(olympiad_id)
+    if (
+        key is not None
+        and key.version == version
+        and time.monotonic() - key.loaded_at < settings.OLYMPIAD_ANSWER_KEY_TTL_SECONDS
+    ):
+        return key
+
+    q_res = await db.execute(select(OlympiadQuestion).where(OlympiadQuestion.olympiad_id == olympiad_id))
+    st_res = await db.execute(select(SavedTest).where(SavedTest.source_platform == f"olympiad:{olympiad_id}"))
+    key = compile_answer_key(q_res.scalars().all(), st_res.scalars().all(), version)
+    _cache[olympiad_id] = key
+    return key
+
+
+async def invalidate_answer_key(olympiad_id: str) -> None:
+    """Savollar o'zgarganda chaqiriladi — barcha worker'lardagi kesh eskiradi."""
+    _cache.pop(olympiad_id, None)
+    redis = get_redis()
+    if redis is not None:
+        try:
+            await redis.incr(_VERSION_KEY.format(olympiad_id))
+        except Exception as e:
+            logger.warning(f"Grading key invalidation publish failed: {e}")
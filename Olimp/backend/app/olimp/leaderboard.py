@@ -0,0 +1,256 @@
+"""
+Olympiad Leaderboard — Redis sorted-set engine
+
+Har bir olimpiada uchun bitta ZSET (a'zo = StudentProfile.id) va satr
+ma'lumotlari uchun HASH saqlanadi. Tartib Postgres'dagi bilan bir xil:
+total_score DESC, time_spent_seconds ASC, completed_at ASC (NULL oxirida).
+Bu uch mezon bitta double (53 bit) ga joylanadi, shuning uchun top-N,
+"mening o'rnim" va atrofdagi oyna O(log N) da, Postgres'ga tegmasdan olinadi.
+
+Kalitlar:
+    olimp:lb:{olympiad_id}        ZSET  student_id -> composite score
+    olimp:lb:{olympiad_id}:rows   HASH  student_id -> JSON satr (rank'siz)
+    olimp:lb:{olympiad_id}:meta   HASH  title, ready
+    olimp:lb:{olympiad_id}:rebuild STRING  rebuild qulfi (SET NX EX)
+
+`ready` belgisi yo'q bo'lsa (cold start, Redis qayta ishga tushgan) yozuvlar
+o'tkazib yuboriladi va birinchi o'qishda ensure_built() Postgres'dan to'liq
+quradi — qulfni olgan bitta so'rov, qolganlari (boshqa worker'lar ham) kutadi.
+"""
+import asyncio
+import json
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Iterable, List, Optional, Tuple
+
+from shared.services.redis_service import get_redis
+
+# Composite score bit taqsimoti: score(20) | time(16) | completed offset(17) = 53 bit
+SCORE_BITS = 20
+TIME_BITS = 16
+DONE_BITS = 17
+
+SCORE_MAX = (1 << SCORE_BITS) - 1
+TIME_MAX = (1 << TIME_BITS) - 1      # ~18 soat
+DONE_MAX = (1 << DONE_BITS) - 1      # start_time dan ~36 soat
+
+KEY_TTL_SECONDS = 7 * 24 * 3600
+
+REBUILD_LOCK_SECONDS = 30     # qulf egasi yiqilsa shundan keyin bo'shaydi
+REBUILD_WAIT_SECONDS = 10     # kutayotganlar shundan keyin Postgres fallback'ga o'tadi
+REBUILD_POLL_SECONDS = 0.05
+
+
+def composite_score(
+    total_score: Optional[int],
+    time_spent_seconds: Optional[int],
+    completed_at: Optional[datetime],
+    reference: Optional[datetime],
+) -> float:
+    """
+    Tartib kalitini hisoblash — kattaroq qiymat yuqoriroq o'rin.
+    Chegaradan oshgan qiymatlar to'yintiriladi (bunday holda tenglik a'zo
+    nomi bo'yicha hal qilinadi).
+    """
+    score = max(0, min(int(total_score or 0), SCORE_MAX))
+    spent = max(0, min(int(time_spent_seconds or 0), TIME_MAX))
+    if completed_at is None:
+        offset = DONE_MAX
+    elif reference is None:
+        offset = DONE_MAX - 1
+    else:
+        offset = int((completed_at - reference).total_seconds())
+        offset = max(0, min(offset, DONE_MAX - 1))
+    return float(
+        (score << (TIME_BITS + DONE_BITS))
+        | ((TIME_MAX - spent) << DONE_BITS)
+        | (DONE_MAX - offset)
+    )
+
+
+def participant_row(p, student_name: Optional[str] = None) -> dict:
+    """OlympiadParticipant -> leaderboard satri (rank'siz)."""
+    return {
+        "student_id": p.student_id,
+        "student_name": student_name,
+        "score": p.total_score or 0,
+        "total_score": p.total_score or 0,
+        "total_points": p.total_score or 0,  # Legacy field
+        "correct_answers": p.correct_answers or 0,
+        "wrong_answers": p.wrong_answers or 0,
+        "total_questions": (p.correct_answers or 0) + (p.wrong_answers or 0),
+        "time_taken_seconds": p.time_spent_seconds or 0,
+        "time_spent_seconds": p.time_spent_seconds or 0,
+        "coins_earned": (p.coins_earned or 0) + (p.reading_coins or 0),
+        "reading_wpm": round(p.reading_wpm or 0),
+        "reading_percent": round(p.reading_percent or 0),
+        "reading_time_seconds": p.reading_time_seconds or 0,
+        "reading_coins": p.reading_coins or 0,
+        "status": p.status.value if p.status else "registered",
+    }
+
+
+class OlympiadLeaderboard:
+    """Redis ustidagi leaderboard. `redis` — redis.asyncio klienti (decode_responses=True)."""
+
+    def __init__(self, redis):
+        self.redis = redis
+
+    @staticmethod
+    def _keys(olympiad_id: str) -> Tuple[str, str, str]:
+        base = f"olimp:lb:{olympiad_id}"
+        return base, f"{base}:rows", f"{base}:meta"
+
+    async def is_ready(self, olympiad_id: str) -> bool:
+        _, _, meta = self._keys(olympiad_id)
+        return bool(await self.redis.hexists(meta, "ready"))
+
+    async def get_title(self, olympiad_id: str) -> Optional[str]:
+        _, _, meta = self._keys(olympiad_id)
+        return await self.redis.hget(meta, "title")
+
+    async def get_student_name(self, olympiad_id: str, student_id: str) -> Optional[str]:
+        _, rows, _ = self._keys(olympiad_id)
+        raw = await self.redis.hget(rows, student_id)
+        if not raw:
+            return None
+        return json.loads(raw).get("student_name")
+
+    async def upsert(
+        self,
+        olympiad_id: str,
+        row: dict,
+        completed_at: Optional[datetime],
+        time_spent_seconds: Optional[int],
+        reference: Optional[datetime],
+    ) -> bool:
+        """
+        Bitta qatnashchini yozish. Leaderboard hali qurilmagan bo'lsa hech narsa
+        qilmaydi (False) — keyingi o'qish uni Postgres'dan to'liq quradi.
+        """
+        if not await self.is_ready(olympiad_id):
+            return False
+        zkey, rows, meta = self._keys(olympiad_id)
+        score = composite_score(row.get("total_score"), time_spent_seconds, completed_at, reference)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zadd(zkey, {row["student_id"]: score})
+            pipe.hset(rows, row["student_id"], json.dumps(row))
+            for key in (zkey, rows, meta):
+                pipe.expire(key, KEY_TTL_SECONDS)
+            await pipe.execute()
+        return True
+
+    async def rebuild(
+        self,
+        olympiad_id: str,
+        title: str,
+        entries: Iterable[Tuple[dict, Optional[datetime], Optional[int]]],
+        reference: Optional[datetime],
+    ) -> int:
+        """
+        To'liq qayta qurish (cold start, finalize). entries: (row, completed_at, time_spent_seconds).
+        Eski holat bitta MULTI/EXEC ichida almashtiriladi — o'quvchilar yarim holatni ko'rmaydi.
+        """
+        zkey, rows, meta = self._keys(olympiad_id)
+        scores = {}
+        payloads = {}
+        for row, completed_at, time_spent in entries:
+            scores[row["student_id"]] = composite_score(
+                row.get("total_score"), time_spent, completed_at, reference
+            )
+            payloads[row["student_id"]] = json.dumps(row)
+
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(zkey, rows, meta)
+            if scores:
+                pipe.zadd(zkey, scores)
+                pipe.hset(rows, mapping=payloads)
+            pipe.hset(meta, mapping={"title": title or "", "ready": "1"})
+            for key in (zkey, rows, meta):
+                pipe.expire(key, KEY_TTL_SECONDS)
+            await pipe.execute()
+        return len(scores)
+
+    async def ensure_built(
+        self,
+        olympiad_id: str,
+        load: Callable[[], Awaitable[Tuple[str, Iterable[Tuple[dict, Optional[datetime], Optional[int]]], Optional[datetime]]]],
+    ) -> None:
+        """
+        `ready` yo'q bo'lsa leaderboard'ni bir marta qurish (single-flight).
+        SET NX qulfini olgan so'rov load() -> (title, entries, reference) ni chaqirib
+        rebuild() qiladi; qolganlar `ready` paydo bo'lishini kutadi. load() xatosi
+        chaqiruvchiga qaytadi, qulf bo'shatiladi. REBUILD_WAIT_SECONDS da tayyor
+        bo'lmasa TimeoutError.
+        """
+        if await self.is_ready(olympiad_id):
+            return
+        lock = f"olimp:lb:{olympiad_id}:rebuild"
+        deadline = time.monotonic() + REBUILD_WAIT_SECONDS
+        while True:
+            if await self.redis.set(lock, "1", nx=True, ex=REBUILD_LOCK_SECONDS):
+                try:
+                    if not await self.is_ready(olympiad_id):
+                        title, entries, reference = await load()
+                        await self.rebuild(olympiad_id, title, entries, reference)
+                    return
+                finally:
+                    await self.redis.delete(lock)
+            await asyncio.sleep(REBUILD_POLL_SECONDS)
+            if await self.is_ready(olympiad_id):
+                return
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"leaderboard rebuild still running: olympiad={olympiad_id}")
+
+    async def invalidate(self, olympiad_id: str) -> None:
+        await self.redis.delete(*self._keys(olympiad_id))
+
+    async def _rows_for(self, olympiad_id: str, student_ids: List[str], first_rank: int) -> List[dict]:
+        if not student_ids:
+            return []
+        _, rows, _ = self._keys(olympiad_id)
+        raw_rows = await self.redis.hmget(rows, student_ids)
+        result = []
+        for rank, (student_id, raw) in enumerate(zip(student_ids, raw_rows), start=first_rank):
+            row = json.loads(raw) if raw else {"student_id": student_id, "student_name": None}
+            if not row.get("student_name"):
+                row["student_name"] = f"O'quvchi #{rank}"
+            result.append({"rank": rank, **row})
+        return result
+
+    async def total(self, olympiad_id: str) -> int:
+        zkey, _, _ = self._keys(olympiad_id)
+        return int(await self.redis.zcard(zkey))
+
+    async def top(self, olympiad_id: str, limit: int = 50) -> List[dict]:
+        """Eng yaxshi `limit` ta qatnashchi, 1 dan boshlab rank bilan."""
+        if limit <= 0:
+            return []
+        zkey, _, _ = self._keys(olympiad_id)
+        ids = await self.redis.zrevrange(zkey, 0, limit - 1)
+        return await self._rows_for(olympiad_id, ids, 1)
+
+    async def rank_of(self, olympiad_id: str, student_id: str) -> Optional[dict]:
+        """Bitta qatnashchining o'rni va satri; leaderboard'da bo'lmasa None."""
+        zkey, _, _ = self._keys(olympiad_id)
+        idx = await self.redis.zrevrank(zkey, student_id)
+        if idx is None:
+            return None
+        rows = await self._rows_for(olympiad_id, [student_id], idx + 1)
+        return rows[0]
+
+    async def around(self, olympiad_id: str, student_id: str, radius: int = 5) -> List[dict]:
+        """Qatnashchi atrofidagi oyna: yuqorida va pastda `radius` tadan."""
+        zkey, _, _ = self._keys(olympiad_id)
+        idx = await self.redis.zrevrank(zkey, student_id)
+        if idx is None:
+            return []
+        start = max(0, idx - radius)
+        ids = await self.redis.zrevrange(zkey, start, idx + radius)
+        return await self._rows_for(olympiad_id, ids, start + 1)
+
+
+def get_leaderboard() -> Optional[OlympiadLeaderboard]:
+    """Redis sozlangan bo'lsa leaderboard, aks holda None (Postgres fallback)."""
+    redis = get_redis()
+    return OlympiadLeaderboard(redis) if redis is not None else None
@@ -3,16 +3,15 @@ Multi-Stage Olympiad Router — Ko'p bosqichli olimpiada endpointlari
 Admin: yaratish, statistika, bosqich yakunlash
 O'quvchi: ro'yxatdan o'tish, dashboard, leaderboard
 """
-from fastapi import APIRouter, Depends, HTTPException, Header, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Header, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import func as sql_func, select, and_
 from pydantic import BaseModel, Field
 from typing import List, Optional
 from datetime import datetime, timezone
-import math
 import logging
 
-from shared.database import get_db
+from shared.database import get_db, AsyncSessionLocal
 from shared.database.models import User, StudentProfile, UserRole
 from shared.database.models.olympiad import (
     Olympiad, OlympiadQuestion, OlympiadParticipant, OlympiadStatus,
@@ -20,10 +19,14 @@ from shared.database.models.olympiad import (
 )
 from shared.database.models.olympiad_content import OlympiadStory
 from shared.database.models.olympiad_stage import (
-    OlympiadStage, OlympiadStageResult, ScopeType, StageContentType
+    OlympiadStage, OlympiadStageFinalization, OlympiadStageResult, ScopeType, StageContentType
 )
 from shared.constants.regions import REGIONS, validate_region, validate_district
 from app.core.config import settings
+from app.olimp.stage_finalization import (
+    enqueue_finalization, run_finalization, summary as finalization_summary,
+)
+from app.olimp.stage_leaderboard import stage_leaderboard
 
 logger = logging.getLogger("olimp")
 
@@ -76,20 +79,6 @@ async def verify_admin_key(x_admin_key: str = Header(..., alias="X-Admin-Key")):
     raise HTTPException(status_code=403, detail="Admin emas")
 
 
-# ============= Foizli kvota formulasi =============
-
-def calculate_passing_count(total: int, percent: float, min_count: int) -> int:
-    """
-    total=10, percent=30 → 3 kishi
-    total=2,  percent=30 → ceiling(0.6)=1
-    """
-    if total <= 0:
-        return 0
-    raw = total * (percent / 100.0)
-    count = max(math.ceil(raw), min_count)
-    return min(count, total)
-
-
 # ============= ADMIN: Yaratish =============
 
 @multi_stage_router.post("/admin/create")
@@ -283,14 +272,7 @@ async def get_olympiad_stats(
 
 # ============= ADMIN: Bosqich yakunlash =============
 
-@multi_stage_router.post("/admin/{olympiad_id}/stages/{stage_id}/finalize")
-async def finalize_stage(
-    olympiad_id: str,
-    stage_id: str,
-    db: AsyncSession = Depends(get_db),
-    _admin: bool = Depends(verify_admin_key),
-):
-    """Bosqichni yakunlash — foizli kvota bilan g'oliblarni aniqlash"""
+async def _get_stage(db: AsyncSession, olympiad_id: str, stage_id: str) -> OlympiadStage:
     stage_res = await db.execute(
         select(OlympiadStage).where(
             OlympiadStage.id == stage_id,
@@ -300,75 +282,60 @@ async def finalize_stage(
     stage = stage_res.scalars().first()
     if not stage:
         raise HTTPException(404, "Bosqich topilmadi")
+    return stage
 
-    # Shu bosqichdagi barcha natijalarni olish
-    results_q = await db.execute(
-        select(OlympiadStageResult).where(OlympiadStageResult.stage_id == stage_id)
+
+async def _run_finalization_in_bg(job_id: str):
+    try:
+        await run_finalization(AsyncSessionLocal, job_id)
+    except Exception:
+        logger.exception(f"Stage finalization {job_id} background task failed")
+
+
+@multi_stage_router.post("/admin/{olympiad_id}/stages/{stage_id}/finalize")
+async def finalize_stage(
+    olympiad_id: str,
+    stage_id: str,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db),
+    _admin: bool = Depends(verify_admin_key),
+):
+    """
+    Bosqichni yakunlash — foizli kvota bilan g'oliblarni aniqlash.
+    Fon jarayoni sifatida ishlaydi (stage_finalization); progress —
+    GET .../finalize.
+    """
+    stage = await _get_stage(db, olympiad_id, stage_id)
+
+    has_results = await db.scalar(
+        select(OlympiadStageResult.id).where(OlympiadStageResult.stage_id == stage_id).limit(1)
     )
-    results = results_q.scalars().all()
-    if not results:
+    if not has_results:
         raise HTTPException(400, "Bu bosqichda natijalar yo'q")
 
-    # Participant ma'lumotlarini olish
-    p_ids = [r.participant_id for r in results]
-    p_res = await db.execute(
-        select(OlympiadParticipant).where(OlympiadParticipant.id.in_(p_ids))
-    )
-    participants = {p.id: p for p in p_res.scalars().all()}
-
-    # Scope bo'yicha guruhlash
-    groups = {}
-    for r in results:
-        p = participants.get(r.participant_id)
-        if not p:
-            continue
-
-        if stage.scope_type == ScopeType.school:
-            key = f"{p.region}|{p.district}|{p.school_number}"
-        elif stage.scope_type == ScopeType.district:
-            key = f"{p.region}|{p.district}"
-        elif stage.scope_type == ScopeType.region:
-            key = f"{p.region}"
-        else:
-            key = "republic"
-
-        if key not in groups:
-            groups[key] = []
-        groups[key].append((r, p))
-
-    # Har bir guruhda reytinglash va o'tkazish
-    total_passed = 0
-    total_failed = 0
-
-    for group_key, members in groups.items():
-        # Score bo'yicha kamayish, vaqt bo'yicha o'sish
-        sorted_members = sorted(members, key=lambda x: (-x[0].score, x[0].duration_seconds))
-
-        pass_count = calculate_passing_count(
-            len(sorted_members), stage.passing_percent, stage.passing_min_count
-        )
+    job = await enqueue_finalization(db, stage)
+    # Har doim rejalashtiriladi: tirik running job'ni _claim rad etadi,
+    # heartbeat'i eskirganini esa egallab kursoridan davom ettiradi
+    background_tasks.add_task(_run_finalization_in_bg, job.id)
 
-        for i, (result, participant) in enumerate(sorted_members):
-            result.rank_in_group = i + 1
-            if i < pass_count:
-                result.is_passed = True
-                participant.current_stage = stage.stage_number + 1
-                total_passed += 1
-            else:
-                result.is_passed = False
-                total_failed += 1
+    return {"success": True, "data": finalization_summary(job)}
 
-    await db.commit()
 
-    return {
-        "success": True,
-        "data": {
-            "stage_number": stage.stage_number,
-            "groups_count": len(groups),
-            "total_passed": total_passed,
-            "total_failed": total_failed,
-        }
-    }
+@multi_stage_router.get("/admin/{olympiad_id}/stages/{stage_id}/finalize")
+async def get_finalization_status(
+    olympiad_id: str,
+    stage_id: str,
+    db: AsyncSession = Depends(get_db),
+    _admin: bool = Depends(verify_admin_key),
+):
+    """Bosqichni yakunlash jarayoni holati va progressi"""
+    await _get_stage(db, olympiad_id, stage_id)
+    job = (await db.execute(
+        select(OlympiadStageFinalization).where(OlympiadStageFinalization.stage_id == stage_id)
+    )).scalars().first()
+    if not job:
+        raise HTTPException(404, "Bosqich hali yakunlanmagan")
+    return {"success": True, "data": finalization_summary(job)}
 
 
 # ============= O'QUVCHI: Ro'yxatdan o'tish =============
@@ -578,107 +545,31 @@ async def get_stage_leaderboard(
     olympiad_id: str,
     stage_id: str,
     student_id: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    around: int = Query(3, ge=0, le=20),
     db: AsyncSession = Depends(get_db),
 ):
-    """Bosqich bo'yicha raqiblar jadvali (scope filtrlangan)"""
-    stage_res = await db.execute(
-        select(OlympiadStage).where(
-            OlympiadStage.id == stage_id,
-            OlympiadStage.olympiad_id == olympiad_id,
-        )
-    )
-    stage = stage_res.scalars().first()
-    if not stage:
-        raise HTTPException(404, "Bosqich topilmadi")
+    """
+    Bosqich bo'yicha raqiblar jadvali (scope filtrlangan): top-`limit`,
+    o'quvchining o'rni va atrofidagi `around` tadan qo'shnilar.
+    """
+    stage = await _get_stage(db, olympiad_id, stage_id)
 
-    # O'quvchining ma'lumotlarini olish (scope filtrlash uchun)
+    # O'quvchining ishtirokchi yozuvi (scope filtrlash uchun)
     my_participant = None
     if student_id:
-        sp = await db.execute(select(StudentProfile).where(StudentProfile.user_id == student_id))
-        profile = sp.scalars().first()
-        if profile:
-            p_res = await db.execute(
-                select(OlympiadParticipant).where(
-                    OlympiadParticipant.olympiad_id == olympiad_id,
-                    OlympiadParticipant.student_id == profile.id,
-                )
+        p_res = await db.execute(
+            select(OlympiadParticipant)
+            .join(StudentProfile, StudentProfile.id == OlympiadParticipant.student_id)
+            .where(
+                StudentProfile.user_id == student_id,
+                OlympiadParticipant.olympiad_id == olympiad_id,
             )
-            my_participant = p_res.scalars().first()
-
-    # Barcha natijalar
-    results_q = select(OlympiadStageResult).where(
-        OlympiadStageResult.stage_id == stage_id
-    )
-    all_results = (await db.execute(results_q)).scalars().all()
-
-    # Participant ma'lumotlarini olish
-    p_ids = [r.participant_id for r in all_results]
-    if not p_ids:
-        return {"success": True, "data": {"leaderboard": [], "scope": stage.scope_type.value}}
-
-    p_res = await db.execute(
-        select(OlympiadParticipant).where(OlympiadParticipant.id.in_(p_ids))
-    )
-    participants = {p.id: p for p in p_res.scalars().all()}
-
-    # Scope filtrlash
-    filtered = []
-    for r in all_results:
-        p = participants.get(r.participant_id)
-        if not p:
-            continue
-
-        if my_participant and stage.scope_type == ScopeType.school:
-            if (p.region != my_participant.region or
-                p.district != my_participant.district or
-                p.school_number != my_participant.school_number):
-                continue
-        elif my_participant and stage.scope_type == ScopeType.district:
-            if (p.region != my_participant.region or
-                p.district != my_participant.district):
-                continue
-        elif my_participant and stage.scope_type == ScopeType.region:
-            if p.region != my_participant.region:
-                continue
-
-        filtered.append((r, p))
-
-    # Reytinglash
-    sorted_results = sorted(filtered, key=lambda x: (-x[0].score, x[0].duration_seconds))
-
-    # User ism-shariflarini olish
-    student_ids = list({p.student_id for _, p in sorted_results})
-    sp_res = await db.execute(
-        select(StudentProfile).where(StudentProfile.id.in_(student_ids))
-    )
-    profiles = {sp.id: sp for sp in sp_res.scalars().all()}
-
-    user_ids = [profiles[sid].user_id for sid in student_ids if sid in profiles]
-    u_res = await db.execute(select(User).where(User.id.in_(user_ids)))
-    users = {u.id: u for u in u_res.scalars().all()}
-
-    leaderboard = []
-    for i, (result, participant) in enumerate(sorted_results):
-        prof = profiles.get(participant.student_id)
-        user = users.get(prof.user_id) if prof else None
-        leaderboard.append({
-            "rank": i + 1,
-            "name": f"{user.first_name} {user.last_name}" if user else "—",
-            "school_number": participant.school_number,
-            "score": result.score,
-            "duration_seconds": result.duration_seconds,
-            "is_passed": result.is_passed,
-            "is_me": participant.id == my_participant.id if my_participant else False,
-        })
+        )
+        my_participant = p_res.scalars().first()
 
-    return {
-        "success": True,
-        "data": {
-            "scope": stage.scope_type.value,
-            "total": len(leaderboard),
-            "leaderboard": leaderboard,
-        }
-    }
+    data = await stage_leaderboard(db, stage, my_participant, limit=limit, around=around)
+    return {"success": True, "data": data}
 
 
 # ============= REGIONS API =============
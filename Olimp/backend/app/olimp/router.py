@@ -34,6 +34,8 @@ from shared.database.models.analytics import AuditLog
 from shared.auth import verify_token
 from app.core.config import settings
 from app.olimp.websocket import manager
+from app.olimp.leaderboard import get_leaderboard as get_redis_leaderboard, participant_row
+from app.olimp.grading import get_answer_key, grade_submission, invalidate_answer_key
 from app.gamification.models import Badge, UserBadge, DailyActivity, BadgeType
 
 logger = logging.getLogger("olimp")
@@ -875,6 +877,12 @@ async def register_for_olympiad(
     await db.commit()
     await db.refresh(participant)
 
+    await _push_leaderboard(
+        olympiad.id, participant, db,
+        reference=olympiad.start_time,
+        student_name=f"{user.first_name} {user.last_name}".strip() or None,
+    )
+
     return {
         "success": True,
         "data": {
@@ -918,6 +926,7 @@ async def start_olympiad(
         participant.started_at = datetime.now(timezone.utc)
         participant.status = ParticipationStatus.started
         await db.commit()
+        await _push_leaderboard(olympiad_id, participant, db, user_id=user_id)
     
     return {"success": True, "data": {"started_at": participant.started_at.isoformat()}}
 
@@ -1015,127 +1024,45 @@ async def submit_answers(
                 participant.total_score = 0
                 participant.completed_at = now
                 await db.commit()
+                await _push_leaderboard(
+                    olympiad.id, participant, db, reference=olympiad.start_time, user_id=sp.user_id
+                )
                 raise HTTPException(
                     status_code=400,
                     detail="Ajratilgan vaqt (Time Limit) tugagan! Natijangiz bekor qilindi.",
                 )
 
-        total_score = 0
-        correct_count = 0
-        wrong_count = 0
-        result_details = []
-        total_points = 0
-
-        logger.info(f"SUBMIT TEST: olympiad={olympiad_id}, student={student_id}, answers_count={len(answers)}")
-
-        # Pre-fetch SavedTests for this olympiad to handle TestAI questions efficiently
-        st_res = await db.execute(
-            select(SavedTest).where(SavedTest.source_platform == f"olympiad:{olympiad_id}")
+        # Javob kaliti keshdan (har bir javob uchun DB so'rovi yo'q)
+        answer_key = await get_answer_key(olympiad.id, db)
+
+        # Only reverse the option shuffle when the request was JWT-authenticated —
+        # /questions shuffles only for authenticated callers. Legacy student_id-only
+        # submits (transitional) receive unshuffled questions, so their indices
+        # must pass through as-is.
+        option_permutation = None
+        if auth_user_id:
+            option_permutation = lambda qid, n: _option_permutation(auth_user_id, olympiad_id, qid, n)
+
+        graded = grade_submission(answer_key, answers, option_permutation)
+        total_score = graded.total_score
+        correct_count = graded.correct_count
+        wrong_count = graded.wrong_count
+        result_details = graded.details
+
+        logger.debug(
+            f"SUBMIT TEST: olympiad={olympiad_id}, student={student_id}, answers={len(answers)}, "
+            f"graded={len(result_details)}, score={total_score}"
         )
-        saved_tests_map = {st.id: st for st in st_res.scalars().all()}
-        logger.info(f"Loaded {len(saved_tests_map)} SavedTests for lookup")
 
-        for answer in answers:
-            question_data = None
-            is_olympiad_q = False
-            n_options: int = 0
-
-            logger.info(f"Checking question_id: {answer.question_id}")
-            
-            if str(answer.question_id).startswith("testai_"):
-                # Handle TestAI questions: testai_{st_id}_{idx}
-                parts = str(answer.question_id).split("_")
-                if len(parts) >= 3:
-                    st_id, q_idx_str = parts[1], parts[2]
-                    try:
-                        q_idx = int(q_idx_str)
-                        st_obj = saved_tests_map.get(st_id)
-                        if not st_obj:
-                            q_st = await db.execute(select(SavedTest).where(SavedTest.id == st_id))
-                            st_obj = q_st.scalars().first()
-                        
-                        if st_obj and st_obj.questions and 0 <= q_idx < len(st_obj.questions):
-                            st_q = st_obj.questions[q_idx]
-                            question_data = {
-                                "correct_answer": st_q.get("correct") if st_q.get("correct") is not None else st_q.get("answer_index"),
-                                "points": st_q.get("points", 5)
-                            }
-                            n_options = len(st_q.get("options") or [])
-                    except (ValueError, IndexError):
-                        continue
-            else:
-                q_res = await db.execute(select(OlympiadQuestion).where(OlympiadQuestion.id == answer.question_id))
-                question = q_res.scalars().first()
-                if question:
-                    question_data = {
-                        "correct_answer": question.correct_answer,
-                        "points": question.points
-                    }
-                    is_olympiad_q = True
-                    n_options = len(question.options or [])
-
-            if not question_data:
-                continue
-
-            # Reverse the per-student option shuffle. The index the client
-            # submitted is indexed into the SHUFFLED options array they saw
-            # in /questions — we translate it back to the canonical index
-            # before comparing with the stored `correct_answer`.
-            submitted_idx_original = answer.answer_index
-            try:
-                submitted_idx_int = int(answer.answer_index)
-            except (ValueError, TypeError):
-                submitted_idx_int = None
-
-            # Only reverse when the request was JWT-authenticated — /questions
-            # shuffles only for authenticated callers. Legacy student_id-only
-            # submits (transitional) receive unshuffled questions, so their
-            # indices must pass through as-is.
-            if (
-                auth_user_id
-                and submitted_idx_int is not None
-                and n_options >= 2
-                and 0 <= submitted_idx_int < n_options
-            ):
-                perm = _option_permutation(auth_user_id, olympiad_id, answer.question_id, n_options)
-                submitted_idx_original = perm[submitted_idx_int]
-
-            try:
-                is_correct = int(submitted_idx_original) == int(question_data["correct_answer"])
-            except (ValueError, TypeError):
-                is_correct = False
-
-            points = question_data["points"] if is_correct else 0
-            logger.info(
-                f"Result for q={answer.question_id}: is_correct={is_correct}, "
-                f"shuffled_idx={answer.answer_index}, original_idx={submitted_idx_original}, "
-                f"expected={question_data['correct_answer']}, points={points}"
-            )
-            total_score += points
-            total_points += question_data["points"]
-            
-            if is_correct:
-                correct_count += 1
-            else:
-                wrong_count += 1
-
-            result_details.append({
-                "question_id": answer.question_id,
-                "submitted_answer": answer.answer_index,
-                "original_answer_index": submitted_idx_original,
-                "is_correct": is_correct,
-                "points_earned": points
-            })
-
-            if participant and is_olympiad_q:
-                ans_obj = OlympiadAnswer(
+        if participant:
+            for question_id, selected, is_correct, points in graded.native_answers:
+                db.add(OlympiadAnswer(
                     participant_id=participant.id,
-                    question_id=answer.question_id,
-                    selected_answer=submitted_idx_original,
+                    question_id=question_id,
+                    selected_answer=selected,
                     is_correct=is_correct,
                     points_earned=points,
-                )
-                db.add(ans_obj)
+                ))
 
         # Calculate coins
         coins = 10  # Base participation
@@ -1216,6 +1143,9 @@ async def submit_answers(
                 await _run_gamification_post_completion(participant, db)
 
             await db.commit()
+            await _push_leaderboard(
+                olympiad.id, participant, db, reference=olympiad.start_time, user_id=sp.user_id
+            )
             
             # SOC-3: Broadcast update to all clients watching this olympiad's live leaderboard
             try:
@@ -1255,65 +1185,148 @@ async def submit_answers(
 
 # ============= Leaderboard =============
 
-@router.get("/{olympiad_id}/leaderboard")
-async def get_leaderboard(
-    olympiad_id: str,
-    limit: int = 50,
-    db: AsyncSession = Depends(get_db)
-):
-    """Get olympiad leaderboard with student names"""
-    res = await db.execute(select(Olympiad).where(Olympiad.id == olympiad_id))
-    olympiad = res.scalars().first()
-    if not olympiad:
-        raise HTTPException(status_code=404, detail="Olimpiada topilmadi")
+_LEADERBOARD_STATUSES = [
+    ParticipationStatus.completed,
+    ParticipationStatus.started,
+    ParticipationStatus.registered,
+]
 
-    # Use joinedload to avoid N+1 queries - load student profile with user in one query
-    p_res = await db.execute(
+
+async def _load_leaderboard_participants(
+    olympiad_id: str, db: AsyncSession, limit: Optional[int] = None
+) -> list[tuple[OlympiadParticipant, Optional[str]]]:
+    """Ordered participants with display names (Postgres path)."""
+    stmt = (
         select(OlympiadParticipant)
         .options(selectinload(OlympiadParticipant.student).selectinload(StudentProfile.user))
         .where(
-            OlympiadParticipant.olympiad_id == olympiad.id,
-            OlympiadParticipant.status.in_([
-                ParticipationStatus.completed,
-                ParticipationStatus.started,
-                ParticipationStatus.registered
-            ]),
+            OlympiadParticipant.olympiad_id == olympiad_id,
+            OlympiadParticipant.status.in_(_LEADERBOARD_STATUSES),
         )
         .order_by(OlympiadParticipant.total_score.desc(), OlympiadParticipant.time_spent_seconds.asc(), OlympiadParticipant.completed_at.asc())
-        .limit(limit)
     )
-    participants = p_res.scalars().all()
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    p_res = await db.execute(stmt)
 
-    leaderboard = []
-    for idx, p in enumerate(participants, 1):
-        student_name = f"O'quvchi #{idx}"
+    result = []
+    for p in p_res.scalars().all():
+        student_name = None
         try:
-            # Already loaded via joinedload - no additional queries
             sp = p.student
             if sp and sp.user:
-                student_name = f"{sp.user.first_name} {sp.user.last_name}".strip() or student_name
+                student_name = f"{sp.user.first_name} {sp.user.last_name}".strip() or None
         except Exception as e:
             logging.warning(f"Failed to get student name for {p.student_id}: {e}")
+        result.append((p, student_name))
+    return result
 
-        leaderboard.append({
-            "rank": idx,
-            "student_id": p.student_id,
-            "student_name": student_name,
-            "score": p.total_score or 0,
-            "total_score": p.total_score or 0,
-            "total_points": p.total_score or 0,  # Legacy field
-            "correct_answers": p.correct_answers or 0,
-            "wrong_answers": p.wrong_answers or 0,
-            "total_questions": (p.correct_answers or 0) + (p.wrong_answers or 0),
-            "time_taken_seconds": p.time_spent_seconds or 0,
-            "time_spent_seconds": p.time_spent_seconds or 0,
-            "coins_earned": (p.coins_earned or 0) + (p.reading_coins or 0),
-            "reading_wpm": round(p.reading_wpm or 0),
-            "reading_percent": round(p.reading_percent or 0),
-            "reading_time_seconds": p.reading_time_seconds or 0,
-            "reading_coins": p.reading_coins or 0,
-            "status": p.status.value if p.status else "registered",
-        })
+
+def _ranked_rows(participants: list[tuple[OlympiadParticipant, Optional[str]]]) -> list[dict]:
+    rows = []
+    for idx, (p, student_name) in enumerate(participants, 1):
+        row = participant_row(p, student_name)
+        row["student_name"] = row["student_name"] or f"O'quvchi #{idx}"
+        rows.append({"rank": idx, **row})
+    return rows
+
+
+async def _leaderboard_entries(olympiad: Olympiad, db: AsyncSession) -> list:
+    participants = await _load_leaderboard_participants(olympiad.id, db)
+    return [(participant_row(p, name), p.completed_at, p.time_spent_seconds) for p, name in participants]
+
+
+async def _rebuild_leaderboard(olympiad: Olympiad, db: AsyncSession) -> bool:
+    """Redis leaderboard'ni Postgres'dan to'liq qurish (finalize)."""
+    lb = get_redis_leaderboard()
+    if not lb:
+        return False
+    count = await lb.rebuild(
+        olympiad.id, olympiad.title, await _leaderboard_entries(olympiad, db), olympiad.start_time
+    )
+    logger.info(f"Leaderboard rebuilt: olympiad={olympiad.id}, participants={count}")
+    return True
+
+
+async def _ensure_leaderboard(lb, olympiad_id: str, db: AsyncSession) -> None:
+    """Cold start: `ready` yo'q bo'lsa bitta so'rov quradi, parallel so'rovlar kutadi."""
+    async def load():
+        res = await db.execute(select(Olympiad).where(Olympiad.id == olympiad_id))
+        olympiad = res.scalars().first()
+        if not olympiad:
+            raise HTTPException(status_code=404, detail="Olimpiada topilmadi")
+        entries = await _leaderboard_entries(olympiad, db)
+        logger.info(f"Leaderboard rebuilt: olympiad={olympiad.id}, participants={len(entries)}")
+        return olympiad.title, entries, olympiad.start_time
+
+    await lb.ensure_built(olympiad_id, load)
+
+
+async def _push_leaderboard(
+    olympiad_id: str,
+    participant: OlympiadParticipant,
+    db: AsyncSession,
+    reference: Optional[datetime] = None,
+    student_name: Optional[str] = None,
+    user_id: Optional[str] = None,
+) -> None:
+    """Bitta qatnashchini Redis leaderboard'ga yozish (commit'dan keyin, xatolar yutiladi)."""
+    lb = get_redis_leaderboard()
+    if not lb:
+        return
+    try:
+        if not await lb.is_ready(olympiad_id):
+            return
+        if student_name is None:
+            student_name = await lb.get_student_name(olympiad_id, participant.student_id)
+        if student_name is None and user_id:
+            u_res = await db.execute(select(User.first_name, User.last_name).where(User.id == user_id))
+            u = u_res.first()
+            if u:
+                student_name = f"{u.first_name} {u.last_name}".strip() or None
+        await lb.upsert(
+            olympiad_id,
+            participant_row(participant, student_name),
+            participant.completed_at,
+            participant.time_spent_seconds,
+            reference,
+        )
+    except Exception as e:
+        logger.warning(f"Leaderboard push failed (olympiad={olympiad_id}): {e}")
+
+
+@router.get("/{olympiad_id}/leaderboard")
+async def get_leaderboard(
+    olympiad_id: str,
+    limit: int = 50,
+    db: AsyncSession = Depends(get_db)
+):
+    """Get olympiad leaderboard with student names"""
+    lb = get_redis_leaderboard()
+    if lb:
+        try:
+            await _ensure_leaderboard(lb, olympiad_id, db)
+            title = await lb.get_title(olympiad_id)
+            leaderboard = await lb.top(olympiad_id, limit)
+            return {
+                "success": True,
+                "data": {
+                    "olympiad_title": title,
+                    "leaderboard": leaderboard,
+                    "total_participants": len(leaderboard)
+                }
+            }
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.warning(f"Redis leaderboard unavailable, falling back to DB: {e}")
+
+    res = await db.execute(select(Olympiad).where(Olympiad.id == olympiad_id))
+    olympiad = res.scalars().first()
+    if not olympiad:
+        raise HTTPException(status_code=404, detail="Olimpiada topilmadi")
+
+    leaderboard = _ranked_rows(await _load_leaderboard_participants(olympiad.id, db, limit))
 
     return {
         "success": True,
@@ -1324,6 +1337,63 @@ async def get_leaderboard(
         }
     }
 
+
+async def _leaderboard_window(
+    olympiad_id: str, student_id: str, radius: int, db: AsyncSession
+) -> tuple[Optional[dict], list[dict], int]:
+    """(my entry, window around me, total) — Redis'dan, bo'lmasa Postgres'dan."""
+    lb = get_redis_leaderboard()
+    if lb:
+        try:
+            await _ensure_leaderboard(lb, olympiad_id, db)
+            me = await lb.rank_of(olympiad_id, student_id)
+            window = await lb.around(olympiad_id, student_id, radius) if me else []
+            return me, window, await lb.total(olympiad_id)
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.warning(f"Redis leaderboard unavailable, falling back to DB: {e}")
+
+    rows = _ranked_rows(await _load_leaderboard_participants(olympiad_id, db))
+    idx = next((i for i, r in enumerate(rows) if r["student_id"] == student_id), None)
+    if idx is None:
+        return None, [], len(rows)
+    return rows[idx], rows[max(0, idx - radius): idx + radius + 1], len(rows)
+
+
+@router.get("/{olympiad_id}/leaderboard/rank/{student_id}")
+async def get_leaderboard_rank(
+    olympiad_id: str,
+    student_id: str,
+    db: AsyncSession = Depends(get_db)
+):
+    """Bitta qatnashchining o'rni (student_id = StudentProfile.id, leaderboard'dagi kabi)"""
+    me, _, total = await _leaderboard_window(olympiad_id, student_id, 0, db)
+    if not me:
+        raise HTTPException(status_code=404, detail="Qatnashchi leaderboard'da topilmadi")
+    return {"success": True, "data": {"entry": me, "total_participants": total}}
+
+
+@router.get("/{olympiad_id}/leaderboard/around/{student_id}")
+async def get_leaderboard_around(
+    olympiad_id: str,
+    student_id: str,
+    radius: int = Query(5, ge=0, le=50),
+    db: AsyncSession = Depends(get_db)
+):
+    """Qatnashchi atrofidagi oyna: yuqorida va pastda `radius` tadan"""
+    me, window, total = await _leaderboard_window(olympiad_id, student_id, radius, db)
+    if not me:
+        raise HTTPException(status_code=404, detail="Qatnashchi leaderboard'da topilmadi")
+    return {
+        "success": True,
+        "data": {
+            "entry": me,
+            "leaderboard": window,
+            "total_participants": total,
+        }
+    }
+
 @router.websocket("/{olympiad_id}/ws/leaderboard")
 async def websocket_leaderboard(websocket: WebSocket, olympiad_id: str):
     """WebSocket for Real-time Leaderboard Updates"""
@@ -1963,6 +2033,7 @@ async def admin_add_question(
     olympiad.questions_count = count
 
     await db.commit()
+    await invalidate_answer_key(olympiad_id)
     await db.refresh(q)
     return {"success": True, "question": _question_to_dict(q)}
 
@@ -1996,6 +2067,7 @@ async def admin_update_question(
     q.order = payload.order_index
 
     await db.commit()
+    await invalidate_answer_key(olympiad_id)
     return {"success": True, "question": _question_to_dict(q)}
 
 
@@ -2033,6 +2105,7 @@ async def admin_delete_question(
         olympiad.questions_count = count
 
     await db.commit()
+    await invalidate_answer_key(olympiad_id)
     return {"success": True, "message": "Savol o'chirildi"}
 
 
@@ -2379,6 +2452,17 @@ async def admin_invalidate_question(
         request=request,
     )
     await db.commit()
+    await invalidate_answer_key(olympiad_id)
+
+    # Ballar o'zgardi — Redis leaderboard keyingi o'qishda Postgres'dan qayta quriladi
+    if affected:
+        lb = get_redis_leaderboard()
+        if lb:
+            try:
+                await lb.invalidate(olympiad_id)
+            except Exception as e:
+                logger.warning(f"invalidate_question: leaderboard invalidate failed: {e}")
+
     return {
         "success": True,
         "data": {
@@ -2548,6 +2632,12 @@ async def admin_finalize_olympiad(
 
     await db.commit()
 
+    # Yakuniy holat — Redis leaderboard'ni Postgres'dan qayta quramiz
+    try:
+        await _rebuild_leaderboard(olympiad, db)
+    except Exception as e:
+        logger.warning(f"finalize: leaderboard rebuild failed: {e}")
+
     try:
         await manager.broadcast(olympiad.id, {"type": "leaderboard_update", "final": True})
     except Exception:
@@ -2847,8 +2937,8 @@ async def evaluate_story_quiz_text(
     to'g'ri javob bilan 100 ballik shkalada solishtiriladi.
     """
     import os
-    import difflib
-    import httpx
+    from shared.services.http_client import get_http_client
+    from shared.services.word_alignment import text_similarity, tokenize
 
     # Prefer JWT when present; fall back to legacy param for backward compat.
     user_id = auth_user_id or student_id
@@ -2879,43 +2969,42 @@ async def evaluate_story_quiz_text(
 
     if api_key and recognized_clean and correct_answer:
         try:
-            async with httpx.AsyncClient(timeout=15) as client:
-                prompt = (
-                    f"Savol: {question_text}\n"
-                    f"To'g'ri javob: {correct_answer}\n"
-                    f"Bola aytgan: {recognized_clean}\n\n"
-                    "Bolaning javobi ma'nosi jihatidan to'g'ri javobga qanchalik mos kelishini "
-                    "0 dan 100 gacha faqat bitta butun son bilan baholang. "
-                    "100 = to'liq mos, 0 = mutlaqo noto'g'ri. "
-                    "Faqat son qaytaring, boshqa hech narsa yozmang."
-                )
-                resp = await client.post(
-                    "https://api.openai.com/v1/chat/completions",
-                    headers={"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
-                    json={
-                        "model": "gpt-4o-mini",
-                        "messages": [{"role": "user", "content": prompt}],
-                        "temperature": 0.0,
-                        "max_tokens": 5,
-                    }
-                )
-                if resp.status_code == 200:
-                    raw = resp.json()["choices"][0]["message"]["content"].strip()
-                    digits = "".join(filter(str.isdigit, raw))[:3]
-                    score = max(0, min(100, int(digits or "0")))
-                    ai_used = True
+            prompt = (
+                f"Savol: {question_text}\n"
+                f"To'g'ri javob: {correct_answer}\n"
+                f"Bola aytgan: {recognized_clean}\n\n"
+                "Bolaning javobi ma'nosi jihatidan to'g'ri javobga qanchalik mos kelishini "
+                "0 dan 100 gacha faqat bitta butun son bilan baholang. "
+                "100 = to'liq mos, 0 = mutlaqo noto'g'ri. "
+                "Faqat son qaytaring, boshqa hech narsa yozmang."
+            )
+            resp = await get_http_client("openai").post(
+                "https://api.openai.com/v1/chat/completions",
+                headers={"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
+                json={
+                    "model": "gpt-4o-mini",
+                    "messages": [{"role": "user", "content": prompt}],
+                    "temperature": 0.0,
+                    "max_tokens": 5,
+                },
+                timeout=15,
+            )
+            if resp.status_code == 200:
+                raw = resp.json()["choices"][0]["message"]["content"].strip()
+                digits = "".join(filter(str.isdigit, raw))[:3]
+                score = max(0, min(100, int(digits or "0")))
+                ai_used = True
         except Exception as e:
-            logger.warning(f"AI evaluation failed, falling back to difflib: {e}")
+            logger.warning(f"AI evaluation failed, falling back to text matching: {e}")
 
     # ── 2. Fallback: keyword + sequence matching ──
     if score is None:
         score = 0
-        r_lower = recognized_clean.lower()
-        c_lower = correct_answer.lower()
-        if r_lower and c_lower:
-            ratio = difflib.SequenceMatcher(None, r_lower, c_lower).ratio()
-            correct_words = set(c_lower.split())
-            recognized_words = set(r_lower.split())
+        if recognized_clean.strip() and correct_answer.strip():
+            # Kirill/lotin va apostrof farqlari hisobga olinmaydi
+            ratio = text_similarity(recognized_clean, correct_answer)
+            correct_words = set(tokenize(correct_answer))
+            recognized_words = set(tokenize(recognized_clean))
             keyword_ratio = len(correct_words & recognized_words) / len(correct_words) if correct_words else 0
             # Scale to 0-100
             raw_score = (ratio * 0.5 + keyword_ratio * 0.5) * 100
@@ -3372,6 +3461,9 @@ async def submit_reading_result(
         await _run_gamification_post_completion(participant, db)
 
     await db.commit()
+    await _push_leaderboard(
+        olympiad.id, participant, db, reference=olympiad.start_time, user_id=sp.user_id
+    )
 
     # Broadcast leaderboard update
     try:
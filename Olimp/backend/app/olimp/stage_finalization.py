@@ -0,0 +1,378 @@
+"""
+Stage finalization — ko'p bosqichli olimpiada bosqichini SQL'da yakunlash
+
+    job = await enqueue_finalization(db, stage)       # POST .../finalize
+    await run_finalization(AsyncSessionLocal, job.id)  # fon vazifasi
+
+Avval barcha natijalar va ishtirokchilar Python'ga yuklanib, har bir guruh
+saralanib, rank ORM orqali qatorma-qator yozilardi — respublika bosqichida
+yuz minglab natija so'rov ichida tugamasdi. Endi:
+
+    - natijalardagi scope nusxasi participant bilan tenglashtiriladi
+      (stage_leaderboard indekslari uchun)
+    - reja: scope kaliti (maktab: region, district, school_number; tuman:
+      region, district; viloyat: region; respublika: bitta guruh) bo'yicha
+      GROUP BY — guruhlar soni va hajmi, DB tartibida
+    - guruhlar ~STAGE_FINALIZE_CHUNK_ROWS natijali bo'laklarga bo'linadi;
+      har bir bo'lak — bitta UPDATE: ROW_NUMBER() OVER (PARTITION BY scope
+      ORDER BY score DESC, duration ASC, id) va COUNT(*) OVER (...) dan
+      rank_in_group va is_passed (foizli kvota, kamida min_count), keyin
+      o'tganlarning current_stage i bitta UPDATE bilan
+    - bo'lak, sanoqlar va kursor (oxirgi guruh kaliti) bitta tranzaksiyada:
+      uzilgan jarayon keyingi POST yoki startup'da (resume_unfinished_
+      finalizations) aynan shu joydan davom etadi; oxirgi bo'lak job'ni
+      "completed" qiladi
+
+Kaliti NULL bo'lgan guruhlar (region/district kiritilmagan eski yozuvlar)
+oxirida alohida bo'lakda reytinglanadi — eski kod ularni "None" guruhiga
+yig'ardi, natija bir xil. Teng score va vaqtda tartib endi result.id bo'yicha
+aniq (avval so'rov qaytargan tartibga bog'liq edi).
+"""
+import logging
+import math
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Float, func, literal, or_, select, tuple_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from shared.database.models.olympiad import OlympiadParticipant
+from shared.database.models.olympiad_stage import (
+    OlympiadStage, OlympiadStageFinalization, OlympiadStageResult, ScopeType,
+)
+from app.core.config import settings
+
+logger = logging.getLogger("olimp")
+
+SCOPE_KEYS = {
+    ScopeType.school: ("region", "district", "school_number"),
+    ScopeType.district: ("region", "district"),
+    ScopeType.region: ("region",),
+    ScopeType.republic: (),
+}
+
+GroupKey = Tuple[Any, ...]
+
+
+def calculate_passing_count(total: int, percent: float, min_count: int) -> int:
+    """
+    total=10, percent=30 → 3 kishi
+    total=2,  percent=30 → ceiling(0.6)=1
+    """
+    if total <= 0:
+        return 0
+    raw = total * (percent / 100.0)
+    count = max(math.ceil(raw), min_count)
+    return min(count, total)
+
+
+def _scope_columns(scope_type) -> List:
+    return [getattr(OlympiadParticipant, name) for name in SCOPE_KEYS[ScopeType(scope_type)]]
+
+
+def _quota(stage: OlympiadStage) -> Tuple[float, int]:
+    percent = stage.passing_percent if stage.passing_percent is not None else 30.0
+    min_count = stage.passing_min_count if stage.passing_min_count is not None else 1
+    return percent, min_count
+
+
+def summary(job: OlympiadStageFinalization) -> Dict[str, Any]:
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "stage_number": job.stage_number,
+        "groups_count": job.groups_total,
+        "groups_done": job.groups_done,
+        "results_total": job.results_total,
+        "results_done": job.results_done,
+        "total_passed": job.total_passed,
+        "total_failed": job.total_failed,
+        "progress": round(100 * job.results_done / job.results_total, 1) if job.results_total else 0.0,
+        "error": job.error,
+    }
+
+
+# -- navbatga qo'yish / egallash ---------------------------------------------
+
+async def enqueue_finalization(db: AsyncSession, stage: OlympiadStage) -> OlympiadStageFinalization:
+    """
+    Bosqich uchun job (stage_id — idempotentlik kaliti). Tugagan job qayta
+    yakunlash uchun noldan boshlanadi; pending/failed/running o'zgarmaydi —
+    run() uni kursoridan davom ettiradi yoki (tirik bo'lsa) tegmaydi.
+    """
+    job = (await db.execute(
+        select(OlympiadStageFinalization).where(OlympiadStageFinalization.stage_id == stage.id)
+    )).scalars().first()
+    if job is None:
+        job = OlympiadStageFinalization(stage_id=stage.id, stage_number=stage.stage_number, status="pending")
+        db.add(job)
+        try:
+            await db.commit()
+        except IntegrityError:
+            # Parallel POST allaqachon yaratdi
+            await db.rollback()
+            return await enqueue_finalization(db, stage)
+        return job
+    if job.status == "completed":
+        job.status = "pending"
+        job.stage_number = stage.stage_number
+        job.groups_done = job.results_done = job.total_passed = job.total_failed = 0
+        job.last_group_key = None
+        job.error = None
+        job.finished_at = None
+        await db.commit()
+    return job
+
+
+async def _claim(db: AsyncSession, job_id: str) -> bool:
+    """pending/failed yoki heartbeat'i eskirgan running job'ni atomik egallash."""
+    stale_before = datetime.now(timezone.utc) - timedelta(seconds=settings.STAGE_FINALIZE_STALE_SECONDS)
+    result = await db.execute(
+        update(OlympiadStageFinalization)
+        .where(
+            OlympiadStageFinalization.id == job_id,
+            or_(
+                OlympiadStageFinalization.status.in_(["pending", "failed"]),
+                (OlympiadStageFinalization.status == "running")
+                & (OlympiadStageFinalization.updated_at < stale_before),
+            ),
+        )
+        .values(status="running", error=None, updated_at=func.now())
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount == 1
+
+
+# -- reja va bo'laklar ----------------------------------------------------------
+
+async def sync_result_scopes(db: AsyncSession, stage_id: str) -> None:
+    """Natijalardagi scope nusxasini participant bilan tenglashtirish (faqat farq qilganlari)"""
+    P, R = OlympiadParticipant, OlympiadStageResult
+    await db.execute(
+        update(R)
+        .where(
+            R.stage_id == stage_id,
+            R.participant_id == P.id,
+            or_(
+                R.region.is_distinct_from(P.region),
+                R.district.is_distinct_from(P.district),
+                R.school_number.is_distinct_from(P.school_number),
+            ),
+        )
+        .values(region=P.region, district=P.district, school_number=P.school_number)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def plan_groups(db: AsyncSession, stage: OlympiadStage) -> List[Tuple[GroupKey, int]]:
+    """(guruh kaliti, natijalar soni) — scope kaliti bo'yicha DB tartibida"""
+    keys = _scope_columns(stage.scope_type)
+    stmt = (
+        select(*keys, func.count())
+        .join_from(OlympiadStageResult, OlympiadParticipant,
+                   OlympiadParticipant.id == OlympiadStageResult.participant_id)
+        .where(OlympiadStageResult.stage_id == stage.id)
+    )
+    if keys:
+        stmt = stmt.group_by(*keys).order_by(*keys)
+    rows = (await db.execute(stmt)).all()
+    return [(tuple(row[:-1]), row[-1]) for row in rows if row[-1]]
+
+
+def split_chunks(
+    groups: Sequence[Tuple[GroupKey, int]],
+    chunk_rows: int,
+    cursor: Optional[GroupKey] = None,
+) -> List[Tuple[Optional[GroupKey], Optional[GroupKey], List[Tuple[GroupKey, int]]]]:
+    """
+    (oldingi bo'lakning oxirgi kaliti, shu bo'lakning oxirgi kaliti, guruhlar),
+    cursor guruhidan keyingilar. Kalitida NULL bo'lgan guruhlar oxirgi alohida
+    bo'lakda (upper=None): SQL qator taqqoslashi NULL'ni diapazonga kiritmaydi.
+    """
+    ranged = [g for g in groups if None not in g[0]]
+    nulls = [g for g in groups if None in g[0]]
+    if cursor is not None:
+        done = next(i for i, (key, _) in enumerate(ranged) if key == cursor)
+        ranged = ranged[done + 1:]
+    chunks, current, rows, lower = [], [], 0, cursor
+    for group in ranged:
+        current.append(group)
+        rows += group[1]
+        if rows >= chunk_rows:
+            chunks.append((lower, group[0], current))
+            lower, current, rows = group[0], [], 0
+    if current:
+        chunks.append((lower, current[-1][0], current))
+    if nulls:
+        chunks.append((None, None, nulls))
+    return chunks
+
+
+def _chunk_conditions(stage: OlympiadStage, lower: Optional[GroupKey], upper: Optional[GroupKey]) -> List:
+    keys = _scope_columns(stage.scope_type)
+    conditions = [
+        OlympiadStageResult.stage_id == stage.id,
+        OlympiadParticipant.olympiad_id == stage.olympiad_id,
+    ]
+    if not keys:
+        return conditions
+    if upper is None:
+        conditions.append(or_(*[key.is_(None) for key in keys]))
+        return conditions
+    conditions.extend(key.isnot(None) for key in keys)
+    if lower is not None:
+        conditions.append(tuple_(*keys) > tuple_(*lower))
+    conditions.append(tuple_(*keys) <= tuple_(*upper))
+    return conditions
+
+
+async def apply_chunk(db: AsyncSession, stage: OlympiadStage, conditions: List) -> None:
+    """Bo'lakdagi barcha guruhlar: rank + kvota bitta UPDATE, o'tganlarga current_stage."""
+    percent, min_count = _quota(stage)
+    keys = _scope_columns(stage.scope_type)
+    partition = keys or None
+    ranked = (
+        select(
+            OlympiadStageResult.id.label("result_id"),
+            func.row_number().over(
+                partition_by=partition,
+                order_by=(
+                    func.coalesce(OlympiadStageResult.score, 0).desc(),
+                    func.coalesce(OlympiadStageResult.duration_seconds, 0).asc(),
+                    OlympiadStageResult.id,
+                ),
+            ).label("place"),
+            func.count().over(partition_by=partition).label("group_size"),
+        )
+        .join_from(OlympiadStageResult, OlympiadParticipant,
+                   OlympiadParticipant.id == OlympiadStageResult.participant_id)
+        .where(*conditions)
+        .subquery("ranked")
+    )
+    # place <= min(max(ceil(n * p), min_count), n)  <=>  place <= ceil(n * p) OR place <= min_count
+    # (place <= n doim); p Python'da hisoblanadi — calculate_passing_count bilan bir xil float
+    passed = or_(
+        ranked.c.place <= func.ceil(ranked.c.group_size * literal(percent / 100.0, Float)),
+        ranked.c.place <= min_count,
+    )
+    await db.execute(
+        update(OlympiadStageResult)
+        .where(OlympiadStageResult.id == ranked.c.result_id)
+        .values(rank_in_group=ranked.c.place, is_passed=passed)
+        .execution_options(synchronize_session=False)
+    )
+    await db.execute(
+        update(OlympiadParticipant)
+        .where(OlympiadParticipant.id.in_(
+            select(OlympiadStageResult.participant_id)
+            .join_from(OlympiadStageResult, OlympiadParticipant,
+                       OlympiadParticipant.id == OlympiadStageResult.participant_id)
+            .where(*conditions, OlympiadStageResult.is_passed.is_(True))
+        ))
+        .values(current_stage=stage.stage_number + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+# -- ishga tushirish -------------------------------------------------------------
+
+async def _mark_failed(session_factory, job_id: str, error: str) -> None:
+    async with session_factory() as db:
+        await db.execute(
+            update(OlympiadStageFinalization)
+            .where(OlympiadStageFinalization.id == job_id)
+            .values(status="failed", error=error[:1000])
+        )
+        await db.commit()
+
+
+async def run_finalization(session_factory, job_id: str, chunk_rows: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Job'ni boshidan yoki saqlangan kursordan davom ettirish.
+    session_factory — AsyncSessionLocal kabi; har bir bo'lak o'z tranzaksiyasida.
+    """
+    chunk_rows = chunk_rows or settings.STAGE_FINALIZE_CHUNK_ROWS
+    async with session_factory() as db:
+        if not await _claim(db, job_id):
+            job = await db.get(OlympiadStageFinalization, job_id)
+            if job is None:
+                raise ValueError(f"Finalization job {job_id} topilmadi")
+            return summary(job)
+        job = await db.get(OlympiadStageFinalization, job_id, populate_existing=True)
+        stage = await db.get(OlympiadStage, job.stage_id)
+        cursor = tuple(job.last_group_key) if job.last_group_key is not None else None
+
+    try:
+        async with session_factory() as db:
+            # Leaderboard indekslaridagi scope nusxasi ham yakuniy holatga keltiriladi
+            await sync_result_scopes(db, stage.id)
+            groups = await plan_groups(db, stage)
+            values = {"groups_total": len(groups), "results_total": sum(n for _, n in groups), "updated_at": func.now()}
+            if cursor is not None and all(key != cursor for key, _ in groups):
+                # Natijalar o'zgargan (kursor guruhi yo'q) — noldan
+                logger.warning(f"Finalization {job_id}: cursor {cursor} not in plan, restarting")
+                cursor = None
+            if cursor is None:
+                values.update(groups_done=0, results_done=0, total_passed=0, total_failed=0, last_group_key=None)
+            chunks = split_chunks(groups, chunk_rows, cursor)
+            if not chunks:
+                values.update(status="completed", finished_at=func.now())
+            await db.execute(
+                update(OlympiadStageFinalization).where(OlympiadStageFinalization.id == job_id).values(**values)
+            )
+            await db.commit()
+
+        percent, min_count = _quota(stage)
+        for index, (lower, upper, chunk_groups) in enumerate(chunks):
+            passed = sum(calculate_passing_count(n, percent, min_count) for _, n in chunk_groups)
+            rows = sum(n for _, n in chunk_groups)
+            progress = {
+                "groups_done": OlympiadStageFinalization.groups_done + len(chunk_groups),
+                "results_done": OlympiadStageFinalization.results_done + rows,
+                "total_passed": OlympiadStageFinalization.total_passed + passed,
+                "total_failed": OlympiadStageFinalization.total_failed + rows - passed,
+                "updated_at": func.now(),
+            }
+            if upper is not None:
+                progress["last_group_key"] = list(upper)
+            if index == len(chunks) - 1:
+                progress.update(status="completed", finished_at=func.now())
+            async with session_factory() as db:
+                await apply_chunk(db, stage, _chunk_conditions(stage, lower, upper))
+                await db.execute(
+                    update(OlympiadStageFinalization)
+                    .where(OlympiadStageFinalization.id == job_id)
+                    .values(**progress)
+                )
+                await db.commit()
+    except Exception as e:
+        logger.exception(f"Stage finalization {job_id} failed")
+        await _mark_failed(session_factory, job_id, str(e))
+
+    async with session_factory() as db:
+        job = await db.get(OlympiadStageFinalization, job_id)
+        if job.status == "completed":
+            logger.info(
+                f"Stage {job.stage_id} finalized: {job.groups_total} groups, "
+                f"passed={job.total_passed} failed={job.total_failed}"
+            )
+        return summary(job)
+
+
+async def resume_unfinished_finalizations(session_factory) -> List[Dict[str, Any]]:
+    """Startup'da: uzilib qolgan (pending yoki heartbeat eskirgan) job'larni davom ettirish."""
+    stale_before = datetime.now(timezone.utc) - timedelta(seconds=settings.STAGE_FINALIZE_STALE_SECONDS)
+    async with session_factory() as db:
+        result = await db.execute(
+            select(OlympiadStageFinalization.id).where(
+                or_(
+                    OlympiadStageFinalization.status == "pending",
+                    (OlympiadStageFinalization.status == "running")
+                    & (OlympiadStageFinalization.updated_at < stale_before),
+                )
+            )
+        )
+        job_ids = result.scalars().all()
+    return [await run_finalization(session_factory, job_id) for job_id in job_ids]
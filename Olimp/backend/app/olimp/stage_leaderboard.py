@@ -0,0 +1,161 @@
+"""
+Stage leaderboard — ko'p bosqichli olimpiada bosqichi reytingi (scope bo'yicha)
+
+Avval har bir so'rov bosqichning barcha natijalari va ishtirokchilarini
+yuklab, o'quvchining maktab/tuman/viloyati bo'yicha Python'da filtrlab
+saralardi. Endi olympiad_stage_results da ishtirokchining scope'i (region,
+district, school_number) saqlanadi va har bir scope darajasi uchun
+(stage_id, scope..., score DESC, duration_seconds, id) INCLUDE
+(participant_id, is_passed) indeksi bor. Javob faqat indeks diapazonlaridan:
+
+    - top-N: scope indeksidagi birinchi N yozuv
+    - o'rnim: 1 + mendan yuqoridagilar soni — uchta diapazon (score > s;
+      score = s, vaqt < d; score = s, vaqt = d, id < meniki)
+    - qo'shnilar: o'sha diapazonlardan menga eng yaqin K tasi va pastdagi
+      teskari diapazonlardan K tasi
+    - total: scope'dagi natijalar soni
+
+Ismlar faqat javobdagi (≤ N + 2K + 1) qatorlar uchun olinadi. Tartib
+finalize (stage_finalization) bilan bir xil: score DESC, duration ASC, id.
+Scope ustunlari insert'da (model event) va bosqich yakunlanganda
+(stage_finalization.sync_result_scopes) participant'dan yangilanadi.
+"""
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import func, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from shared.database.models import StudentProfile, User
+from shared.database.models.olympiad import OlympiadParticipant
+from shared.database.models.olympiad_stage import OlympiadStage, OlympiadStageResult, ScopeType
+from app.olimp.stage_finalization import SCOPE_KEYS
+
+R = OlympiadStageResult
+_ROW = (R.id, R.participant_id, R.score, R.duration_seconds, R.is_passed)
+
+
+def _rank_key(row) -> tuple:
+    return (-(row.score or 0), row.duration_seconds or 0, row.id)
+
+
+def scope_conditions(stage: OlympiadStage, scope_row=None) -> List:
+    """scope_row — region/district/school_number atributli obyekt; None — butun bosqich"""
+    conditions = [R.stage_id == stage.id]
+    if scope_row is None:
+        return conditions
+    for name in SCOPE_KEYS[ScopeType(stage.scope_type)]:
+        value = getattr(scope_row, name)
+        column = getattr(R, name)
+        conditions.append(column.is_(None) if value is None else column == value)
+    return conditions
+
+
+def _above(me) -> Sequence:
+    """Mendan yuqoridagilar: (shart, menga yaqinidan boshlab tartib) — har biri indeks diapazoni"""
+    return (
+        ((R.score == me.score, R.duration_seconds == me.duration_seconds, R.id < me.id),
+         (R.id.desc(),)),
+        ((R.score == me.score, R.duration_seconds < me.duration_seconds),
+         (R.duration_seconds.desc(), R.id.desc())),
+        ((R.score > me.score,),
+         (R.score.asc(), R.duration_seconds.desc(), R.id.desc())),
+    )
+
+
+def _below(me) -> Sequence:
+    return (
+        ((R.score == me.score, R.duration_seconds == me.duration_seconds, R.id > me.id),
+         (R.id,)),
+        ((R.score == me.score, R.duration_seconds > me.duration_seconds),
+         (R.duration_seconds, R.id)),
+        ((R.score < me.score,),
+         (R.score.desc(), R.duration_seconds, R.id)),
+    )
+
+
+async def _nearest(db: AsyncSession, conditions: List, tiers: Sequence, limit: int, reverse: bool) -> List:
+    parts = [
+        select(*sub.c) for sub in (
+            select(*_ROW).where(*conditions, *where).order_by(*order).limit(limit).subquery()
+            for where, order in tiers
+        )
+    ]
+    rows = (await db.execute(union_all(*parts))).all()
+    return sorted(rows, key=_rank_key, reverse=reverse)[:limit]
+
+
+async def stage_leaderboard(
+    db: AsyncSession,
+    stage: OlympiadStage,
+    me: Optional[OlympiadParticipant] = None,
+    limit: int = 50,
+    around: int = 3,
+) -> Dict[str, Any]:
+    """
+    me berilsa — uning scope'i bo'yicha top-N, o'rni va atrofidagi `around`
+    tadan qo'shnilar; aks holda butun bosqich bo'yicha top-N.
+    """
+    my_result = None
+    if me is not None:
+        my_result = (await db.execute(
+            select(*_ROW, R.region, R.district, R.school_number)
+            .where(R.stage_id == stage.id, R.participant_id == me.id)
+        )).first()
+    conditions = scope_conditions(stage, my_result if my_result is not None else me)
+
+    # total va (bo'lsa) mendan yuqoridagilar — bitta so'rovda
+    counts = [select(func.count()).select_from(R).where(*conditions).scalar_subquery()]
+    if my_result is not None:
+        counts += [
+            select(func.count()).select_from(R).where(*conditions, *where).scalar_subquery()
+            for where, _ in _above(my_result)
+        ]
+    total, *above_counts = (await db.execute(select(*counts))).one()
+
+    top = (await db.execute(
+        select(*_ROW).where(*conditions)
+        .order_by(R.score.desc(), R.duration_seconds, R.id)
+        .limit(limit)
+    )).all()
+    ranked = {row.id: (i + 1, row) for i, row in enumerate(top)}
+
+    my_rank = None
+    if my_result is not None:
+        my_rank = 1 + sum(above_counts)
+        ranked[my_result.id] = (my_rank, my_result)
+        if around:
+            for i, row in enumerate(await _nearest(db, conditions, _above(my_result), around, reverse=True)):
+                ranked.setdefault(row.id, (my_rank - 1 - i, row))
+            for i, row in enumerate(await _nearest(db, conditions, _below(my_result), around, reverse=False)):
+                ranked.setdefault(row.id, (my_rank + 1 + i, row))
+
+    names = {}
+    if ranked:
+        name_rows = await db.execute(
+            select(R.id, OlympiadParticipant.school_number, User.first_name, User.last_name)
+            .join(OlympiadParticipant, OlympiadParticipant.id == R.participant_id)
+            .outerjoin(StudentProfile, StudentProfile.id == OlympiadParticipant.student_id)
+            .outerjoin(User, User.id == StudentProfile.user_id)
+            .where(R.id.in_(list(ranked)))
+        )
+        names = {row.id: row for row in name_rows}
+
+    leaderboard = []
+    for rank, row in sorted(ranked.values(), key=lambda item: item[0]):
+        info = names.get(row.id)
+        leaderboard.append({
+            "rank": rank,
+            "name": f"{info.first_name} {info.last_name}" if info is not None and info.first_name is not None else "—",
+            "school_number": info.school_number if info is not None else None,
+            "score": row.score,
+            "duration_seconds": row.duration_seconds,
+            "is_passed": row.is_passed,
+            "is_me": my_result is not None and row.id == my_result.id,
+        })
+
+    return {
+        "scope": ScopeType(stage.scope_type).value,
+        "total": total,
+        "my_rank": my_rank,
+        "leaderboard": leaderboard,
+    }
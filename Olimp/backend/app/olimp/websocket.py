@@ -1,33 +1,235 @@
-from typing import Dict, List
+"""
+Live leaderboard WebSocket fan-out.
+
+broadcast() publishes the event to Redis (`olimp:ws:{olympiad_id}`), and every
+uvicorn worker's listener delivers it to the sockets connected to that worker.
+Without REDIS_URL events are delivered locally only (single-worker dev setup).
+
+Local delivery never awaits a socket: the JSON payload is encoded once and
+put on each client's bounded queue, a per-client writer task sends it with a
+timeout. Clients whose queue is full or whose send times out are dropped.
+`leaderboard_update` bursts are coalesced to at most
+WS_LEADERBOARD_MAX_PUSHES_PER_SECOND pushes per olympiad (latest wins).
+"""
+import asyncio
+import json
+import logging
+from typing import Dict, Optional
+
 from fastapi import WebSocket
 
+from shared.services.redis_service import get_redis
+from app.core.config import settings
+
+logger = logging.getLogger("olimp")
+
+CHANNEL_PREFIX = "olimp:ws:"
+COALESCED_TYPES = {"leaderboard_update"}
+
+
+class _Client:
+    __slots__ = ("ws", "queue", "task")
+
+    def __init__(self, ws: WebSocket, queue_size: int):
+        self.ws = ws
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.task: Optional[asyncio.Task] = None
+
+
 class ConnectionManager:
-    def __init__(self):
-        # Maps olympiad_id to a list of active websocket connections
-        self.active_connections: Dict[str, List[WebSocket]] = {}
+    def __init__(
+        self,
+        send_timeout: Optional[float] = None,
+        queue_size: Optional[int] = None,
+        max_pushes_per_second: Optional[float] = None,
+        use_redis: bool = True,
+    ):
+        self.send_timeout = send_timeout or settings.WS_SEND_TIMEOUT_SECONDS
+        self.queue_size = queue_size or settings.WS_CLIENT_QUEUE_SIZE
+        pps = max_pushes_per_second or settings.WS_LEADERBOARD_MAX_PUSHES_PER_SECOND
+        self.min_push_interval = 1.0 / pps if pps > 0 else 0.0
+        self.use_redis = use_redis
+
+        # Maps olympiad_id to the active websocket connections on this worker
+        self.active_connections: Dict[str, Dict[WebSocket, _Client]] = {}
+
+        self._listener_task: Optional[asyncio.Task] = None
+        self._last_push: Dict[str, float] = {}
+        self._pending: Dict[str, str] = {}
+        self._flush_tasks: Dict[str, asyncio.Task] = {}
+        self.dropped_slow_consumers = 0
+
+    # ---- connections -----------------------------------------------------
 
     async def connect(self, ws: WebSocket, olympiad_id: str):
         await ws.accept()
-        if olympiad_id not in self.active_connections:
-            self.active_connections[olympiad_id] = []
-        self.active_connections[olympiad_id].append(ws)
+        client = _Client(ws, self.queue_size)
+        client.task = asyncio.create_task(self._writer(olympiad_id, client))
+        self.active_connections.setdefault(olympiad_id, {})[ws] = client
+        self._ensure_listener()
 
     def disconnect(self, ws: WebSocket, olympiad_id: str):
-        if olympiad_id in self.active_connections:
-            if ws in self.active_connections[olympiad_id]:
-                self.active_connections[olympiad_id].remove(ws)
-            if not self.active_connections[olympiad_id]:
-                del self.active_connections[olympiad_id]
+        clients = self.active_connections.get(olympiad_id)
+        if not clients:
+            return
+        client = clients.pop(ws, None)
+        if not clients:
+            del self.active_connections[olympiad_id]
+        if client and client.task and client.task is not asyncio.current_task():
+            client.task.cancel()
+
+    def connection_count(self, olympiad_id: Optional[str] = None) -> int:
+        if olympiad_id is not None:
+            return len(self.active_connections.get(olympiad_id, {}))
+        return sum(len(c) for c in self.active_connections.values())
+
+    async def _writer(self, olympiad_id: str, client: _Client):
+        while True:
+            payload = await client.queue.get()
+            try:
+                await asyncio.wait_for(client.ws.send_text(payload), self.send_timeout)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Timed out or socket already gone — drop it, others are unaffected
+                self._drop(client, olympiad_id)
+                return
+
+    def _drop(self, client: _Client, olympiad_id: str):
+        self.dropped_slow_consumers += 1
+        self.disconnect(client.ws, olympiad_id)
+        asyncio.create_task(self._close_quietly(client.ws))
+
+    async def _close_quietly(self, ws: WebSocket):
+        try:
+            # 1013 = Try Again Later; the client reconnects and refetches the board
+            await asyncio.wait_for(ws.close(code=1013), self.send_timeout)
+        except Exception:
+            pass
+
+    # ---- publishing ------------------------------------------------------
 
     async def broadcast(self, olympiad_id: str, message: dict):
-        if olympiad_id in self.active_connections:
-            # Create a copy of the list to iterate over, in case connections drop mid-broadcast
-            connections = list(self.active_connections[olympiad_id])
-            for connection in connections:
+        """Publish to every worker (Redis) or, without Redis, to local sockets."""
+        payload = json.dumps(message, ensure_ascii=False)
+        redis = get_redis() if self.use_redis else None
+        if redis is not None:
+            try:
+                await redis.publish(f"{CHANNEL_PREFIX}{olympiad_id}", payload)
+                return
+            except Exception as e:
+                logger.warning(f"WS publish failed, delivering locally only: {e}")
+        self.dispatch(olympiad_id, payload)
+
+    def dispatch(self, olympiad_id: str, payload: str):
+        """Deliver an encoded event to this worker's sockets, coalescing bursts."""
+        if olympiad_id not in self.active_connections:
+            return
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            return
+
+        coalesce = (
+            self.min_push_interval > 0
+            and message.get("type") in COALESCED_TYPES
+            and not message.get("final")
+        )
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+
+        if not coalesce:
+            # Final/other events go out immediately and supersede a pending update
+            self._pending.pop(olympiad_id, None)
+            self._fan_out(olympiad_id, payload)
+            self._last_push[olympiad_id] = now
+            return
+
+        wait = self._last_push.get(olympiad_id, 0.0) + self.min_push_interval - now
+        if wait <= 0 and olympiad_id not in self._pending:
+            self._fan_out(olympiad_id, payload)
+            self._last_push[olympiad_id] = now
+            return
+
+        self._pending[olympiad_id] = payload
+        if olympiad_id not in self._flush_tasks:
+            self._flush_tasks[olympiad_id] = asyncio.create_task(
+                self._flush_later(olympiad_id, max(wait, 0.0))
+            )
+
+    async def _flush_later(self, olympiad_id: str, delay: float):
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            self._flush_tasks.pop(olympiad_id, None)
+        payload = self._pending.pop(olympiad_id, None)
+        if payload is not None:
+            self._fan_out(olympiad_id, payload)
+            self._last_push[olympiad_id] = asyncio.get_running_loop().time()
+
+    def _fan_out(self, olympiad_id: str, payload: str):
+        for client in list(self.active_connections.get(olympiad_id, {}).values()):
+            try:
+                client.queue.put_nowait(payload)
+            except asyncio.QueueFull:
+                self._drop(client, olympiad_id)
+
+    # ---- cross-worker listener -------------------------------------------
+
+    def _ensure_listener(self):
+        if not self.use_redis:
+            return
+        if self._listener_task is not None and not self._listener_task.done():
+            return
+        redis = get_redis()
+        if redis is not None:
+            self._listener_task = asyncio.create_task(self._listen(redis))
+
+    async def _listen(self, redis):
+        backoff = 0.5
+        while True:
+            pubsub = redis.pubsub()
+            try:
+                await pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+                backoff = 0.5
+                while True:
+                    msg = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if not msg or msg.get("type") != "pmessage":
+                        continue
+                    channel = msg["channel"]
+                    if isinstance(channel, bytes):
+                        channel = channel.decode()
+                    data = msg["data"]
+                    if isinstance(data, bytes):
+                        data = data.decode()
+                    self.dispatch(channel[len(CHANNEL_PREFIX):], data)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"WS pub/sub listener error, reconnecting in {backoff}s: {e}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 10.0)
+            finally:
                 try:
-                    await connection.send_json(message)
+                    await pubsub.aclose()
                 except Exception:
-                    # If sending fails, assume it's disconnected and remove it
-                    self.disconnect(connection, olympiad_id)
+                    pass
+
+    async def close(self):
+        """Shutdown: stop the listener, pending flushes and all writer tasks."""
+        tasks = []
+        if self._listener_task:
+            tasks.append(self._listener_task)
+        tasks.extend(self._flush_tasks.values())
+        for clients in self.active_connections.values():
+            tasks.extend(c.task for c in clients.values() if c.task)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._listener_task = None
+        self._flush_tasks.clear()
+        self._pending.clear()
+        self.active_connections.clear()
+
 
 manager = ConnectionManager()
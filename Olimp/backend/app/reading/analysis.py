@@ -0,0 +1,425 @@
+"""
+Reading voice analysis — ovoz yozuvlarini fon tahlili navbati
+
+    job = await enqueue_analysis(db, session)   # yuklash bilan bir tranzaksiyada
+    await db.commit()
+    wake_reading_analysis()                     # worker darhol olsin
+
+Musobaqa oxirida yuzlab sessiya bir daqiqada tugaydi — STT so'rov ichida
+qilinsa har biri HTTP ulanishni o'nlab soniya ushlab turadi. Endi yuklash
+reading_analysis_jobs ga qator qo'yadi (session_id — idempotentlik kaliti:
+takroriy so'rov yangi job yaratmaydi, qayta yuklangan audio job'ni qaytadan
+boshlaydi), ReadingAnalysisWorker esa:
+
+    - due qatorlarni bo'sh slotlar soniga qarab egallaydi (status="processing",
+      next_attempt_at — lease; Postgres'da FOR UPDATE SKIP LOCKED) — bir vaqtda
+      READING_ANALYSIS_CONCURRENCY tadan ko'p STT so'rovi yo'q
+    - audio'ni storage'dan bo'laklab STT ga uzatadi (butun blob xotirada emas)
+    - scoring.apply_stt_result + refresh_competition_result, job'ni "done"
+      qilish — bitta tranzaksiyada
+    - vaqtinchalik xatoda attempts+1 va eksponensial kechikish; audio yo'q yoki
+      ovoz tanib olinmasa — darhol "failed"
+
+Mijoz natijani GET /sessions/{id}/analysis?wait=N bilan oladi (long-poll:
+shu jarayondagi worker tugatsa darhol, aks holda har soniyada bazadan).
+
+STT backend'lari: AzureSTTBackend (prod) va FakeSTTBackend — audio baytlarini
+transcript sifatida o'qiydi (testlar, READING_STT_BACKEND=fake lokal ishlash).
+"""
+import asyncio
+import logging
+import re
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from shared.database.models.reading_competition import ReadingAnalysisJob, ReadingSession, ReadingTask
+from app.core.config import settings
+from app.reading.scoring import apply_stt_result, refresh_competition_result
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ("done", "failed")
+
+
+class AnalysisError(Exception):
+    """Qayta urinib foyda yo'q xato (audio yo'q, ovoz tanib olinmadi)."""
+
+
+# ============================================================
+# STT BACKENDS
+# ============================================================
+
+class AzureSTTBackend:
+    """Azure Speech REST — audio chunked transfer bilan yuboriladi."""
+
+    async def transcribe(self, chunks: AsyncIterator[bytes], language: str) -> Dict[str, Any]:
+        from shared.services.azure_speech_service import speech_service
+        return await speech_service.speech_to_text(chunks, language=language)
+
+
+class FakeSTTBackend:
+    """
+    Lokal/test STT: audio baytlari UTF-8 matn deb o'qiladi va transcript
+    sifatida qaytadi; davomiylik — so'zlar soni x seconds_per_word.
+    fail_times — shuncha chaqiruv vaqtinchalik xato bilan tugaydi.
+    """
+
+    def __init__(self, seconds_per_word: float = 0.6, fail_times: int = 0, delay: float = 0.0):
+        self.seconds_per_word = seconds_per_word
+        self.fail_times = fail_times
+        self.delay = delay
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def transcribe(self, chunks: AsyncIterator[bytes], language: str) -> Dict[str, Any]:
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            data = b"".join([chunk async for chunk in chunks])
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            if self.calls <= self.fail_times:
+                raise ConnectionError("fake STT unavailable")
+        finally:
+            self.in_flight -= 1
+        transcript = data.decode("utf-8", "ignore").strip()
+        if not transcript:
+            return {"transcript": "", "duration": 0, "success": False, "error": "Ovoz tanib olinmadi"}
+        words = len(re.findall(r"\w+", transcript))
+        return {
+            "transcript": transcript,
+            "duration": int(words * self.seconds_per_word * 10_000_000),  # Azure kabi 100 ns birlikda
+            "success": True,
+        }
+
+
+def get_stt_backend(name: Optional[str] = None):
+    name = (name or settings.READING_STT_BACKEND).lower()
+    if name == "fake":
+        return FakeSTTBackend()
+    return AzureSTTBackend()
+
+
+# ============================================================
+# ENQUEUE / QUERY
+# ============================================================
+
+async def enqueue_analysis(db: AsyncSession, session: ReadingSession) -> ReadingAnalysisJob:
+    """
+    Sessiya audio'sini tahlilga qo'yish (commit chaqiruvchida). Idempotent:
+    shu audio uchun job bor bo'lsa (failed'dan boshqa) o'zgarmaydi.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as upsert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as upsert
+
+    now = datetime.now(timezone.utc)
+    stmt = upsert(ReadingAnalysisJob).values(
+        session_id=session.id, audio_filename=session.audio_filename,
+        status="pending", attempts=0, next_attempt_at=now,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ReadingAnalysisJob.session_id],
+        set_={
+            "audio_filename": stmt.excluded.audio_filename,
+            "status": "pending",
+            "attempts": 0,
+            "next_attempt_at": now,
+            "last_error": None,
+            "result": None,
+            "finished_at": None,
+        },
+        where=(ReadingAnalysisJob.audio_filename != stmt.excluded.audio_filename)
+        | (ReadingAnalysisJob.status == "failed"),
+    )
+    await db.execute(stmt)
+    return await get_analysis_job(db, session.id)
+
+
+async def get_analysis_job(db: AsyncSession, session_id: str) -> Optional[ReadingAnalysisJob]:
+    result = await db.execute(
+        select(ReadingAnalysisJob)
+        .where(ReadingAnalysisJob.session_id == session_id)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalars().first()
+
+
+async def wait_for_analysis(db: AsyncSession, session_id: str, timeout: float = 0) -> Optional[ReadingAnalysisJob]:
+    """Job done/failed bo'lguncha yoki timeout tugaguncha kutish (long-poll)"""
+    deadline = time.monotonic() + timeout
+    while True:
+        job = await get_analysis_job(db, session_id)
+        remaining = deadline - time.monotonic()
+        if job is None or job.status in TERMINAL_STATUSES or remaining <= 0:
+            return job
+        # Kutish paytida tranzaksiya ochiq qolmasin
+        await db.commit()
+        event = _waiters.setdefault(session_id, asyncio.Event())
+        try:
+            await asyncio.wait_for(event.wait(), timeout=min(remaining, 1.0))
+        except asyncio.TimeoutError:
+            # Job boshqa jarayonda bo'lishi mumkin — event qolib ketmasin, bazadan qayta o'qiymiz
+            _waiters.pop(session_id, None)
+
+
+def analysis_payload(job: ReadingAnalysisJob) -> Dict[str, Any]:
+    done = job.status == "done"
+    return {
+        "success": done,
+        "status": job.status,
+        "attempts": job.attempts,
+        "analysis": job.result if done else None,
+        "error": job.last_error if job.status == "failed" else None,
+    }
+
+
+_waiters: Dict[str, asyncio.Event] = {}
+
+
+def _notify(session_id: str) -> None:
+    event = _waiters.pop(session_id, None)
+    if event is not None:
+        event.set()
+
+
+# ============================================================
+# WORKER
+# ============================================================
+
+class ReadingAnalysisWorker:
+    """reading_analysis_jobs navbatini cheklangan parallellik bilan bo'shatuvchi fon worker'i."""
+
+    def __init__(
+        self,
+        session_factory,
+        stt=None,
+        storage=None,
+        concurrency: int = settings.READING_ANALYSIS_CONCURRENCY,
+        max_attempts: int = settings.READING_ANALYSIS_MAX_ATTEMPTS,
+        retry_base_seconds: float = settings.READING_ANALYSIS_RETRY_BASE_SECONDS,
+        lease_seconds: int = settings.READING_ANALYSIS_LEASE_SECONDS,
+        poll_seconds: float = settings.READING_ANALYSIS_POLL_SECONDS,
+    ):
+        if storage is None:
+            from shared.services.storage_service import get_storage_service
+            storage = get_storage_service()
+        self.session_factory = session_factory
+        self.stt = stt or get_stt_backend()
+        self.storage = storage
+        self.concurrency = max(1, concurrency)
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self.stats = {"done": 0, "retried": 0, "failed": 0}
+        self._wake: Optional[asyncio.Event] = None
+
+    def wake(self) -> None:
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _claim(self, limit: int) -> List[Any]:
+        now = datetime.now(timezone.utc)
+        async with self.session_factory() as db:
+            stmt = (
+                select(ReadingAnalysisJob.id, ReadingAnalysisJob.session_id,
+                       ReadingAnalysisJob.audio_filename, ReadingAnalysisJob.attempts)
+                .where(
+                    ReadingAnalysisJob.status.in_(["pending", "processing"]),
+                    ReadingAnalysisJob.next_attempt_at <= now,
+                )
+                .order_by(ReadingAnalysisJob.next_attempt_at)
+                .limit(limit)
+            )
+            if db.get_bind().dialect.name == "postgresql":
+                stmt = stmt.with_for_update(skip_locked=True)
+            rows = (await db.execute(stmt)).all()
+            if rows:
+                await db.execute(
+                    update(ReadingAnalysisJob)
+                    .where(ReadingAnalysisJob.id.in_([r.id for r in rows]))
+                    .values(status="processing", next_attempt_at=now + timedelta(seconds=self.lease_seconds))
+                    .execution_options(synchronize_session=False)
+                )
+            await db.commit()
+        return rows
+
+    async def _audio_chunks(self, filename: str) -> AsyncIterator[bytes]:
+        """Birinchi bo'lakni STT'dan oldin o'qiymiz — fayl yo'qligi aniq xato bo'lsin"""
+        chunks = self.storage.iter_audio(filename).__aiter__()
+        try:
+            first = await chunks.__anext__()
+        except (FileNotFoundError, StopAsyncIteration):
+            raise AnalysisError("Audio fayl topilmadi")
+
+        async def _stream():
+            yield first
+            async for chunk in chunks:
+                yield chunk
+
+        return _stream()
+
+    def _job_is_current(self, job):
+        # Worker ishlayotganda audio qayta yuklansa — natija eski audio'niki, yozilmaydi
+        return (
+            (ReadingAnalysisJob.id == job.id)
+            & (ReadingAnalysisJob.audio_filename == job.audio_filename)
+            & (ReadingAnalysisJob.status == "processing")
+        )
+
+    async def _load(self, db: AsyncSession, session_id: str):
+        session = (await db.execute(
+            select(ReadingSession).where(ReadingSession.id == session_id)
+        )).scalars().first()
+        task = None
+        if session is not None:
+            task = (await db.execute(
+                select(ReadingTask)
+                .options(selectinload(ReadingTask.competition))
+                .where(ReadingTask.id == session.task_id)
+            )).scalars().first()
+        if session is None or task is None:
+            raise AnalysisError("Sessiya yoki hikoya topilmadi")
+        return session, task
+
+    async def _analyze(self, job) -> None:
+        # STT kutilayotganda DB ulanishi band turmasin: o'qish va yozish alohida sessiyalarda
+        async with self.session_factory() as db:
+            _, task = await self._load(db, job.session_id)
+            language = getattr(task.competition, 'language', 'uz') if task.competition else "uz"
+
+        stt_result = await self.stt.transcribe(await self._audio_chunks(job.audio_filename), language)
+        if not stt_result.get("success"):
+            raise AnalysisError(stt_result.get("error") or "Ovoz tanib olinmadi")
+
+        async with self.session_factory() as db:
+            session, task = await self._load(db, job.session_id)
+            analysis = apply_stt_result(session, task, stt_result)
+            await refresh_competition_result(db, session.student_id, session.competition_id, task)
+            marked = await db.execute(
+                update(ReadingAnalysisJob)
+                .where(self._job_is_current(job))
+                .values(status="done", attempts=job.attempts + 1, last_error=None, result=analysis,
+                        finished_at=datetime.now(timezone.utc))
+                .execution_options(synchronize_session=False)
+            )
+            if marked.rowcount == 0:
+                await db.rollback()
+                return
+            await db.commit()
+
+    async def _process(self, job) -> str:
+        """Bitta job: "done" / "retry" / "failed" / "stale" qaytaradi"""
+        try:
+            await self._analyze(job)
+            outcome, error = "done", None
+        except asyncio.CancelledError:
+            raise
+        except AnalysisError as e:
+            outcome, error = "failed", str(e)
+        except Exception as e:
+            logger.warning(f"Reading analysis {job.session_id} attempt {job.attempts + 1} failed: {e}")
+            attempts = job.attempts + 1
+            outcome = "failed" if attempts >= self.max_attempts else "retry"
+            error = str(e) or e.__class__.__name__
+
+        if outcome != "done":
+            attempts = job.attempts + 1
+            now = datetime.now(timezone.utc)
+            values: Dict[str, Any] = {"attempts": attempts, "last_error": error[:1000]}
+            if outcome == "retry":
+                values.update(status="pending",
+                              next_attempt_at=now + timedelta(seconds=self.retry_base_seconds * 2 ** (attempts - 1)))
+            else:
+                values.update(status="failed", finished_at=now)
+            async with self.session_factory() as db:
+                await db.execute(
+                    update(ReadingAnalysisJob).where(self._job_is_current(job)).values(**values)
+                    .execution_options(synchronize_session=False)
+                )
+                await db.commit()
+
+        self.stats["retried" if outcome == "retry" else outcome] += 1
+        if outcome != "retry":
+            _notify(job.session_id)
+        return outcome
+
+    async def drain_once(self) -> int:
+        """Bo'sh slotlar sonicha job egallab tahlil qilish; egallangan jobs soni qaytadi"""
+        jobs = await self._claim(self.concurrency)
+        if jobs:
+            await asyncio.gather(*[self._process(job) for job in jobs])
+        return len(jobs)
+
+    async def run(self) -> None:
+        """
+        To'xtatilguncha: bo'sh slot bo'lsa yangi job'larni egallash, aks holda
+        biror job tugashini, wake() yoki poll intervalini kutish
+        """
+        self._wake = asyncio.Event()
+        in_flight: set = set()
+        try:
+            while True:
+                free = self.concurrency - len(in_flight)
+                if free > 0:
+                    try:
+                        for job in await self._claim(free):
+                            in_flight.add(asyncio.create_task(self._process(job)))
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception as e:
+                        logger.error(f"Reading analysis claim failed: {e}")
+                waiter = asyncio.create_task(self._wake.wait())
+                try:
+                    done, _ = await asyncio.wait(
+                        in_flight | {waiter}, timeout=self.poll_seconds, return_when=asyncio.FIRST_COMPLETED,
+                    )
+                finally:
+                    waiter.cancel()
+                self._wake.clear()
+                for task in done - {waiter}:
+                    in_flight.discard(task)
+                    if not task.cancelled() and task.exception() is not None:
+                        logger.error(f"Reading analysis job crashed: {task.exception()}")
+        finally:
+            for task in in_flight:
+                task.cancel()
+            await asyncio.gather(*in_flight, return_exceptions=True)
+
+
+_worker: Optional[ReadingAnalysisWorker] = None
+_worker_task: Optional[asyncio.Task] = None
+
+
+def start_reading_analysis(session_factory, **kwargs) -> asyncio.Task:
+    """Jarayondagi tahlil worker'ini ishga tushirish (lifespan startup)"""
+    global _worker, _worker_task
+    _worker = ReadingAnalysisWorker(session_factory, **kwargs)
+    _worker_task = asyncio.get_running_loop().create_task(_worker.run())
+    return _worker_task
+
+
+async def stop_reading_analysis() -> None:
+    global _worker, _worker_task
+    if _worker_task is not None:
+        _worker_task.cancel()
+        try:
+            await _worker_task
+        except (asyncio.CancelledError, Exception):
+            pass
+    _worker = _worker_task = None
+
+
+def wake_reading_analysis() -> None:
+    """Commit'dan keyin chaqiriladi: worker poll intervalini kutmasin"""
+    if _worker is not None:
+        _worker.wake()
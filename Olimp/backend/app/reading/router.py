@@ -10,6 +10,8 @@ Endpoints:
 - POST /competitions/{id}/test/submit — Test javoblarini yuborish
 - GET /competitions/{id}/my-results — Mening natijalarim
 - GET /competitions/{id}/leaderboard — Umumiy natijalar (4 guruh)
+- POST /sessions/{id}/audio — Ovoz yozuvini yuklash (tahlil navbatga qo'yiladi)
+- GET /sessions/{id}/analysis — Ovoz tahlili holati/natijasi (?wait= long-poll)
 """
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Request, UploadFile, File, Response as FastAPIResponse
@@ -19,8 +21,6 @@ from sqlalchemy.orm import selectinload
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
 from datetime import datetime, timezone
-import difflib
-import re
 import logging
 
 logger = logging.getLogger(__name__)
@@ -37,7 +37,12 @@ from shared.database.models.reading_competition import (
 from shared.database.models.coin import StudentCoin, CoinTransaction, TransactionType
 from shared.auth import verify_token
 from shared.services.storage_service import get_storage_service
+from shared.services.word_alignment import count_words, text_similarity, tokenize
 from shared.subscription import require_feature, SubscriptionInfo
+from app.reading.scoring import calculate_text_similarity, calculate_scores, refresh_competition_result
+from app.reading.analysis import (
+    enqueue_analysis, wait_for_analysis, analysis_payload, wake_reading_analysis,
+)
 
 router = APIRouter()
 security = HTTPBearer(auto_error=False)
@@ -100,83 +105,6 @@ class TestSubmit(BaseModel):
     answers: List[int]  # [0, 2, 1, 3, ...] — har bir savol uchun tanlangan variant
 
 
-# ============================================================
-# SCORING HELPERS
-# ============================================================
-
-def calculate_text_similarity(original: str, transcript: str) -> dict:
-    """Original matn va STT transcript taqqoslash"""
-    if not original or not transcript:
-        return {"completion_percentage": 0, "words_read": 0, "total_words": 0}
-
-    # Matnlarni so'zlarga ajratish (kichik harflarda)
-    orig_words = re.findall(r'\w+', original.lower())
-    trans_words = re.findall(r'\w+', transcript.lower())
-
-    total_words = len(orig_words)
-    if total_words == 0:
-        return {"completion_percentage": 0, "words_read": 0, "total_words": 0}
-
-    # SequenceMatcher bilan taqqoslash
-    matcher = difflib.SequenceMatcher(None, orig_words, trans_words)
-    ratio = matcher.ratio()
-
-    # O'qilgan so'zlar soni — matching bloklardan
-    matched_words = sum(block.size for block in matcher.get_matching_blocks())
-
-    return {
-        "completion_percentage": round(ratio * 100, 1),
-        "words_read": matched_words,
-        "total_words": total_words,
-    }
-
-
-def calculate_scores(
-    completion_pct: float,
-    words_read: int,
-    total_words: int,
-    reading_time: float,
-    questions_correct: int,
-    questions_total: int,
-) -> dict:
-    """100 ballik tizimda baholash"""
-
-    # 1. Matn to'liqligi (0-100)
-    score_completion = min(100, completion_pct * 1.05)
-
-    # 2. So'zlar soni (0-100) — nechta so'z o'qildi
-    score_words = min(100, (words_read / max(total_words, 1)) * 100)
-
-    # 3. Vaqt (0-100) — tezroq = yuqoriroq
-    # Benchmark: 1 so'z ~0.6 sek (ideal), 1.2 sek (sekin)
-    if reading_time > 0 and total_words > 0:
-        expected_time = total_words * 0.8  # o'rtacha kutilgan vaqt
-        time_ratio = expected_time / reading_time
-        score_time = max(0, min(100, time_ratio * 100))
-    else:
-        score_time = 0
-
-    # 4. Savollar (0-100)
-    if questions_total > 0:
-        score_questions = (questions_correct / questions_total) * 100
-    else:
-        score_questions = 0
-
-    # Jami (o'rtacha)
-    if questions_total > 0:
-        total = (score_completion + score_words + score_time + score_questions) / 4
-    else:
-        total = (score_completion + score_words + score_time) / 3
-
-    return {
-        "score_completion": round(score_completion, 1),
-        "score_words": round(score_words, 1),
-        "score_time": round(score_time, 1),
-        "score_questions": round(score_questions, 1),
-        "total_score": round(total, 1),
-    }
-
-
 # ============================================================
 # STUDENT ENDPOINTS
 # ============================================================
@@ -542,62 +470,8 @@ async def submit_reading(
         except Exception as e:
             logger.error(f"Reading coin award error: {e}")
 
-    # ============================================================
-    # UPDATE COMPETITION RESULT INSTANTLY FOR LEADERBOARD
-    # ============================================================
-    # Get all completed sessions for this competition
-    sessions_res = await db.execute(
-        select(ReadingSession).where(
-            ReadingSession.student_id == student.id,
-            ReadingSession.competition_id == comp_id,
-            ReadingSession.status == SessionStatus.completed,
-        )
-    )
-    all_sessions = sessions_res.scalars().all()
-    
-    daily_scores = {}
-    total_reading = 0
-    for s in all_sessions:
-        if s.task_id == task_id:
-            task_ref = task
-        else:
-            task_res = await db.execute(select(ReadingTask).where(ReadingTask.id == s.task_id))
-            task_ref = task_res.scalars().first()
-            
-        if task_ref:
-            day = task_ref.day_of_week.value
-            daily_scores[day] = {
-                "score_completion": s.score_completion,
-                "score_words": s.score_words,
-                "score_time": s.score_time,
-                "score_questions": s.score_questions,
-                "total_score": s.total_score,
-            }
-            total_reading += s.total_score
-
-    avg_reading = total_reading / max(len(all_sessions), 1)
-
-    # CompetitionResult yaratish yoki yangilash
-    result_res = await db.execute(
-        select(CompetitionResult).where(
-            CompetitionResult.student_id == student.id,
-            CompetitionResult.competition_id == comp_id,
-        )
-    )
-    comp_result = result_res.scalars().first()
-    
-    if not comp_result:
-        comp_result = CompetitionResult(
-            student_id=student.id,
-            competition_id=comp_id,
-            test_score=0.0,
-        )
-        db.add(comp_result)
-
-    comp_result.daily_scores = daily_scores
-    comp_result.total_reading_score = round(avg_reading, 1)
-    # total_score = 60% reading + 40% test
-    comp_result.total_score = round((avg_reading * 0.6) + ((comp_result.test_score or 0.0) * 0.4), 1)
+    # Leaderboard uchun CompetitionResult darhol yangilanadi
+    await refresh_competition_result(db, student.id, comp_id, task)
 
     await db.commit()
 
@@ -608,6 +482,7 @@ async def submit_reading(
             "completion_percentage": similarity["completion_percentage"],
             "words_read": similarity["words_read"],
             "total_words": similarity["total_words"],
+            "word_marks": similarity["word_marks"],
             "reading_time_seconds": data.reading_time_seconds,
             "words_per_minute": wpm,
             "questions_correct": questions_correct,
@@ -946,10 +821,12 @@ async def upload_voice_recording(
     extension = audio.filename.split(".")[-1] if "." in audio.filename else "webm"
     result = await storage.save_audio(audio_data, session_id, extension)
 
-    # Session yangilash
+    # Session yangilash va tahlilni navbatga qo'yish (STT fon worker'ida)
     session.audio_url = result["url"]
     session.audio_filename = result["filename"]
+    job = await enqueue_analysis(db, session)
     await db.commit()
+    wake_reading_analysis()
 
     return {
         "success": True,
@@ -957,23 +834,12 @@ async def upload_voice_recording(
         "audio": {
             "url": result["url"],
             "file_size": result["file_size"],
-        }
+        },
+        "analysis": analysis_payload(job),
     }
 
 
-@router.post("/sessions/{session_id}/analyze")
-async def analyze_voice_recording(
-    session_id: str,
-    db: AsyncSession = Depends(get_db),
-    student: User = Depends(get_current_student),
-):
-    """
-    Ovoz yozuvini tahlil qilish — STT + scoring
-
-    Avval ovoz yozuvi yuklangan bo'lishi kerak.
-    STT qiladi, matnni taqqoslaydi, ballarni hisoblaydi.
-    """
-    # Session tekshirish
+async def _get_own_session(db: AsyncSession, session_id: str, student: User) -> ReadingSession:
     session_res = await db.execute(
         select(ReadingSession).where(
             ReadingSession.id == session_id,
@@ -983,158 +849,49 @@ async def analyze_voice_recording(
     session = session_res.scalars().first()
     if not session:
         raise HTTPException(status_code=404, detail="Sessiya topilmadi")
+    return session
 
-    if not session.audio_url:
-        raise HTTPException(status_code=400, detail="Avval ovoz yozuvini yuklang")
-
-    # Task va original matnni olish (eager-load competition to avoid async lazy-load)
-    task_res = await db.execute(
-        select(ReadingTask)
-        .options(selectinload(ReadingTask.competition))
-        .where(ReadingTask.id == session.task_id)
-    )
-    task = task_res.scalars().first()
-    if not task:
-        raise HTTPException(status_code=404, detail="Hikoya topilmadi")
 
-    # Audio faylini olish (Azure Blob)
-    storage = get_storage_service()
-    if session.audio_filename:
-        audio_data = await storage.get_audio_data(session.audio_filename)
-        if not audio_data:
-            raise HTTPException(status_code=404, detail="Audio fayl topilmadi")
-    else:
-        raise HTTPException(status_code=400, detail="Audio fayl yo'q")
-
-    # STT qilish (Azure Speech Service)
-    try:
-        language = getattr(task.competition, 'language', 'uz') if task.competition else "uz"
-        stt_result = await speech_service.speech_to_text(audio_data, language=language)
-    except Exception as e:
-        logger.error(f"STT xatoligi: {e}")
-        raise HTTPException(status_code=500, detail=f"STT xatoligi: {str(e)}")
-
-    if not stt_result.get("success"):
-        return {
-            "success": False,
-            "error": stt_result.get("error", "Ovoz tanib olinmadi"),
-            "transcript": "",
-        }
-
-    transcript = stt_result.get("transcript", "")
-
-    # Matnni taqqoslash
-    similarity = calculate_text_similarity(task.story_text, transcript)
-
-    # Reading speed (words per minute) - Azure returns actual duration
-    azure_duration = stt_result.get("duration", 0) / 10000000.0  # Azure duration is in 100-nanosecond units
-    duration_seconds = max(azure_duration, session.reading_time_seconds or 0)
-    words_per_minute = 0
-    if duration_seconds > 0:
-        words_per_minute = round((similarity["words_read"] / duration_seconds) * 60, 1)
-
-    # Accuracy (so'zlarning to'g'riligi)
-    accuracy_percentage = similarity["completion_percentage"]
-
-    # Session yangilash
-    session.stt_transcript = transcript
-    session.words_read = similarity["words_read"]
-    session.total_words = similarity["total_words"]
-    session.completion_percentage = similarity["completion_percentage"]
-    session.audio_duration_seconds = duration_seconds
-
-    # Ballarni hisoblash
-    scores = calculate_scores(
-        completion_pct=similarity["completion_percentage"],
-        words_read=similarity["words_read"],
-        total_words=similarity["total_words"],
-        reading_time=duration_seconds,
-        questions_correct=session.questions_correct or 0,
-        questions_total=session.questions_total or 0,
-    )
-
-    session.score_completion = scores["score_completion"]
-    session.score_words = scores["score_words"]
-    session.score_time = scores["score_time"]
-    session.score_questions = scores["score_questions"]
-    session.total_score = scores["total_score"]
-    
-    session.status = SessionStatus.completed
-    session.completed_at = datetime.now(timezone.utc)
-
-    # ============================================================
-    # UPDATE COMPETITION RESULT INSTANTLY FOR LEADERBOARD
-    # ============================================================
-    from shared.database.models.reading_competition import CompetitionResult
-    # Get comp_id from session's competition_id
-    comp_id = session.competition_id
-    
-    sessions_res = await db.execute(
-        select(ReadingSession).where(
-            ReadingSession.student_id == student.id,
-            ReadingSession.competition_id == comp_id,
-            ReadingSession.status == SessionStatus.completed,
-        )
-    )
-    all_sessions = sessions_res.scalars().all()
-    
-    daily_scores = {}
-    total_reading = 0
-    for s in all_sessions:
-        if s.task_id == session.task_id:
-            task_ref = task
-        else:
-            task_res_loop = await db.execute(select(ReadingTask).where(ReadingTask.id == s.task_id))
-            task_ref = task_res_loop.scalars().first()
-            
-        if task_ref:
-            day = task_ref.day_of_week.value
-            daily_scores[day] = {
-                "score_completion": s.score_completion,
-                "score_words": s.score_words,
-                "score_time": s.score_time,
-                "score_questions": s.score_questions,
-                "total_score": s.total_score,
-            }
-            total_reading += s.total_score
+@router.post("/sessions/{session_id}/analyze")
+async def analyze_voice_recording(
+    session_id: str,
+    wait: float = Query(0, ge=0, le=30, description="Natijani kutish, soniya (long-poll)"),
+    db: AsyncSession = Depends(get_db),
+    student: User = Depends(get_current_student),
+):
+    """
+    Ovoz yozuvini tahlilga qo'yish — STT + scoring fon worker'ida
 
-    avg_reading = total_reading / max(len(all_sessions), 1)
+    Avval ovoz yozuvi yuklangan bo'lishi kerak (yuklash o'zi ham navbatga
+    qo'yadi). Idempotent: takroriy chaqiruv yangi job yaratmaydi, faqat
+    xato bilan tugagan tahlilni qayta boshlaydi. Javob — job holati;
+    status="done" bo'lsa "analysis" da ballar.
+    """
+    session = await _get_own_session(db, session_id, student)
+    if not session.audio_filename:
+        raise HTTPException(status_code=400, detail="Avval ovoz yozuvini yuklang")
 
-    result_res = await db.execute(
-        select(CompetitionResult).where(
-            CompetitionResult.student_id == student.id,
-            CompetitionResult.competition_id == comp_id,
-        )
-    )
-    comp_result = result_res.scalars().first()
-    
-    if not comp_result:
-        comp_result = CompetitionResult(
-            student_id=student.id,
-            competition_id=comp_id,
-            test_score=0.0,
-        )
-        db.add(comp_result)
+    await enqueue_analysis(db, session)
+    await db.commit()
+    wake_reading_analysis()
 
-    comp_result.daily_scores = daily_scores
-    comp_result.total_reading_score = round(avg_reading, 1)
-    comp_result.total_score = round((avg_reading * 0.6) + ((comp_result.test_score or 0.0) * 0.4), 1)
+    job = await wait_for_analysis(db, session_id, wait)
+    return analysis_payload(job)
 
-    await db.commit()
 
-    return {
-        "success": True,
-        "analysis": {
-            "transcript": transcript,
-            "words_read": similarity["words_read"],
-            "total_words": similarity["total_words"],
-            "completion_percentage": similarity["completion_percentage"],
-            "reading_time_seconds": round(duration_seconds, 1),
-            "words_per_minute": words_per_minute,
-            "accuracy_percentage": accuracy_percentage,
-            **scores,
-        }
-    }
+@router.get("/sessions/{session_id}/analysis")
+async def get_voice_analysis(
+    session_id: str,
+    wait: float = Query(0, ge=0, le=30, description="Natijani kutish, soniya (long-poll)"),
+    db: AsyncSession = Depends(get_db),
+    student: User = Depends(get_current_student),
+):
+    """Ovoz tahlili holati: pending / processing / done (analysis bilan) / failed (error bilan)"""
+    await _get_own_session(db, session_id, student)
+    job = await wait_for_analysis(db, session_id, wait)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Tahlil topilmadi — avval ovoz yozuvini yuklang")
+    return analysis_payload(job)
 
 
 # ============================================================
@@ -1143,7 +900,7 @@ async def analyze_voice_recording(
 
 from fastapi import Header, Form
 from app.core.config import settings
-import httpx
+from shared.services.http_client import get_http_client
 
 
 async def verify_admin_key(x_admin_key: str = Header(..., alias="X-Admin-Key")):
@@ -1337,7 +1094,7 @@ async def create_task(
         raise HTTPException(status_code=404, detail="Musobaqa topilmadi")
 
     # So'zlar sonini hisoblash
-    total_words = len(re.findall(r'\w+', data.story_text)) if data.story_text else 0
+    total_words = count_words(data.story_text) if data.story_text else 0
 
     task = ReadingTask(
         competition_id=comp_id,
@@ -1386,7 +1143,7 @@ async def update_task(
 
     # So'zlar sonini qayta hisoblash
     if data.story_text:
-        task.total_words = len(re.findall(r'\w+', data.story_text))
+        task.total_words = count_words(data.story_text)
 
     await db.commit()
     await db.refresh(task)
@@ -1426,7 +1183,7 @@ async def evaluate_quiz_answer_text(
     """
     Frontend'dan tayyor matn (STT orqali olingan) qabul qilinib,
     admin bergan to'g'ri javob bilan 100 ballik shkalada solishtiriladi.
-    GPT-4o-mini semantic baholash qo'llaniladi, xato bo'lsa difflib fallback.
+    GPT-4o-mini semantic baholash qo'llaniladi, xato bo'lsa matn o'xshashligi fallback.
     """
     import os
 
@@ -1453,43 +1210,42 @@ async def evaluate_quiz_answer_text(
 
     if api_key and recognized_clean and correct_answer:
         try:
-            async with httpx.AsyncClient(timeout=15) as client:
-                prompt = (
-                    f"Savol: {question_text}\n"
-                    f"To'g'ri javob: {correct_answer}\n"
-                    f"Bola aytgan: {recognized_clean}\n\n"
-                    "Bolaning javobi ma'nosi jihatidan to'g'ri javobga qanchalik mos kelishini "
-                    "0 dan 100 gacha faqat bitta butun son bilan baholang. "
-                    "100 = to'liq mos, 0 = mutlaqo noto'g'ri. "
-                    "Faqat son qaytaring, boshqa hech narsa yozmang."
-                )
-                resp = await client.post(
-                    "https://api.openai.com/v1/chat/completions",
-                    headers={"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
-                    json={
-                        "model": "gpt-4o-mini",
-                        "messages": [{"role": "user", "content": prompt}],
-                        "temperature": 0.0,
-                        "max_tokens": 5,
-                    }
-                )
-                if resp.status_code == 200:
-                    raw = resp.json()["choices"][0]["message"]["content"].strip()
-                    digits = "".join(filter(str.isdigit, raw))[:3]
-                    score = max(0, min(100, int(digits or "0")))
-                    ai_used = True
+            prompt = (
+                f"Savol: {question_text}\n"
+                f"To'g'ri javob: {correct_answer}\n"
+                f"Bola aytgan: {recognized_clean}\n\n"
+                "Bolaning javobi ma'nosi jihatidan to'g'ri javobga qanchalik mos kelishini "
+                "0 dan 100 gacha faqat bitta butun son bilan baholang. "
+                "100 = to'liq mos, 0 = mutlaqo noto'g'ri. "
+                "Faqat son qaytaring, boshqa hech narsa yozmang."
+            )
+            resp = await get_http_client("openai").post(
+                "https://api.openai.com/v1/chat/completions",
+                headers={"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
+                json={
+                    "model": "gpt-4o-mini",
+                    "messages": [{"role": "user", "content": prompt}],
+                    "temperature": 0.0,
+                    "max_tokens": 5,
+                },
+                timeout=15,
+            )
+            if resp.status_code == 200:
+                raw = resp.json()["choices"][0]["message"]["content"].strip()
+                digits = "".join(filter(str.isdigit, raw))[:3]
+                score = max(0, min(100, int(digits or "0")))
+                ai_used = True
         except Exception as e:
-            logger.warning(f"AI evaluation failed, falling back to difflib: {e}")
+            logger.warning(f"AI evaluation failed, falling back to text matching: {e}")
 
     # ── 2. Fallback: keyword + sequence matching ──
     if score is None:
         score = 0
-        r_lower = recognized_clean.lower()
-        c_lower = correct_answer.lower()
-        if r_lower and c_lower:
-            ratio = difflib.SequenceMatcher(None, r_lower, c_lower).ratio()
-            correct_words = set(c_lower.split())
-            recognized_words = set(r_lower.split())
+        if recognized_clean.strip() and correct_answer.strip():
+            # Kirill/lotin va apostrof farqlari hisobga olinmaydi
+            ratio = text_similarity(recognized_clean, correct_answer)
+            correct_words = set(tokenize(correct_answer))
+            recognized_words = set(tokenize(recognized_clean))
             keyword_ratio = len(correct_words & recognized_words) / len(correct_words) if correct_words else 0
             score = int((ratio * 0.5 + keyword_ratio * 0.5) * 100)
             score = min(100, max(0, score))
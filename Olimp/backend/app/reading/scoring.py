@@ -0,0 +1,201 @@
+"""
+Reading Competition — baholash yordamchilari
+
+router.py (submit) va analysis.py (fon STT tahlili) ikkalasi ham shu
+funksiyalar bilan ball qo'yadi va CompetitionResult'ni yangilaydi.
+"""
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from shared.database.models.reading_competition import (
+    ReadingTask, ReadingSession, CompetitionResult, SessionStatus,
+)
+from shared.services.word_alignment import align_words
+
+
+def calculate_text_similarity(original: str, transcript: str) -> dict:
+    """
+    Original matn va STT transcript taqqoslash (so'zma-so'z tekislash).
+    word_marks — har bir hikoya so'zi: correct / substituted / skipped.
+    """
+    if not original or not transcript:
+        return {"completion_percentage": 0, "words_read": 0, "total_words": 0, "word_marks": []}
+
+    alignment = align_words(original, transcript)
+    if alignment.total_words == 0:
+        return {"completion_percentage": 0, "words_read": 0, "total_words": 0, "word_marks": []}
+
+    return {
+        # 2·mos / (hikoya + transcript) — avvalgi SequenceMatcher.ratio bilan bir xil shkala
+        "completion_percentage": round(alignment.ratio * 100, 1),
+        "words_read": alignment.correct,
+        "total_words": alignment.total_words,
+        "word_marks": alignment.marks_payload(),
+    }
+
+
+def calculate_scores(
+    completion_pct: float,
+    words_read: int,
+    total_words: int,
+    reading_time: float,
+    questions_correct: int,
+    questions_total: int,
+) -> dict:
+    """100 ballik tizimda baholash"""
+
+    # 1. Matn to'liqligi (0-100)
+    score_completion = min(100, completion_pct * 1.05)
+
+    # 2. So'zlar soni (0-100) — nechta so'z o'qildi
+    score_words = min(100, (words_read / max(total_words, 1)) * 100)
+
+    # 3. Vaqt (0-100) — tezroq = yuqoriroq
+    # Benchmark: 1 so'z ~0.6 sek (ideal), 1.2 sek (sekin)
+    if reading_time > 0 and total_words > 0:
+        expected_time = total_words * 0.8  # o'rtacha kutilgan vaqt
+        time_ratio = expected_time / reading_time
+        score_time = max(0, min(100, time_ratio * 100))
+    else:
+        score_time = 0
+
+    # 4. Savollar (0-100)
+    if questions_total > 0:
+        score_questions = (questions_correct / questions_total) * 100
+    else:
+        score_questions = 0
+
+    # Jami (o'rtacha)
+    if questions_total > 0:
+        total = (score_completion + score_words + score_time + score_questions) / 4
+    else:
+        total = (score_completion + score_words + score_time) / 3
+
+    return {
+        "score_completion": round(score_completion, 1),
+        "score_words": round(score_words, 1),
+        "score_time": round(score_time, 1),
+        "score_questions": round(score_questions, 1),
+        "total_score": round(total, 1),
+    }
+
+
+def apply_stt_result(session: ReadingSession, task: ReadingTask, stt_result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    STT natijasini sessiyaga yozish: matn taqqoslash, tezlik, ballar,
+    status=completed. Tahlil natijasini (API javobidagi "analysis") qaytaradi.
+    """
+    transcript = stt_result.get("transcript", "")
+    similarity = calculate_text_similarity(task.story_text, transcript)
+
+    # Reading speed (words per minute) - Azure returns actual duration
+    azure_duration = (stt_result.get("duration") or 0) / 10000000.0  # Azure duration is in 100-nanosecond units
+    duration_seconds = max(azure_duration, session.reading_time_seconds or 0)
+    words_per_minute = 0
+    if duration_seconds > 0:
+        words_per_minute = round((similarity["words_read"] / duration_seconds) * 60, 1)
+
+    session.stt_transcript = transcript
+    session.words_read = similarity["words_read"]
+    session.total_words = similarity["total_words"]
+    session.completion_percentage = similarity["completion_percentage"]
+    session.audio_duration_seconds = duration_seconds
+
+    scores = calculate_scores(
+        completion_pct=similarity["completion_percentage"],
+        words_read=similarity["words_read"],
+        total_words=similarity["total_words"],
+        reading_time=duration_seconds,
+        questions_correct=session.questions_correct or 0,
+        questions_total=session.questions_total or 0,
+    )
+    session.score_completion = scores["score_completion"]
+    session.score_words = scores["score_words"]
+    session.score_time = scores["score_time"]
+    session.score_questions = scores["score_questions"]
+    session.total_score = scores["total_score"]
+
+    session.status = SessionStatus.completed
+    session.completed_at = datetime.now(timezone.utc)
+
+    return {
+        "transcript": transcript,
+        "words_read": similarity["words_read"],
+        "total_words": similarity["total_words"],
+        "completion_percentage": similarity["completion_percentage"],
+        "reading_time_seconds": round(duration_seconds, 1),
+        "words_per_minute": words_per_minute,
+        "accuracy_percentage": similarity["completion_percentage"],
+        "word_marks": similarity["word_marks"],
+        **scores,
+    }
+
+
+async def refresh_competition_result(
+    db: AsyncSession,
+    student_id: str,
+    comp_id: str,
+    task: Optional[ReadingTask] = None,
+) -> CompetitionResult:
+    """
+    Leaderboard uchun CompetitionResult'ni darhol qayta hisoblash:
+    yakunlangan sessiyalar bo'yicha kunlik ballar va o'rtacha (60% o'qish + 40% test).
+    """
+    # Sessiyalar autoflush=False — joriy sessiya o'zgarishlari so'rovda ko'rinsin
+    await db.flush()
+    sessions_res = await db.execute(
+        select(ReadingSession).where(
+            ReadingSession.student_id == student_id,
+            ReadingSession.competition_id == comp_id,
+            ReadingSession.status == SessionStatus.completed,
+        )
+    )
+    all_sessions = sessions_res.scalars().all()
+
+    tasks = {task.id: task} if task is not None else {}
+    missing = {s.task_id for s in all_sessions} - set(tasks)
+    if missing:
+        task_res = await db.execute(select(ReadingTask).where(ReadingTask.id.in_(missing)))
+        tasks.update({t.id: t for t in task_res.scalars().all()})
+
+    daily_scores = {}
+    total_reading = 0
+    for s in all_sessions:
+        task_ref = tasks.get(s.task_id)
+        if task_ref:
+            day = task_ref.day_of_week.value
+            daily_scores[day] = {
+                "score_completion": s.score_completion,
+                "score_words": s.score_words,
+                "score_time": s.score_time,
+                "score_questions": s.score_questions,
+                "total_score": s.total_score,
+            }
+            total_reading += s.total_score
+
+    avg_reading = total_reading / max(len(all_sessions), 1)
+
+    result_res = await db.execute(
+        select(CompetitionResult).where(
+            CompetitionResult.student_id == student_id,
+            CompetitionResult.competition_id == comp_id,
+        )
+    )
+    comp_result = result_res.scalars().first()
+
+    if not comp_result:
+        comp_result = CompetitionResult(
+            student_id=student_id,
+            competition_id=comp_id,
+            test_score=0.0,
+        )
+        db.add(comp_result)
+
+    comp_result.daily_scores = daily_scores
+    comp_result.total_reading_score = round(avg_reading, 1)
+    # total_score = 60% reading + 40% test
+    comp_result.total_score = round((avg_reading * 0.6) + ((comp_result.test_score or 0.0) * 0.4), 1)
+    return comp_result
@@ -0,0 +1,131 @@
+"""
+Benchmark: olimpiada javoblarini baholash (submit_answers ning baholash qismi).
+
+Sintetik olimpiada (native savollar + SavedTest savollari) uchun 10k submission
+yaratiladi va ikki yo'l o'lchanadi:
+
+    legacy   — eski sikl: har bir javob uchun ID parse, dict'lardan qidirish va
+               har bir savolga INFO log (DB so'rovlari bu yerda yo'q, ya'ni eski
+               yo'lning eng yaxshi holati; haqiqatda har bir native javob uchun
+               alohida SELECT ham bo'lardi)
+    compiled — grading.compile_answer_key + grade_submission (bitta o'tish)
+
+Har ikki yo'l aralashtirishsiz (legacy student_id) va JWT so'rovi kabi variant
+aralashtirishini qaytarish bilan o'lchanadi — ikkinchisida vaqtning katta qismi
+_option_permutation (SHA-256 + seeded shuffle) ga ketadi.
+app.olimp.router import qilinadi, shuning uchun DATABASE_URL, JWT_SECRET va
+ADMIN_SECRET_KEY env (yoki DEBUG=true) kerak.
+
+    cd Olimp/backend
+    DEBUG=true python bench_grading.py --submissions 10000 --native 40 --saved-tests 2
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.olimp.grading import compile_answer_key, grade_submission
+from app.olimp.router import _option_permutation
+
+logger = logging.getLogger("olimp")
+
+
+def _legacy_grade(native_by_id, saved_map, answers, perm):
+    total_score = correct_count = 0
+    for answer in answers:
+        question_data = None
+        n_options = 0
+        logger.info(f"Checking question_id: {answer.question_id}")
+        if str(answer.question_id).startswith("testai_"):
+            parts = str(answer.question_id).split("_")
+            st_obj = saved_map.get(parts[1])
+            st_q = st_obj.questions[int(parts[2])]
+            question_data = {"correct_answer": st_q.get("correct"), "points": st_q.get("points", 5)}
+            n_options = len(st_q.get("options") or [])
+        else:
+            question = native_by_id.get(answer.question_id)
+            question_data = {"correct_answer": question.correct_answer, "points": question.points}
+            n_options = len(question.options or [])
+
+        submitted = int(answer.answer_index)
+        if perm:
+            submitted = perm(answer.question_id, n_options)[submitted]
+        is_correct = int(submitted) == int(question_data["correct_answer"])
+        points = question_data["points"] if is_correct else 0
+        logger.info(f"Result for q={answer.question_id}: is_correct={is_correct}, points={points}")
+        total_score += points
+        correct_count += is_correct
+    return total_score, correct_count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--submissions", type=int, default=10_000)
+    parser.add_argument("--native", type=int, default=40)
+    parser.add_argument("--saved-tests", type=int, default=2)
+    parser.add_argument("--saved-questions", type=int, default=10)
+    parser.add_argument("--log-level", default="INFO", help="olimp logger darajasi (prod: INFO)")
+    args = parser.parse_args()
+
+    logging.basicConfig(stream=open(os.devnull, "w"))
+    logger.setLevel(args.log_level)
+
+    rng = random.Random(1)
+    native = [
+        SimpleNamespace(id=str(10_000_000 + i), correct_answer=rng.randrange(4), points=5,
+                        options=["a", "b", "c", "d"])
+        for i in range(args.native)
+    ]
+    saved = [
+        SimpleNamespace(id=str(20_000_000 + s), questions=[
+            {"correct": rng.randrange(4), "points": 5, "options": ["a", "b", "c", "d"]}
+            for _ in range(args.saved_questions)
+        ])
+        for s in range(args.saved_tests)
+    ]
+    question_ids = [q.id for q in native]
+    question_ids += [f"testai_{st.id}_{i}" for st in saved for i in range(len(st.questions))]
+
+    submissions = []
+    for n in range(args.submissions):
+        user_id = str(30_000_000 + n)
+        answers = [SimpleNamespace(question_id=qid, answer_index=rng.randrange(4)) for qid in question_ids]
+        perm = (lambda uid: lambda qid, k: _option_permutation(uid, "bench", qid, k))(user_id)
+        submissions.append((answers, perm))
+
+    native_by_id = {q.id: q for q in native}
+    saved_map = {st.id: st for st in saved}
+    started = time.perf_counter()
+    key = compile_answer_key(native, saved)
+    compile_elapsed = time.perf_counter() - started
+
+    total = args.submissions
+    print(f"{total} submission x {len(question_ids)} savol, kalit kompilyatsiyasi {compile_elapsed * 1000:.2f}ms")
+    for label, shuffled in (("unshuffled", False), ("shuffled", True)):
+        started = time.perf_counter()
+        legacy = [
+            _legacy_grade(native_by_id, saved_map, answers, perm if shuffled else None)
+            for answers, perm in submissions
+        ]
+        legacy_elapsed = time.perf_counter() - started
+
+        started = time.perf_counter()
+        compiled = [grade_submission(key, answers, perm if shuffled else None) for answers, perm in submissions]
+        compiled_elapsed = time.perf_counter() - started
+
+        assert legacy == [(r.total_score, r.correct_count) for r in compiled]
+        print(f"  {label}:")
+        print(f"    legacy:   {legacy_elapsed:.2f}s  {total / legacy_elapsed:,.0f} submission/s "
+              f"(+{args.native} SELECT har bir submission uchun DB'da)")
+        print(f"    compiled: {compiled_elapsed:.2f}s  {total / compiled_elapsed:,.0f} submission/s (DB so'rovi 0)")
+
+
+if __name__ == "__main__":
+    main()
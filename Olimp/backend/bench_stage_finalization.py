@@ -0,0 +1,199 @@
+"""
+Benchmark: ko'p bosqichli olimpiada bosqichini yakunlash (finalize_stage).
+
+Sintetik bosqich: --rows ta natija (har biri alohida ishtirokchi), maktablar
+14 viloyat × 14 tuman × --schools bo'yicha taqsimlangan, score va vaqt
+tengliklari ko'p. Ikki yo'l bir xil ma'lumot ustida (har biri toza nusxada):
+
+    legacy — eski finalize_stage: barcha natija va ishtirokchilarni ORM'ga
+             yuklash, Python'da guruhlash/saralash, rank'larni ORM flush bilan
+             qatorma-qator yozish. Ishtirokchilar olympiad_id bo'yicha
+             o'qiladi — eski kodning IN (p_ids) si 32767 dan ortiq natijada
+             asyncpg bind parametr limitiga urilib umuman ishlamaydi
+    sql    — stage_finalization.run_finalization: GROUP BY reja, bo'laklab
+             ROW_NUMBER() OVER (PARTITION BY scope) UPDATE + current_stage
+
+Natijalar (rank, is_passed, current_stage) ikkala yo'lda solishtiriladi.
+Standart baza — vaqtinchalik SQLite fayl; Postgres uchun --database-url.
+shared.database va app.olimp.* import qilinadi, shuning uchun DATABASE_URL
+(faqat import uchun — bench o'z engine'ini ochadi), JWT_SECRET va
+ADMIN_SECRET_KEY env kerak.
+
+    cd Olimp/backend
+    python bench_stage_finalization.py --rows 500000
+    python bench_stage_finalization.py --rows 500000 --scope region --skip-legacy
+    python bench_stage_finalization.py --database-url postgresql+asyncpg://u:p@localhost/bench
+"""
+import argparse
+import asyncio
+import os
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from sqlalchemy import delete, insert, select, update  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+
+from shared.database.base import Base  # noqa: E402
+from shared.database.models.olympiad import OlympiadParticipant  # noqa: E402
+from shared.database.models.olympiad_stage import (  # noqa: E402
+    OlympiadStage, OlympiadStageFinalization, OlympiadStageResult, ScopeType,
+)
+from app.olimp.stage_finalization import (  # noqa: E402
+    calculate_passing_count, enqueue_finalization, run_finalization,
+)
+
+TABLES = [OlympiadParticipant.__table__, OlympiadStage.__table__, OlympiadStageResult.__table__,
+          OlympiadStageFinalization.__table__]
+OLYMPIAD_ID = "o0000001"
+STAGE_ID = "st000001"
+INSERT_BATCH = 20_000
+
+
+async def _seed(engine, rows: int, schools: int, scope: ScopeType):
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda c: Base.metadata.drop_all(c, tables=TABLES))
+        await conn.run_sync(lambda c: Base.metadata.create_all(c, tables=TABLES))
+        await conn.execute(insert(OlympiadStage).values(
+            id=STAGE_ID, olympiad_id=OLYMPIAD_ID, stage_number=1, scope_type=scope,
+            passing_percent=30.0, passing_min_count=1,
+        ))
+    rng = random.Random(42)
+    for start in range(0, rows, INSERT_BATCH):
+        participants, results = [], []
+        for i in range(start, min(rows, start + INSERT_BATCH)):
+            participants.append({
+                "id": f"p{i:07d}", "olympiad_id": OLYMPIAD_ID, "student_id": f"s{i:07d}", "current_stage": 1,
+                "region": f"Viloyat {rng.randrange(14):02d}", "district": f"Tuman {rng.randrange(14):02d}",
+                "school_number": rng.randint(1, schools),
+            })
+            results.append({
+                "id": f"r{i:07d}", "participant_id": f"p{i:07d}", "stage_id": STAGE_ID,
+                "score": float(rng.randint(0, 40) * 2.5), "duration_seconds": rng.randint(300, 3600) // 30 * 30,
+            })
+        async with engine.begin() as conn:
+            await conn.execute(insert(OlympiadParticipant), participants)
+            await conn.execute(insert(OlympiadStageResult), results)
+
+
+async def _legacy(factory):
+    """Eski finalize_stage tanasi (HTTPException va javobsiz)"""
+    async with factory() as db:
+        stage = await db.get(OlympiadStage, STAGE_ID)
+        results = (await db.execute(
+            select(OlympiadStageResult).where(OlympiadStageResult.stage_id == STAGE_ID)
+        )).scalars().all()
+        participants = {p.id: p for p in (await db.execute(
+            select(OlympiadParticipant).where(OlympiadParticipant.olympiad_id == OLYMPIAD_ID)
+        )).scalars().all()}
+
+        groups = {}
+        for r in results:
+            p = participants.get(r.participant_id)
+            if not p:
+                continue
+            if stage.scope_type == ScopeType.school:
+                key = f"{p.region}|{p.district}|{p.school_number}"
+            elif stage.scope_type == ScopeType.district:
+                key = f"{p.region}|{p.district}"
+            elif stage.scope_type == ScopeType.region:
+                key = f"{p.region}"
+            else:
+                key = "republic"
+            groups.setdefault(key, []).append((r, p))
+
+        for members in groups.values():
+            # id — tenglikda solishtirish uchun (eski kodda so'rov tartibi)
+            sorted_members = sorted(members, key=lambda x: (-x[0].score, x[0].duration_seconds, x[0].id))
+            pass_count = calculate_passing_count(len(sorted_members), stage.passing_percent, stage.passing_min_count)
+            for i, (result, participant) in enumerate(sorted_members):
+                result.rank_in_group = i + 1
+                if i < pass_count:
+                    result.is_passed = True
+                    participant.current_stage = stage.stage_number + 1
+                else:
+                    result.is_passed = False
+        await db.commit()
+        return len(groups)
+
+
+async def _sql(factory, chunk_rows):
+    async with factory() as db:
+        job = await enqueue_finalization(db, await db.get(OlympiadStage, STAGE_ID))
+    summary = await run_finalization(factory, job.id, chunk_rows=chunk_rows)
+    assert summary["status"] == "completed", summary
+    return summary["groups_count"]
+
+
+async def _snapshot(factory):
+    async with factory() as db:
+        rows = (await db.execute(
+            select(OlympiadStageResult.id, OlympiadStageResult.rank_in_group, OlympiadStageResult.is_passed,
+                   OlympiadParticipant.current_stage)
+            .join(OlympiadParticipant, OlympiadParticipant.id == OlympiadStageResult.participant_id)
+        )).all()
+    return {r[0]: (r[1], bool(r[2]), r[3]) for r in rows}
+
+
+async def _reset(factory):
+    async with factory() as db:
+        await db.execute(update(OlympiadStageResult).values(rank_in_group=None, is_passed=False))
+        await db.execute(update(OlympiadParticipant).values(current_stage=1))
+        await db.execute(delete(OlympiadStageFinalization))
+        await db.commit()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--schools", type=int, default=30, help="har bir tumandagi maktablar soni")
+    parser.add_argument("--scope", default="school", choices=[s.value for s in ScopeType])
+    parser.add_argument("--chunk-rows", type=int, default=50_000)
+    parser.add_argument("--database-url", default=None, help="standart: vaqtinchalik SQLite fayl")
+    parser.add_argument("--skip-legacy", action="store_true")
+    args = parser.parse_args()
+
+    tmp = None
+    url = args.database_url
+    if url is None:
+        tmp = tempfile.mkdtemp()
+        url = f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}"
+    engine = create_async_engine(url)
+    factory = async_sessionmaker(engine, expire_on_commit=False, autoflush=False)
+    try:
+        started = time.perf_counter()
+        await _seed(engine, args.rows, args.schools, ScopeType(args.scope))
+        print(f"{args.rows:,} natija, scope={args.scope}, baza={engine.dialect.name} "
+              f"(seed {time.perf_counter() - started:.1f}s)")
+
+        snapshots = {}
+        for mode in ("sql", "legacy"):  # sql avval — peak RSS o'sishi legacy'dan ta'sirlanmasin
+            if mode == "legacy" and args.skip_legacy:
+                continue
+            await _reset(factory)
+            rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            started = time.perf_counter()
+            groups = await (_legacy(factory) if mode == "legacy" else _sql(factory, args.chunk_rows))
+            elapsed = time.perf_counter() - started
+            rss_growth = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) / 1024
+            snapshots[mode] = await _snapshot(factory)
+            print(f"  {mode:<6} {elapsed:8.2f}s  guruhlar={groups:,}  "
+                  f"{args.rows / elapsed:10,.0f} natija/s  peak RSS o'sishi {rss_growth:6.0f} MB")
+        if len(snapshots) == 2:
+            same = snapshots["legacy"] == snapshots["sql"]
+            print(f"  rank/is_passed/current_stage bir xil: {'ha' if same else 'YO‘Q'}")
+    finally:
+        await engine.dispose()
+        if tmp:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,124 @@
+"""
+Benchmark: o'qish tahlilida hikoya matni va STT transcript taqqoslash.
+
+Sintetik o'zbekcha hikoya (Zipf bo'yicha takrorlanuvchi so'zlar) 50..5000 so'z
+uchun uch xil "o'qish" yaratiladi:
+
+    full       — oxirigacha o'qilgan, ~5% almashtirilgan, ~3% tashlab ketilgan,
+                 ~2% ortiqcha so'z
+    truncated  — hikoyaning birinchi yarmi (xatolar bilan), keyin to'xtagan
+    skipped    — o'rtadagi 20% xatboshi tashlab ketilgan
+
+va ikki yo'l o'lchanadi:
+
+    difflib    — eski calculate_text_similarity: re \\w+ + SequenceMatcher
+    alignment  — shared.services.word_alignment.align_words (Myers / langarlar)
+
+"words_read" aniqligi cheklovsiz Myers (aniq LCS) bilan solishtiriladi;
+difflib ham bir xil normallashgan tokenlarda ishlatiladi.
+
+    cd Olimp/backend
+    python bench_word_alignment.py --sizes 50 500 5000 --repeat 5
+"""
+import argparse
+import difflib
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from shared.services import word_alignment
+from shared.services.word_alignment import align_words, to_ids, tokenize
+
+SYLLABLES = ["ki", "tob", "bo", "la", "o'q", "ish", "yax", "shi", "ko'r", "ar", "e", "kan",
+             "bir", "bor", "yo'q", "qiz", "o'g'", "il", "uy", "da", "gi", "lar", "ni", "ga"]
+
+
+def _vocabulary(rng, size=600):
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 3))))
+    return sorted(words)
+
+
+def _story(rng, vocab, n):
+    weights = [1.0 / (rank + 1) for rank in range(len(vocab))]
+    words = rng.choices(vocab, weights=weights, k=n)
+    for i in range(0, n, 12):
+        words[i] = words[i].capitalize()
+    return " ".join(w + ("." if i % 12 == 11 else "") for i, w in enumerate(words))
+
+
+def _noisy(rng, vocab, words):
+    out = []
+    for word in words:
+        roll = rng.random()
+        if roll < 0.03:
+            continue
+        out.append(rng.choice(vocab) if roll < 0.08 else word)
+        if rng.random() < 0.02:
+            out.append(rng.choice(vocab))
+    return out
+
+
+def _readings(rng, vocab, story):
+    words = story.split()
+    n = len(words)
+    return {
+        "full": " ".join(_noisy(rng, vocab, words)),
+        "truncated": " ".join(_noisy(rng, vocab, words[: n // 2])),
+        "skipped": " ".join(_noisy(rng, vocab, words[: n * 2 // 5] + words[n * 3 // 5:])),
+    }
+
+
+def _legacy(original, transcript):
+    orig_words = re.findall(r'\w+', original.lower())
+    trans_words = re.findall(r'\w+', transcript.lower())
+    matcher = difflib.SequenceMatcher(None, orig_words, trans_words)
+    return matcher.ratio(), sum(block.size for block in matcher.get_matching_blocks())
+
+
+def _exact_lcs(a, b):
+    out = []
+    word_alignment._myers(a, b, 0, len(a), 0, len(b), out, len(a) + len(b))
+    return len(out)
+
+
+def _timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 200, 1000, 5000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    vocab = _vocabulary(rng)
+    print(f"{'so`zlar':>8} {'holat':<10} {'difflib':>10} {'alignment':>10} {'tezlik':>7}"
+          f"  {'aniq LCS':>8} {'difflib':>8} {'alignment':>9}")
+    for n in args.sizes:
+        story = _story(rng, vocab, n)
+        for label, transcript in _readings(rng, vocab, story).items():
+            legacy_elapsed, _ = _timed(lambda: _legacy(story, transcript), args.repeat)
+            new_elapsed, alignment = _timed(lambda: align_words(story, transcript), args.repeat)
+
+            ref_ids, hyp_ids = to_ids(tokenize(story), tokenize(transcript))
+            exact = _exact_lcs(ref_ids, hyp_ids)
+            matcher = difflib.SequenceMatcher(None, ref_ids, hyp_ids)
+            difflib_matched = sum(block.size for block in matcher.get_matching_blocks())
+            print(f"{n:>8} {label:<10} {legacy_elapsed * 1000:>8.2f}ms {new_elapsed * 1000:>8.2f}ms "
+                  f"{legacy_elapsed / new_elapsed:>6.1f}x  {exact:>8} {difflib_matched:>8} {alignment.correct:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""
+Load test: multi-stage olympiad stage leaderboard
+(GET /multi-stage/{olympiad_id}/stages/{stage_id}/leaderboard).
+
+A synthetic stage is seeded with a realistic spread of participants:
+regions weighted by school-age population, districts per region from
+shared.constants.regions with a Zipf-like size curve (city districts are
+larger), and a log-normal number of participants per school. Scores
+cluster around the middle with many ties, as in real test results.
+
+Virtual users then hit the endpoint concurrently, each as a random
+participant, so school-, district- and region-scope requests touch
+groups of very different sizes. Two implementations:
+
+    legacy  — the previous handler: load every stage result and
+              participant, filter by the caller's scope and sort in Python
+              (only for --rows <= 30000: its IN (participant ids) needs
+              one bind parameter per result, which breaks past the
+              SQLite/asyncpg limit of ~32k)
+    indexed — app.olimp.stage_leaderboard (scope index ranges: top-N,
+              caller's rank and neighbours)
+
+SQLite file by default, or Postgres with --database-url. The olimp package
+is imported, so DATABASE_URL (import only), JWT_SECRET and
+ADMIN_SECRET_KEY must be set.
+
+    cd Olimp/backend
+    python loadtest_stage_leaderboard.py --rows 30000 --scope school
+    python loadtest_stage_leaderboard.py --rows 500000 --scope district --users 50 --requests 20
+"""
+import argparse
+import asyncio
+import math
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from sqlalchemy import func, insert, select  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+
+from shared.constants.regions import REGIONS  # noqa: E402
+from shared.database.base import Base  # noqa: E402
+from shared.database.models import StudentProfile, User, UserRole  # noqa: E402
+from shared.database.models.olympiad import OlympiadParticipant  # noqa: E402
+from shared.database.models.olympiad_stage import OlympiadStage, OlympiadStageResult, ScopeType  # noqa: E402
+from app.olimp.multi_stage_router import get_stage_leaderboard  # noqa: E402
+
+TABLES = [User.__table__, StudentProfile.__table__, OlympiadParticipant.__table__, OlympiadStage.__table__,
+          OlympiadStageResult.__table__]
+OLYMPIAD_ID = "o0000001"
+STAGE_ID = "st000001"
+LEGACY_MAX_ROWS = 30_000
+INSERT_BATCH = 10_000
+
+# Approximate school-age population share (millions of residents)
+REGION_WEIGHTS = {
+    "Qoraqalpog'iston Respublikasi": 2.0, "Andijon viloyati": 3.3, "Buxoro viloyati": 2.0,
+    "Farg'ona viloyati": 3.9, "Jizzax viloyati": 1.4, "Xorazm viloyati": 1.9, "Namangan viloyati": 3.0,
+    "Navoiy viloyati": 1.0, "Qashqadaryo viloyati": 3.5, "Samarqand viloyati": 4.2,
+    "Sirdaryo viloyati": 0.9, "Surxondaryo viloyati": 2.8, "Toshkent viloyati": 3.0, "Toshkent shahri": 3.0,
+}
+
+
+def build_schools(rng: random.Random, rows: int):
+    """[(region, district, school_number, participants)] summing to `rows`"""
+    weights = []
+    for region, districts in REGIONS.items():
+        for rank, district in enumerate(districts, start=1):
+            district_weight = REGION_WEIGHTS[region] / rank ** 0.7
+            for school in range(1, rng.randint(25, 70) + 1):
+                weights.append(((region, district, school), district_weight * rng.lognormvariate(0, 0.6)))
+    scale = rows / sum(w for _, w in weights)
+    schools = [(key, max(1, round(w * scale))) for key, w in weights]
+    # Spread the rounding difference over the largest schools
+    diff = rows - sum(n for _, n in schools)
+    schools.sort(key=lambda s: -s[1])
+    for i in range(abs(diff)):
+        key, n = schools[i % len(schools)]
+        schools[i % len(schools)] = (key, n + (1 if diff > 0 else -1))
+    return [s for s in schools if s[1] > 0]
+
+
+async def seed(engine, rows: int, scope: ScopeType, seed_value: int = 11):
+    rng = random.Random(seed_value)
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda c: Base.metadata.drop_all(c, tables=TABLES))
+        await conn.run_sync(lambda c: Base.metadata.create_all(c, tables=TABLES))
+        await conn.execute(insert(OlympiadStage).values(
+            id=STAGE_ID, olympiad_id=OLYMPIAD_ID, stage_number=1, scope_type=scope))
+
+    users, profiles, participants, results = [], [], [], []
+    index = 0
+
+    async def flush():
+        async with engine.begin() as conn:
+            for table, batch in ((User, users), (StudentProfile, profiles),
+                                 (OlympiadParticipant, participants), (OlympiadStageResult, results)):
+                if batch:
+                    await conn.execute(insert(table), batch)
+        for batch in (users, profiles, participants, results):
+            batch.clear()
+
+    for (region, district, school), count in build_schools(rng, rows):
+        for _ in range(count):
+            users.append({"id": f"u{index:07d}", "first_name": "O'quvchi", "last_name": str(index),
+                          "role": UserRole.student})
+            profiles.append({"id": f"s{index:07d}", "user_id": f"u{index:07d}"})
+            participants.append({"id": f"p{index:07d}", "olympiad_id": OLYMPIAD_ID, "student_id": f"s{index:07d}",
+                                 "region": region, "district": district, "school_number": school})
+            score = min(100.0, max(0.0, round(rng.gauss(55, 18) / 2.5) * 2.5))
+            # Core insert skips the ORM before_insert hook, so the scope copy is set here
+            results.append({"id": f"r{index:07d}", "participant_id": f"p{index:07d}", "stage_id": STAGE_ID,
+                            "score": score, "duration_seconds": rng.randint(10, 60) * 30,
+                            "is_passed": False, "region": region, "district": district, "school_number": school})
+            index += 1
+            if len(results) >= INSERT_BATCH:
+                await flush()
+    await flush()
+    return index
+
+
+async def legacy_leaderboard(db, stage, student_id):
+    """Previous handler body (full load + Python filter/sort)"""
+    sp = await db.execute(select(StudentProfile).where(StudentProfile.user_id == student_id))
+    profile = sp.scalars().first()
+    my_participant = None
+    if profile:
+        p_res = await db.execute(select(OlympiadParticipant).where(
+            OlympiadParticipant.olympiad_id == OLYMPIAD_ID, OlympiadParticipant.student_id == profile.id))
+        my_participant = p_res.scalars().first()
+    all_results = (await db.execute(
+        select(OlympiadStageResult).where(OlympiadStageResult.stage_id == stage.id))).scalars().all()
+    p_ids = [r.participant_id for r in all_results]
+    participants = {p.id: p for p in (await db.execute(
+        select(OlympiadParticipant).where(OlympiadParticipant.id.in_(p_ids)))).scalars().all()}
+    filtered = []
+    for r in all_results:
+        p = participants.get(r.participant_id)
+        if not p:
+            continue
+        if my_participant and stage.scope_type == ScopeType.school:
+            if (p.region, p.district, p.school_number) != (
+                    my_participant.region, my_participant.district, my_participant.school_number):
+                continue
+        elif my_participant and stage.scope_type == ScopeType.district:
+            if (p.region, p.district) != (my_participant.region, my_participant.district):
+                continue
+        elif my_participant and stage.scope_type == ScopeType.region:
+            if p.region != my_participant.region:
+                continue
+        filtered.append((r, p))
+    sorted_results = sorted(filtered, key=lambda x: (-x[0].score, x[0].duration_seconds))
+    student_ids = list({p.student_id for _, p in sorted_results})
+    profiles = {sp.id: sp for sp in (await db.execute(
+        select(StudentProfile).where(StudentProfile.id.in_(student_ids)))).scalars().all()}
+    user_ids = [profiles[sid].user_id for sid in student_ids if sid in profiles]
+    users = {u.id: u for u in (await db.execute(select(User).where(User.id.in_(user_ids)))).scalars().all()}
+    return len(sorted_results), len(users)
+
+
+async def run(factory, mode, stage, students, users, requests, limit, around):
+    latencies = []
+    rng = random.Random(5)
+
+    async def user():
+        for _ in range(requests):
+            student_id = rng.choice(students)
+            started = time.perf_counter()
+            async with factory() as db:
+                if mode == "legacy":
+                    await legacy_leaderboard(db, stage, student_id)
+                else:
+                    await get_stage_leaderboard(OLYMPIAD_ID, STAGE_ID, student_id=student_id,
+                                                limit=limit, around=around, db=db)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(user() for _ in range(users)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+
+    def pct(p):
+        return latencies[min(len(latencies) - 1, math.ceil(p * len(latencies)) - 1)] * 1000
+
+    return {"rps": len(latencies) / elapsed, "p50": pct(0.5), "p95": pct(0.95), "p99": pct(0.99),
+            "mean": statistics.mean(latencies) * 1000}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=30_000)
+    parser.add_argument("--scope", default="school", choices=[s.value for s in ScopeType])
+    parser.add_argument("--users", type=int, default=20, help="concurrent virtual users")
+    parser.add_argument("--requests", type=int, default=10, help="requests per virtual user")
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--around", type=int, default=3)
+    parser.add_argument("--database-url", default=None, help="default: temporary SQLite file")
+    args = parser.parse_args()
+
+    tmp = None
+    url = args.database_url
+    if url is None:
+        tmp = tempfile.mkdtemp()
+        url = f"sqlite+aiosqlite:///{os.path.join(tmp, 'loadtest.db')}"
+    engine = create_async_engine(url, pool_size=args.users, max_overflow=0)
+    factory = async_sessionmaker(engine, expire_on_commit=False, autoflush=False)
+    try:
+        started = time.perf_counter()
+        rows = await seed(engine, args.rows, ScopeType(args.scope))
+        async with factory() as db:
+            stage = await db.get(OlympiadStage, STAGE_ID)
+            group_col = {"school": (OlympiadParticipant.region, OlympiadParticipant.district,
+                                    OlympiadParticipant.school_number),
+                         "district": (OlympiadParticipant.region, OlympiadParticipant.district),
+                         "region": (OlympiadParticipant.region,), "republic": ()}[args.scope]
+            sizes = [1] if not group_col else [n for *_, n in (await db.execute(
+                select(*group_col, func.count()).group_by(*group_col))).all()]
+        students = [f"u{i:07d}" for i in range(rows)]
+        print(f"{rows:,} results, scope={args.scope}, {engine.dialect.name} (seed {time.perf_counter() - started:.1f}s); "
+              f"groups={len(sizes):,} size p50={statistics.median(sizes):.0f} max={max(sizes):,}; "
+              f"{args.users} users x {args.requests} requests")
+
+        for mode in ("legacy", "indexed"):
+            if mode == "legacy" and rows > LEGACY_MAX_ROWS:
+                print(f"  legacy   skipped: IN ({rows:,} participant ids) exceeds the bind parameter limit")
+                continue
+            r = await run(factory, mode, stage, students, args.users, args.requests, args.limit, args.around)
+            print(f"  {mode:<8} {r['rps']:8.1f} req/s  p50 {r['p50']:8.1f}ms  p95 {r['p95']:8.1f}ms  "
+                  f"p99 {r['p99']:8.1f}ms")
+    finally:
+        await engine.dispose()
+        if tmp:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,133 @@
+"""
+Load test: live leaderboard WebSocket fan-out.
+
+Thousands of simulated WebSocket clients are spread over several
+ConnectionManager instances (one per simulated uvicorn worker) that share a
+Redis — fakeredis by default, a real server with --redis-url. A fraction of
+clients is deliberately slow. A burst of leaderboard_update events is
+published from one worker and we measure, for the healthy clients, how long
+until they receive the latest state, how many pushes they got (coalescing)
+and how many slow clients were dropped. Needs the usual backend env
+(DATABASE_URL, JWT_SECRET) because the olimp package is imported.
+
+    cd Olimp/backend
+    DEBUG=true python loadtest_ws_leaderboard.py --clients 5000 --workers 4 --slow 0.02
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from shared.services import redis_service
+from app.olimp.websocket import ConnectionManager
+
+
+class SimulatedClient:
+    def __init__(self, send_delay: float):
+        self.send_delay = send_delay
+        self.received = []
+        self.closed_with = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, data: str):
+        if self.send_delay:
+            await asyncio.sleep(self.send_delay)
+        self.received.append((time.perf_counter(), data))
+
+    async def close(self, code: int = 1000):
+        self.closed_with = code
+
+
+async def run(args):
+    if args.redis_url:
+        import redis.asyncio as aioredis
+        redis_service.set_redis(aioredis.from_url(args.redis_url, decode_responses=True))
+    else:
+        import fakeredis.aioredis
+        redis_service.set_redis(fakeredis.aioredis.FakeRedis(decode_responses=True))
+
+    workers = [
+        ConnectionManager(
+            send_timeout=args.send_timeout,
+            queue_size=args.queue_size,
+            max_pushes_per_second=args.max_pps,
+        )
+        for _ in range(args.workers)
+    ]
+
+    clients = []
+    slow_every = int(1 / args.slow) if args.slow > 0 else 0
+    for i in range(args.clients):
+        slow = slow_every and i % slow_every == 0
+        client = SimulatedClient(send_delay=args.send_timeout * 5 if slow else 0.0)
+        clients.append((client, bool(slow)))
+        await workers[i % args.workers].connect(client, args.olympiad)
+    await asyncio.sleep(0.2)  # listeners subscribe
+
+    publisher = workers[0]
+    started = time.perf_counter()
+    for seq in range(args.events):
+        await publisher.broadcast(args.olympiad, {"type": "leaderboard_update", "seq": seq})
+        await asyncio.sleep(args.event_interval)
+    last_published = time.perf_counter()
+
+    # Wait for trailing coalesced pushes and slow-consumer timeouts
+    await asyncio.sleep(max(1.0 / args.max_pps, args.send_timeout) + 0.5)
+
+    latencies = []
+    pushes = []
+    missing_latest = 0
+    for client, slow in clients:
+        if slow:
+            continue
+        pushes.append(len(client.received))
+        latest = [t for t, data in client.received if json.loads(data)["seq"] == args.events - 1]
+        if latest:
+            latencies.append((latest[0] - last_published) * 1000)
+        else:
+            missing_latest += 1
+
+    dropped = sum(w.dropped_slow_consumers for w in workers)
+    slow_total = sum(1 for _, slow in clients if slow)
+    latencies.sort()
+
+    print(f"clients={args.clients} workers={args.workers} slow={slow_total} events={args.events} "
+          f"burst={(last_published - started) * 1000:.0f}ms")
+    print(f"healthy clients missing latest state: {missing_latest}")
+    if latencies:
+        print(f"latest-state latency ms: p50={statistics.median(latencies):.1f} "
+              f"p99={latencies[int(len(latencies) * 0.99) - 1]:.1f} max={latencies[-1]:.1f}")
+    print(f"pushes per healthy client: min={min(pushes)} max={max(pushes)} "
+          f"(cap ~{args.max_pps * (last_published - started) + 2:.0f})")
+    print(f"slow consumers dropped: {dropped}/{slow_total}")
+
+    for w in workers:
+        await w.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--slow", type=float, default=0.02, help="fraction of slow clients")
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--event-interval", type=float, default=0.005)
+    parser.add_argument("--max-pps", type=float, default=2.0)
+    parser.add_argument("--send-timeout", type=float, default=0.5)
+    parser.add_argument("--queue-size", type=int, default=8)
+    parser.add_argument("--olympiad", default="loadtest")
+    parser.add_argument("--redis-url", default=os.getenv("LOADTEST_REDIS_URL"))
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
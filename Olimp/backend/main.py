@@ -12,6 +12,7 @@ Features:
 - Leaderboard
 """
 
+import asyncio
 import sys
 import os
 from pathlib import Path
@@ -27,13 +28,15 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
 # Shared imports
-from shared.database import init_db, get_db
+from shared.database import init_db, get_db, AsyncSessionLocal
 from shared.auth import verify_token
 from shared.database.models import UserSubscription, SubscriptionStatus, User
 from shared.database.models.subscription import SubscriptionPlanConfig
 
 # Import subscription info and dependencies from shared module
 from shared.subscription import SubscriptionInfo, get_sub_info, require_feature
+from shared.services.redis_service import close_redis
+from shared.services.http_client import close_http_clients
 
 from sqlalchemy import select as _select
 from sqlalchemy.orm import selectinload as _selectinload
@@ -49,6 +52,9 @@ from app.olimp import router as olimp_router
 from app.reading import router as reading_router
 from app.speech import router as speech_router
 from app.gamification import router as gamification_router
+from app.olimp.websocket import manager as ws_manager
+from app.reading.analysis import start_reading_analysis, stop_reading_analysis
+from app.olimp.stage_finalization import resume_unfinished_finalizations
 
 
 @asynccontextmanager
@@ -59,9 +65,30 @@ async def lifespan(app: FastAPI):
     await init_db()
     logger.info("[OK] Database initialized")
 
+    # O'qish musobaqasi ovoz yozuvlari tahlili navbati (reading_analysis_jobs)
+    if settings.READING_ANALYSIS_ENABLED and AsyncSessionLocal is not None:
+        start_reading_analysis(AsyncSessionLocal)
+
+    # Uzilib qolgan bosqich yakunlash jarayonlarini fonda davom ettirish (claim atomik — bitta worker oladi)
+    if AsyncSessionLocal is not None:
+        app.state.finalization_resume_task = asyncio.create_task(
+            resume_unfinished_finalizations(AsyncSessionLocal)
+        )
+
     yield
 
     logger.info("[BYE] Shutting down Olimp Platform...")
+    resume_task = getattr(app.state, "finalization_resume_task", None)
+    if resume_task is not None and not resume_task.done():
+        resume_task.cancel()
+        try:
+            await resume_task
+        except (asyncio.CancelledError, Exception):
+            pass
+    await stop_reading_analysis()
+    await ws_manager.close()
+    await close_redis()
+    await close_http_clients()
 
 
 # Create FastAPI app
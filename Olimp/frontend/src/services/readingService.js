@@ -18,7 +18,9 @@ const readingService = {
         formData.append('audio', audioBlob, 'recording.webm');
         return apiService.postForm(`/reading/sessions/${sessionId}/audio`, formData);
     },
-    analyzeAudio: (sessionId) => apiService.post(`/reading/sessions/${sessionId}/analyze`),
+    // Tahlil fon navbatida: yuklash uni boshlaydi, natija status="done" bo'lganda "analysis" da
+    analyzeAudio: (sessionId, wait = 0) => apiService.post(`/reading/sessions/${sessionId}/analyze?wait=${wait}`),
+    getAnalysis: (sessionId, wait = 0) => apiService.get(`/reading/sessions/${sessionId}/analysis`, { wait }),
 
     // TTS - Hikoyani eshittirish
     getTaskTTSUrl: (compId, taskId) => {
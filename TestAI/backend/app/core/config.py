@@ -33,5 +33,10 @@ class Settings:
     MAX_PARTICIPANTS_PER_QUIZ: int = int(os.getenv("MAX_PARTICIPANTS_PER_QUIZ", "40"))
     DEFAULT_TIME_PER_QUESTION: int = int(os.getenv("DEFAULT_TIME_PER_QUESTION", "30"))
 
+    # Live Quiz hot-path: javoblar xotira/Redis'da baholanadi, DB'ga partiya bilan yoziladi.
+    # REDIS_URL bo'lmasa holat worker xotirasida - faqat bitta uvicorn worker bilan ishlating.
+    LIVE_QUIZ_HOT_PATH: bool = os.getenv("LIVE_QUIZ_HOT_PATH", "true").lower() == "true"
+    LIVE_QUIZ_ANSWER_BATCH_SIZE: int = int(os.getenv("LIVE_QUIZ_ANSWER_BATCH_SIZE", "40"))
+
 
 settings = Settings()
\ No newline at end of file
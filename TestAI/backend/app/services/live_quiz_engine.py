@@ -0,0 +1,480 @@
+"""
+Live Quiz hot-path engine
+
+submit_answer() har bir javob uchun Postgres'ga 4-5 marta bormasligi uchun faol
+quizning savollari (javob kaliti), student_user_id -> participant xaritasi va
+ballar jadvali xotirada (bitta worker) yoki Redis'da (bir nechta worker)
+saqlanadi. Javob shu yerda baholanadi va dublikat tekshiriladi, LiveQuizAnswer
+satrlari navbatga qo'yiladi va Postgres'ga partiya bilan yoziladi
+(bulk INSERT + participant'lar uchun bitta executemany UPDATE):
+
+    - navbat LIVE_QUIZ_ANSWER_BATCH_SIZE ga yetganda,
+    - next_question / end_quiz / o'qituvchi natijalarni o'qishidan oldin.
+
+Holat birinchi javobda Postgres'dan yuklanadi (oldin yozilgan javoblar ham
+dedupe to'plamiga kiradi). Quiz tugaganda avval close() yangi javoblarni
+yopadi va qolganini yozadi, commit'dan keyin drop() holatni o'chiradi.
+
+Redis kalitlari (livequiz:{quiz_id}:...):
+    meta       HASH  ready, closed
+    questions  HASH  question_id -> "correct,points,time_limit"
+    members    HASH  student_user_id -> participant_id
+    stats:{pid} HASH total_score, correct_count, wrong_count, current_streak, best_streak
+    answered   SET   "{participant_id}:{question_id}"
+    pending    LIST  JSON LiveQuizAnswer satrlari
+    dirty      SET   navbatdagi javoblari bor participant_id lar
+"""
+import asyncio
+import json
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, bindparam, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.errors import BadRequestError, NotFoundError
+from shared.database.id_generator import generate_8_digit_id
+from shared.database.models import (
+    StudentProfile,
+    LiveQuiz, LiveQuizQuestion, LiveQuizParticipant, LiveQuizAnswer,
+    LiveQuizStatus,
+)
+from shared.services.redis_service import get_redis
+
+logger = logging.getLogger(__name__)
+
+STAT_FIELDS = ("total_score", "correct_count", "wrong_count", "current_streak", "best_streak")
+
+# (correct_answer, points, time_limit)
+QuestionKey = Tuple[int, int, int]
+
+
+def score_answer(question: QuestionKey, selected_answer: int, time_to_answer_ms: int) -> Tuple[bool, int]:
+    """Javobni baholash (tezroq = ko'proq ball). DB va hot-path uchun yagona formula."""
+    correct_answer, max_points, time_limit = question
+    is_correct = (selected_answer == correct_answer)
+    points = 0
+    if is_correct:
+        # Base points reduced by time taken (max 1000ms penalty)
+        time_penalty = min(time_to_answer_ms / (time_limit * 10), max_points * 0.5)
+        points = max(int(max_points - time_penalty), max_points // 2)
+    return is_correct, points
+
+
+def apply_answer(stats: Dict[str, int], is_correct: bool, points: int) -> Dict[str, int]:
+    """Participant statistikasini javob bo'yicha yangilash (joyida)."""
+    if is_correct:
+        stats["correct_count"] += 1
+        stats["current_streak"] += 1
+        stats["best_streak"] = max(stats["best_streak"], stats["current_streak"])
+    else:
+        stats["wrong_count"] += 1
+        stats["current_streak"] = 0
+    stats["total_score"] += points
+    return stats
+
+
+class _MemoryQuiz:
+    __slots__ = ("questions", "members", "stats", "answered", "pending", "dirty", "closed")
+
+    def __init__(self, questions, members, stats, answered):
+        self.questions: Dict[str, QuestionKey] = questions
+        self.members: Dict[str, str] = members
+        self.stats: Dict[str, Dict[str, int]] = stats
+        self.answered = set(answered)
+        self.pending: List[dict] = []
+        self.dirty = set()
+        self.closed = False
+
+
+class MemoryQuizStore:
+    """Bitta worker uchun. Barcha amallar await'siz — asyncio ichida atomar."""
+
+    def __init__(self):
+        self._quizzes: Dict[str, _MemoryQuiz] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def lock(self, quiz_id: str):
+        return self._locks.setdefault(quiz_id, asyncio.Lock())
+
+    async def is_loaded(self, quiz_id: str) -> bool:
+        return quiz_id in self._quizzes
+
+    async def load(self, quiz_id, questions, members, stats, answered) -> None:
+        self._quizzes[quiz_id] = _MemoryQuiz(questions, members, stats, answered)
+
+    async def lookup(self, quiz_id: str, student_user_id: str, question_id: str):
+        """None — holat yuklanmagan; aks holda (closed, participant_id, question)."""
+        quiz = self._quizzes.get(quiz_id)
+        if quiz is None:
+            return None
+        return quiz.closed, quiz.members.get(student_user_id), quiz.questions.get(question_id)
+
+    async def record(self, quiz_id, participant_id, question_id, is_correct, points, row):
+        """Javobni qabul qilish. Dublikat bo'lsa None, aks holda (stats, pending_count)."""
+        quiz = self._quizzes.get(quiz_id)
+        if quiz is None or quiz.closed:
+            raise BadRequestError("Quiz faol emas")
+        key = (participant_id, question_id)
+        if key in quiz.answered:
+            return None
+        quiz.answered.add(key)
+        stats = apply_answer(quiz.stats[participant_id], is_correct, points)
+        quiz.pending.append(row)
+        quiz.dirty.add(participant_id)
+        return dict(stats), len(quiz.pending)
+
+    async def is_answered(self, quiz_id: str, participant_id: str, question_id: str) -> Optional[bool]:
+        quiz = self._quizzes.get(quiz_id)
+        if quiz is None:
+            return None
+        return (participant_id, question_id) in quiz.answered
+
+    async def close(self, quiz_id: str) -> None:
+        quiz = self._quizzes.get(quiz_id)
+        if quiz is not None:
+            quiz.closed = True
+
+    async def take_pending(self, quiz_id: str):
+        quiz = self._quizzes.get(quiz_id)
+        if quiz is None or not quiz.pending:
+            return [], {}
+        rows, quiz.pending = quiz.pending, []
+        dirty, quiz.dirty = quiz.dirty, set()
+        return rows, {pid: dict(quiz.stats[pid]) for pid in dirty}
+
+    async def requeue(self, quiz_id: str, rows: List[dict], stats: Dict[str, Dict[str, int]]) -> None:
+        quiz = self._quizzes.get(quiz_id)
+        if quiz is None:
+            return
+        quiz.pending[:0] = rows
+        quiz.dirty.update(stats)
+
+    async def drop(self, quiz_id: str) -> None:
+        self._quizzes.pop(quiz_id, None)
+        self._locks.pop(quiz_id, None)
+
+
+class RedisQuizStore:
+    """Bir nechta worker uchun umumiy holat. `redis` — redis.asyncio (decode_responses=True)."""
+
+    KEY_TTL_SECONDS = 6 * 3600
+    LOAD_LOCK_SECONDS = 10
+
+    def __init__(self, redis):
+        self.redis = redis
+
+    @staticmethod
+    def _key(quiz_id: str, suffix: str) -> str:
+        return f"livequiz:{quiz_id}:{suffix}"
+
+    def lock(self, quiz_id: str):
+        return _RedisLoadLock(self, quiz_id)
+
+    async def is_loaded(self, quiz_id: str) -> bool:
+        return bool(await self.redis.hexists(self._key(quiz_id, "meta"), "ready"))
+
+    async def load(self, quiz_id, questions, members, stats, answered) -> None:
+        keys = [self._key(quiz_id, s) for s in ("meta", "questions", "members", "answered", "pending", "dirty")]
+        stat_keys = [self._key(quiz_id, f"stats:{pid}") for pid in stats]
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(*keys)
+            if questions:
+                pipe.hset(keys[1], mapping={qid: ",".join(map(str, q)) for qid, q in questions.items()})
+            if members:
+                pipe.hset(keys[2], mapping=members)
+            answered = [f"{pid}:{qid}" for pid, qid in answered]
+            if answered:
+                pipe.sadd(keys[3], *answered)
+            for key, values in zip(stat_keys, stats.values()):
+                pipe.delete(key)
+                pipe.hset(key, mapping=values)
+                pipe.expire(key, self.KEY_TTL_SECONDS)
+            # ready oxirida — boshqa worker'lar yarim holatni ko'rmaydi
+            pipe.hset(keys[0], "ready", "1")
+            for key in keys:
+                pipe.expire(key, self.KEY_TTL_SECONDS)
+            await pipe.execute()
+
+    async def lookup(self, quiz_id: str, student_user_id: str, question_id: str):
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hmget(self._key(quiz_id, "meta"), ["ready", "closed"])
+            pipe.hget(self._key(quiz_id, "members"), student_user_id)
+            pipe.hget(self._key(quiz_id, "questions"), question_id)
+            (ready, closed), participant_id, raw_question = await pipe.execute()
+        if not ready:
+            return None
+        question = tuple(int(v) for v in raw_question.split(",")) if raw_question else None
+        return bool(closed), participant_id, question
+
+    async def record(self, quiz_id, participant_id, question_id, is_correct, points, row):
+        if await self.redis.hexists(self._key(quiz_id, "meta"), "closed"):
+            raise BadRequestError("Quiz faol emas")
+        # SADD atomar: ikki worker bir vaqtda bir xil javobni qabul qila olmaydi
+        added = await self.redis.sadd(self._key(quiz_id, "answered"), f"{participant_id}:{question_id}")
+        if not added:
+            return None
+
+        stats_key = self._key(quiz_id, f"stats:{participant_id}")
+        pending_key = self._key(quiz_id, "pending")
+        async with self.redis.pipeline(transaction=True) as pipe:
+            if is_correct:
+                pipe.hincrby(stats_key, "correct_count", 1)
+                pipe.hincrby(stats_key, "current_streak", 1)
+            else:
+                pipe.hincrby(stats_key, "wrong_count", 1)
+                pipe.hset(stats_key, "current_streak", 0)
+            pipe.hincrby(stats_key, "total_score", points)
+            pipe.rpush(pending_key, json.dumps(row))
+            pipe.sadd(self._key(quiz_id, "dirty"), participant_id)
+            pipe.hgetall(stats_key)
+            result = await pipe.execute()
+
+        pending_count = result[-3]
+        stats = {field: int(result[-1].get(field, 0)) for field in STAT_FIELDS}
+        if stats["current_streak"] > stats["best_streak"]:
+            # Bitta participant bir vaqtda faqat bitta savolga javob beradi
+            stats["best_streak"] = stats["current_streak"]
+            await self.redis.hset(stats_key, "best_streak", stats["best_streak"])
+        return stats, pending_count
+
+    async def is_answered(self, quiz_id: str, participant_id: str, question_id: str) -> Optional[bool]:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hexists(self._key(quiz_id, "meta"), "ready")
+            pipe.sismember(self._key(quiz_id, "answered"), f"{participant_id}:{question_id}")
+            ready, answered = await pipe.execute()
+        if not ready:
+            return None
+        return bool(answered)
+
+    async def close(self, quiz_id: str) -> None:
+        await self.redis.hset(self._key(quiz_id, "meta"), "closed", "1")
+
+    async def take_pending(self, quiz_id: str):
+        pending_key = self._key(quiz_id, "pending")
+        dirty_key = self._key(quiz_id, "dirty")
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.lrange(pending_key, 0, -1)
+            pipe.delete(pending_key)
+            pipe.smembers(dirty_key)
+            pipe.delete(dirty_key)
+            raw_rows, _, dirty, _ = await pipe.execute()
+        if not raw_rows:
+            return [], {}
+
+        dirty = sorted(dirty)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for pid in dirty:
+                pipe.hgetall(self._key(quiz_id, f"stats:{pid}"))
+            raw_stats = await pipe.execute()
+        stats = {
+            pid: {field: int(values.get(field, 0)) for field in STAT_FIELDS}
+            for pid, values in zip(dirty, raw_stats)
+        }
+        return [json.loads(r) for r in raw_rows], stats
+
+    async def requeue(self, quiz_id: str, rows: List[dict], stats: Dict[str, Dict[str, int]]) -> None:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            if rows:
+                pipe.lpush(self._key(quiz_id, "pending"), *[json.dumps(r) for r in reversed(rows)])
+            if stats:
+                pipe.sadd(self._key(quiz_id, "dirty"), *stats)
+            await pipe.execute()
+
+    async def drop(self, quiz_id: str) -> None:
+        members = await self.redis.hvals(self._key(quiz_id, "members"))
+        keys = [self._key(quiz_id, s) for s in ("meta", "questions", "members", "answered", "pending", "dirty")]
+        keys.extend(self._key(quiz_id, f"stats:{pid}") for pid in members)
+        await self.redis.delete(*keys)
+
+
+class _RedisLoadLock:
+    """Yuklashni bitta worker bajarishi uchun SET NX qulfi; qolganlar tayyor bo'lishini kutadi."""
+
+    def __init__(self, store: RedisQuizStore, quiz_id: str):
+        self.store = store
+        self.key = store._key(quiz_id, "loading")
+
+    async def __aenter__(self):
+        deadline = asyncio.get_running_loop().time() + self.store.LOAD_LOCK_SECONDS
+        while not await self.store.redis.set(self.key, "1", nx=True, ex=self.store.LOAD_LOCK_SECONDS):
+            if asyncio.get_running_loop().time() > deadline:
+                break
+            await asyncio.sleep(0.05)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.store.redis.delete(self.key)
+
+
+class LiveQuizEngine:
+    """Faol quiz uchun javoblarni baholash, dedupe va partiyali yozish."""
+
+    def __init__(self, store, batch_size: Optional[int] = None):
+        self.store = store
+        self.batch_size = batch_size or settings.LIVE_QUIZ_ANSWER_BATCH_SIZE
+
+    async def submit(
+        self,
+        db: AsyncSession,
+        student_user_id: str,
+        quiz_id: str,
+        question_id: str,
+        selected_answer: int,
+        time_to_answer_ms: int
+    ) -> Dict:
+        found = await self.store.lookup(quiz_id, student_user_id, question_id)
+        if found is None:
+            await self._load(db, quiz_id)
+            found = await self.store.lookup(quiz_id, student_user_id, question_id)
+        closed, participant_id, question = found
+
+        if not participant_id:
+            raise NotFoundError("Siz bu quizga qo'shilmagansiz")
+        if closed:
+            raise BadRequestError("Quiz faol emas")
+        if question is None:
+            raise NotFoundError("Savol topilmadi")
+
+        is_correct, points = score_answer(question, selected_answer, time_to_answer_ms)
+        row = {
+            "id": generate_8_digit_id(),
+            "participant_id": participant_id,
+            "question_id": question_id,
+            "selected_answer": selected_answer,
+            "is_correct": is_correct,
+            "points_earned": points,
+            "time_to_answer_ms": time_to_answer_ms,
+        }
+        recorded = await self.store.record(quiz_id, participant_id, question_id, is_correct, points, row)
+        if recorded is None:
+            raise BadRequestError("Bu savolga allaqachon javob berdingiz")
+        stats, pending_count = recorded
+
+        if pending_count >= self.batch_size:
+            try:
+                await self.flush(db, quiz_id)
+            except Exception as e:
+                # Javob qabul qilingan va navbatda qoldi — keyingi flush yozadi
+                logger.warning(f"Live quiz {quiz_id} batch flush failed: {e}")
+
+        return {
+            "is_correct": is_correct,
+            "points_earned": points,
+            "total_score": stats["total_score"],
+            "current_streak": stats["current_streak"]
+        }
+
+    async def is_answered(self, quiz_id: str, participant_id: str, question_id: str) -> Optional[bool]:
+        """Holat yuklangan bo'lsa True/False, aks holda None (Postgres'dan tekshiring)."""
+        return await self.store.is_answered(quiz_id, participant_id, question_id)
+
+    async def flush(self, db: AsyncSession, quiz_id: str) -> int:
+        """
+        Navbatdagi javoblarni yozish va commit qilish. Xatolikda satrlar navbatga
+        qaytariladi va xato qayta ko'tariladi. Yozilgan javoblar soni qaytadi.
+        """
+        rows, stats = await self.store.take_pending(quiz_id)
+        if not rows:
+            return 0
+        try:
+            await db.execute(insert(LiveQuizAnswer), rows)
+            if stats:
+                # Kechikkan flush yangiroq holatni eski bilan almashtirmasligi uchun
+                # javoblar soni (monoton) bo'yicha himoya
+                table = LiveQuizParticipant.__table__
+                await db.execute(
+                    update(table)
+                    .where(and_(
+                        table.c.id == bindparam("pid"),
+                        table.c.correct_count + table.c.wrong_count <= bindparam("answered"),
+                    ))
+                    .values({field: bindparam(f"s_{field}") for field in STAT_FIELDS}),
+                    [
+                        {
+                            "pid": pid,
+                            "answered": s["correct_count"] + s["wrong_count"],
+                            **{f"s_{field}": s[field] for field in STAT_FIELDS},
+                        }
+                        for pid, s in stats.items()
+                    ],
+                )
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            await self.store.requeue(quiz_id, rows, stats)
+            raise
+        return len(rows)
+
+    async def close(self, db: AsyncSession, quiz_id: str) -> int:
+        """Yangi javoblarni to'xtatish va qolganini yozish (quiz tugashidan oldin)."""
+        await self.store.close(quiz_id)
+        return await self.flush(db, quiz_id)
+
+    async def drop(self, quiz_id: str) -> None:
+        await self.store.drop(quiz_id)
+
+    async def _load(self, db: AsyncSession, quiz_id: str) -> None:
+        async with self.store.lock(quiz_id):
+            if await self.store.is_loaded(quiz_id):
+                return
+
+            res = await db.execute(select(LiveQuiz.status).where(LiveQuiz.id == quiz_id))
+            status = res.scalar()
+            if status is None:
+                raise NotFoundError("Siz bu quizga qo'shilmagansiz")
+            if status != LiveQuizStatus.active:
+                raise BadRequestError("Quiz faol emas")
+
+            res = await db.execute(
+                select(
+                    LiveQuizQuestion.id, LiveQuizQuestion.correct_answer,
+                    LiveQuizQuestion.points, LiveQuizQuestion.time_limit
+                ).where(LiveQuizQuestion.quiz_id == quiz_id)
+            )
+            questions = {qid: (correct, points, time_limit) for qid, correct, points, time_limit in res.all()}
+
+            res = await db.execute(
+                select(StudentProfile.user_id, LiveQuizParticipant)
+                .join(StudentProfile, StudentProfile.id == LiveQuizParticipant.student_id)
+                .where(LiveQuizParticipant.quiz_id == quiz_id)
+            )
+            members = {}
+            stats = {}
+            for user_id, p in res.all():
+                members[user_id] = p.id
+                stats[p.id] = {field: getattr(p, field) or 0 for field in STAT_FIELDS}
+
+            res = await db.execute(
+                select(LiveQuizAnswer.participant_id, LiveQuizAnswer.question_id)
+                .join(LiveQuizParticipant, LiveQuizParticipant.id == LiveQuizAnswer.participant_id)
+                .where(LiveQuizParticipant.quiz_id == quiz_id)
+            )
+            answered = [tuple(r) for r in res.all()]
+
+            await self.store.load(quiz_id, questions, members, stats, answered)
+
+
+_engine: Optional[LiveQuizEngine] = None
+
+
+def get_engine() -> Optional[LiveQuizEngine]:
+    """
+    LIVE_QUIZ_HOT_PATH o'chirilgan bo'lsa None (eski to'g'ridan-to'g'ri DB yo'li).
+    REDIS_URL bo'lsa Redis, aks holda xotira (faqat bitta uvicorn worker bilan!).
+    """
+    global _engine
+    if not settings.LIVE_QUIZ_HOT_PATH:
+        return None
+    if _engine is None:
+        redis = get_redis()
+        store = RedisQuizStore(redis) if redis is not None else MemoryQuizStore()
+        _engine = LiveQuizEngine(store)
+    return _engine
+
+
+def set_engine(engine: Optional[LiveQuizEngine]) -> None:
+    """Engine'ni almashtirish (testlar va benchmark uchun)."""
+    global _engine
+    _engine = engine
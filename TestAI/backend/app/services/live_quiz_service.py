@@ -5,7 +5,7 @@ Maximum 40 students per quiz session.
 from typing import Optional, List, Dict
 from datetime import datetime, timezone
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import and_, select
+from sqlalchemy import and_, func, select, update
 from sqlalchemy.orm import selectinload
 import secrets
 import string
@@ -22,8 +22,10 @@ from shared.database.models import (
     TeacherProfile, StudentProfile,
     LiveQuiz, LiveQuizQuestion, LiveQuizParticipant, LiveQuizAnswer,
     LiveQuizStatus, ParticipantState,
-    StudentCoin, CoinTransaction, TransactionType
+    TransactionType
 )
+from shared.payments.coin_service import add_coins_bulk
+from app.services.live_quiz_engine import get_engine, score_answer, apply_answer, STAT_FIELDS
 
 
 class LiveQuizService:
@@ -33,6 +35,8 @@ class LiveQuizService:
     
     def __init__(self, db: AsyncSession):
         self.db = db
+        # Faol quiz hot-path (xotira/Redis); None — har bir javob to'g'ridan-to'g'ri DB'ga
+        self.engine = get_engine()
     
     # ============================================================
     # TEACHER FUNCTIONS
@@ -204,6 +208,8 @@ class LiveQuizService:
             
         await self.db.delete(quiz)
         await self.db.commit()
+        if self.engine:
+            await self.engine.drop(quiz_id)
         return {"message": "Sessiya o'chirildi"}
         
     async def delete_template(self, teacher_user_id: str, template_id: str) -> Dict:
@@ -353,21 +359,27 @@ class LiveQuizService:
         if quiz.status != LiveQuizStatus.active:
             raise BadRequestError("Quiz faol emas")
         
+        finishing = quiz.current_question_index + 1 >= len(quiz.questions)
+        await self._flush_answers(quiz, close=finishing)
+        
         quiz.current_question_index += 1
         
-        if quiz.current_question_index >= len(quiz.questions):
+        if finishing:
             # Quiz finished
             quiz.status = LiveQuizStatus.finished
             quiz.ended_at = datetime.now(timezone.utc)
             await self._calculate_rankings(quiz)
         
         await self.db.commit()
+        if finishing and self.engine:
+            await self.engine.drop(quiz_id)
         
         return await self.get_current_question(teacher_user_id, quiz_id)
     
     async def get_question_results(self, teacher_user_id: str, quiz_id: str, question_id: str) -> Dict:
         """Get results for a specific question."""
         quiz = await self._get_quiz_for_teacher(quiz_id, teacher_user_id)
+        await self._flush_answers(quiz)
         
         res = await self.db.execute(select(LiveQuizQuestion).where(LiveQuizQuestion.id == question_id))
         question = res.scalars().first()
@@ -398,6 +410,7 @@ class LiveQuizService:
     async def get_leaderboard(self, teacher_user_id: str, quiz_id: str) -> List[Dict]:
         """Get current leaderboard."""
         quiz = await self._get_quiz_for_teacher(quiz_id, teacher_user_id)
+        await self._flush_answers(quiz)
         
         participants = sorted(
             quiz.participants,
@@ -423,11 +436,15 @@ class LiveQuizService:
         if quiz.status == LiveQuizStatus.finished:
             raise BadRequestError("Quiz allaqachon tugatilgan")
             
+        await self._flush_answers(quiz, close=True)
+        
         quiz.status = LiveQuizStatus.finished
         quiz.ended_at = datetime.now(timezone.utc)
         
         await self._calculate_rankings(quiz)
         await self.db.commit()
+        if self.engine:
+            await self.engine.drop(quiz_id)
         
         return {
             "message": "Quiz tugatildi!",
@@ -521,16 +538,20 @@ class LiveQuizService:
         
         question = quiz.questions[quiz.current_question_index]
         
-        # Check if already answered
-        res = await self.db.execute(
-            select(LiveQuizAnswer).where(
-                and_(
-                    LiveQuizAnswer.participant_id == participant.id,
-                    LiveQuizAnswer.question_id == question.id
+        # Check if already answered (navbatdagi javoblar hali DB'da bo'lmasligi mumkin)
+        already_answered = None
+        if self.engine:
+            already_answered = await self.engine.is_answered(quiz_id, participant.id, question.id)
+        if already_answered is None:
+            res = await self.db.execute(
+                select(LiveQuizAnswer.id).where(
+                    and_(
+                        LiveQuizAnswer.participant_id == participant.id,
+                        LiveQuizAnswer.question_id == question.id
+                    )
                 )
             )
-        )
-        already_answered = res.scalars().first()
+            already_answered = res.first() is not None
         
         return {
             "status": "active",
@@ -541,7 +562,7 @@ class LiveQuizService:
             "image": question.question_image,
             "options": question.options,
             "time_limit": question.time_limit,
-            "already_answered": already_answered is not None
+            "already_answered": already_answered
         }
     
     async def submit_answer(
@@ -553,6 +574,11 @@ class LiveQuizService:
         time_to_answer_ms: int
     ) -> Dict:
         """Submit answer for current question."""
+        if self.engine:
+            return await self.engine.submit(
+                self.db, student_user_id, quiz_id, question_id, selected_answer, time_to_answer_ms
+            )
+        
         participant = await self._get_participant(student_user_id, quiz_id)
         quiz = participant.quiz
         
@@ -581,22 +607,14 @@ class LiveQuizService:
             raise BadRequestError("Bu savolga allaqachon javob berdingiz")
         
         # Calculate score (faster = more points)
-        is_correct = (selected_answer == question.correct_answer)
-        points = 0
-        
-        if is_correct:
-            # Base points reduced by time taken (max 1000ms penalty)
-            time_penalty = min(time_to_answer_ms / (question.time_limit * 10), question.points * 0.5)
-            points = max(int(question.points - time_penalty), question.points // 2)
-            
-            participant.correct_count += 1
-            participant.current_streak += 1
-            participant.best_streak = max(participant.best_streak, participant.current_streak)
-        else:
-            participant.wrong_count += 1
-            participant.current_streak = 0
-        
-        participant.total_score += points
+        is_correct, points = score_answer(
+            (question.correct_answer, question.points, question.time_limit),
+            selected_answer,
+            time_to_answer_ms
+        )
+        stats = apply_answer({f: getattr(participant, f) for f in STAT_FIELDS}, is_correct, points)
+        for field, value in stats.items():
+            setattr(participant, field, value)
         
         # Save answer
         answer = LiveQuizAnswer(
@@ -668,6 +686,25 @@ class LiveQuizService:
         
         return quiz
     
+    async def _flush_answers(self, quiz: LiveQuiz, close: bool = False):
+        """
+        Hot-path navbatidagi javoblarni DB'ga yozish va quiz.participants'ni
+        yangilash. close=True — quiz tugayapti, yangi javoblar qabul qilinmaydi.
+        """
+        if not self.engine:
+            return
+        if close:
+            written = await self.engine.close(self.db, quiz.id)
+        else:
+            written = await self.engine.flush(self.db, quiz.id)
+        if written:
+            res = await self.db.execute(
+                select(LiveQuizParticipant)
+                .where(LiveQuizParticipant.quiz_id == quiz.id)
+                .execution_options(populate_existing=True)
+            )
+            res.scalars().all()
+    
     async def _get_participant(self, student_user_id: str, quiz_id: str) -> LiveQuizParticipant:
         """Get participant by student user ID."""
         res = await self.db.execute(select(StudentProfile).where(StudentProfile.user_id == student_user_id))
@@ -692,42 +729,50 @@ class LiveQuizService:
         return participant
     
     async def _calculate_rankings(self, quiz: LiveQuiz):
-        """Calculate final rankings and award coins."""
-        participants = sorted(
-            quiz.participants,
-            key=lambda p: (-p.total_score, -p.best_streak)
+        """
+        Calculate final rankings and award coins.
+        O'rinlar bitta window-function UPDATE bilan, coinlar add_coins_bulk bilan —
+        qatnashchilar soniga bog'liq bo'lmagan so'rovlar soni.
+        """
+        table = LiveQuizParticipant.__table__
+        ranked = (
+            select(
+                table.c.id,
+                func.row_number().over(
+                    order_by=(table.c.total_score.desc(), table.c.best_streak.desc(), table.c.joined_at, table.c.id)
+                ).label("place")
+            )
+            .where(table.c.quiz_id == quiz.id)
+            .subquery()
+        )
+        await self.db.execute(
+            update(table)
+            .where(table.c.id == ranked.c.id)
+            .values(
+                rank=ranked.c.place,
+                state=ParticipantState.finished,
+                # Award coins for participation and performance: 2 coins per correct answer
+                coins_earned=2 * func.coalesce(table.c.correct_count, 0),
+            )
         )
         
-        for rank, participant in enumerate(participants, 1):
-            participant.rank = rank
-            participant.state = ParticipantState.finished
-            
-            # Award coins for participation and performance
-            base_coins = 2 * participant.correct_count  # 2 coins per correct answer
-            participant.coins_earned = base_coins
-            
-            # Add coins to student balance
-            await self._add_coins(participant.student_id, base_coins)
+        res = await self.db.execute(
+            select(LiveQuizParticipant)
+            .where(LiveQuizParticipant.quiz_id == quiz.id)
+            .order_by(LiveQuizParticipant.rank)
+            .execution_options(populate_existing=True)
+        )
+        participants = res.scalars().all()
+        
+        # Add coins to student balances
+        await add_coins_bulk(self.db, [
+            {
+                "student_id": p.student_id,
+                "amount": p.coins_earned,
+                "transaction_type": TransactionType.quiz_correct,
+                "description": "Live Quiz mukofoti",
+            }
+            for p in participants
+        ], commit=False)
         
         await self.db.commit()
-    
-    async def _add_coins(self, student_id: str, amount: int):
-        """Add coins to student balance."""
-        res = await self.db.execute(select(StudentCoin).where(StudentCoin.student_id == student_id))
-        coin_balance = res.scalars().first()
-        
-        if not coin_balance:
-            coin_balance = StudentCoin(student_id=student_id)
-            self.db.add(coin_balance)
-            await self.db.flush()
-        
-        coin_balance.total_earned += amount
-        coin_balance.current_balance += amount
-        
-        transaction = CoinTransaction(
-            student_coin_id=coin_balance.id,
-            type=TransactionType.quiz_correct,
-            amount=amount,
-            description="Live Quiz mukofoti"
-        )
-        self.db.add(transaction)
@@ -0,0 +1,156 @@
+"""
+Benchmark: live quiz javob yuborish (submit_answer) — soniyasiga javoblar soni.
+
+Bir sinf (default 40 o'quvchi) har bir savolga bir vaqtda javob beradi, har
+bir so'rov o'z sessiyasida (xuddi get_db kabi). Ikki yo'l solishtiriladi:
+
+    direct  — har bir javob uchun StudentProfile/participant/savol/dublikat
+              so'rovlari va commit (LIVE_QUIZ_HOT_PATH=false)
+    hot     — LiveQuizEngine: xotira (yoki --redis-url) + partiyali yozish,
+              har bir savoldan keyin flush (next_question kabi)
+
+Default holatda vaqtinchalik SQLite fayl ishlatiladi. Postgres uchun
+--database-url bering: vaqtinchalik o'qituvchi/o'quvchilar va quiz yaratiladi
+va oxirida o'chiriladi. shared.database import qilinadi, shuning uchun
+DATABASE_URL va JWT_SECRET env o'rnatilgan bo'lishi kerak.
+
+    cd TestAI/backend
+    python bench_live_quiz.py --students 40 --questions 20
+    python bench_live_quiz.py --database-url postgresql+asyncpg://... --redis-url redis://localhost:6379
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from shared.database.base import Base
+from shared.database.id_generator import generate_8_digit_id
+from shared.database.models import (
+    User, UserRole, TeacherProfile, StudentProfile,
+    LiveQuiz, LiveQuizQuestion, LiveQuizParticipant, LiveQuizAnswer,
+    LiveQuizStatus, ParticipantState,
+)
+from app.services.live_quiz_engine import LiveQuizEngine, MemoryQuizStore, RedisQuizStore
+from app.services.live_quiz_service import LiveQuizService
+
+SQLITE_TABLES = [
+    User.__table__, TeacherProfile.__table__, StudentProfile.__table__,
+    LiveQuiz.__table__, LiveQuizQuestion.__table__, LiveQuizParticipant.__table__, LiveQuizAnswer.__table__,
+]
+
+
+async def _seed(Session, students: int, questions: int):
+    async with Session() as db:
+        teacher = User(id=generate_8_digit_id(), first_name="Bench", last_name="Teacher", role=UserRole.teacher)
+        users = [
+            User(id=generate_8_digit_id(), first_name="Bench", last_name=f"Student {i}", role=UserRole.student)
+            for i in range(students)
+        ]
+        db.add_all([teacher, *users])
+        await db.flush()
+        profile = TeacherProfile(id=generate_8_digit_id(), user_id=teacher.id)
+        student_profiles = [StudentProfile(id=generate_8_digit_id(), user_id=u.id) for u in users]
+        db.add_all([profile, *student_profiles])
+        await db.flush()
+
+        quiz = LiveQuiz(id=generate_8_digit_id(), teacher_id=profile.id, title="Benchmark",
+                        join_code=None, status=LiveQuizStatus.active)
+        db.add(quiz)
+        await db.flush()
+        question_ids = []
+        for i in range(questions):
+            q = LiveQuizQuestion(id=generate_8_digit_id(), quiz_id=quiz.id, question_text=f"Savol {i}",
+                                 options=["a", "b", "c", "d"], correct_answer=i % 4,
+                                 points=100, time_limit=30, order=i)
+            db.add(q)
+            question_ids.append(q.id)
+        for sp in student_profiles:
+            db.add(LiveQuizParticipant(id=generate_8_digit_id(), quiz_id=quiz.id, student_id=sp.id,
+                                       display_name=sp.user_id, state=ParticipantState.answering,
+                                       total_score=0, correct_count=0, wrong_count=0,
+                                       current_streak=0, best_streak=0))
+        await db.commit()
+        return teacher.id, [u.id for u in users], quiz.id, question_ids
+
+
+async def _cleanup(Session, teacher_user_id, user_ids, quiz_id):
+    async with Session() as db:
+        participant_ids = select(LiveQuizParticipant.id).where(LiveQuizParticipant.quiz_id == quiz_id)
+        await db.execute(delete(LiveQuizAnswer).where(LiveQuizAnswer.participant_id.in_(participant_ids)))
+        await db.execute(delete(LiveQuizParticipant).where(LiveQuizParticipant.quiz_id == quiz_id))
+        await db.execute(delete(LiveQuizQuestion).where(LiveQuizQuestion.quiz_id == quiz_id))
+        await db.execute(delete(LiveQuiz).where(LiveQuiz.id == quiz_id))
+        await db.execute(delete(StudentProfile).where(StudentProfile.user_id.in_(user_ids)))
+        await db.execute(delete(TeacherProfile).where(TeacherProfile.user_id == teacher_user_id))
+        await db.execute(delete(User).where(User.id.in_([teacher_user_id, *user_ids])))
+        await db.commit()
+
+
+async def _run(Session, engine, user_ids, quiz_id, question_ids) -> float:
+    async def answer(user_id, question_id, i):
+        async with Session() as db:
+            service = LiveQuizService(db)
+            service.engine = engine
+            await service.submit_answer(user_id, quiz_id, question_id, i % 4, 1000 + i * 37)
+
+    started = time.perf_counter()
+    for question_id in question_ids:
+        await asyncio.gather(*(answer(u, question_id, i) for i, u in enumerate(user_ids)))
+        if engine is not None:
+            async with Session() as db:
+                await engine.flush(db, quiz_id)
+    return time.perf_counter() - started
+
+
+async def main(args):
+    tmp = None
+    url = args.database_url
+    if not url:
+        tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+        url = f"sqlite+aiosqlite:///{tmp.name}"
+    if tmp:
+        db_engine = create_async_engine(url)
+        async with db_engine.begin() as conn:
+            await conn.run_sync(lambda c: Base.metadata.create_all(c, tables=SQLITE_TABLES))
+    else:
+        db_engine = create_async_engine(url, pool_size=args.students + 5)
+    Session = async_sessionmaker(db_engine, expire_on_commit=False)
+
+    if args.redis_url:
+        import redis.asyncio as aioredis
+        store_factory = lambda: RedisQuizStore(aioredis.from_url(args.redis_url, decode_responses=True))
+    else:
+        store_factory = MemoryQuizStore
+
+    total = args.students * args.questions
+    for label, engine in (("direct", None), ("hot", LiveQuizEngine(store_factory(), batch_size=args.batch_size))):
+        teacher_id, user_ids, quiz_id, question_ids = await _seed(Session, args.students, args.questions)
+        try:
+            elapsed = await _run(Session, engine, user_ids, quiz_id, question_ids)
+            print(f"{label:>6}: {total} javob, {elapsed:.2f}s, {total / elapsed:,.0f} javob/s")
+        finally:
+            if engine is not None:
+                await engine.drop(quiz_id)
+            await _cleanup(Session, teacher_id, user_ids, quiz_id)
+
+    await db_engine.dispose()
+    if tmp:
+        os.unlink(tmp.name)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=40)
+    parser.add_argument("--questions", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=40)
+    parser.add_argument("--database-url", default=os.getenv("BENCH_DATABASE_URL"))
+    parser.add_argument("--redis-url", default=os.getenv("BENCH_REDIS_URL"))
+    asyncio.run(main(parser.parse_args()))
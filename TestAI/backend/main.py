@@ -39,6 +39,10 @@ from shared.database.models import (
     SavedTest, SavedTestStatus,
 )
 from shared.auth import verify_token
+from shared.services.http_client import close_http_clients, get_http_client
+from shared.services.document_extraction import (
+    ExtractionError, UploadTooLarge, extract_document, file_kind, spooled_upload,
+)
 from openai import AsyncAzureOpenAI
 import json
 
@@ -116,6 +120,7 @@ async def lifespan(app: FastAPI):
     yield
     
     logger.info("[BYE] Shutting down TestAI Platform...")
+    await close_http_clients()
 
 
 # Create FastAPI app
@@ -530,7 +535,8 @@ async def generate_test(
     client = AsyncAzureOpenAI(
         azure_endpoint=settings.AZURE_OPENAI_ENDPOINT,
         api_key=settings.AZURE_OPENAI_KEY,
-        api_version=settings.AZURE_OPENAI_API_VERSION
+        api_version=settings.AZURE_OPENAI_API_VERSION,
+        http_client=get_http_client("azure_openai").pool,
     )
 
     lang_map = {"uz": "o'zbek tilida", "ru": "на русском языке", "en": "in English"}
@@ -817,7 +823,6 @@ async def register_for_olympiad(
 # ============= Olympiad Test Sets (Admin) =============
 
 import re
-import io
 
 TESTAI_ADMIN_KEYS = {
     "hazratqul": "alif24_rahbariyat26!",
@@ -984,26 +989,19 @@ async def parse_olympiad_test_from_file(
     admin=Depends(verify_testai_admin),
 ):
     """PDF, DOCX yoki TXT fayldan savollarni ajratib oladi"""
-    content = await file.read()
     filename = (file.filename or "").lower()
-    text = ""
+    if filename.endswith(".doc"):
+        raise HTTPException(400, ".doc format qo'llab-quvvatlanmaydi. .docx yoki .pdf ga o'tkazing.")
+    # Boshqa kengaytmalar — oddiy UTF-8 matn sifatida (avvalgidek)
+    kind = file_kind(filename) or "txt"
     try:
-        if filename.endswith(".pdf"):
-            from pypdf import PdfReader
-            reader = PdfReader(io.BytesIO(content))
-            text = "\n".join(page.extract_text() or "" for page in reader.pages)
-        elif filename.endswith(".docx"):
-            from docx import Document as DocxDoc
-            doc = DocxDoc(io.BytesIO(content))
-            text = "\n".join(p.text for p in doc.paragraphs)
-        elif filename.endswith(".doc"):
-            raise HTTPException(400, ".doc format qo'llab-quvvatlanmaydi. .docx yoki .pdf ga o'tkazing.")
-        else:
-            text = content.decode("utf-8", errors="ignore")
-    except HTTPException:
-        raise
-    except Exception as e:
+        async with spooled_upload(file) as spooled:
+            result = await extract_document(spooled.path, kind, encoding="utf-8")
+    except UploadTooLarge as e:
+        raise HTTPException(413, str(e))
+    except ExtractionError as e:
         raise HTTPException(422, f"Faylni o'qishda xatolik: {str(e)}")
+    text = result.text
     if not text.strip():
         raise HTTPException(422, "Fayldan matn ajratib olinmadi")
     questions = _parse_questions_for_testai(text)
@@ -1029,6 +1027,7 @@ async def ai_generate_olympiad_test(
         azure_endpoint=settings.AZURE_OPENAI_ENDPOINT,
         api_key=settings.AZURE_OPENAI_KEY,
         api_version=settings.AZURE_OPENAI_API_VERSION,
+        http_client=get_http_client("azure_openai").pool,
     )
 
     prompt = f"""Quyidagi matn asosida {count} ta test savoli tuz. Har bir savolda 4 ta variant bo'lsin.
@@ -18,7 +18,17 @@ from shared.auth.password import (
     hash_password,
     verify_password,
     hash_pin,
-    verify_pin
+    verify_pin,
+    password_needs_rehash,
+    hash_password_async,
+    verify_password_async,
+    verify_and_upgrade_password
+)
+
+from shared.auth.crypto_executor import (
+    CryptoBusyError,
+    run_crypto,
+    get_crypto_stats
 )
 
 from shared.auth.permissions import (
@@ -46,6 +56,13 @@ __all__ = [
     "verify_password",
     "hash_pin",
     "verify_pin",
+    "password_needs_rehash",
+    "hash_password_async",
+    "verify_password_async",
+    "verify_and_upgrade_password",
+    "CryptoBusyError",
+    "run_crypto",
+    "get_crypto_stats",
     
     # Permissions
     "has_permission",
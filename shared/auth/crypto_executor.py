@@ -0,0 +1,132 @@
+"""
+Crypto Executor — bcrypt va boshqa CPU-og'ir kripto amallarini event loop'dan
+tashqarida bajarish
+
+bcrypt bitta tekshiruvga ~250 ms CPU sarflaydi; event loop ichida chaqirilsa
+shu worker'dagi boshqa barcha so'rovlar kutib qoladi. run_crypto() amalni
+cheklangan pool'da bajaradi:
+
+    CRYPTO_EXECUTOR     thread (default; bcrypt GIL'ni qo'yib yuboradi) | process
+    CRYPTO_MAX_WORKERS  bir vaqtda bajariladigan amallar soni
+    CRYPTO_MAX_QUEUE    navbatdagi amallar chegarasi — oshsa CryptoBusyError
+                        (back-pressure: endpoint 503 + Retry-After qaytaradi)
+
+get_crypto_stats() — navbat chuqurligi, bajarilayotganlar, rad etilganlar va
+navbatda kutish latency'si.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+CRYPTO_EXECUTOR = os.getenv("CRYPTO_EXECUTOR", "thread")
+CRYPTO_MAX_WORKERS = int(os.getenv("CRYPTO_MAX_WORKERS", str(min(4, os.cpu_count() or 1))))
+CRYPTO_MAX_QUEUE = int(os.getenv("CRYPTO_MAX_QUEUE", "64"))
+
+T = TypeVar("T")
+
+
+class CryptoBusyError(Exception):
+    """Kripto navbati to'lgan — so'rovni keyinroq qaytarish kerak."""
+
+    retry_after = 1
+
+
+class _CryptoPool:
+    def __init__(self, max_workers: int, max_queue: int, kind: str = CRYPTO_EXECUTOR):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.kind = kind
+        self._executor: Optional[Executor] = None
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_ms = deque(maxlen=1024)
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="crypto")
+        return self._executor
+
+    def _timed(self, fn: Callable[..., T], submitted: float, *args) -> T:
+        # Thread rejimida pool ichida ishlaydi; process rejimida ishlatilmaydi
+        self.wait_ms.append((time.perf_counter() - submitted) * 1000)
+        return fn(*args)
+
+    async def run(self, fn: Callable[..., T], *args) -> T:
+        if self.in_flight >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            raise CryptoBusyError("Crypto queue is full")
+
+        loop = asyncio.get_running_loop()
+        submitted = time.perf_counter()
+        self.in_flight += 1
+        try:
+            if self.kind == "process":
+                future = loop.run_in_executor(self._get_executor(), fn, *args)
+            else:
+                future = loop.run_in_executor(self._get_executor(), self._timed, fn, submitted, *args)
+            return await future
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+
+    def stats(self) -> dict:
+        samples = sorted(self.wait_ms)
+
+        def _pct(q: float) -> Optional[float]:
+            if not samples:
+                return None
+            return round(samples[min(len(samples) - 1, int(q * len(samples)))], 2)
+
+        return {
+            "executor": self.kind,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queue_depth": max(0, self.in_flight - self.max_workers),
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "queue_wait_p50_ms": _pct(0.50),
+            "queue_wait_p99_ms": _pct(0.99),
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+_pool = _CryptoPool(CRYPTO_MAX_WORKERS, CRYPTO_MAX_QUEUE)
+
+
+async def run_crypto(fn: Callable[..., T], *args) -> T:
+    """fn(*args) ni kripto pool'da bajarish (process rejimida fn picklable bo'lishi kerak)"""
+    return await _pool.run(fn, *args)
+
+
+def get_crypto_stats() -> dict:
+    return _pool.stats()
+
+
+def configure_crypto_pool(max_workers: Optional[int] = None, max_queue: Optional[int] = None,
+                          kind: Optional[str] = None) -> None:
+    """Pool'ni qayta sozlash (testlar va benchmark uchun)"""
+    global _pool
+    _pool.shutdown()
+    _pool = _CryptoPool(
+        max_workers or CRYPTO_MAX_WORKERS,
+        CRYPTO_MAX_QUEUE if max_queue is None else max_queue,
+        kind or CRYPTO_EXECUTOR,
+    )
+
+
+__all__ = ["CryptoBusyError", "run_crypto", "get_crypto_stats", "configure_crypto_pool"]
@@ -1,9 +1,21 @@
 """
 Password Hashing - Parolni hash qilish va tekshirish
 bcrypt yordamida xavfsiz parol saqlash
+
+Async kodda *_async variantlaridan foydalaning — bcrypt event loop'ni
+bloklamasligi uchun kripto pool'da bajariladi (shared.auth.crypto_executor).
+BCRYPT_ROUNDS o'zgarsa, eski hash'lar login paytida
+verify_and_upgrade_password() orqali yangi cost bilan qayta hash qilinadi.
 """
+import os
+from typing import Optional, Tuple
+
 import bcrypt
 
+from shared.auth.crypto_executor import run_crypto
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
 
 def hash_password(password: str) -> str:
     """
@@ -21,7 +33,7 @@ def hash_password(password: str) -> str:
     """
     # Parolni bytega aylantirish va hash qilish
     password_bytes = password.encode('utf-8')[:72]  # bcrypt 72 byte limit
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
     hashed = bcrypt.hashpw(password_bytes, salt)
     return hashed.decode('utf-8')
 
@@ -60,7 +72,7 @@ def hash_pin(pin: str) -> str:
         str: Hash qilingan PIN
     """
     pin_bytes = pin.encode('utf-8')
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
     hashed = bcrypt.hashpw(pin_bytes, salt)
     return hashed.decode('utf-8')
 
@@ -84,9 +96,52 @@ def verify_pin(plain_pin: str, hashed_pin: str) -> bool:
         return False
 
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    """Hash joriy BCRYPT_ROUNDS dan boshqa cost bilan yaratilganmi ("$2b$12$...")"""
+    try:
+        _, _, cost, _ = hashed_password.split("$", 3)
+        return int(cost) != BCRYPT_ROUNDS
+    except (AttributeError, ValueError):
+        return True
+
+
+async def hash_password_async(password: str) -> str:
+    """hash_password() — kripto pool'da"""
+    return await run_crypto(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password() — kripto pool'da"""
+    return await run_crypto(verify_password, plain_password, hashed_password)
+
+
+async def verify_and_upgrade_password(
+    plain_password: str,
+    hashed_password: Optional[str],
+) -> Tuple[bool, Optional[str]]:
+    """
+    Parolni tekshirish va kerak bo'lsa yangi cost bilan qayta hash qilish.
+
+    Returns:
+        (to'g'rimi, yangi hash yoki None) — yangi hash qaytsa chaqiruvchi uni saqlaydi
+    """
+    if not hashed_password:
+        return False, None
+    if not await verify_password_async(plain_password, hashed_password):
+        return False, None
+    if password_needs_rehash(hashed_password):
+        return True, await hash_password_async(plain_password)
+    return True, None
+
+
 __all__ = [
+    "BCRYPT_ROUNDS",
     "hash_password",
     "verify_password",
     "hash_pin",
-    "verify_pin"
+    "verify_pin",
+    "password_needs_rehash",
+    "hash_password_async",
+    "verify_password_async",
+    "verify_and_upgrade_password",
 ]
@@ -24,7 +24,7 @@ from shared.database.models.student import StudentProfile
 from shared.database.models.parent import ParentProfile
 from shared.database.models.teacher import TeacherProfile
 from shared.database.models.organization import OrganizationProfile, ModeratorProfile
-from shared.database.models.telegram import PhoneVerification, TelegramUser
+from shared.database.models.telegram import PhoneVerification, TelegramUser, TelegramBroadcast, TelegramOutbox
 from shared.database.models.feedback import PlatformFeedback
 from shared.database.models.email_verification import (
     EmailVerificationCode,
@@ -79,6 +79,7 @@ from shared.database.models.olympiad_stage import (
     StageContentType,
     OlympiadStage,
     OlympiadStageResult,
+    OlympiadStageFinalization,
 )
 
 # Game System
@@ -157,6 +158,7 @@ from shared.database.models.reading_competition import (
     CompetitionTest,
     ReadingSession,
     CompetitionResult,
+    ReadingAnalysisJob,
     CompetitionStatus,
     TaskDay,
     SessionStatus,
@@ -180,6 +182,8 @@ from shared.database.models.analytics import (
     UserGeoLog,
     AuditLog,
     AdminNotification,
+    DailyPlatformMetrics,
+    UserDailyLogin,
 )
 
 # Reading Rating System
@@ -226,6 +230,8 @@ __all__ = [
     # Telegram Models
     "PhoneVerification",
     "TelegramUser",
+    "TelegramBroadcast",
+    "TelegramOutbox",
     
     # Feedback
     "PlatformFeedback",
@@ -269,6 +275,7 @@ __all__ = [
     "StageContentType",
     "OlympiadStage",
     "OlympiadStageResult",
+    "OlympiadStageFinalization",
     
     # Game Models
     "GameType",
@@ -342,6 +349,7 @@ __all__ = [
     "CompetitionTest",
     "ReadingSession",
     "CompetitionResult",
+    "ReadingAnalysisJob",
     "CompetitionStatus",
     "TaskDay",
     "SessionStatus",
@@ -363,6 +371,8 @@ __all__ = [
     "UserGeoLog",
     "AuditLog",
     "AdminNotification",
+    "DailyPlatformMetrics",
+    "UserDailyLogin",
 
     # Marketplace Models
     "MarketplaceItemType",
@@ -1,8 +1,8 @@
 """
-Analytics Models - Geolocation, Audit Log, Admin Notifications
+Analytics Models - Geolocation, Audit Log, Admin Notifications, Daily Metrics
 Alif24 Smart Admin Panel uchun
 """
-from sqlalchemy import Column, String, Boolean, DateTime, Float, Integer, Text, JSON, Index, ForeignKey
+from sqlalchemy import Column, String, Boolean, Date, DateTime, Float, Integer, BigInteger, Text, JSON, Index, ForeignKey
 from sqlalchemy.sql import func
 import uuid
 from shared.database.base import Base
@@ -45,6 +45,7 @@ class UserGeoLog(Base):
         Index("idx_geo_user_created", "user_id", "created_at"),
         Index("idx_geo_region", "region"),
         Index("idx_geo_city", "city"),
+        Index("idx_geo_action_created", "action", "created_at"),
     )
 
 
@@ -107,8 +108,64 @@ class AdminNotification(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 
+class DailyPlatformMetrics(Base):
+    """
+    Kunlik platforma ko'rsatkichlari (UTC kun) — admin dashboard shu jadvaldan o'qiydi
+    Fon job'i (metrics_rollup) tugagan kunlarni inkremental hisoblaydi.
+
+    Kunlik hodisalar: new_*, logins, revenue, coins_*
+    Holat snapshot'i (hisoblangan paytdagi): users_*, active_*, subscribers, ...
+    — faqat eng so'nggi kun uchun yangilanadi, eski kunlarda NULL bo'lishi mumkin
+    """
+    __tablename__ = "daily_platform_metrics"
+
+    day = Column(Date, primary_key=True)
+
+    # Shu kuni ro'yxatdan o'tganlar
+    new_users = Column(Integer, nullable=False, default=0)
+    new_by_role = Column(JSON, nullable=True)           # {"student": 12, "parent": 3, ...}
+
+    # Loginlar (user_geo_logs, action="login")
+    logins = Column(Integer, nullable=False, default=0)
+    unique_logins = Column(Integer, nullable=False, default=0)
+
+    # Pul va coinlar
+    revenue = Column(BigInteger, nullable=False, default=0)     # UZS, shu kuni yaratilgan obunalar
+    subscriptions_started = Column(Integer, nullable=False, default=0)
+    coins_earned = Column(BigInteger, nullable=False, default=0)
+    coins_spent = Column(BigInteger, nullable=False, default=0)
+
+    # Kun oxiridagi jami foydalanuvchilar (created_at < kun oxiri)
+    users_total = Column(Integer, nullable=False, default=0)
+    users_by_role = Column(JSON, nullable=True)
+    # Kun oxirigacha jami daromad (UZS) — catch-up oynasidan oldingi tarix ham
+    revenue_total = Column(BigInteger, nullable=True)
+
+    # Holat snapshot'i
+    active_users = Column(Integer, nullable=True)
+    active_subscriptions = Column(Integer, nullable=True)
+    subscribers = Column(Integer, nullable=True)
+    coins_in_circulation = Column(BigInteger, nullable=True)
+    coin_rich_users = Column(Integer, nullable=True)
+
+    computed_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class UserDailyLogin(Base):
+    """
+    Kun x foydalanuvchi (login qilganlar) — bir necha kunlik unique loginlar
+    (segmentlar: oxirgi 7 kun, 7-30 kun) geo loglarni skan qilmasdan hisoblanadi
+    """
+    __tablename__ = "user_daily_logins"
+
+    day = Column(Date, primary_key=True)
+    user_id = Column(String(8), primary_key=True)
+
+
 __all__ = [
     "UserGeoLog",
     "AuditLog",
     "AdminNotification",
+    "DailyPlatformMetrics",
+    "UserDailyLogin",
 ]
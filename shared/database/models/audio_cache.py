@@ -25,8 +25,9 @@ class AudioCache(Base):
     voice_gender = Column(String(10), default="female")  # male/female
 
     # Audio fayl (blob yoki file path)
-    audio_data = Column(Text, nullable=True)  # Base64 encoded audio (for small files)
+    audio_data = Column(Text, nullable=True)  # Base64 encoded audio (legacy — yangi yozuvlarda NULL)
     audio_url = Column(String(500), nullable=True)  # URL for larger files (Azure Blob)
+    storage_key = Column(String(300), nullable=True)  # "disk:<nom>" yoki "azure:<blob nomi>" — audio baytlari
 
     # Metadata
     file_size = Column(Integer, nullable=True)  # bytes
@@ -34,6 +35,7 @@ class AudioCache(Base):
 
     # Stats
     hit_count = Column(Integer, default=0)
+    last_accessed_at = Column(DateTime(timezone=True), nullable=True, index=True)  # eviction uchun
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
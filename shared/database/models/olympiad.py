@@ -172,6 +172,8 @@ class OlympiadParticipant(Base):
         UniqueConstraint("olympiad_id", "student_id", name="uq_participant_olympiad_student"),
         Index("ix_participant_olympiad_id", "olympiad_id"),
         Index("ix_participant_student_id", "student_id"),
+        # Ko'p bosqichli olimpiada: scope guruhlari (stage_finalization, leaderboard)
+        Index("ix_participant_scope", "olympiad_id", "region", "district", "school_number"),
     )
     
     id = Column(String(8), primary_key=True, default=generate_8_digit_id)
@@ -2,12 +2,13 @@
 Olympiad Stage Models — Ko'p bosqichli olimpiada uchun
 Har bir bosqich (maktab, tuman, viloyat, respublika) alohida jadvalda saqlanadi.
 """
-from sqlalchemy import Column, String, Integer, Float, Boolean, DateTime, Text, ForeignKey, Enum as SQLEnum, Index
+from sqlalchemy import Column, String, Integer, Float, Boolean, DateTime, Text, ForeignKey, JSON, Enum as SQLEnum, Index, event, select
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
 from shared.database.base import Base
 from shared.database.id_generator import generate_8_digit_id
+from shared.database.models.olympiad import OlympiadParticipant
 
 
 # ============================================================
@@ -92,7 +93,6 @@ class OlympiadStageResult(Base):
     __tablename__ = "olympiad_stage_results"
     __table_args__ = (
         Index("ix_stage_result_participant", "participant_id"),
-        Index("ix_stage_result_stage", "stage_id"),
     )
 
     id = Column(String(8), primary_key=True, default=generate_8_digit_id)
@@ -105,6 +105,12 @@ class OlympiadStageResult(Base):
     rank_in_group = Column(Integer, nullable=True)          # Guruh ichidagi o'rni
     is_passed = Column(Boolean, default=False)              # Keyingi bosqichga o'tdimi?
 
+    # Ishtirokchining scope'i (denormalizatsiya) — leaderboard indekslari uchun.
+    # Insert'da participant'dan to'ldiriladi, bosqich yakunlanganda qayta sinxronlanadi
+    region = Column(String(100), nullable=True)
+    district = Column(String(100), nullable=True)
+    school_number = Column(Integer, nullable=True)
+
     # Vaqt
     completed_at = Column(DateTime(timezone=True), server_default=func.now())
 
@@ -116,9 +122,82 @@ class OlympiadStageResult(Base):
         return f"<OlympiadStageResult rank={self.rank_in_group} passed={self.is_passed}>"
 
 
+# Scope bo'yicha reyting indekslari: WHERE stage + scope kaliti, ORDER BY
+# score DESC, duration ASC, id — top-N, "mening o'rnim" va qo'shnilar indeks
+# diapazonidan (Postgres'da INCLUDE bilan index-only)
+_RANK_ORDER = (
+    OlympiadStageResult.score.desc(),
+    OlympiadStageResult.duration_seconds,
+    OlympiadStageResult.id,
+)
+_RANK_INCLUDE = {"postgresql_include": ["participant_id", "is_passed"]}
+Index("ix_stage_result_rank_republic", OlympiadStageResult.stage_id, *_RANK_ORDER, **_RANK_INCLUDE)
+Index("ix_stage_result_rank_region", OlympiadStageResult.stage_id, OlympiadStageResult.region,
+      *_RANK_ORDER, **_RANK_INCLUDE)
+Index("ix_stage_result_rank_district", OlympiadStageResult.stage_id, OlympiadStageResult.region,
+      OlympiadStageResult.district, *_RANK_ORDER, **_RANK_INCLUDE)
+Index("ix_stage_result_rank_school", OlympiadStageResult.stage_id, OlympiadStageResult.region,
+      OlympiadStageResult.district, OlympiadStageResult.school_number, *_RANK_ORDER, **_RANK_INCLUDE)
+
+
+# ============================================================
+# EVENT LISTENERS
+# ============================================================
+
+def _fill_result_scope(mapper, connection, target):
+    """OlympiadStageResult scope ustunlarini participant'dan avtomatik to'ldiradi"""
+    if target.participant_id and target.region is None and target.school_number is None:
+        row = connection.execute(
+            select(OlympiadParticipant.region, OlympiadParticipant.district, OlympiadParticipant.school_number)
+            .where(OlympiadParticipant.id == target.participant_id)
+        ).first()
+        if row is not None:
+            target.region, target.district, target.school_number = row
+
+event.listen(OlympiadStageResult, "before_insert", _fill_result_scope)
+
+
+# ============================================================
+# OLYMPIAD STAGE FINALIZATION
+# ============================================================
+
+class OlympiadStageFinalization(Base):
+    """
+    Bosqichni yakunlash jarayoni (Olimp app/olimp/stage_finalization.py).
+    Guruhlar scope kaliti tartibida bo'laklab reytinglanadi; last_group_key —
+    oxirgi to'liq yozilgan bo'lakning oxirgi guruhi, jarayon uzilib qolsa
+    shu joydan davom ettiriladi. Har bir bosqich uchun yagona yozuv.
+    """
+    __tablename__ = "olympiad_stage_finalizations"
+
+    id = Column(String(8), primary_key=True, default=generate_8_digit_id)
+    stage_id = Column(String(8), ForeignKey("olympiad_stages.id", ondelete="CASCADE"), nullable=False, unique=True)
+    stage_number = Column(Integer, nullable=False)
+
+    # pending / running / completed / failed
+    status = Column(String(20), nullable=False, default="pending", index=True)
+    groups_total = Column(Integer, default=0)
+    groups_done = Column(Integer, default=0)
+    results_total = Column(Integer, default=0)
+    results_done = Column(Integer, default=0)
+    total_passed = Column(Integer, default=0)
+    total_failed = Column(Integer, default=0)
+    last_group_key = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Ishlayotgan worker har bo'lakdan keyin yangilaydi (heartbeat)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self):
+        return f"<OlympiadStageFinalization stage={self.stage_id} status={self.status} {self.groups_done}/{self.groups_total}>"
+
+
 __all__ = [
     "ScopeType",
     "StageContentType",
     "OlympiadStage",
     "OlympiadStageResult",
+    "OlympiadStageFinalization",
 ]
@@ -8,11 +8,13 @@ Modellari:
 - CompetitionTest: Shanba kuni test
 - ReadingSession: Bola o'qish sessiyasi
 - CompetitionResult: Haftalik yakuniy natija
+- ReadingAnalysisJob: Ovoz yozuvini fon tahlili (STT + scoring) navbati
 """
 import enum
+import uuid
 from sqlalchemy import (
     Column, String, Integer, Float, Boolean, Text, DateTime, Date,
-    ForeignKey, Enum as SQLEnum, JSON, UniqueConstraint
+    ForeignKey, Enum as SQLEnum, JSON, UniqueConstraint, Index
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -258,8 +260,45 @@ class CompetitionResult(Base):
         return f"<CompetitionResult student={self.student_id} total={self.total_score}>"
 
 
+# ============================================================
+# READING ANALYSIS JOB — Ovoz yozuvini fon tahlili
+# ============================================================
+
+class ReadingAnalysisJob(Base):
+    """
+    Ovoz yozuvi tahlili navbati: bitta sessiyaga bitta yozuv (session_id —
+    idempotentlik kaliti). Yuklash qatorni pending qiladi; worker uni egallaydi
+    (status="processing", next_attempt_at — lease muddati), audio'ni STT ga
+    oqim bilan uzatadi, ball qo'yib ReadingSession/CompetitionResult ni yozadi
+    va done/failed qiladi. Vaqtinchalik xatoda next_attempt_at kechiktiriladi.
+    """
+    __tablename__ = "reading_analysis_jobs"
+
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    session_id = Column(String(8), ForeignKey("reading_sessions.id", ondelete="CASCADE"), nullable=False, unique=True)
+    # Qaysi yozuv tahlil qilinmoqda — qayta yuklansa job qaytadan boshlanadi
+    audio_filename = Column(String(200), nullable=False)
+
+    # pending / processing / done / failed
+    status = Column(String(20), nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime(timezone=True), nullable=False)
+    last_error = Column(Text, nullable=True)
+    result = Column(JSON, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("idx_reading_analysis_due", "status", "next_attempt_at"),
+    )
+
+    def __repr__(self):
+        return f"<ReadingAnalysisJob session={self.session_id} status={self.status}>"
+
+
 __all__ = [
     "ReadingCompetition", "ReadingTask", "CompetitionTest",
-    "ReadingSession", "CompetitionResult",
+    "ReadingSession", "CompetitionResult", "ReadingAnalysisJob",
     "CompetitionStatus", "TaskDay", "SessionStatus", "ResultGroup",
 ]
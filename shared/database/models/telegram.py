@@ -3,9 +3,10 @@ Phone Verification and Telegram Models
 Telefon raqamini tasdiqlash va Telegram foydalanuvchi modellari
 8 xonalik ID bilan
 """
-from sqlalchemy import Column, String, Boolean, DateTime, Integer
+from sqlalchemy import Column, String, Boolean, DateTime, Index, Integer, Text
 from sqlalchemy.sql import func
 import secrets
+import uuid
 import string
 from datetime import datetime, timedelta, timezone
 from shared.database.base import Base
@@ -139,3 +140,69 @@ class TelegramUser(Base):
     
     def __repr__(self):
         return f"<TelegramUser chat_id={self.telegram_chat_id} user_id={self.user_id}>"
+
+
+class TelegramBroadcast(Base):
+    """
+    Ommaviy Telegram xabari va uning yuborilish holati.
+    Qabul qiluvchilar TelegramUser.id bo'yicha tartibda bo'laklab yuboriladi;
+    last_recipient_id — oxirgi to'liq yuborilgan bo'lak kursori, jarayon
+    uzilib qolsa shu joydan davom ettiriladi.
+    """
+    __tablename__ = "telegram_broadcasts"
+
+    id = Column(String(8), primary_key=True, default=generate_8_digit_id)
+
+    message = Column(Text, nullable=False)
+    parse_mode = Column(String(20), nullable=True)
+    filter_type = Column(String(20), nullable=True)  # None/"all", "students", "parents", "teachers"
+
+    # pending / running / completed / failed
+    status = Column(String(20), nullable=False, default="pending", index=True)
+    total = Column(Integer, default=0)
+    sent = Column(Integer, default=0)
+    failed = Column(Integer, default=0)
+    last_recipient_id = Column(String(8), nullable=True)
+    error = Column(Text, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Ishlayotgan worker har bo'lakdan keyin yangilaydi (heartbeat)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self):
+        return f"<TelegramBroadcast id={self.id} status={self.status} sent={self.sent}/{self.total}>"
+
+
+class TelegramOutbox(Base):
+    """
+    Telegram chiqish navbati: bitta chatga bitta xabar.
+    Yozuv xabarni keltirib chiqargan amal (vazifa, taklif) bilan bir
+    tranzaksiyada qo'shiladi — commit bo'lmasa xabar ham ketmaydi.
+    Worker pending qatorlarni egallaydi (status="sending", next_attempt_at —
+    lease muddati), yuboradi va sent/failed qiladi; xatoda next_attempt_at
+    kechiktiriladi.
+    """
+    __tablename__ = "telegram_outbox"
+
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = Column(String(8), nullable=True)
+    chat_id = Column(String(50), nullable=False)
+    text = Column(Text, nullable=False)
+    parse_mode = Column(String(20), nullable=True)
+
+    # pending / sending / sent / failed
+    status = Column(String(20), nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime(timezone=True), nullable=False)
+    last_error = Column(Text, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("idx_telegram_outbox_due", "status", "next_attempt_at"),
+    )
+
+    def __repr__(self):
+        return f"<TelegramOutbox id={self.id} chat_id={self.chat_id} status={self.status}>"
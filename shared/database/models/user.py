@@ -130,7 +130,7 @@ class User(Base):
     
     # Vaqt tamg'alari
     last_login_at = Column(DateTime(timezone=True), nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     deleted_at = Column(DateTime(timezone=True), nullable=True)
     
@@ -167,17 +167,32 @@ class User(Base):
             return False
         return self.pin_code == pin   
     def set_password(self, password: str):
-        """Parolni hash qilish (bcrypt)"""
-        import bcrypt
-        salt = bcrypt.gensalt()
-        self.password_hash = bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+        """Parolni hash qilish (bcrypt) — event loop'ni bloklaydi, async kodda set_password_async"""
+        from shared.auth.password import hash_password
+        self.password_hash = hash_password(password)
     
     def verify_password(self, password: str) -> bool:
-        """Parolni tekshirish"""
+        """Parolni tekshirish — event loop'ni bloklaydi, async kodda verify_password_async"""
         if not self.password_hash:
             return False
-        import bcrypt
-        return bcrypt.checkpw(password.encode('utf-8'), self.password_hash.encode('utf-8'))
+        from shared.auth.password import verify_password
+        return verify_password(password, self.password_hash)
+
+    async def set_password_async(self, password: str):
+        """Parolni kripto pool'da hash qilish"""
+        from shared.auth.password import hash_password_async
+        self.password_hash = await hash_password_async(password)
+
+    async def verify_password_async(self, password: str) -> bool:
+        """
+        Parolni kripto pool'da tekshirish. Hash eski cost bilan bo'lsa,
+        password_hash yangilanadi (saqlash uchun chaqiruvchi commit qiladi).
+        """
+        from shared.auth.password import verify_and_upgrade_password
+        ok, new_hash = await verify_and_upgrade_password(password, self.password_hash)
+        if new_hash:
+            self.password_hash = new_hash
+        return ok
     
     def to_dict(self) -> dict:
         """Dict formatga aylantirish"""
@@ -9,6 +9,7 @@ Import qilish:
 from shared.payments.coin_service import (
     get_or_create_coin_balance,
     add_coins,
+    add_coins_bulk,
     deduct_coins,
     get_coin_balance,
     get_transaction_history,
@@ -22,6 +23,7 @@ from shared.payments.coin_service import (
 __all__ = [
     "get_or_create_coin_balance",
     "add_coins",
+    "add_coins_bulk",
     "deduct_coins",
     "get_coin_balance",
     "get_transaction_history",
@@ -3,8 +3,9 @@ Coin Service - Coin tizimini boshqarish
 Barcha platformalar uchun bir xil coin tizimi
 """
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, desc
-from typing import Optional, List
+from sqlalchemy import select, desc, insert, update
+from typing import Optional, List, Dict, Iterable
+from shared.database.id_generator import generate_8_digit_id
 from shared.database.models import (
     StudentCoin,
     CoinTransaction,
@@ -12,6 +13,9 @@ from shared.database.models import (
     StudentProfile
 )
 
+# Bitta INSERT ... VALUES dagi satrlar soni (Postgres 65535 parametr chegarasi)
+BULK_CHUNK_SIZE = 1000
+
 
 async def get_or_create_coin_balance(db: AsyncSession, student_id: str) -> StudentCoin:
     """
@@ -126,6 +130,91 @@ async def deduct_coins(
     return coin_balance
 
 
+async def add_coins_bulk(db: AsyncSession, awards: Iterable[Dict], commit: bool = True) -> Dict[str, int]:
+    """
+    Ko'p o'quvchiga bir vaqtda coin berish (quiz/olimpiada/dars mukofotlari).
+
+    Har bir award — add_coins() argumentlari bilan dict:
+        {"student_id", "amount", "transaction_type", "description"?, "reference_id"?, "reference_type"?}
+
+    add_coins() ni har bir o'quvchi uchun chaqirish bilan bir xil natija
+    (balans, tranzaksiyalar, StudentProfile.total_coins), lekin so'rovlar soni
+    o'quvchilar soniga bog'liq emas: balanslar bitta INSERT ... ON CONFLICT
+    bilan, tranzaksiyalar bitta bulk INSERT bilan, total_coins bitta UPDATE bilan.
+    Yangi balanslar {student_id: current_balance} ko'rinishida qaytadi.
+    """
+    awards = list(awards)
+    if not awards:
+        return {}
+
+    totals: Dict[str, int] = {}
+    for award in awards:
+        totals[award["student_id"]] = totals.get(award["student_id"], 0) + award["amount"]
+
+    if db.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as upsert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as upsert
+
+    coin_ids: Dict[str, str] = {}
+    balances: Dict[str, int] = {}
+    student_ids = list(totals)
+    for start in range(0, len(student_ids), BULK_CHUNK_SIZE):
+        chunk = student_ids[start:start + BULK_CHUNK_SIZE]
+        stmt = upsert(StudentCoin).values([
+            {
+                "id": generate_8_digit_id(),
+                "student_id": student_id,
+                "total_earned": totals[student_id],
+                "total_spent": 0,
+                "total_withdrawn": 0,
+                "current_balance": totals[student_id],
+            }
+            for student_id in chunk
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[StudentCoin.student_id],
+            set_={
+                "total_earned": StudentCoin.total_earned + stmt.excluded.total_earned,
+                "current_balance": StudentCoin.current_balance + stmt.excluded.current_balance,
+            },
+        ).returning(StudentCoin.id, StudentCoin.student_id, StudentCoin.current_balance)
+        res = await db.execute(stmt)
+        for coin_id, student_id, balance in res.all():
+            coin_ids[student_id] = coin_id
+            balances[student_id] = balance
+
+    await db.execute(insert(CoinTransaction), [
+        {
+            "id": generate_8_digit_id(),
+            "student_coin_id": coin_ids[award["student_id"]],
+            "type": award["transaction_type"],
+            "amount": award["amount"],
+            "description": award.get("description")
+            or f"{award['transaction_type'].value}: +{award['amount']} coin",
+            "reference_id": award.get("reference_id"),
+            "reference_type": award.get("reference_type"),
+        }
+        for award in awards
+    ])
+
+    # O'quvchi profillaridagi keshni yangilash
+    await db.execute(
+        update(StudentProfile)
+        .where(StudentProfile.id.in_(student_ids))
+        .values(total_coins=(
+            select(StudentCoin.current_balance)
+            .where(StudentCoin.student_id == StudentProfile.id)
+            .scalar_subquery()
+        ))
+        .execution_options(synchronize_session=False)
+    )
+
+    if commit:
+        await db.commit()
+    return balances
+
+
 async def get_coin_balance(db: AsyncSession, student_id: str) -> int:
     """
     O'quvchining joriy coin balansini olish
@@ -226,6 +315,7 @@ async def reward_olympiad(db: AsyncSession, student_id: str, olympiad_id: str, p
 __all__ = [
     "get_or_create_coin_balance",
     "add_coins",
+    "add_coins_bulk",
     "deduct_coins",
     "get_coin_balance",
     "get_transaction_history",
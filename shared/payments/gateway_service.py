@@ -14,7 +14,8 @@ import json
 import logging
 from datetime import datetime, timezone
 from typing import Optional, Dict, Any, Tuple
-import httpx
+
+from shared.services.http_client import get_http_client
 
 logger = logging.getLogger(__name__)
 
@@ -86,11 +87,8 @@ class PaymeGateway(BaseGateway):
         auth_string = f"{self.merchant_id}:{self.secret_key}"
         return "Basic " + base64.b64encode(auth_string.encode()).decode()
 
-    def _make_request(self, method: str, params: Dict) -> Dict:
-        """Payme ga RPC so'rov yuborish"""
-        import httpx
-        import uuid
-
+    async def _make_request(self, method: str, params: Dict, idempotent: bool = False) -> Dict:
+        """Payme ga RPC so'rov yuborish (umumiy async klient orqali)"""
         payload = {
             "method": method,
             "params": params,
@@ -103,7 +101,9 @@ class PaymeGateway(BaseGateway):
         }
 
         try:
-            response = httpx.post(self.merchant_api, json=payload, headers=headers, timeout=15)
+            response = await get_http_client("payme").post(
+                self.merchant_api, json=payload, headers=headers, idempotent=idempotent
+            )
             return response.json()
         except Exception as e:
             logger.error(f"Payme API error: {e}")
@@ -146,7 +146,7 @@ class PaymeGateway(BaseGateway):
 
     async def check_payment(self, external_id: str) -> Dict[str, Any]:
         """Payme CheckTransaction - tranzaksiya holatini tekshirish"""
-        result = self._make_request("CheckTransaction", {"id": external_id})
+        result = await self._make_request("CheckTransaction", {"id": external_id}, idempotent=True)
 
         if "error" in result:
             return {"status": "pending", "error": result.get("error")}
@@ -258,25 +258,24 @@ class ClickGateway(BaseGateway):
                 "transaction_id": order_id,
                 "description": description[:100],  # Max 100 chars
             }
-            async with httpx.AsyncClient(timeout=15) as client:
-                resp = await client.post(
-                    f"{self.BASE_URL}/merchant/invoice/create",
-                    json=payload,
-                    headers=headers,
-                )
-                data = resp.json()
-                if data.get("success"):
-                    return {
-                        "checkout_url": data.get("url", ""),
-                        "external_id": str(data.get("invoice_id", order_id)),
-                        "raw": data,
-                    }
+            resp = await get_http_client("click").post(
+                f"{self.BASE_URL}/merchant/invoice/create",
+                json=payload,
+                headers=headers,
+            )
+            data = resp.json()
+            if data.get("success"):
                 return {
-                    "checkout_url": "",
-                    "external_id": order_id,
+                    "checkout_url": data.get("url", ""),
+                    "external_id": str(data.get("invoice_id", order_id)),
                     "raw": data,
-                    "error": data.get("error_note", "Unknown error"),
                 }
+            return {
+                "checkout_url": "",
+                "external_id": order_id,
+                "raw": data,
+                "error": data.get("error_note", "Unknown error"),
+            }
         except Exception as e:
             logger.error(f"Click create payment error: {e}")
             return {
@@ -292,22 +291,21 @@ class ClickGateway(BaseGateway):
                 "Authorization": f"Token {self.secret_key}",
                 "Content-Type": "application/json",
             }
-            async with httpx.AsyncClient(timeout=15) as client:
-                resp = await client.get(
-                    f"{self.BASE_URL}/merchant/invoice/status/{external_id}",
-                    headers=headers,
-                )
-                data = resp.json()
-                state_map = {
-                    "1": "pending",
-                    "2": "completed",
-                    "-1": "cancelled",
-                    "-2": "cancelled",
-                }
-                return {
-                    "status": state_map.get(str(data.get("state", "0")), "pending"),
-                    "raw": data,
-                }
+            resp = await get_http_client("click").get(
+                f"{self.BASE_URL}/merchant/invoice/status/{external_id}",
+                headers=headers,
+            )
+            data = resp.json()
+            state_map = {
+                "1": "pending",
+                "2": "completed",
+                "-1": "cancelled",
+                "-2": "cancelled",
+            }
+            return {
+                "status": state_map.get(str(data.get("state", "0")), "pending"),
+                "raw": data,
+            }
         except Exception as e:
             logger.error(f"Click check error: {e}")
             return {"status": "pending", "error": str(e)}
@@ -362,20 +360,19 @@ class UzumGateway(BaseGateway):
                 "description": description,
                 "returnUrl": return_url,
             }
-            async with httpx.AsyncClient(timeout=15) as client:
-                resp = await client.post(
-                    f"{self.BASE_URL}/payment/create",
-                    json=payload,
-                    headers=headers,
-                )
-                data = resp.json()
-                checkout_url = data.get("paymentUrl") or data.get("redirectUrl", "")
-                ext_id = data.get("transactionId") or data.get("id", order_id)
-                return {
-                    "checkout_url": checkout_url,
-                    "external_id": str(ext_id),
-                    "raw": data,
-                }
+            resp = await get_http_client("uzum").post(
+                f"{self.BASE_URL}/payment/create",
+                json=payload,
+                headers=headers,
+            )
+            data = resp.json()
+            checkout_url = data.get("paymentUrl") or data.get("redirectUrl", "")
+            ext_id = data.get("transactionId") or data.get("id", order_id)
+            return {
+                "checkout_url": checkout_url,
+                "external_id": str(ext_id),
+                "raw": data,
+            }
         except Exception as e:
             logger.error(f"Uzum create error: {e}")
             # Fallback: manual URL
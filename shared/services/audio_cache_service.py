@@ -1,17 +1,371 @@
 """
 Audio Cache Service — TTS audio fayllarni cache qilish uchun
  Hikoyalar uchun TTS audio tezroq va arzonroq xizmat qilish uchun
+
+Qatlamlar (tezdan sekinga):
+    1. memory — har bir worker'dagi LRU, hajmi baytlarda cheklangan
+       (AUDIO_CACHE_MEMORY_BYTES). Hit bo'lsa DB'ga umuman murojaat yo'q.
+    2. blob   — audio_cache qatori faqat metadata (storage_key, file_size...),
+       audio baytlari Azure Blob (StorageService) yoki umumiy volume'da
+       (AUDIO_CACHE_DIR). Tanlov: AUDIO_CACHE_STORAGE=azure|disk|inline.
+    3. inline — audio_data ustunida base64: blob store sozlanmagan bo'lsa
+       yangi yozuvlar ham shu yerda. offload_inline_rows() ularni blob'ga
+       ko'chiradi.
+
+audio_cache jadvali MainPlatform va Lessions uchun umumiy, shuning uchun blob
+faqat ikkala servis ko'radigan joyga yoziladi: Azure sozlanmagan va
+AUDIO_CACHE_DIR (umumiy volume, hamma servislarda bir xil) berilmagan bo'lsa
+inline. Blob'i yo'qolgan qator oddiy miss emas — o'qishda tuzatiladi yoki
+o'chiriladi, prune_missing_blobs() (maintenance) qolganlarini tozalaydi.
+
+hit_count va last_accessed_at so'rov ichida yozilmaydi: hit'lar xotirada
+yig'iladi va fon vazifasi AUDIO_CACHE_FLUSH_SECONDS da bir marta bitta
+executemany UPDATE bilan yozadi. evict() eski (last_accessed_at) va umumiy
+hajm (AUDIO_CACHE_MAX_BYTES) bo'yicha qatorlarni blob'lari bilan o'chiradi.
+start_audio_cache_maintenance() (lifespan) har AUDIO_CACHE_MAINTENANCE_SECONDS
+da inline qatorlarni blob'ga ko'chiradi va evict() ni chaqiradi;
+stop_audio_cache_maintenance() shutdown'da yig'ilgan hit'larni yozadi.
+get_audio_cache_stats() — hit ratio, qatlamlar bo'yicha hit'lar va latency
+(MainPlatform: GET /admin/system/cache-stats).
 """
+import asyncio
+import base64
+import binascii
 import hashlib
 import logging
-from typing import Optional
+import os
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import bindparam, func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
 
 from shared.database.models.audio_cache import AudioCache
 
 logger = logging.getLogger(__name__)
 
+AUDIO_CACHE_MEMORY_BYTES = int(os.getenv("AUDIO_CACHE_MEMORY_BYTES", str(64 * 1024 * 1024)))
+AUDIO_CACHE_DIR = os.getenv("AUDIO_CACHE_DIR", "")
+AUDIO_CACHE_STORAGE = os.getenv(
+    "AUDIO_CACHE_STORAGE",
+    "azure" if os.getenv("AZURE_STORAGE_CONNECTION_STRING") else ("disk" if AUDIO_CACHE_DIR else "inline"),
+)
+AUDIO_CACHE_FLUSH_SECONDS = float(os.getenv("AUDIO_CACHE_FLUSH_SECONDS", "30"))
+AUDIO_CACHE_MAX_BYTES = int(os.getenv("AUDIO_CACHE_MAX_BYTES", str(5 * 1024 * 1024 * 1024)))
+AUDIO_CACHE_MAX_IDLE_DAYS = int(os.getenv("AUDIO_CACHE_MAX_IDLE_DAYS", "90"))
+AUDIO_CACHE_MAINTENANCE_SECONDS = float(os.getenv("AUDIO_CACHE_MAINTENANCE_SECONDS", "3600"))
+
+AUDIO_EXTENSION = "mp3"
+
+
+class _AudioLRU:
+    """cache_key -> (base64 audio, metadata); umumiy hajm baytlarda cheklangan."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._items: "OrderedDict[str, Tuple[str, dict]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key: str) -> Optional[Tuple[str, dict]]:
+        item = self._items.get(key)
+        if item is not None:
+            self._items.move_to_end(key)
+        return item
+
+    def put(self, key: str, audio_b64: str, meta: dict) -> None:
+        self.pop(key)
+        size = len(audio_b64)
+        if size > self.max_bytes:
+            return
+        self._items[key] = (audio_b64, meta)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            _, (old_audio, _) = self._items.popitem(last=False)
+            self.bytes -= len(old_audio)
+
+    def pop(self, key: str) -> None:
+        item = self._items.pop(key, None)
+        if item is not None:
+            self.bytes -= len(item[0])
+
+    def clear(self) -> None:
+        self._items.clear()
+        self.bytes = 0
+
+
+class LocalDiskAudioStore:
+    """Audio baytlari lokal diskda: storage_key = "disk:<fayl nomi>"."""
+
+    prefix = "disk"
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or AUDIO_CACHE_DIR
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, os.path.basename(name))
+
+    def _write(self, name: str, data: bytes) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(name)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _read(self, name: str) -> Optional[bytes]:
+        try:
+            with open(self._path(name), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _delete(self, name: str) -> None:
+        try:
+            os.remove(self._path(name))
+        except FileNotFoundError:
+            pass
+
+    async def put(self, name: str, data: bytes) -> str:
+        await asyncio.to_thread(self._write, name, data)
+        return f"{self.prefix}:{name}"
+
+    async def get(self, name: str) -> Optional[bytes]:
+        return await asyncio.to_thread(self._read, name)
+
+    async def exists(self, name: str) -> bool:
+        return await asyncio.to_thread(os.path.exists, self._path(name))
+
+    async def delete(self, name: str) -> None:
+        await asyncio.to_thread(self._delete, name)
+
+
+class AzureAudioStore:
+    """Audio baytlari Azure Blob'da (StorageService konteyneri): storage_key = "azure:<blob nomi>"."""
+
+    prefix = "azure"
+    blob_prefix = "tts-cache/"
+
+    def __init__(self, storage=None):
+        if storage is None:
+            from shared.services.storage_service import get_storage_service
+            storage = get_storage_service()
+        self.storage = storage
+
+    async def put(self, name: str, data: bytes) -> str:
+        if not self.storage.container_client:
+            raise RuntimeError("Azure Storage sozlanmagan")
+        await self.storage._ensure_container()
+        blob_name = f"{self.blob_prefix}{name}"
+        await self.storage.container_client.get_blob_client(blob_name).upload_blob(data, overwrite=True)
+        return f"{self.prefix}:{blob_name}"
+
+    async def get(self, name: str) -> Optional[bytes]:
+        """Blob yo'q bo'lsa None; boshqa xatolar (tarmoq, sozlama) ko'tariladi."""
+        from azure.core.exceptions import ResourceNotFoundError
+        if not self.storage.container_client:
+            raise RuntimeError("Azure Storage sozlanmagan")
+        try:
+            stream = await self.storage.container_client.get_blob_client(name).download_blob()
+        except ResourceNotFoundError:
+            return None
+        return await stream.readall()
+
+    async def delete(self, name: str) -> None:
+        await self.storage.delete_audio(name)
+
+
+class _HitBuffer:
+    """Xotirada yig'ilgan hit'lar: cache_key -> (soni, oxirgi murojaat vaqti)."""
+
+    def __init__(self):
+        self.pending: Dict[str, Tuple[int, datetime]] = {}
+        self.engine = None
+        self.task: Optional[asyncio.Task] = None
+
+    def record(self, cache_key: str) -> None:
+        count, _ = self.pending.get(cache_key, (0, None))
+        self.pending[cache_key] = (count + 1, datetime.now(timezone.utc))
+
+    def ensure_flusher(self, engine) -> None:
+        """Fon flush vazifasini (worker'da bitta) kerak bo'lganda ishga tushirish."""
+        if engine is not None:
+            self.engine = engine
+        if self.task is not None and not self.task.done():
+            return
+        try:
+            self.task = asyncio.get_running_loop().create_task(self._run())
+        except RuntimeError:
+            self.task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(AUDIO_CACHE_FLUSH_SECONDS)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.warning(f"Audio cache hit flush failed: {e}")
+
+    async def flush(self, engine=None) -> int:
+        """Yig'ilgan hit'larni bitta executemany UPDATE bilan yozish."""
+        engine = engine or self.engine
+        if not self.pending or engine is None:
+            return 0
+        batch, self.pending = self.pending, {}
+        params = [
+            {"key": key, "n": count, "ts": ts}
+            for key, (count, ts) in batch.items()
+        ]
+        stmt = (
+            update(AudioCache.__table__)
+            .where(AudioCache.__table__.c.cache_key == bindparam("key"))
+            .values(
+                hit_count=func.coalesce(AudioCache.__table__.c.hit_count, 0) + bindparam("n"),
+                last_accessed_at=bindparam("ts"),
+            )
+        )
+        try:
+            async with engine.begin() as conn:
+                await conn.execute(stmt, params)
+        except Exception:
+            # Keyingi flush'da qayta urinish
+            for key, (count, ts) in batch.items():
+                pending_count, pending_ts = self.pending.get(key, (0, ts))
+                self.pending[key] = (count + pending_count, max(ts, pending_ts))
+            raise
+        return len(params)
+
+
+class _CacheMetrics:
+    TIERS = ("memory", "blob", "inline")
+
+    def __init__(self):
+        self.hits = dict.fromkeys(self.TIERS, 0)
+        self.misses = 0
+        self.latencies_ms = deque(maxlen=2048)
+
+    def observe(self, tier: Optional[str], started: float) -> None:
+        if tier is None:
+            self.misses += 1
+        else:
+            self.hits[tier] += 1
+        self.latencies_ms.append((time.perf_counter() - started) * 1000)
+
+    @staticmethod
+    def _percentile(samples, q: float) -> Optional[float]:
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 3)
+
+    def snapshot(self) -> dict:
+        hits = sum(self.hits.values())
+        lookups = hits + self.misses
+        return {
+            "hits": dict(self.hits),
+            "misses": self.misses,
+            "hit_ratio": round(hits / lookups, 4) if lookups else None,
+            "latency_p50_ms": self._percentile(self.latencies_ms, 0.50),
+            "latency_p95_ms": self._percentile(self.latencies_ms, 0.95),
+        }
+
+
+_memory = _AudioLRU(AUDIO_CACHE_MEMORY_BYTES)
+_hits = _HitBuffer()
+_metrics = _CacheMetrics()
+_blob_store = None
+_blob_store_resolved = False
+
+
+def _configured_blob_store():
+    if AUDIO_CACHE_STORAGE == "azure":
+        return AzureAudioStore()
+    if AUDIO_CACHE_STORAGE == "disk":
+        if AUDIO_CACHE_DIR:
+            return LocalDiskAudioStore(AUDIO_CACHE_DIR)
+        logger.warning("AUDIO_CACHE_STORAGE=disk, lekin AUDIO_CACHE_DIR (umumiy volume) berilmagan — audio inline saqlanadi")
+    return None
+
+
+def get_blob_store():
+    """Yangi yozuvlar uchun blob store (AUDIO_CACHE_STORAGE bo'yicha, lazy); None — inline."""
+    global _blob_store, _blob_store_resolved
+    if not _blob_store_resolved:
+        _blob_store = _configured_blob_store()
+        _blob_store_resolved = True
+    return _blob_store
+
+
+def set_blob_store(store) -> None:
+    """Testlar uchun: blob store ni almashtirish (None — AUDIO_CACHE_STORAGE bo'yicha qayta tanlash)"""
+    global _blob_store, _blob_store_resolved
+    _blob_store = store
+    _blob_store_resolved = store is not None
+
+
+def _disk_store() -> Optional[LocalDiskAudioStore]:
+    store = get_blob_store()
+    if isinstance(store, LocalDiskAudioStore):
+        return store
+    return LocalDiskAudioStore() if AUDIO_CACHE_DIR else None
+
+
+def _store_for_key(storage_key: str):
+    """storage_key prefiksi bo'yicha store va nom (backend almashgan eski yozuvlar ham o'qiladi)."""
+    prefix, _, name = storage_key.partition(":")
+    store = get_blob_store()
+    if getattr(store, "prefix", None) == prefix:
+        return store, name
+    if prefix == LocalDiskAudioStore.prefix:
+        return _disk_store(), name
+    if prefix == AzureAudioStore.prefix:
+        return AzureAudioStore(), name
+    return None, name
+
+
+async def _delete_blob(storage_key: Optional[str]) -> None:
+    if not storage_key:
+        return
+    store, name = _store_for_key(storage_key)
+    if store is None:
+        return
+    try:
+        await store.delete(name)
+    except Exception as e:
+        logger.warning(f"Audio blob delete failed ({storage_key}): {e}")
+
+
+def get_audio_cache_stats() -> dict:
+    """Hit ratio, qatlamlar bo'yicha hit'lar, latency p50/p95 va xotira holati"""
+    stats = _metrics.snapshot()
+    stats.update({
+        "memory_entries": len(_memory),
+        "memory_bytes": _memory.bytes,
+        "memory_max_bytes": _memory.max_bytes,
+        "pending_hit_keys": len(_hits.pending),
+    })
+    return stats
+
+
+async def flush_audio_cache_hits(engine=None) -> int:
+    """Yig'ilgan hit'larni hozir yozish (shutdown va testlar uchun)"""
+    return await _hits.flush(engine)
+
+
+def reset_audio_cache() -> None:
+    """Testlar uchun: xotira, hit buferi va metrikalarni tozalash"""
+    global _metrics
+    _memory.clear()
+    _hits.pending.clear()
+    if _hits.task is not None:
+        _hits.task.cancel()
+    _hits.task = _hits.engine = None
+    _metrics = _CacheMetrics()
+
 
 class AudioCacheService:
     """
@@ -33,36 +387,99 @@ class AudioCacheService:
         """Matn SHA256 hash"""
         return hashlib.sha256(text.encode()).hexdigest()
 
+    @staticmethod
+    def _meta(row: AudioCache) -> dict:
+        return {
+            "audio_url": row.audio_url,
+            "file_size": row.file_size,
+            "duration_seconds": row.duration_seconds,
+        }
+
+    def _record_hit(self, cache_key: str) -> None:
+        _hits.record(cache_key)
+        _hits.ensure_flusher(self.db.bind)
+
     async def get_cached_audio(
         self,
         text: str,
         language: str = "uz",
         voice_gender: str = "female"
     ) -> Optional[dict]:
-        """Cache dan audio olish (agar mavjud bo'lsa)"""
+        """Cache dan audio olish (agar mavjud bo'lsa): memory -> blob -> inline"""
+        started = time.perf_counter()
         cache_key = self.generate_cache_key(text, language, voice_gender)
 
-        result = await self.db.execute(
-            select(AudioCache).where(AudioCache.cache_key == cache_key)
-        )
-        cached = result.scalars().first()
+        item = _memory.get(cache_key)
+        tier = "memory" if item is not None else None
+        if item is None:
+            result = await self.db.execute(
+                select(AudioCache).where(AudioCache.cache_key == cache_key)
+            )
+            cached = result.scalars().first()
+            if cached is not None:
+                item, tier, missing = await self._load_audio(cached)
+                if missing:
+                    await self._repair_missing_blob(cached)
+                if item is not None:
+                    _memory.put(cache_key, *item)
 
-        if cached:
-            # Hit count oshirish
-            cached.hit_count += 1
-            await self.db.commit()
+        _metrics.observe(tier, started)
+        if item is None:
+            logger.info(f"Audio cache MISS: {cache_key}")
+            return None
+
+        self._record_hit(cache_key)
+        logger.debug(f"Audio cache HIT ({tier}): {cache_key}")
+        audio_b64, meta = item
+        return {"audio_data": audio_b64, **meta, "cached": True}
+
+    async def _load_audio(self, cached: AudioCache) -> Tuple[Optional[Tuple[str, dict]], Optional[str], bool]:
+        """-> (audio, qatlam, blob yo'qolganmi). O'qish xatosi (tarmoq) yo'qolgan hisoblanmaydi."""
+        missing = False
+        if cached.storage_key:
+            store, name = _store_for_key(cached.storage_key)
+            data = None
+            try:
+                data = await store.get(name) if store is not None else None
+                missing = data is None
+            except Exception as e:
+                logger.warning(f"Audio blob read failed ({cached.storage_key}): {e}")
+            if data is not None:
+                return (base64.b64encode(data).decode("ascii"), self._meta(cached)), "blob", False
+            if missing:
+                logger.warning(f"Audio blob missing: {cached.storage_key}")
+        if cached.audio_data:
+            return (cached.audio_data, self._meta(cached)), "inline", missing
+        return None, None, missing
 
-            logger.info(f"Audio cache HIT: {cache_key} (hits: {cached.hit_count})")
-            return {
-                "audio_data": cached.audio_data,
-                "audio_url": cached.audio_url,
-                "file_size": cached.file_size,
-                "duration_seconds": cached.duration_seconds,
-                "cached": True,
-            }
+    async def _repair_missing_blob(self, row: AudioCache) -> None:
+        """Blob'i yo'q qator: inline nusxa bo'lsa storage_key tozalanadi, aks holda qator o'chiriladi."""
+        try:
+            if row.audio_data:
+                row.storage_key = None
+            else:
+                await self.db.delete(row)
+            await self.db.commit()
+        except Exception as e:
+            await self.db.rollback()
+            logger.warning(f"Audio cache repair failed ({row.cache_key}): {e}")
+        _memory.pop(row.cache_key)
 
-        logger.info(f"Audio cache MISS: {cache_key}")
-        return None
+    async def _offload(self, cache_key: str, audio_data: str) -> Tuple[Optional[str], Optional[int]]:
+        """base64 audio ni blob store ga yozish -> (storage_key, hajm). Inline rejimda yoki xatoda (None, None)."""
+        store = get_blob_store()
+        if store is None:
+            return None, None
+        try:
+            raw = base64.b64decode(audio_data, validate=True)
+        except (binascii.Error, ValueError):
+            return None, None
+        try:
+            storage_key = await store.put(f"{cache_key}.{AUDIO_EXTENSION}", raw)
+        except Exception as e:
+            logger.warning(f"Audio blob write failed, inline saqlanadi ({cache_key}): {e}")
+            return None, None
+        return storage_key, len(raw)
 
     async def save_audio_to_cache(
         self,
@@ -73,10 +490,16 @@ class AudioCacheService:
         file_size: Optional[int] = None,
         duration_seconds: Optional[float] = None,
     ) -> AudioCache:
-        """Audio ni cache ga saqlash"""
+        """Audio ni cache ga saqlash — baytlar blob'ga, qatorga faqat metadata"""
         cache_key = self.generate_cache_key(text, language, voice_gender)
         text_hash = self.generate_text_hash(text)
 
+        storage_key, raw_size = await self._offload(cache_key, audio_data)
+        inline_data = None if storage_key else audio_data
+        if file_size is None:
+            file_size = raw_size
+        now = datetime.now(timezone.utc)
+
         # Eski cache ni tekshirish
         result = await self.db.execute(
             select(AudioCache).where(AudioCache.cache_key == cache_key)
@@ -85,13 +508,19 @@ class AudioCacheService:
 
         if existing:
             # Yangilash
-            existing.audio_data = audio_data
+            old_storage_key = existing.storage_key
+            existing.audio_data = inline_data
+            existing.storage_key = storage_key
             existing.audio_url = None
             existing.file_size = file_size
             existing.duration_seconds = duration_seconds
-            existing.hit_count += 1
+            existing.hit_count = (existing.hit_count or 0) + 1
+            existing.last_accessed_at = now
             await self.db.commit()
             await self.db.refresh(existing)
+            if old_storage_key and old_storage_key != storage_key:
+                await _delete_blob(old_storage_key)
+            _memory.put(cache_key, audio_data, self._meta(existing))
             logger.info(f"Audio cache UPDATED: {cache_key}")
             return existing
 
@@ -101,18 +530,138 @@ class AudioCacheService:
             text_hash=text_hash,
             language=language,
             voice_gender=voice_gender,
-            audio_data=audio_data,
+            audio_data=inline_data,
+            storage_key=storage_key,
             file_size=file_size,
             duration_seconds=duration_seconds,
             hit_count=1,
+            last_accessed_at=now,
         )
         self.db.add(cached)
         await self.db.commit()
         await self.db.refresh(cached)
+        _memory.put(cache_key, audio_data, self._meta(cached))
 
         logger.info(f"Audio cache CREATED: {cache_key}")
         return cached
 
+    async def offload_inline_rows(self, limit: int = 500) -> int:
+        """Eski (audio_data ichida) qatorlarni blob store ga ko'chirish"""
+        if get_blob_store() is None:
+            return 0
+        result = await self.db.execute(
+            select(AudioCache)
+            .where(AudioCache.audio_data.isnot(None), AudioCache.storage_key.is_(None))
+            .limit(limit)
+        )
+        moved = 0
+        for row in result.scalars().all():
+            storage_key, raw_size = await self._offload(row.cache_key, row.audio_data)
+            if storage_key is None:
+                continue
+            row.storage_key = storage_key
+            row.audio_data = None
+            row.file_size = row.file_size or raw_size
+            moved += 1
+        await self.db.commit()
+        if moved:
+            logger.info(f"Audio cache: {moved} ta inline qator blob'ga ko'chirildi")
+        return moved
+
+    async def prune_missing_blobs(self, batch: int = 1000) -> int:
+        """
+        Fayli yo'q "disk:" qatorlarini o'chirish (konteyner qayta ishga tushgani,
+        volume almashgani). AUDIO_CACHE_DIR berilmagan bo'lsa bunday qatorlarni
+        hech kim o'qiy olmaydi — hammasi o'chiriladi. Azure blob'lari tekshirilmaydi.
+        """
+        store = _disk_store()
+        table = AudioCache.__table__
+        last_id, pruned = None, 0
+        while True:
+            query = (
+                select(
+                    table.c.id, table.c.cache_key, table.c.storage_key,
+                    table.c.audio_data.isnot(None).label("has_inline"),
+                )
+                .where(table.c.storage_key.like(f"{LocalDiskAudioStore.prefix}:%"))
+                .order_by(table.c.id)
+                .limit(batch)
+            )
+            if last_id is not None:
+                query = query.where(table.c.id > last_id)
+            rows = (await self.db.execute(query)).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            dangling = []
+            for row in rows:
+                name = row.storage_key.partition(":")[2]
+                if store is None or not await store.exists(name):
+                    dangling.append(row)
+            if dangling:
+                repaired = [r.id for r in dangling if r.has_inline]
+                deleted = [r.id for r in dangling if not r.has_inline]
+                if repaired:
+                    await self.db.execute(table.update().where(table.c.id.in_(repaired)).values(storage_key=None))
+                if deleted:
+                    await self.db.execute(table.delete().where(table.c.id.in_(deleted)))
+                await self.db.commit()
+                for row in dangling:
+                    _memory.pop(row.cache_key)
+                pruned += len(dangling)
+        if pruned:
+            logger.info(f"Audio cache: blob'i yo'q {pruned} ta qator tozalandi")
+        return pruned
+
+    async def evict(
+        self,
+        max_total_bytes: int = AUDIO_CACHE_MAX_BYTES,
+        max_idle_days: int = AUDIO_CACHE_MAX_IDLE_DAYS,
+    ) -> dict:
+        """
+        Eviction: avval max_idle_days dan beri ishlatilmaganlar, keyin umumiy
+        hajm max_total_bytes dan oshsa eng uzoq ishlatilmaganlar o'chiriladi.
+        """
+        await _hits.flush(self.db.bind)
+
+        last_used = func.coalesce(AudioCache.last_accessed_at, AudioCache.created_at)
+        cutoff = datetime.now(timezone.utc) - timedelta(days=max_idle_days)
+        result = await self.db.execute(
+            select(
+                AudioCache.id, AudioCache.cache_key, AudioCache.storage_key, AudioCache.file_size,
+                last_used.label("last_used"),
+            ).order_by(last_used, AudioCache.id)
+        )
+        rows = result.all()
+
+        total = sum(r.file_size or 0 for r in rows)
+        victims = []
+        for row in rows:
+            used_at = row.last_used
+            if used_at is not None and used_at.tzinfo is None:
+                used_at = used_at.replace(tzinfo=timezone.utc)
+            is_idle = used_at is not None and used_at < cutoff
+            if is_idle or total > max_total_bytes:
+                victims.append(row)
+                total -= row.file_size or 0
+
+        if not victims:
+            return {"deleted": 0, "freed_bytes": 0}
+
+        victim_ids = [r.id for r in victims]
+        for start in range(0, len(victim_ids), 1000):
+            chunk = victim_ids[start:start + 1000]
+            await self.db.execute(AudioCache.__table__.delete().where(AudioCache.__table__.c.id.in_(chunk)))
+        await self.db.commit()
+
+        for row in victims:
+            _memory.pop(row.cache_key)
+            await _delete_blob(row.storage_key)
+
+        freed = sum(r.file_size or 0 for r in victims)
+        logger.info(f"Audio cache eviction: {len(victims)} ta yozuv, {freed} bayt")
+        return {"deleted": len(victims), "freed_bytes": freed}
+
 
 # Singleton helper
 _cache_service_instance = None
@@ -121,3 +670,62 @@ _cache_service_instance = None
 def get_audio_cache_service(db: AsyncSession) -> AudioCacheService:
     """Audio cache service olish"""
     return AudioCacheService(db)
+
+
+# ============================================================
+# FON XIZMATI (lifespan)
+# ============================================================
+
+_maintenance_task: Optional[asyncio.Task] = None
+
+
+async def run_audio_cache_maintenance(session_factory) -> dict:
+    """Bitta aylanish: blob'i yo'q qatorlarni tozalash, inline qatorlarni blob'ga ko'chirish, eviction"""
+    moved = 0
+    async with session_factory() as db:
+        service = AudioCacheService(db)
+        pruned = await service.prune_missing_blobs()
+        while True:
+            batch = await service.offload_inline_rows()
+            moved += batch
+            if batch == 0:
+                break
+        evicted = await service.evict()
+    return {"pruned": pruned, "offloaded": moved, **evicted}
+
+
+async def _maintenance_loop(session_factory) -> None:
+    while True:
+        try:
+            await run_audio_cache_maintenance(session_factory)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Audio cache maintenance failed: {e}")
+        await asyncio.sleep(AUDIO_CACHE_MAINTENANCE_SECONDS)
+
+
+def start_audio_cache_maintenance(session_factory) -> asyncio.Task:
+    """Lifespan startup: har AUDIO_CACHE_MAINTENANCE_SECONDS da offload + evict"""
+    global _maintenance_task
+    # Hit flusher birinchi cache hit'dan oldin ham engine'ni bilsin (shutdown flush uchun)
+    _hits.engine = _hits.engine or getattr(session_factory, "kw", {}).get("bind")
+    _maintenance_task = asyncio.get_running_loop().create_task(_maintenance_loop(session_factory))
+    return _maintenance_task
+
+
+async def stop_audio_cache_maintenance() -> None:
+    """Lifespan shutdown: fon vazifalarini to'xtatish va yig'ilgan hit'larni yozish"""
+    global _maintenance_task
+    for task in (_maintenance_task, _hits.task):
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+    _maintenance_task = _hits.task = None
+    try:
+        await _hits.flush()
+    except Exception as e:
+        logger.error(f"Audio cache hit flush on shutdown failed: {e}")
@@ -12,10 +12,12 @@ import os
 import logging
 import time
 import re
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, AsyncIterable, Union
 from xml.sax.saxutils import escape
 from fastapi import HTTPException
 
+from shared.services.http_client import get_http_client
+
 logger = logging.getLogger(__name__)
 
 # ===== Ovoz konfiguratsiyasi =====
@@ -59,15 +61,16 @@ class AzureSpeechService:
             raise HTTPException(status_code=500, detail="AZURE_SPEECH_KEY sozlanmagan")
 
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                resp = await client.post(
-                    self.token_url,
-                    headers={"Ocp-Apim-Subscription-Key": self.speech_key},
-                )
-                resp.raise_for_status()
-                self._cached_token = resp.text
-                self._token_expiry = time.time() + 540  # 9 daqiqa
-                return self._cached_token
+            resp = await get_http_client("azure_speech").post(
+                self.token_url,
+                headers={"Ocp-Apim-Subscription-Key": self.speech_key},
+                timeout=10.0,
+                idempotent=True,
+            )
+            resp.raise_for_status()
+            self._cached_token = resp.text
+            self._token_expiry = time.time() + 540  # 9 daqiqa
+            return self._cached_token
         except httpx.HTTPStatusError as e:
             status = e.response.status_code
             body = e.response.text
@@ -99,12 +102,16 @@ class AzureSpeechService:
             "languages": list(VOICE_MAP.keys()),
         }
 
-    async def speech_to_text(self, audio_data: bytes, language: str = "uz") -> Dict[str, Any]:
+    async def speech_to_text(
+        self, audio_data: Union[bytes, AsyncIterable[bytes]], language: str = "uz"
+    ) -> Dict[str, Any]:
         """
         Ovozni matnga aylantirish (Azure STT)
 
         Args:
-            audio_data: Ovoz fayli baytlari (webm, wav, mp3)
+            audio_data: Ovoz fayli baytlari (webm, wav, mp3) yoki bo'laklar oqimi —
+                oqim chunked transfer bilan yuboriladi va qayta o'qib bo'lmaydi,
+                shuning uchun qayta urinish chaqiruvchida (masalan tahlil navbati)
             language: Til kodi (uz, ru, en)
 
         Returns:
@@ -124,46 +131,49 @@ class AzureSpeechService:
         # STT URL — conversation mode (eng yaxshi natija)
         stt_url = f"https://{self.speech_region}.stt.speech.microsoft.com/speech/recognition/conversation/cognitiveservices/v1?language={stt_lang}"
 
+        streamed = not isinstance(audio_data, (bytes, bytearray))
         try:
             token = await self._get_token()
-            async with httpx.AsyncClient(timeout=60.0) as client:
-                resp = await client.post(
-                    stt_url,
-                    headers={
-                        "Authorization": f"Bearer {token}",
-                        "Content-Type": "audio/webm; codecs=opus",  # Default webm
-                    },
-                    content=audio_data,
-                )
-
-                if resp.status_code != 200:
-                    logger.error(f"Azure STT xatoligi: {resp.status_code} - {resp.text}")
-                    raise HTTPException(status_code=500, detail=f"STT xatoligi: {resp.status_code}")
-
-                result = resp.json()
-
-                # Azure STT response format
-                # {"RecognitionStatus": "Success", "DisplayText": "...", "Duration": "..."}
-                if result.get("RecognitionStatus") == "Success":
-                    return {
-                        "transcript": result.get("DisplayText", ""),
-                        "duration": result.get("Duration", 0),
-                        "success": True,
-                    }
-                elif result.get("RecognitionStatus") == "NoMatch":
-                    return {
-                        "transcript": "",
-                        "duration": 0,
-                        "success": False,
-                        "error": "Ovoz tanib olinmadi",
-                    }
-                else:
-                    return {
-                        "transcript": "",
-                        "duration": 0,
-                        "success": False,
-                        "error": result.get("RecognitionStatus", "Noma'lum xatolik"),
-                    }
+            resp = await get_http_client("azure_speech").post(
+                stt_url,
+                headers={
+                    "Authorization": f"Bearer {token}",
+                    "Content-Type": "audio/webm; codecs=opus",  # Default webm
+                },
+                content=audio_data,
+                timeout=60.0,
+                idempotent=not streamed,
+                retries=0 if streamed else None,
+            )
+
+            if resp.status_code != 200:
+                logger.error(f"Azure STT xatoligi: {resp.status_code} - {resp.text}")
+                raise HTTPException(status_code=500, detail=f"STT xatoligi: {resp.status_code}")
+
+            result = resp.json()
+
+            # Azure STT response format
+            # {"RecognitionStatus": "Success", "DisplayText": "...", "Duration": "..."}
+            if result.get("RecognitionStatus") == "Success":
+                return {
+                    "transcript": result.get("DisplayText", ""),
+                    "duration": result.get("Duration", 0),
+                    "success": True,
+                }
+            elif result.get("RecognitionStatus") == "NoMatch":
+                return {
+                    "transcript": "",
+                    "duration": 0,
+                    "success": False,
+                    "error": "Ovoz tanib olinmadi",
+                }
+            else:
+                return {
+                    "transcript": "",
+                    "duration": 0,
+                    "success": False,
+                    "error": result.get("RecognitionStatus", "Noma'lum xatolik"),
+                }
 
         except HTTPException:
             raise
@@ -190,18 +200,19 @@ class AzureSpeechService:
 
         try:
             token = await self._get_token()
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                resp = await client.post(
-                    self.tts_url,
-                    headers={
-                        "Authorization": f"Bearer {token}",
-                        "Content-Type": "application/ssml+xml",
-                        "X-Microsoft-OutputFormat": "audio-16khz-128kbitrate-mono-mp3",
-                    },
-                    content=ssml,
-                )
-                resp.raise_for_status()
-                return resp.content
+            resp = await get_http_client("azure_speech").post(
+                self.tts_url,
+                headers={
+                    "Authorization": f"Bearer {token}",
+                    "Content-Type": "application/ssml+xml",
+                    "X-Microsoft-OutputFormat": "audio-16khz-128kbitrate-mono-mp3",
+                },
+                content=ssml,
+                timeout=30.0,
+                idempotent=True,
+            )
+            resp.raise_for_status()
+            return resp.content
         except Exception as e:
             logger.error(f"Azure TTS xatoligi: {e}")
             raise HTTPException(status_code=500, detail=f"TTS xatoligi: {str(e)}")
@@ -0,0 +1,344 @@
+"""
+Document Extraction — yuklangan PDF / DOCX / TXT fayllardan matn ajratish
+
+    async with spooled_upload(file) as spooled:          # diskka, bo'laklab
+        result = await extract_document(spooled.path, "pdf", max_words=250)
+
+spooled_upload() yuklamani SPOOL_CHUNK_BYTES bo'laklarda vaqtinchalik faylga
+yozadi (50 MB butunlay xotiraga o'qilmaydi), hajm chegarasidan oshsa darhol
+to'xtaydi. extract_document() parser'ni (pypdf / python-docx) event loop'dan
+tashqarida — pool'da — bajaradi va matnni sahifama-sahifa o'qiydi: max_words
+berilsa, shuncha so'z yig'ilgach qolgan sahifalar umuman parse qilinmaydi.
+
+    EXTRACT_EXECUTOR         process (default) | thread
+    EXTRACT_MAX_WORKERS      bir vaqtda parse qilinadigan hujjatlar
+    EXTRACT_TIMEOUT_SECONDS  bitta hujjat uchun chegara; oshsa ExtractionTimeout
+                             va (process rejimida) osilib qolgan worker o'ldiriladi
+    EXTRACT_MAX_UPLOAD_BYTES yuklama hajmi chegarasi (UploadTooLarge)
+
+get_extraction_stats() — bajarilganlar, timeout'lar, pool qayta ishga tushishi.
+"""
+import asyncio
+import codecs
+import logging
+import os
+import tempfile
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable, Iterator, List, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+EXTRACT_EXECUTOR = os.getenv("EXTRACT_EXECUTOR", "process")
+EXTRACT_MAX_WORKERS = int(os.getenv("EXTRACT_MAX_WORKERS", str(min(2, os.cpu_count() or 1))))
+EXTRACT_TIMEOUT_SECONDS = float(os.getenv("EXTRACT_TIMEOUT_SECONDS", "30"))
+EXTRACT_MAX_UPLOAD_BYTES = int(os.getenv("EXTRACT_MAX_UPLOAD_BYTES", str(50 * 1024 * 1024)))
+EXTRACT_SPOOL_DIR = os.getenv("EXTRACT_SPOOL_DIR") or None
+
+SPOOL_CHUNK_BYTES = 1024 * 1024
+TEXT_CHUNK_BYTES = 256 * 1024
+SUPPORTED_KINDS = ("pdf", "docx", "txt")
+
+T = TypeVar("T")
+
+
+class ExtractionError(Exception):
+    """Fayldan matn ajratib bo'lmadi (buzilgan fayl, parser xatosi)."""
+
+
+class UploadTooLarge(ExtractionError):
+    pass
+
+
+class ExtractionTimeout(ExtractionError):
+    pass
+
+
+@dataclass
+class SpooledUpload:
+    path: str
+    size: int
+
+
+@dataclass
+class Extraction:
+    text: str
+    pages: int
+    truncated: bool = False
+
+
+def file_kind(filename: Optional[str]) -> Optional[str]:
+    """Fayl nomi bo'yicha tur: pdf / docx / txt yoki None"""
+    name = (filename or "").lower()
+    for kind in SUPPORTED_KINDS:
+        if name.endswith("." + kind):
+            return kind
+    return None
+
+
+@asynccontextmanager
+async def spooled_upload(upload, max_bytes: int = EXTRACT_MAX_UPLOAD_BYTES, digest=None) -> AsyncIterator[SpooledUpload]:
+    """
+    UploadFile'ni vaqtinchalik faylga bo'laklab yozish; blokdan chiqqanda fayl o'chadi.
+    digest (hashlib obyekti) berilsa har bir bo'lak bilan yangilanadi.
+    """
+    fd, path = tempfile.mkstemp(prefix="upload_", dir=EXTRACT_SPOOL_DIR)
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            while True:
+                chunk = await upload.read(SPOOL_CHUNK_BYTES)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(f"Fayl hajmi {max_bytes // (1024 * 1024)}MB dan katta")
+                if digest is not None:
+                    digest.update(chunk)
+                f.write(chunk)
+        yield SpooledUpload(path, size)
+    finally:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+# ============================================================
+# PARSERLAR (pool worker'ida ishlaydi)
+# ============================================================
+
+def _iter_pdf(path: str) -> Iterator[str]:
+    from pypdf import PdfReader
+
+    reader = PdfReader(path)
+    for page in reader.pages:
+        yield page.extract_text() or ""
+
+
+def _iter_docx(path: str) -> Iterator[str]:
+    try:
+        import docx
+    except ImportError:
+        raise ExtractionError("DOCX qayta ishlash o'rnatilmagan")
+    document = docx.Document(path)
+    for paragraph in document.paragraphs:
+        yield paragraph.text
+
+
+def _detect_encoding(sample: bytes) -> str:
+    try:
+        import chardet
+    except ImportError:
+        return "utf-8"
+    return chardet.detect(sample).get("encoding") or "utf-8"
+
+
+def _iter_txt(path: str, encoding: Optional[str]) -> Iterator[str]:
+    with open(path, "rb") as f:
+        head = f.read(TEXT_CHUNK_BYTES)
+        try:
+            decoder = codecs.getincrementaldecoder(encoding or _detect_encoding(head))(errors="ignore")
+        except LookupError:
+            decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+        carry = ""
+        chunk = head
+        while chunk:
+            text = carry + decoder.decode(chunk)
+            # So'z bo'lak chegarasida bo'linmasin — oxirgi bo'shliqqacha
+            cut = max(text.rfind(" "), text.rfind("\n"))
+            if cut < 0:
+                carry = text
+            else:
+                carry = text[cut + 1:]
+                yield text[:cut + 1]
+            chunk = f.read(TEXT_CHUNK_BYTES)
+        tail = carry + decoder.decode(b"", final=True)
+        if tail:
+            yield tail
+
+
+def iter_document(path: str, kind: str, encoding: Optional[str] = None) -> Iterator[str]:
+    """Sahifalar (PDF), paragraflar (DOCX) yoki bo'laklar (TXT) ketma-ketligi"""
+    if kind == "pdf":
+        return _iter_pdf(path)
+    if kind == "docx":
+        return _iter_docx(path)
+    if kind == "txt":
+        return _iter_txt(path, encoding)
+    raise ExtractionError(f"Fayl turi qo'llab-quvvatlanmaydi: {kind}")
+
+
+def extract_file(path: str, kind: str, max_words: Optional[int] = None,
+                 encoding: Optional[str] = None) -> Extraction:
+    """
+    Sinxron ajratish (pool worker'ida). max_words berilsa, undan ko'p so'z
+    yig'ilgach to'xtaydi: matn birinchi max_words so'zdan iborat, truncated=True.
+    """
+    parts: List[str] = []
+    words: List[str] = []
+    pages = 0
+    separator = "" if kind == "txt" else "\n"
+    try:
+        for part in iter_document(path, kind, encoding):
+            pages += 1
+            if max_words is None:
+                parts.append(part)
+                continue
+            words.extend(part.split())
+            if len(words) > max_words:
+                return Extraction(" ".join(words[:max_words]), pages, truncated=True)
+            parts.append(part)
+    except ExtractionError:
+        raise
+    except Exception as e:
+        # Parser istisnolari (pypdf, zipfile) pickle qilinmasligi mumkin — matn sifatida
+        raise ExtractionError(f"{type(e).__name__}: {e}") from None
+    return Extraction(separator.join(parts), pages)
+
+
+# ============================================================
+# POOL
+# ============================================================
+
+class _ExtractionPool:
+    """
+    Parser pool'i: timeout'da osilgan worker o'ldiriladi (image_pipeline ham ishlatadi).
+
+    Pool'ga bir vaqtda max_workers tadan ortiq vazifa berilmaydi — qolganlari
+    semafor navbatida kutadi va timeout faqat bajarilish vaqtini o'lchaydi.
+    Aks holda yuklamalar ko'payganda navbatda turgan to'g'ri hujjat timeout
+    bo'lib, _kill boshqa foydalanuvchilarning parser'larini ham to'xtatardi.
+    """
+
+    def __init__(self, max_workers: int, timeout: float, kind: str = EXTRACT_EXECUTOR, name: str = "extract"):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.kind = kind
+        self.name = name
+        self._executor: Optional[Executor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._slots_loop = None
+        self.in_flight = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.restarts = 0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+        return self._executor
+
+    def _kill(self, executor: Executor) -> None:
+        """Osilib qolgan parser'ni to'xtatish: pool jarayonlarini o'ldirib, yangisini ochish"""
+        if self._executor is executor:
+            self._executor = None
+        self.restarts += 1
+        if isinstance(executor, ProcessPoolExecutor):
+            # ProcessPoolExecutor bitta vazifani bekor qila olmaydi — worker'larni terminate
+            for process in list((getattr(executor, "_processes", None) or {}).values()):
+                process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _get_slots(self, loop) -> asyncio.Semaphore:
+        # Semafor event loop'ga bog'lanadi (testlarda har biri o'z loop'ida)
+        if self._slots is None or self._slots_loop is not loop:
+            self._slots = asyncio.Semaphore(self.max_workers)
+            self._slots_loop = loop
+        return self._slots
+
+    async def run(self, fn: Callable[..., T], *args) -> T:
+        """fn(*args) pool'da; fn modul darajasidagi funksiya bo'lishi kerak (process rejimida pickle)"""
+        loop = asyncio.get_running_loop()
+        self.in_flight += 1
+        try:
+            async with self._get_slots(loop):
+                self.running += 1
+                try:
+                    return await self._execute(loop, fn, args)
+                finally:
+                    self.running -= 1
+        except ExtractionError:
+            self.failed += 1
+            raise
+        finally:
+            self.in_flight -= 1
+
+    async def _execute(self, loop, fn: Callable[..., T], args) -> T:
+        """Bo'sh worker bor — timeout shu yerdan boshlanadi"""
+        for attempt in range(2):
+            executor = self._get_executor()
+            try:
+                result = await asyncio.wait_for(loop.run_in_executor(executor, fn, *args), self.timeout)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                if self.kind == "process":
+                    self._kill(executor)
+                raise ExtractionTimeout(f"Faylni o'qish {self.timeout:.0f} soniyadan oshdi")
+            except BrokenProcessPool:
+                # Boshqa hujjatning timeout'i pool'ni o'ldirgan — bir marta qayta
+                if self._executor is executor:
+                    self._executor = None
+                if attempt:
+                    raise ExtractionError("Parser jarayoni to'xtab qoldi")
+                continue
+            self.completed += 1
+            return result
+
+    def stats(self) -> dict:
+        return {
+            "executor": self.kind,
+            "max_workers": self.max_workers,
+            "timeout_seconds": self.timeout,
+            "in_flight": self.in_flight,
+            "running": self.running,
+            "queued": self.in_flight - self.running,
+            "completed": self.completed,
+            "failed": self.failed,
+            "timeouts": self.timeouts,
+            "restarts": self.restarts,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+_pool = _ExtractionPool(EXTRACT_MAX_WORKERS, EXTRACT_TIMEOUT_SECONDS)
+
+
+async def extract_document(path: str, kind: str, max_words: Optional[int] = None,
+                           encoding: Optional[str] = None) -> Extraction:
+    """Spool qilingan fayldan matn (pool'da, EXTRACT_TIMEOUT_SECONDS bilan)"""
+    return await _pool.run(extract_file, path, kind, max_words, encoding)
+
+
+def get_extraction_stats() -> dict:
+    return _pool.stats()
+
+
+def configure_extraction_pool(max_workers: Optional[int] = None, timeout: Optional[float] = None,
+                              kind: Optional[str] = None) -> None:
+    """Pool'ni qayta sozlash (testlar va benchmark uchun)"""
+    global _pool
+    _pool.shutdown()
+    _pool = _ExtractionPool(
+        max_workers or EXTRACT_MAX_WORKERS,
+        EXTRACT_TIMEOUT_SECONDS if timeout is None else timeout,
+        kind or EXTRACT_EXECUTOR,
+    )
+
+
+__all__ = [
+    "ExtractionError", "UploadTooLarge", "ExtractionTimeout", "SpooledUpload", "Extraction",
+    "file_kind", "spooled_upload", "iter_document", "extract_file", "extract_document",
+    "get_extraction_stats", "configure_extraction_pool",
+]
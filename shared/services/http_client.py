@@ -0,0 +1,251 @@
+"""
+HTTP Client — tashqi integratsiyalar uchun umumiy, uzoq yashovchi HTTP klientlar
+
+Har bir upstream (Payme, Click, Uzum, Telegram, Azure Speech, Azure OpenAI,
+OpenAI, Lessions API) uchun bitta httpx.AsyncClient: keep-alive ulanishlar pooli (h2 paketi
+o'rnatilgan bo'lsa HTTP/2), o'z timeout'lari, jitter bilan qayta urinish,
+circuit breaker va latency/xato metrikalari.
+
+    client = get_http_client("payme")
+    resp = await client.post(url, json=payload, idempotent=True)
+
+Qayta urinish qoidasi: ulanish o'rnatilmagan xatolar (ConnectError,
+ConnectTimeout, PoolTimeout) har doim qayta yuboriladi; javob kutishdagi
+timeout va 5xx faqat idempotent so'rovlarda (GET yoki idempotent=True).
+Ketma-ket `failure_threshold` ta xatodan keyin breaker ochiladi va
+`reset_seconds` davomida so'rovlar darhol CircuitOpenError bilan qaytadi.
+"""
+import asyncio
+import logging
+import os
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, replace
+from typing import Dict, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+RETRY_STATUSES = {502, 503, 504}
+_ALWAYS_RETRY = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+@dataclass(frozen=True)
+class UpstreamConfig:
+    timeout: float = 15.0
+    connect_timeout: float = 5.0
+    max_connections: int = 20
+    retries: int = 2
+    backoff_seconds: float = 0.2
+    failure_threshold: int = 5
+    reset_seconds: float = 30.0
+
+
+UPSTREAMS: Dict[str, UpstreamConfig] = {
+    "payme": UpstreamConfig(timeout=15.0),
+    "click": UpstreamConfig(timeout=15.0),
+    "uzum": UpstreamConfig(timeout=15.0),
+    "telegram": UpstreamConfig(timeout=10.0, max_connections=50),
+    "azure_speech": UpstreamConfig(timeout=60.0),
+    "azure_openai": UpstreamConfig(timeout=60.0, retries=1),
+    "openai": UpstreamConfig(timeout=60.0, retries=1),
+    "lessions": UpstreamConfig(timeout=10.0),
+}
+DEFAULT_UPSTREAM = UpstreamConfig(
+    timeout=float(os.getenv("HTTP_CLIENT_DEFAULT_TIMEOUT", "15")),
+)
+
+
+class CircuitOpenError(Exception):
+    """Upstream vaqtincha o'chirilgan (ketma-ket xatolar)."""
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        return self.state != "open"
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.failures >= self.failure_threshold or self.state == "half_open":
+            self.opened_at = time.monotonic()
+
+
+class UpstreamClient:
+    """Bitta upstream uchun pool + retry + breaker + metrikalar."""
+
+    def __init__(self, name: str, config: UpstreamConfig, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.name = name
+        self.config = config
+        self.breaker = CircuitBreaker(config.failure_threshold, config.reset_seconds)
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.rejected = 0
+        self.latencies_ms = deque(maxlen=1024)
+        self._loop = asyncio.get_running_loop()
+        self._client = httpx.AsyncClient(
+            timeout=httpx.Timeout(config.timeout, connect=config.connect_timeout),
+            limits=httpx.Limits(
+                max_connections=config.max_connections,
+                max_keepalive_connections=config.max_connections,
+            ),
+            http2=HTTP2_AVAILABLE and transport is None,
+            transport=transport,
+        )
+
+    @property
+    def pool(self) -> httpx.AsyncClient:
+        """
+        Ichki httpx klienti — o'z retry'lariga ega SDK'lar uchun
+        (AsyncAzureOpenAI(http_client=...)): pool va timeout'lar umumiy,
+        lekin bu so'rovlar retry/breaker/metrikalardan o'tmaydi.
+        """
+        return self._client
+
+    @property
+    def is_closed(self) -> bool:
+        return self._client.is_closed
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter: [0, base * 2^attempt]
+        return random.uniform(0, self.config.backoff_seconds * (2 ** attempt))
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        idempotent: Optional[bool] = None,
+        retries: Optional[int] = None,
+        **kwargs,
+    ) -> httpx.Response:
+        if not self.breaker.allow():
+            self.rejected += 1
+            raise CircuitOpenError(f"{self.name}: circuit open")
+        if idempotent is None:
+            idempotent = method.upper() in ("GET", "HEAD", "OPTIONS")
+        max_retries = self.config.retries if retries is None else retries
+
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            self.requests += 1
+            try:
+                response = await self._client.request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                self.latencies_ms.append((time.perf_counter() - started) * 1000)
+                self.errors += 1
+                self.breaker.record_failure()
+                retriable = isinstance(e, _ALWAYS_RETRY) or idempotent
+                if not retriable or attempt >= max_retries or not self.breaker.allow():
+                    raise
+                logger.warning(f"{self.name} {method} {e.__class__.__name__}, retry {attempt + 1}")
+            else:
+                self.latencies_ms.append((time.perf_counter() - started) * 1000)
+                if response.status_code < 500:
+                    self.breaker.record_success()
+                    return response
+                self.errors += 1
+                self.breaker.record_failure()
+                if (
+                    response.status_code not in RETRY_STATUSES
+                    or not idempotent
+                    or attempt >= max_retries
+                    or not self.breaker.allow()
+                ):
+                    return response
+                logger.warning(f"{self.name} {method} HTTP {response.status_code}, retry {attempt + 1}")
+            self.retries += 1
+            await asyncio.sleep(self._backoff(attempt))
+            attempt += 1
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    def metrics(self) -> dict:
+        samples = sorted(self.latencies_ms)
+
+        def _pct(q: float) -> Optional[float]:
+            if not samples:
+                return None
+            return round(samples[min(len(samples) - 1, int(q * len(samples)))], 2)
+
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "rejected": self.rejected,
+            "error_rate": round(self.errors / self.requests, 4) if self.requests else None,
+            "latency_p50_ms": _pct(0.50),
+            "latency_p95_ms": _pct(0.95),
+            "circuit": self.breaker.state,
+        }
+
+
+_clients: Dict[str, UpstreamClient] = {}
+
+
+def get_http_client(name: str) -> UpstreamClient:
+    """
+    Upstream klientini qaytaradi (lazy, har bir event loop uchun bitta).
+    Faqat async kontekstda chaqiriladi.
+    """
+    client = _clients.get(name)
+    if client is None or client.is_closed or client._loop is not asyncio.get_running_loop():
+        client = UpstreamClient(name, UPSTREAMS.get(name, DEFAULT_UPSTREAM))
+        _clients[name] = client
+    return client
+
+
+def configure_upstream(name: str, transport: Optional[httpx.AsyncBaseTransport] = None, **overrides) -> UpstreamClient:
+    """Upstream sozlamalarini almashtirish (testlar va maxsus transportlar uchun)"""
+    config = replace(UPSTREAMS.get(name, DEFAULT_UPSTREAM), **overrides)
+    UPSTREAMS[name] = config
+    client = UpstreamClient(name, config, transport=transport)
+    _clients[name] = client
+    return client
+
+
+async def close_http_clients() -> None:
+    """Shutdown: barcha pool'larni yopish"""
+    for client in list(_clients.values()):
+        if not client.is_closed and client._loop is asyncio.get_running_loop():
+            await client.aclose()
+    _clients.clear()
+
+
+def get_http_metrics() -> Dict[str, dict]:
+    """Upstream bo'yicha so'rovlar, xatolar, latency va breaker holati"""
+    return {name: client.metrics() for name, client in _clients.items()}
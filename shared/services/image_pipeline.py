@@ -0,0 +1,241 @@
+"""
+Image Pipeline — vision OCR chaqiruvidan oldin rasmni tayyorlash va natija keshi
+
+    prepared = await prepare_upload(file)                   # 413 / 422
+    text = await get_or_recognize(prepared, "smartkids_ocr", call_vision)
+
+prepare_upload() yuklamani diskka spool qiladi (document_extraction) va pool'da:
+    decode  — JPEG bo'lsa draft(): DCT darajasida kichraytirib o'qiladi
+    EXIF    — Orientation bo'yicha aylantirish (telefon rasmlari)
+    resize  — uzun tomoni IMAGE_MAX_LONG_EDGE, qisqa tomoni IMAGE_MAX_SHORT_EDGE
+              gacha (gpt-4o "high" detail rasmni baribir 2048 / 768 gacha
+              kichraytiradi — undan kattasi faqat upload va latency)
+    encode  — grayscale (IMAGE_GRAYSCALE) JPEG, IMAGE_JPEG_QUALITY
+    hash    — normallashgan baytlarning sha256'i
+
+get_or_recognize() natijani (maqsad, sha256) bo'yicha keshlaydi: aynan o'sha
+fayl qayta yuklansa AI chaqirilmaydi. Yaqin nusxalar (qayta siqilgan,
+kichraytirilgan) ataylab keshdan berilmaydi — zich sahifada bitta raqam
+o'zgarishi perceptual hash va kichik thumbnail'da ko'rinmaydi, bunday hit
+boshqa sahifaning matnini qaytarardi. Kesh faqat ortiqcha AI chaqiruvini
+tejaydi, javobni hech qachon o'zgartirmaydi.
+Pillow o'rnatilmagan bo'lsa rasm o'zgarishsiz yuboriladi (sha256 xom baytlardan).
+
+get_image_pipeline_stats() — pool, kesh hit/miss va yuborilgan baytlar.
+"""
+import base64
+import hashlib
+import io
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional, Tuple
+
+from shared.services.document_extraction import (
+    ExtractionError, UploadTooLarge, _ExtractionPool, spooled_upload,
+)
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXECUTOR = os.getenv("IMAGE_EXECUTOR", "process")
+IMAGE_MAX_WORKERS = int(os.getenv("IMAGE_MAX_WORKERS", str(min(2, os.cpu_count() or 1))))
+IMAGE_TIMEOUT_SECONDS = float(os.getenv("IMAGE_TIMEOUT_SECONDS", "20"))
+IMAGE_MAX_UPLOAD_BYTES = int(os.getenv("IMAGE_MAX_UPLOAD_BYTES", str(50 * 1024 * 1024)))
+IMAGE_MAX_LONG_EDGE = int(os.getenv("IMAGE_MAX_LONG_EDGE", "2048"))
+IMAGE_MAX_SHORT_EDGE = int(os.getenv("IMAGE_MAX_SHORT_EDGE", "768"))
+IMAGE_JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", "85"))
+IMAGE_GRAYSCALE = os.getenv("IMAGE_GRAYSCALE", "1").lower() in ("1", "true", "yes")
+IMAGE_CACHE_MAX_ENTRIES = int(os.getenv("IMAGE_CACHE_MAX_ENTRIES", "500"))
+IMAGE_CACHE_TTL_SECONDS = float(os.getenv("IMAGE_CACHE_TTL_SECONDS", str(24 * 3600)))
+
+# EXIF Orientation -> transpose (ImageOps.exif_transpose bilan bir xil jadval)
+_ORIENTATION = {2: 0, 3: 3, 4: 1, 5: 5, 6: 4, 7: 6, 8: 2}  # Image.Transpose qiymatlari
+
+
+class ImageError(ExtractionError):
+    """Yuklangan fayl rasm sifatida o'qilmadi."""
+
+
+@dataclass
+class PreparedImage:
+    data: bytes
+    mime: str
+    width: int
+    height: int
+    source_bytes: int
+    sha256: str
+
+    def data_url(self) -> str:
+        return f"data:{self.mime};base64,{base64.b64encode(self.data).decode('ascii')}"
+
+
+# ============================================================
+# TAYYORLASH (pool worker'ida ishlaydi)
+# ============================================================
+
+def _target_size(width: int, height: int, long_edge: int, short_edge: int) -> Tuple[int, int]:
+    scale = min(1.0, long_edge / max(width, height), short_edge / min(width, height))
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def prepare_image(path: str, long_edge: int = IMAGE_MAX_LONG_EDGE, short_edge: int = IMAGE_MAX_SHORT_EDGE,
+                  quality: int = IMAGE_JPEG_QUALITY, grayscale: bool = IMAGE_GRAYSCALE) -> PreparedImage:
+    """Sinxron: decode -> EXIF -> resize -> JPEG -> sha256"""
+    mode = "L" if grayscale else "RGB"
+    try:
+        with Image.open(path) as image:
+            orientation = image.getexif().get(0x0112)
+            target = _target_size(image.width, image.height, long_edge, short_edge)
+            if image.format == "JPEG":
+                # 1/2, 1/4, 1/8 masshtabda decode — to'liq 12 MP piksel massivi yaratilmaydi
+                image.draft(mode, target)
+            image.load()
+            if image.mode in ("RGBA", "LA", "PA") or (image.mode == "P" and "transparency" in image.info):
+                # Shaffof fon (skrinshot, PNG) — oq fonga
+                rgba = image.convert("RGBA")
+                image = Image.new("RGBA", rgba.size, (255, 255, 255, 255))
+                image.alpha_composite(rgba)
+            image = image.convert(mode)
+            if image.size != target:
+                image = image.resize(target, Image.Resampling.LANCZOS, reducing_gap=3.0)
+            if orientation in _ORIENTATION:
+                image = image.transpose(Image.Transpose(_ORIENTATION[orientation]))
+
+            buffer = io.BytesIO()
+            image.save(buffer, "JPEG", quality=quality, optimize=True)
+            data = buffer.getvalue()
+            return PreparedImage(
+                data=data,
+                mime="image/jpeg",
+                width=image.width,
+                height=image.height,
+                source_bytes=os.path.getsize(path),
+                sha256=hashlib.sha256(data).hexdigest(),
+            )
+    except Exception as e:
+        # Pillow istisnolari (DecompressionBombError va b.) pickle qilinmasligi mumkin — matn sifatida
+        raise ImageError(f"{type(e).__name__}: {e}") from None
+
+
+# ============================================================
+# NATIJA KESHI
+# ============================================================
+
+class _ResultCache:
+    """(maqsad, normallashgan rasm sha256) -> natija; LRU + TTL"""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._items: "OrderedDict[Tuple[str, str], Tuple[float, str]]" = OrderedDict()
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, purpose: str, image_id: str) -> Optional[str]:
+        item = self._items.get((purpose, image_id))
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._items[(purpose, image_id)]
+            return None
+        self._items.move_to_end((purpose, image_id))
+        return value
+
+    def put(self, purpose: str, image_id: str, value: str) -> None:
+        self._items[(purpose, image_id)] = (time.monotonic() + self.ttl_seconds, value)
+        self._items.move_to_end((purpose, image_id))
+        while len(self._items) > self.max_entries:
+            self._items.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._items.clear()
+
+
+_pool = _ExtractionPool(IMAGE_MAX_WORKERS, IMAGE_TIMEOUT_SECONDS, IMAGE_EXECUTOR, name="image")
+_cache = _ResultCache(IMAGE_CACHE_MAX_ENTRIES, IMAGE_CACHE_TTL_SECONDS)
+_stats = {"prepared": 0, "hits": 0, "misses": 0, "source_bytes": 0, "sent_bytes": 0}
+
+
+async def prepare_upload(upload, max_bytes: int = IMAGE_MAX_UPLOAD_BYTES,
+                         grayscale: Optional[bool] = None) -> PreparedImage:
+    """
+    UploadFile -> PreparedImage. UploadTooLarge (hajm) va ImageError (rasm
+    emas / buzilgan / timeout) — ikkalasi ham ExtractionError.
+    """
+    async with spooled_upload(upload, max_bytes) as spooled:
+        if Image is None:
+            with open(spooled.path, "rb") as f:
+                data = f.read()
+            prepared = PreparedImage(data, upload.content_type or "image/jpeg", 0, 0, spooled.size,
+                                     hashlib.sha256(data).hexdigest())
+        else:
+            prepared = await _pool.run(
+                prepare_image, spooled.path, IMAGE_MAX_LONG_EDGE, IMAGE_MAX_SHORT_EDGE, IMAGE_JPEG_QUALITY,
+                IMAGE_GRAYSCALE if grayscale is None else grayscale,
+            )
+    _stats["prepared"] += 1
+    _stats["source_bytes"] += prepared.source_bytes
+    return prepared
+
+
+async def get_or_recognize(prepared: PreparedImage, purpose: str,
+                           recognize: Callable[[PreparedImage], Awaitable[str]]) -> str:
+    """
+    Aynan shu rasm (sha256) shu maqsadda o'qilgan bo'lsa keshdagi natija,
+    aks holda recognize(prepared). Bo'sh natija saqlanmaydi.
+    """
+    text = _cache.get(purpose, prepared.sha256)
+    if text is not None:
+        _stats["hits"] += 1
+        return text
+    _stats["misses"] += 1
+    _stats["sent_bytes"] += len(prepared.data)
+    text = await recognize(prepared)
+    if text and text.strip():
+        _cache.put(purpose, prepared.sha256, text)
+    return text
+
+
+def get_image_pipeline_stats() -> dict:
+    lookups = _stats["hits"] + _stats["misses"]
+    return {
+        **_stats,
+        "hit_ratio": round(_stats["hits"] / lookups, 4) if lookups else None,
+        "cache_entries": len(_cache),
+        "cache_evictions": _cache.evictions,
+        "pillow": Image is not None,
+        "pool": _pool.stats(),
+    }
+
+
+def configure_image_pipeline(max_workers: Optional[int] = None, timeout: Optional[float] = None,
+                             kind: Optional[str] = None) -> None:
+    """Pool'ni qayta sozlash va keshni tozalash (testlar va benchmark uchun)"""
+    global _pool
+    _pool.shutdown()
+    _pool = _ExtractionPool(
+        max_workers or IMAGE_MAX_WORKERS,
+        IMAGE_TIMEOUT_SECONDS if timeout is None else timeout,
+        kind or IMAGE_EXECUTOR,
+        name="image",
+    )
+    _cache.clear()
+    for key in _stats:
+        _stats[key] = 0
+
+
+__all__ = [
+    "ImageError", "UploadTooLarge", "PreparedImage", "prepare_image",
+    "prepare_upload", "get_or_recognize", "get_image_pipeline_stats", "configure_image_pipeline",
+]
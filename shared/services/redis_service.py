@@ -0,0 +1,57 @@
+"""
+Redis Service — barcha platformalar uchun umumiy Redis ulanishi
+REDIS_URL environment variable orqali beriladi (docker-compose: redis://redis:6379)
+
+Redis ixtiyoriy: sozlanmagan bo'lsa get_redis() None qaytaradi va chaqiruvchi
+kod Postgres'dan o'qishga qaytishi kerak.
+"""
+import os
+import logging
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv("REDIS_URL")
+
+_client = None
+
+
+def get_redis():
+    """
+    Umumiy redis.asyncio klientini qaytaradi (lazy, har bir worker uchun bitta pool).
+    REDIS_URL yo'q yoki redis paketi o'rnatilmagan bo'lsa None.
+    """
+    global _client
+    if _client is None and REDIS_URL:
+        try:
+            import redis.asyncio as aioredis
+            _client = aioredis.from_url(
+                REDIS_URL,
+                decode_responses=True,
+                socket_timeout=float(os.getenv("REDIS_SOCKET_TIMEOUT", "2")),
+                socket_connect_timeout=float(os.getenv("REDIS_CONNECT_TIMEOUT", "2")),
+                health_check_interval=30,
+            )
+        except Exception as e:
+            logger.warning(f"Redis client yaratilmadi: {e}")
+    return _client
+
+
+def set_redis(client) -> None:
+    """Klientni almashtirish (testlarda fakeredis uchun)."""
+    global _client
+    _client = client
+
+
+async def close_redis() -> None:
+    """Shutdown paytida ulanishlarni yopish."""
+    global _client
+    if _client is not None:
+        try:
+            await _client.aclose()
+        except Exception as e:
+            logger.warning(f"Redis yopishda xatolik: {e}")
+        _client = None
+
+
+__all__ = ["get_redis", "set_redis", "close_redis", "REDIS_URL"]
@@ -5,9 +5,9 @@ Azure Blob Storage Container
 import os
 import uuid
 import logging
-from typing import Optional
+from typing import AsyncIterator, Optional
 from azure.storage.blob.aio import BlobServiceClient
-from azure.core.exceptions import ResourceExistsError
+from azure.core.exceptions import ResourceExistsError, ResourceNotFoundError
 
 logger = logging.getLogger(__name__)
 
@@ -124,6 +124,21 @@ class StorageService:
             logger.error(f"Azure audio read error: {e}")
             return None
 
+    async def iter_audio(self, filename: str) -> AsyncIterator[bytes]:
+        """
+        Faylni bo'laklab o'qish — butun blob xotiraga yuklanmaydi (STT ga oqim).
+        get_audio_data'dan farqli xatolarni yutmaydi: fayl yo'q bo'lsa FileNotFoundError.
+        """
+        if not self.container_client:
+            raise FileNotFoundError("Azure Storage sozlanmagan")
+        blob_client = self.container_client.get_blob_client(filename)
+        try:
+            download_stream = await blob_client.download_blob(max_concurrency=1)
+        except ResourceNotFoundError:
+            raise FileNotFoundError(filename)
+        async for chunk in download_stream.chunks():
+            yield chunk
+
 
 # Singleton instance
 _storage_service: Optional[StorageService] = None
@@ -12,12 +12,14 @@ import os
 import json
 from datetime import datetime, timezone
 from typing import Optional, Dict, Any, List
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from sqlalchemy import select, delete, desc
 
 from shared.database.models import PhoneVerification, TelegramUser, User, StudentProfile
 from shared.database.models.achievement import Achievement, StudentAchievement
 from shared.database.models.coin import StudentCoin
+from shared.services.http_client import get_http_client
+from shared.services.telegram_broadcast import TelegramBroadcaster
 import asyncio
 
 logger = logging.getLogger(__name__)
@@ -358,29 +360,28 @@ Tabriklaymiz! 🎉
                     f"{self.azure_openai_deployment}/chat/completions"
                     f"?api-version={self.azure_openai_api_version}"
                 )
-                async with httpx.AsyncClient() as client:
-                    response = await client.post(
-                        azure_url,
-                        headers={
-                            "api-key": self.azure_openai_key,
-                            "Content-Type": "application/json"
-                        },
-                        json={
-                            "messages": messages,
-                            "max_tokens": 800,
-                            "temperature": 0.7,
-                        },
-                        timeout=30.0
-                    )
+                response = await get_http_client("azure_openai").post(
+                    azure_url,
+                    headers={
+                        "api-key": self.azure_openai_key,
+                        "Content-Type": "application/json"
+                    },
+                    json={
+                        "messages": messages,
+                        "max_tokens": 800,
+                        "temperature": 0.7,
+                    },
+                    timeout=30.0
+                )
 
-                    if response.status_code == 200:
-                        data = response.json()
-                        ai_reply = data["choices"][0]["message"]["content"]
-                        history.append({"role": "assistant", "content": ai_reply})
-                        self._chat_history[history_key] = history
-                        return ai_reply
-                    else:
-                        logger.error(f"Azure OpenAI error {response.status_code}: {response.text[:200]}")
+                if response.status_code == 200:
+                    data = response.json()
+                    ai_reply = data["choices"][0]["message"]["content"]
+                    history.append({"role": "assistant", "content": ai_reply})
+                    self._chat_history[history_key] = history
+                    return ai_reply
+                else:
+                    logger.error(f"Azure OpenAI error {response.status_code}: {response.text[:200]}")
             except httpx.TimeoutException:
                 return "⏳ Javob olishda kutish vaqti tugadi. Iltimos, qayta urinib ko'ring."
             except Exception as e:
@@ -527,61 +528,13 @@ Tabriklaymiz! 🎉
         """
         Barcha Telegram foydalanuvchilarga ommaviy xabar jo'natish.
         filter_type: None (hammaga), "students", "parents", "teachers"
-        Telegram API cheklovi: 30 msg/sec — shuning uchun 0.05s kechikish
+        Yuborish TelegramBroadcaster orqali (bo'laklar, umumiy HTTP klient,
+        rate limit, 429 retry_after); holat telegram_broadcasts jadvalida.
+        Uzoq broadcast'lar uchun router uni fon vazifasida ishga tushiradi.
         """
-        stmt = select(TelegramUser).filter(TelegramUser.notifications_enabled == True)
-        result = await self.db.execute(stmt)
-        users = result.scalars().all()
-        
-        if filter_type and filter_type != "all":
-            # Filter by user role if needed
-            filtered = []
-            for tg_user in users:
-                if tg_user.user_id:
-                    user_stmt = select(User).filter(User.id == tg_user.user_id)
-                    user_result = await self.db.execute(user_stmt)
-                    user = user_result.scalars().first()
-                    if user and hasattr(user, 'role'):
-                        role = str(user.role.value if hasattr(user.role, 'value') else user.role).lower()
-                        if filter_type == "students" and role == "student":
-                            filtered.append(tg_user)
-                        elif filter_type == "parents" and role == "parent":
-                            filtered.append(tg_user)
-                        elif filter_type == "teachers" and role == "teacher":
-                            filtered.append(tg_user)
-                    else:
-                        # Agar filter bo'lsa lekin role topilmasa — o'tkazib yuborish
-                        pass
-                else:
-                    # user_id bog'lanmagan — faqat "all" da yuborish
-                    pass
-            users = filtered
-        
-        total = len(users)
-        success_count = 0
-        fail_count = 0
-        
-        for tg_user in users:
-            try:
-                sent = await self._send_message(tg_user.telegram_chat_id, message, parse_mode=parse_mode)
-                if sent:
-                    success_count += 1
-                else:
-                    fail_count += 1
-            except Exception as e:
-                logger.error(f"Broadcast error for {tg_user.telegram_chat_id}: {e}")
-                fail_count += 1
-            
-            # Telegram API rate limit: 30 msg/sec
-            await asyncio.sleep(0.05)
-        
-        return {
-            "success": True,
-            "total": total,
-            "sent": success_count,
-            "failed": fail_count,
-            "message": f"Xabar {success_count}/{total} foydalanuvchiga yuborildi."
-        }
+        broadcast = await TelegramBroadcaster.create(self.db, message, parse_mode, filter_type)
+        session_factory = async_sessionmaker(self.db.bind, class_=AsyncSession, expire_on_commit=False)
+        return await TelegramBroadcaster(self.bot_token, api_url=self.api_url).run(session_factory, broadcast.id)
     
     async def _send_message(self, chat_id: str, message: str, parse_mode: Optional[str] = None,
                               reply_markup: Optional[Dict] = None) -> bool:
@@ -596,19 +549,19 @@ Tabriklaymiz! 🎉
             if reply_markup:
                 payload["reply_markup"] = reply_markup
             
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.api_url}/sendMessage",
-                    json=payload,
-                    timeout=10.0
-                )
+            response = await get_http_client("telegram").post(
+                f"{self.api_url}/sendMessage",
+                json=payload,
+                timeout=10.0
+            )
+            
+            if response.status_code == 200:
+                return True
+            else:
+                logger.error(f"Telegram API error: {response.text}")
+                return False
                 
-                if response.status_code == 200:
-                    return True
-                else:
-                    logger.error(f"Telegram API error: {response.text}")
-                    return False
-                    
+
         except Exception as e:
             logger.error(f"Error sending Telegram message: {e}")
             return False
@@ -972,12 +925,12 @@ Tabriklaymiz! 🎉
     async def _send_typing(self, chat_id: str) -> None:
         """Typing indikatorni ko'rsatish"""
         try:
-            async with httpx.AsyncClient() as client:
-                await client.post(
-                    f"{self.api_url}/sendChatAction",
-                    json={"chat_id": chat_id, "action": "typing"},
-                    timeout=5.0
-                )
+            await get_http_client("telegram").post(
+                f"{self.api_url}/sendChatAction",
+                json={"chat_id": chat_id, "action": "typing"},
+                timeout=5.0,
+                retries=0
+            )
         except Exception:
             pass
     
@@ -999,18 +952,18 @@ Tabriklaymiz! 🎉
             {"command": "cancel", "description": "Bekor qilish"},
         ]
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.api_url}/setMyCommands",
-                    json={"commands": commands},
-                    timeout=10.0
-                )
-                if response.status_code == 200:
-                    logger.info("Bot commands registered successfully")
-                    return True
-                else:
-                    logger.error(f"setMyCommands error: {response.text}")
-                    return False
+            response = await get_http_client("telegram").post(
+                f"{self.api_url}/setMyCommands",
+                json={"commands": commands},
+                timeout=10.0,
+                idempotent=True
+            )
+            if response.status_code == 200:
+                logger.info("Bot commands registered successfully")
+                return True
+            else:
+                logger.error(f"setMyCommands error: {response.text}")
+                return False
         except Exception as e:
             logger.error(f"setMyCommands error: {e}")
             return False
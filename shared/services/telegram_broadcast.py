@@ -0,0 +1,317 @@
+"""
+Telegram Broadcast — ommaviy xabarlarni tez va Telegram cheklovlariga mos yuborish
+
+    - Qabul qiluvchilar bitta so'rovda (TelegramUser JOIN User rol filtri bilan)
+      TelegramUser.id bo'yicha keyset bo'laklab o'qiladi
+    - Umumiy keep-alive "telegram" klienti (shared.services.http_client), bir
+      vaqtda TELEGRAM_BROADCAST_CONCURRENCY ta so'rov
+    - Token bucket: global TELEGRAM_BROADCAST_RATE msg/s va har bir chat uchun
+      minimal interval (shaxsiy chat 1s, guruh 3s)
+    - 429 da javobdagi retry_after gacha butun yuborish to'xtatiladi va xabar
+      qayta yuboriladi; 5xx/tarmoq xatolari kechikish bilan qayta urinadi
+    - Holat telegram_broadcasts jadvalida: har bir bo'lakdan keyin kursor va
+      sanoqlar saqlanadi, uzilgan broadcast run() bilan davom ettiriladi
+      (qayta yuborilishi mumkin bo'lgani faqat oxirgi tugallanmagan bo'lak)
+"""
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+from sqlalchemy import false, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from shared.database.models import TelegramBroadcast, TelegramUser, User, UserRole
+from shared.services.http_client import CircuitOpenError, get_http_client
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_BROADCAST_CONCURRENCY = int(os.getenv("TELEGRAM_BROADCAST_CONCURRENCY", "20"))
+TELEGRAM_BROADCAST_RATE = float(os.getenv("TELEGRAM_BROADCAST_RATE", "25"))
+TELEGRAM_BROADCAST_CHUNK_SIZE = int(os.getenv("TELEGRAM_BROADCAST_CHUNK_SIZE", "500"))
+TELEGRAM_BROADCAST_MAX_RETRIES = int(os.getenv("TELEGRAM_BROADCAST_MAX_RETRIES", "3"))
+# Shu vaqt ichida heartbeat bo'lmasa "running" broadcast uzilgan hisoblanadi
+TELEGRAM_BROADCAST_STALE_SECONDS = int(os.getenv("TELEGRAM_BROADCAST_STALE_SECONDS", "120"))
+
+PRIVATE_CHAT_INTERVAL = 1.0
+GROUP_CHAT_INTERVAL = 3.0
+
+FILTER_ROLES = {
+    "students": UserRole.student,
+    "parents": UserRole.parent,
+    "teachers": UserRole.teacher,
+}
+
+
+class TokenBucket:
+    """Global limit: sekundiga `rate` ta token, `capacity` gacha yig'iladi."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds: float) -> None:
+        """429 retry_after: shu vaqtgacha hech kim token olmaydi."""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class PerChatLimiter:
+    """Bitta chatga ketma-ket xabarlar orasidagi minimal interval."""
+
+    def __init__(self):
+        self._next_at: Dict[str, float] = {}
+
+    async def wait(self, chat_id: str) -> None:
+        interval = GROUP_CHAT_INTERVAL if str(chat_id).startswith("-") else PRIVATE_CHAT_INTERVAL
+        now = time.monotonic()
+        next_at = self._next_at.get(chat_id, now)
+        self._next_at[chat_id] = max(next_at, now) + interval
+        if next_at > now:
+            await asyncio.sleep(next_at - now)
+
+
+def recipients_query(filter_type: Optional[str] = None):
+    """Bildirishnoma yoqilgan qabul qiluvchilar (id, chat_id); rol filtri JOIN orqali."""
+    stmt = (
+        select(TelegramUser.id, TelegramUser.telegram_chat_id)
+        .where(TelegramUser.notifications_enabled == True)  # noqa: E712
+    )
+    if filter_type and filter_type != "all":
+        # Bog'lanmagan foydalanuvchilar va noma'lum filtr — hech kimga (avvalgi xatti-harakat)
+        role = FILTER_ROLES.get(filter_type)
+        if role is None:
+            return stmt.where(false())
+        stmt = stmt.join(User, User.id == TelegramUser.user_id).where(User.role == role)
+    return stmt
+
+
+class TelegramBroadcaster:
+    """Ommaviy xabarlarni yuboruvchi."""
+
+    def __init__(
+        self,
+        bot_token: str,
+        api_url: Optional[str] = None,
+        concurrency: int = TELEGRAM_BROADCAST_CONCURRENCY,
+        rate: float = TELEGRAM_BROADCAST_RATE,
+        chunk_size: int = TELEGRAM_BROADCAST_CHUNK_SIZE,
+        max_retries: int = TELEGRAM_BROADCAST_MAX_RETRIES,
+    ):
+        self.api_url = api_url or f"https://api.telegram.org/bot{bot_token}"
+        self.concurrency = concurrency
+        self.chunk_size = chunk_size
+        self.max_retries = max_retries
+        self.bucket = TokenBucket(rate)
+        self.per_chat = PerChatLimiter()
+        self._client = None
+
+    # -- yaratish / holat ----------------------------------------------------
+
+    @staticmethod
+    async def create(
+        db: AsyncSession,
+        message: str,
+        parse_mode: Optional[str] = None,
+        filter_type: Optional[str] = None,
+    ) -> TelegramBroadcast:
+        """Broadcast yozuvini yaratish (qabul qiluvchilar soni bilan)."""
+        total = await db.scalar(select(func.count()).select_from(recipients_query(filter_type).subquery()))
+        broadcast = TelegramBroadcast(
+            message=message,
+            parse_mode=parse_mode,
+            filter_type=filter_type,
+            status="pending",
+            total=total or 0,
+        )
+        db.add(broadcast)
+        await db.commit()
+        return broadcast
+
+    @staticmethod
+    def summary(broadcast: TelegramBroadcast) -> Dict[str, Any]:
+        return {
+            "success": broadcast.status != "failed",
+            "broadcast_id": broadcast.id,
+            "status": broadcast.status,
+            "total": broadcast.total,
+            "sent": broadcast.sent,
+            "failed": broadcast.failed,
+            "message": f"Xabar {broadcast.sent}/{broadcast.total} foydalanuvchiga yuborildi.",
+        }
+
+    @staticmethod
+    async def _claim(db: AsyncSession, broadcast_id: str) -> bool:
+        """pending yoki heartbeat'i eskirgan running broadcast'ni atomik egallash."""
+        stale_before = datetime.now(timezone.utc) - timedelta(seconds=TELEGRAM_BROADCAST_STALE_SECONDS)
+        result = await db.execute(
+            update(TelegramBroadcast)
+            .where(
+                TelegramBroadcast.id == broadcast_id,
+                or_(
+                    TelegramBroadcast.status.in_(["pending", "failed"]),
+                    (TelegramBroadcast.status == "running") & (TelegramBroadcast.updated_at < stale_before),
+                ),
+            )
+            .values(status="running", error=None, updated_at=func.now())
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        return result.rowcount == 1
+
+    # -- yuborish ------------------------------------------------------------
+
+    async def send(self, chat_id: str, payload: Dict[str, Any]) -> bool:
+        """Bitta xabar: limitlar, 429 retry_after va vaqtinchalik xatolarda qayta urinish."""
+        await self.per_chat.wait(chat_id)
+        body = {**payload, "chat_id": chat_id}
+        client = self._client or get_http_client("telegram")
+        for attempt in range(self.max_retries + 1):
+            await self.bucket.acquire()
+            try:
+                # 429/5xx bu yerda boshqariladi — umumiy klientning o'z retry'i o'chiq
+                response = await client.post(f"{self.api_url}/sendMessage", json=body, retries=0)
+            except (httpx.HTTPError, CircuitOpenError) as e:
+                logger.warning(f"Broadcast network error for {chat_id}: {e}")
+                await asyncio.sleep(min(2 ** attempt, 10))
+                continue
+
+            if response.status_code == 200:
+                return True
+            if response.status_code == 429:
+                try:
+                    retry_after = response.json().get("parameters", {}).get("retry_after", 1)
+                except ValueError:
+                    retry_after = 1
+                logger.warning(f"Telegram 429, retry_after={retry_after}s")
+                self.bucket.pause(float(retry_after))
+                continue
+            if response.status_code >= 500:
+                await asyncio.sleep(min(2 ** attempt, 10))
+                continue
+            # 400/403: chat topilmadi, bot bloklangan — qayta urinish befoyda
+            logger.info(f"Broadcast to {chat_id} rejected: {response.status_code} {response.text[:200]}")
+            return False
+        return False
+
+    async def _send_chunk(self, chat_ids: List[str], payload: Dict[str, Any]) -> Tuple[int, int]:
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def _one(chat_id: str) -> bool:
+            async with semaphore:
+                try:
+                    return await self.send(chat_id, payload)
+                except Exception as e:
+                    logger.error(f"Broadcast error for {chat_id}: {e}")
+                    return False
+
+        results = await asyncio.gather(*[_one(chat_id) for chat_id in chat_ids])
+        sent = sum(results)
+        return sent, len(results) - sent
+
+    async def run(self, session_factory, broadcast_id: str) -> Dict[str, Any]:
+        """
+        Broadcast'ni boshidan yoki saqlangan kursordan davom ettirish.
+        session_factory — AsyncSessionLocal kabi; har bir bo'lak o'z sessiyasida.
+        """
+        async with session_factory() as db:
+            if not await self._claim(db, broadcast_id):
+                broadcast = await db.get(TelegramBroadcast, broadcast_id)
+                if broadcast is None:
+                    raise ValueError(f"Broadcast {broadcast_id} topilmadi")
+                return self.summary(broadcast)
+            broadcast = await db.get(TelegramBroadcast, broadcast_id, populate_existing=True)
+            payload = {"text": broadcast.message}
+            if broadcast.parse_mode:
+                payload["parse_mode"] = broadcast.parse_mode
+            filter_type = broadcast.filter_type
+            cursor = broadcast.last_recipient_id
+
+        self._client = get_http_client("telegram")
+        try:
+            while True:
+                async with session_factory() as db:
+                    stmt = recipients_query(filter_type).order_by(TelegramUser.id).limit(self.chunk_size)
+                    if cursor is not None:
+                        stmt = stmt.where(TelegramUser.id > cursor)
+                    rows = (await db.execute(stmt)).all()
+                if not rows:
+                    break
+
+                sent, failed = await self._send_chunk([r.telegram_chat_id for r in rows], payload)
+                cursor = rows[-1].id
+                async with session_factory() as db:
+                    await db.execute(
+                        update(TelegramBroadcast)
+                        .where(TelegramBroadcast.id == broadcast_id)
+                        .values(
+                            sent=TelegramBroadcast.sent + sent,
+                            failed=TelegramBroadcast.failed + failed,
+                            last_recipient_id=cursor,
+                            updated_at=func.now(),
+                        )
+                    )
+                    await db.commit()
+        except Exception as e:
+            logger.exception(f"Broadcast {broadcast_id} failed")
+            async with session_factory() as db:
+                await db.execute(
+                    update(TelegramBroadcast)
+                    .where(TelegramBroadcast.id == broadcast_id)
+                    .values(status="failed", error=str(e)[:1000])
+                )
+                await db.commit()
+                return self.summary(await db.get(TelegramBroadcast, broadcast_id, populate_existing=True))
+        finally:
+            self._client = None
+
+        async with session_factory() as db:
+            await db.execute(
+                update(TelegramBroadcast)
+                .where(TelegramBroadcast.id == broadcast_id)
+                .values(status="completed", finished_at=func.now())
+            )
+            await db.commit()
+            broadcast = await db.get(TelegramBroadcast, broadcast_id, populate_existing=True)
+            logger.info(f"Broadcast {broadcast_id} completed: {broadcast.sent}/{broadcast.total}")
+            return self.summary(broadcast)
+
+
+async def resume_unfinished_broadcasts(session_factory, bot_token: str) -> List[Dict[str, Any]]:
+    """Startup'da: uzilib qolgan (heartbeat eskirgan) broadcast'larni davom ettirish."""
+    stale_before = datetime.now(timezone.utc) - timedelta(seconds=TELEGRAM_BROADCAST_STALE_SECONDS)
+    async with session_factory() as db:
+        result = await db.execute(
+            select(TelegramBroadcast.id).where(
+                or_(
+                    TelegramBroadcast.status == "pending",
+                    (TelegramBroadcast.status == "running") & (TelegramBroadcast.updated_at < stale_before),
+                )
+            )
+        )
+        broadcast_ids = result.scalars().all()
+    summaries = []
+    for broadcast_id in broadcast_ids:
+        summaries.append(await TelegramBroadcaster(bot_token).run(session_factory, broadcast_id))
+    return summaries
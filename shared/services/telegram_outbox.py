@@ -0,0 +1,236 @@
+"""
+Telegram Outbox — amallardan keyingi shaxsiy Telegram xabarlari uchun navbat
+
+    await enqueue_telegram(db, student_ids, text)   # amal bilan bir tranzaksiyada
+    await db.commit()
+    wake_telegram_outbox()                          # worker darhol olsin
+
+enqueue_telegram() qabul qiluvchilarning chat_id'larini bitta SELECT bilan
+oladi va telegram_outbox ga bitta INSERT qiladi — HTTP so'rov javob yo'lida
+yo'q. TelegramOutboxWorker (MainPlatform lifespan'da ishga tushadi) due
+qatorlarni TELEGRAM_OUTBOX_BATCH_SIZE tadan egallaydi va TelegramBroadcaster
+limitlari bilan yuboradi (global token bucket, chat intervali, 429 retry_after).
+
+    - egallash: status="sending", next_attempt_at = hozir + lease; Postgres'da
+      FOR UPDATE SKIP LOCKED — bir nechta worker bir qatorni olmaydi
+    - worker yiqilsa lease tugagach qator qayta olinadi
+    - yuborilmasa attempts+1 va eksponensial kechikish, TELEGRAM_OUTBOX_MAX_ATTEMPTS
+      dan keyin "failed"
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from shared.database.models import TelegramOutbox, TelegramUser
+from shared.services.telegram_broadcast import TELEGRAM_BROADCAST_CONCURRENCY, TelegramBroadcaster
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_OUTBOX_BATCH_SIZE = int(os.getenv("TELEGRAM_OUTBOX_BATCH_SIZE", "100"))
+TELEGRAM_OUTBOX_POLL_SECONDS = float(os.getenv("TELEGRAM_OUTBOX_POLL_SECONDS", "5"))
+TELEGRAM_OUTBOX_MAX_ATTEMPTS = int(os.getenv("TELEGRAM_OUTBOX_MAX_ATTEMPTS", "5"))
+TELEGRAM_OUTBOX_LEASE_SECONDS = int(os.getenv("TELEGRAM_OUTBOX_LEASE_SECONDS", "120"))
+TELEGRAM_OUTBOX_RETRY_BASE_SECONDS = float(os.getenv("TELEGRAM_OUTBOX_RETRY_BASE_SECONDS", "30"))
+
+
+async def enqueue_telegram(
+    db: AsyncSession,
+    user_ids: Iterable[str],
+    text: str,
+    parse_mode: Optional[str] = "Markdown",
+) -> int:
+    """Bildirishnoma yoqilgan, bog'langan foydalanuvchilarga xabarni navbatga qo'yish (commit chaqiruvchida)"""
+    user_ids = list(dict.fromkeys(u for u in user_ids if u))
+    if not user_ids:
+        return 0
+    result = await db.execute(
+        select(TelegramUser.user_id, TelegramUser.telegram_chat_id).where(
+            TelegramUser.user_id.in_(user_ids),
+            TelegramUser.notifications_enabled == True,  # noqa: E712
+        )
+    )
+    now = datetime.now(timezone.utc)
+    rows = [
+        {"user_id": user_id, "chat_id": chat_id, "text": text, "parse_mode": parse_mode,
+         "status": "pending", "attempts": 0, "next_attempt_at": now}
+        for user_id, chat_id in result.all()
+        if chat_id
+    ]
+    if rows:
+        await db.execute(insert(TelegramOutbox), rows)
+    return len(rows)
+
+
+class TelegramOutboxWorker:
+    """telegram_outbox navbatini limitlar bilan bo'shatuvchi fon worker'i."""
+
+    def __init__(
+        self,
+        bot_token: str,
+        session_factory,
+        api_url: Optional[str] = None,
+        batch_size: int = TELEGRAM_OUTBOX_BATCH_SIZE,
+        poll_seconds: float = TELEGRAM_OUTBOX_POLL_SECONDS,
+        max_attempts: int = TELEGRAM_OUTBOX_MAX_ATTEMPTS,
+        rate: Optional[float] = None,
+    ):
+        kwargs = {"api_url": api_url, "max_retries": 1}
+        if rate is not None:
+            kwargs["rate"] = rate
+        self.sender = TelegramBroadcaster(bot_token, **kwargs)
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self.max_attempts = max_attempts
+        self.stats = {"sent": 0, "retried": 0, "failed": 0}
+        self._wake: Optional[asyncio.Event] = None
+
+    def wake(self) -> None:
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _claim(self) -> List[Any]:
+        now = datetime.now(timezone.utc)
+        async with self.session_factory() as db:
+            stmt = (
+                select(TelegramOutbox.id, TelegramOutbox.chat_id, TelegramOutbox.text,
+                       TelegramOutbox.parse_mode, TelegramOutbox.attempts)
+                .where(
+                    TelegramOutbox.status.in_(["pending", "sending"]),
+                    TelegramOutbox.next_attempt_at <= now,
+                )
+                .order_by(TelegramOutbox.next_attempt_at)
+                .limit(self.batch_size)
+            )
+            if db.get_bind().dialect.name == "postgresql":
+                stmt = stmt.with_for_update(skip_locked=True)
+            rows = (await db.execute(stmt)).all()
+            if rows:
+                await db.execute(
+                    update(TelegramOutbox)
+                    .where(TelegramOutbox.id.in_([r.id for r in rows]))
+                    .values(status="sending", next_attempt_at=now + timedelta(seconds=TELEGRAM_OUTBOX_LEASE_SECONDS))
+                    .execution_options(synchronize_session=False)
+                )
+            await db.commit()
+        return rows
+
+    async def drain_once(self) -> Tuple[int, int]:
+        """Bitta paketni egallab yuborish; (yuborilgan, yuborilmagan) qaytadi"""
+        rows = await self._claim()
+        if not rows:
+            return 0, 0
+
+        semaphore = asyncio.Semaphore(TELEGRAM_BROADCAST_CONCURRENCY)
+
+        async def _one(row) -> bool:
+            payload: Dict[str, Any] = {"text": row.text}
+            if row.parse_mode:
+                payload["parse_mode"] = row.parse_mode
+            async with semaphore:
+                try:
+                    return await self.sender.send(row.chat_id, payload)
+                except Exception as e:
+                    logger.error(f"Outbox send error for {row.chat_id}: {e}")
+                    return False
+
+        results = await asyncio.gather(*[_one(row) for row in rows])
+        sent_ids = [row.id for row, ok in zip(rows, results) if ok]
+        retry: Dict[int, List[str]] = {}
+        failed_ids: List[str] = []
+        for row, ok in zip(rows, results):
+            if ok:
+                continue
+            attempts = row.attempts + 1
+            if attempts >= self.max_attempts:
+                failed_ids.append(row.id)
+            else:
+                retry.setdefault(attempts, []).append(row.id)
+
+        now = datetime.now(timezone.utc)
+        async with self.session_factory() as db:
+            if sent_ids:
+                await db.execute(
+                    update(TelegramOutbox).where(TelegramOutbox.id.in_(sent_ids))
+                    .values(status="sent", sent_at=now, attempts=TelegramOutbox.attempts + 1)
+                    .execution_options(synchronize_session=False)
+                )
+            for attempts, ids in retry.items():
+                delay = TELEGRAM_OUTBOX_RETRY_BASE_SECONDS * 2 ** (attempts - 1)
+                await db.execute(
+                    update(TelegramOutbox).where(TelegramOutbox.id.in_(ids))
+                    .values(status="pending", attempts=attempts, last_error="send failed",
+                            next_attempt_at=now + timedelta(seconds=delay))
+                    .execution_options(synchronize_session=False)
+                )
+            if failed_ids:
+                await db.execute(
+                    update(TelegramOutbox).where(TelegramOutbox.id.in_(failed_ids))
+                    .values(status="failed", attempts=TelegramOutbox.attempts + 1, last_error="send failed")
+                    .execution_options(synchronize_session=False)
+                )
+            await db.commit()
+
+        self.stats["sent"] += len(sent_ids)
+        self.stats["retried"] += sum(len(ids) for ids in retry.values())
+        self.stats["failed"] += len(failed_ids)
+        return len(sent_ids), len(rows) - len(sent_ids)
+
+    async def run(self) -> None:
+        """To'xtatilguncha: paketlarni ketma-ket bo'shatish, navbat bo'sh bo'lsa wake/poll kutish"""
+        self._wake = asyncio.Event()
+        while True:
+            try:
+                sent, unsent = await self.drain_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Telegram outbox drain failed: {e}")
+                sent = unsent = 0
+            if sent or unsent:
+                continue
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+
+_worker: Optional[TelegramOutboxWorker] = None
+_worker_task: Optional[asyncio.Task] = None
+
+
+def start_telegram_outbox(session_factory, bot_token: str, **kwargs) -> asyncio.Task:
+    """Jarayondagi outbox worker'ini ishga tushirish (lifespan startup)"""
+    global _worker, _worker_task
+    _worker = TelegramOutboxWorker(bot_token, session_factory, **kwargs)
+    _worker_task = asyncio.get_running_loop().create_task(_worker.run())
+    return _worker_task
+
+
+async def stop_telegram_outbox() -> None:
+    global _worker, _worker_task
+    if _worker_task is not None:
+        _worker_task.cancel()
+        try:
+            await _worker_task
+        except (asyncio.CancelledError, Exception):
+            pass
+    _worker = _worker_task = None
+
+
+def wake_telegram_outbox() -> None:
+    """Commit'dan keyin chaqiriladi: worker poll intervalini kutmasin"""
+    if _worker is not None:
+        _worker.wake()
+
+
+__all__ = [
+    "enqueue_telegram", "TelegramOutboxWorker",
+    "start_telegram_outbox", "stop_telegram_outbox", "wake_telegram_outbox",
+]
@@ -0,0 +1,300 @@
+"""
+TTS Render — ertak va matnlarni gap-gap bo'laklarda oldindan ovozlashtirish
+
+Matn gaplarga bo'linadi va TTS_CHUNK_MAX_CHARS gacha bo'laklarga yig'iladi.
+Har bir bo'lak audio_cache'da (text hash + ovoz + til bo'yicha) saqlanadi,
+ya'ni bir xil gap qaysi ertak yoki endpoint'dan kelmasin bir marta sintez
+qilinadi. Kalitlar MainPlatform va Lessions uchun bir xil, shuning uchun
+bo'laklar audio_cache_service'ning umumiy saqlash joyiga (Azure, umumiy
+AUDIO_CACHE_DIR yoki inline) yoziladi — konteyner ichidagi diskka emas.
+
+    renderer = get_tts_renderer()                      # Azure TTS
+    renderer.prerender(story.content, "uz", "female")  # nashr/tahrirda, fon rejimida
+    return await renderer.audio_response(request, text, "uz", "female", db)
+
+audio_response():
+    * If-None-Match mos kelsa — 304 (ETag bo'laklar kalitidan hisoblanadi)
+    * hamma bo'lak tayyor — to'liq audio, ETag va Range (206) bilan
+    * aks holda yetishmayotganlar navbatga qo'yiladi va audio tartib bilan
+      stream qilinadi: birinchi bo'lak tayyor bo'lishi bilan yuboriladi,
+      keyingilari worker'larda parallel sintez qilinadi
+
+Worker pool har bir jarayonda bitta (TTS_RENDER_WORKERS ta vazifa). Bir xil
+bo'lak uchun parallel so'rovlar bitta sintezni kutadi; so'rov kutayotgan
+bo'laklar fon pre-render'dan oldin olinadi.
+"""
+import asyncio
+import base64
+import hashlib
+import itertools
+import logging
+import os
+import re
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from shared.services.audio_cache_service import AudioCacheService
+
+logger = logging.getLogger(__name__)
+
+TTS_RENDER_WORKERS = int(os.getenv("TTS_RENDER_WORKERS", "4"))
+TTS_CHUNK_MAX_CHARS = int(os.getenv("TTS_CHUNK_MAX_CHARS", "300"))
+
+PRIORITY_REQUEST = 0
+PRIORITY_BACKGROUND = 1
+
+_SENTENCE_END = re.compile(r"(?<=[.!?…])\s+|\n+")
+
+Synthesizer = Callable[[str, str, str], Awaitable[bytes]]
+
+
+@dataclass(frozen=True)
+class TTSChunk:
+    text: str
+    language: str
+    voice: str
+
+    @property
+    def key(self) -> str:
+        return AudioCacheService.generate_cache_key(self.text, self.language, self.voice)
+
+
+def split_sentences(text: str, max_chars: Optional[int] = None) -> List[str]:
+    """Gaplarga bo'lish va max_chars gacha yig'ish; juda uzun gap so'zlar bo'yicha bo'linadi"""
+    max_chars = max_chars or TTS_CHUNK_MAX_CHARS
+    pieces: List[str] = []
+    for sentence in _SENTENCE_END.split(text or ""):
+        sentence = " ".join(sentence.split())
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(" ", 0, max_chars + 1)
+            if cut <= 0:
+                cut = max_chars
+            pieces.append(sentence[:cut].strip())
+            sentence = sentence[cut:].strip()
+        if sentence:
+            pieces.append(sentence)
+
+    chunks: List[str] = []
+    for piece in pieces:
+        if chunks and len(chunks[-1]) + 1 + len(piece) <= max_chars:
+            chunks[-1] = f"{chunks[-1]} {piece}"
+        else:
+            chunks.append(piece)
+    return chunks
+
+
+def split_chunks(text: str, language: str, voice: str) -> List[TTSChunk]:
+    return [TTSChunk(s, language, voice) for s in split_sentences(text)]
+
+
+def audio_etag(chunks: List[TTSChunk]) -> str:
+    digest = hashlib.sha256("|".join(c.key for c in chunks).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def _parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """"bytes=a-b" / "bytes=a-" / "bytes=-n" -> (start, end) (end kiritilgan). Noto'g'ri -> ValueError"""
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    start_s, _, end_s = header[6:].strip().partition("-")
+    if not start_s:
+        length = int(end_s)
+        if length <= 0:
+            raise ValueError(header)
+        return max(0, size - length), size - 1
+    start = int(start_s)
+    end = min(int(end_s), size - 1) if end_s else size - 1
+    if start >= size or end < start:
+        raise ValueError(header)
+    return start, end
+
+
+def full_audio_response(request: Request, body: bytes, etag: str, media_type: str = "audio/mpeg") -> Response:
+    headers = {"ETag": etag, "Accept-Ranges": "bytes", "Cache-Control": "public, max-age=86400"}
+    try:
+        byte_range = _parse_range(request.headers.get("range"), len(body))
+    except ValueError:
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{len(body)}"})
+    if byte_range is None:
+        return Response(content=body, media_type=media_type, headers=headers)
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{len(body)}"
+    return Response(content=body[start:end + 1], status_code=206, media_type=media_type, headers=headers)
+
+
+class TTSRenderer:
+    """Bitta TTS provayderi uchun worker pool + single-flight + audio_cache."""
+
+    def __init__(self, synthesize: Synthesizer, workers: int = TTS_RENDER_WORKERS, session_factory=None):
+        self.synthesize = synthesize
+        self.workers = workers
+        self._session_factory = session_factory
+        self._loop = None
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._inflight: Dict[str, Tuple[asyncio.Future, int]] = {}
+        self._rendering: set = set()
+        self._seq = itertools.count()
+        self.stats = {"rendered": 0, "cache_hits": 0, "coalesced": 0, "failed": 0}
+
+    def _sessions(self):
+        if self._session_factory is not None:
+            return self._session_factory
+        from shared.database import session as db_session
+        return db_session.AsyncSessionLocal
+
+    def _ensure_workers(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.PriorityQueue()
+            self._inflight.clear()
+            self._rendering.clear()
+            self._tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+
+    def submit(self, chunk: TTSChunk, priority: int = PRIORITY_REQUEST) -> asyncio.Future:
+        """Bo'lakni navbatga qo'yish; allaqachon navbatda bo'lsa o'sha future qaytadi"""
+        self._ensure_workers()
+        existing = self._inflight.get(chunk.key)
+        if existing is not None:
+            future, queued_priority = existing
+            self.stats["coalesced"] += 1
+            if priority < queued_priority:
+                # So'rov kutmoqda — fon navbatini kutmasdan oldinga o'tkazamiz
+                self._inflight[chunk.key] = (future, priority)
+                self._queue.put_nowait((priority, next(self._seq), chunk, future))
+            return future
+        future = self._loop.create_future()
+        self._inflight[chunk.key] = (future, priority)
+        self._queue.put_nowait((priority, next(self._seq), chunk, future))
+        return future
+
+    def prerender(self, text: str, language: str, voice: str) -> int:
+        """Nashr/tahrir paytida: barcha bo'laklarni fon navbatiga qo'yish"""
+        chunks = split_chunks(text, language, voice)
+        for chunk in chunks:
+            self.submit(chunk, PRIORITY_BACKGROUND)
+        return len(chunks)
+
+    async def _worker(self) -> None:
+        while True:
+            _, _, chunk, future = await self._queue.get()
+            try:
+                # Ustuvorligi oshirilgan bo'lak ikki marta navbatda bo'lishi mumkin
+                if future.done() or chunk.key in self._rendering:
+                    continue
+                self._rendering.add(chunk.key)
+                try:
+                    audio = await self._render(chunk)
+                except Exception as e:
+                    self.stats["failed"] += 1
+                    logger.error(f"TTS render failed ({chunk.key}): {e}")
+                    if not future.done():
+                        future.set_exception(e)
+                        future.exception()  # kutuvchi bo'lmasa "never retrieved" chiqmasin
+                else:
+                    if not future.done():
+                        future.set_result(audio)
+                finally:
+                    self._rendering.discard(chunk.key)
+            finally:
+                current = self._inflight.get(chunk.key)
+                if current is not None and current[0].done():
+                    self._inflight.pop(chunk.key, None)
+                self._queue.task_done()
+
+    async def _render(self, chunk: TTSChunk) -> bytes:
+        async with self._sessions()() as db:
+            cache = AudioCacheService(db)
+            cached = await cache.get_cached_audio(chunk.text, chunk.language, chunk.voice)
+            if cached is not None:
+                self.stats["cache_hits"] += 1
+                return base64.b64decode(cached["audio_data"])
+
+            audio = await self.synthesize(chunk.text, chunk.language, chunk.voice)
+            self.stats["rendered"] += 1
+            try:
+                await cache.save_audio_to_cache(
+                    chunk.text,
+                    base64.b64encode(audio).decode("ascii"),
+                    language=chunk.language,
+                    voice_gender=chunk.voice,
+                    file_size=len(audio),
+                )
+            except Exception as e:
+                # Boshqa jarayon bir vaqtda yozgan bo'lishi mumkin — audio baribir qaytariladi
+                logger.warning(f"TTS chunk cache write failed ({chunk.key}): {e}")
+            return audio
+
+    async def _lookup(self, chunks: List[TTSChunk], db: AsyncSession) -> List[Optional[bytes]]:
+        cache = AudioCacheService(db)
+        parts: List[Optional[bytes]] = []
+        for chunk in chunks:
+            cached = await cache.get_cached_audio(chunk.text, chunk.language, chunk.voice)
+            parts.append(base64.b64decode(cached["audio_data"]) if cached is not None else None)
+        return parts
+
+    async def audio_response(
+        self,
+        request: Request,
+        text: str,
+        language: str,
+        voice: str,
+        db: AsyncSession,
+    ) -> Response:
+        chunks = split_chunks(text, language, voice)
+        if not chunks:
+            raise HTTPException(status_code=400, detail="Matn kiritilmadi")
+
+        etag = audio_etag(chunks)
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+
+        parts = await self._lookup(chunks, db)
+        if all(part is not None for part in parts):
+            return full_audio_response(request, b"".join(parts), etag)
+
+        futures = [self.submit(c) if part is None else None for c, part in zip(chunks, parts)]
+        # Birinchi bo'lak xatosi oddiy HTTP xato bo'lib qaytsin (stream boshlanmasidan oldin)
+        first = parts[0] if parts[0] is not None else await asyncio.shield(futures[0])
+
+        async def body():
+            yield first
+            for part, future in zip(parts[1:], futures[1:]):
+                # shield: mijoz uzilsa umumiy future bekor bo'lmasin
+                yield part if part is not None else await asyncio.shield(future)
+
+        return StreamingResponse(body(), media_type="audio/mpeg", headers={"Cache-Control": "no-store"})
+
+
+async def _azure_synthesize(text: str, language: str, voice: str) -> bytes:
+    from shared.services.azure_speech_service import speech_service
+    return await speech_service.text_to_speech(text=text, language=language, gender=voice)
+
+
+_renderer: Optional[TTSRenderer] = None
+
+
+def get_tts_renderer() -> TTSRenderer:
+    """Azure TTS (voice = "female"/"male") uchun umumiy renderer"""
+    global _renderer
+    if _renderer is None:
+        _renderer = TTSRenderer(_azure_synthesize)
+    return _renderer
+
+
+def set_tts_renderer(renderer: Optional[TTSRenderer]) -> None:
+    """Testlar uchun: renderer'ni almashtirish"""
+    global _renderer
+    _renderer = renderer
+
+
+__all__ = [
+    "TTSChunk", "TTSRenderer", "split_sentences", "split_chunks", "audio_etag",
+    "full_audio_response", "get_tts_renderer", "set_tts_renderer",
+    "PRIORITY_REQUEST", "PRIORITY_BACKGROUND",
+]
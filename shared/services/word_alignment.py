@@ -0,0 +1,301 @@
+"""
+Word Alignment — o'qish natijasini baholash uchun so'zma-so'z tekislash
+
+Hikoya matni (reference) va STT transcript (hypothesis) normallashtiriladi
+(kichik harf, o'zbek kirill -> lotin, ʻ ʼ ‘ ’ ` -> '), so'zlar butun son ID'larga
+aylantiriladi va eng uzun umumiy qism-ketma-ketlik (LCS) bo'yicha tekislanadi:
+
+    1. umumiy boshi/oxiri kesiladi
+    2. oddiy o'qish (tahrirlar soni D kichik) — Myers O((n+m)·D) diff
+    3. D katta bo'lsa (bola hikoyaning yarmida to'xtagan, xatboshini tashlab
+       ketgan) — bit-parallel LCS: har bir so'z uchun butun son ustida bir
+       nechta amal, O(n·m / 64)
+
+Ikkala yo'l ham aniq LCS beradi — difflib.SequenceMatcher evristikalaridan
+(autojunk, eng uzun blokdan boshlash) farqli takrorlanuvchi so'zlarda
+adashmaydi.
+
+    alignment = align_words(task.story_text, transcript)
+    alignment.correct, alignment.ratio       # 2·mos / (n + m), SequenceMatcher.ratio kabi
+    alignment.marks_payload()                # har bir so'z: correct / substituted / skipped
+
+Oraliqdagi o'qilmagan hikoya so'zlari va ortiqcha eshitilgan so'zlar tartib
+bo'yicha juftlanadi — juftlari "substituted", qolgani "skipped" (yoki
+alignment.inserted).
+"""
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+CORRECT = "correct"
+SUBSTITUTED = "substituted"
+SKIPPED = "skipped"
+
+# Myers shu tahrirlar sonigacha (O((n+m)·D)); undan ko'pida bit-parallel LCS
+MYERS_MAX_EDITS = 64
+
+_QUOTES = "'ʻʼ‘’`´′"
+_APOSTROPHES = str.maketrans({c: "'" for c in _QUOTES})
+_CYRILLIC_TABLE = str.maketrans({
+    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d", "е": "e", "ё": "yo", "ж": "j",
+    "з": "z", "и": "i", "й": "y", "к": "k", "л": "l", "м": "m", "н": "n", "о": "o",
+    "п": "p", "р": "r", "с": "s", "т": "t", "у": "u", "ф": "f", "х": "x", "ц": "ts",
+    "ч": "ch", "ш": "sh", "щ": "sh", "ъ": "'", "ь": "", "ы": "i", "э": "e", "ю": "yu",
+    "я": "ya", "ў": "o'", "қ": "q", "ғ": "g'", "ҳ": "h",
+})
+_YE_RE = re.compile(r"\bе")  # so'z boshidagi kirill "е" — ye (ер -> yer)
+# So'z: chetdagi apostroflar (qo'shtirnoq) tashlanadi, lekin o' / g' oxiridagisi
+# harfning bir qismi (tog', bo'). Ikkala regex bir xil tuzilishda — yozilgan va
+# normallashgan so'zlar 1:1 mos keladi.
+_NORM_RE = re.compile(r"'*(\w(?:[\w']*\w)?(?:(?<=[og])')?)'*")
+_RAW_RE = re.compile(rf"[{_QUOTES}]*(\w(?:[\w{_QUOTES}]*\w)?(?:(?<=[oOgG])[{_QUOTES}])?)[{_QUOTES}]*")
+
+
+def _normalize(text: str) -> str:
+    text = text.lower().translate(_APOSTROPHES)
+    return _YE_RE.sub("ye", text).translate(_CYRILLIC_TABLE)
+
+
+def tokenize(text: str) -> List[str]:
+    """Normallashgan so'zlar: kichik harf, kirill -> lotin, apostroflar bir xil"""
+    return _NORM_RE.findall(_normalize(text or ""))
+
+
+def normalize_word(word: str) -> str:
+    return "".join(tokenize(word))
+
+
+def split_words(text: str) -> List[Tuple[str, str]]:
+    """[(yozilgani, normallashgani)] — tinish belgilari tashlanadi"""
+    raw = _RAW_RE.findall(text or "")
+    norm = tokenize(text)
+    if len(raw) == len(norm):
+        return list(zip(raw, norm))
+    # Normallashda butunlay yo'qolgan so'z (masalan yolg'iz "ь") — so'zma-so'z
+    words = []
+    for word in raw:
+        word_norm = normalize_word(word)
+        if word_norm:
+            words.append((word, word_norm))
+    return words
+
+
+def count_words(text: str) -> int:
+    """Hikoyadagi so'zlar soni — baholashdagi total_words bilan bir xil"""
+    return len(tokenize(text))
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(tokenize(text))
+
+
+# ============================================================
+# ALIGNMENT ENGINE (butun son ketma-ketliklari ustida)
+# ============================================================
+
+def _bit_parallel(a, b, alo, ahi, blo, bhi, out: List[Tuple[int, int]]) -> None:
+    """
+    Aniq LCS, bit-parallel (Allison-Dix / Hyyrö): har bir hypothesis so'zi
+    uchun Python butun soni ustida bir nechta amal — O(n·m / 64), C tezligida.
+
+    Ketma-ketliklar teskari o'giriladi: backtrack eng o'ngdagi mosni tanlaydi,
+    teskarida bu asl matndagi eng chap (o'qish tartibi) bo'ladi.
+    """
+    n = ahi - alo
+    masks: Dict[int, int] = {}
+    for bit, i in enumerate(range(ahi - 1, alo - 1, -1)):
+        masks[a[i]] = masks.get(a[i], 0) | (1 << bit)
+    full = (1 << n) - 1
+    v = full
+    rows = [0]  # rows[j] — nol bitlar (LCS qatorida +1 bo'lgan joylar), 0-qator bo'sh
+    for j in range(bhi - 1, blo - 1, -1):
+        u = v & masks.get(b[j], 0)
+        v = ((v + u) | (v - u)) & full
+        rows.append(~v & full)
+
+    i = n
+    cur = rows[-1].bit_count()
+    for j in range(len(rows) - 1, 0, -1):
+        if not cur:
+            break
+        below = rows[j] & ((1 << i) - 1)
+        if (rows[j - 1] & ((1 << i) - 1)).bit_count() == cur:
+            continue  # bu so'z LCS ga kerak emas
+        i = below.bit_length() - 1  # LCS shu qatorda oshgan eng o'ng joy — mos so'z
+        cur -= 1
+        out.append((ahi - 1 - i, bhi - j))
+
+
+def _myers(a, b, alo, ahi, blo, bhi, out: List[Tuple[int, int]], max_edits: int) -> bool:
+    """Myers diff; max_edits dan ko'p tahrir kerak bo'lsa False (out o'zgarmaydi)"""
+    n, m = ahi - alo, bhi - blo
+    max_d = min(n + m, max_edits)
+    offset = max_d + 1
+    v = [0] * (2 * max_d + 3)
+    trace: List[List[int]] = []
+    for d in range(max_d + 1):
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and v[offset + k - 1] < v[offset + k + 1]):
+                x = v[offset + k + 1]
+            else:
+                x = v[offset + k - 1] + 1
+            y = x - k
+            while x < n and y < m and a[alo + x] == b[blo + y]:
+                x += 1
+                y += 1
+            v[offset + k] = x
+            if x >= n and y >= m:
+                trace.append(v[offset - d: offset + d + 1])
+                _myers_backtrack(trace, n, m, alo, blo, out)
+                return True
+        trace.append(v[offset - d: offset + d + 1])
+    return False
+
+
+def _myers_backtrack(trace, n, m, alo, blo, out) -> None:
+    matches = []
+    x, y = n, m
+    for d in range(len(trace) - 1, 0, -1):
+        prev = trace[d - 1]  # indekslar: k + (d - 1)
+        k = x - y
+        if k == -d or (k != d and prev[k - 1 + d - 1] < prev[k + 1 + d - 1]):
+            prev_k = k + 1
+        else:
+            prev_k = k - 1
+        prev_x = prev[prev_k + d - 1]
+        prev_y = prev_x - prev_k
+        mid_x, mid_y = (prev_x, prev_y + 1) if prev_k == k + 1 else (prev_x + 1, prev_y)
+        while x > mid_x and y > mid_y:
+            x -= 1
+            y -= 1
+            matches.append((alo + x, blo + y))
+        x, y = prev_x, prev_y
+    while x > 0 and y > 0:
+        x -= 1
+        y -= 1
+        matches.append((alo + x, blo + y))
+    matches.reverse()
+    out.extend(matches)
+
+
+def match_pairs(a: Sequence[int], b: Sequence[int]) -> List[Tuple[int, int]]:
+    """Mos kelgan (i, j) juftlari (aniq LCS), i va j bo'yicha o'suvchi"""
+    out: List[Tuple[int, int]] = []
+    alo, ahi, blo, bhi = 0, len(a), 0, len(b)
+    while alo < ahi and blo < bhi and a[alo] == b[blo]:
+        out.append((alo, blo))
+        alo += 1
+        blo += 1
+    tail = []
+    while alo < ahi and blo < bhi and a[ahi - 1] == b[bhi - 1]:
+        ahi -= 1
+        bhi -= 1
+        tail.append((ahi, bhi))
+    if alo < ahi and blo < bhi:
+        # Oddiy o'qish (oz xato) — Myers; ko'p tahrir (yarmida to'xtagan) — bit-parallel
+        if abs((ahi - alo) - (bhi - blo)) > MYERS_MAX_EDITS or not _myers(
+            a, b, alo, ahi, blo, bhi, out, MYERS_MAX_EDITS
+        ):
+            _bit_parallel(a, b, alo, ahi, blo, bhi, out)
+    out.extend(reversed(tail))
+    return out
+
+
+def to_ids(*sequences: Sequence[str]) -> List[List[int]]:
+    """Bir nechta so'z ro'yxati uchun umumiy lug'at bo'yicha butun son ID'lar"""
+    vocab: Dict[str, int] = {}
+    return [[vocab.setdefault(w, len(vocab)) for w in seq] for seq in sequences]
+
+
+# ============================================================
+# NATIJA
+# ============================================================
+
+@dataclass
+class WordMark:
+    index: int
+    word: str
+    status: str
+    heard: Optional[str] = None
+
+
+@dataclass
+class Alignment:
+    marks: List[WordMark]
+    inserted: List[str] = field(default_factory=list)
+    hypothesis_words: int = 0
+
+    def _count(self, status: str) -> int:
+        return sum(1 for mark in self.marks if mark.status == status)
+
+    @property
+    def total_words(self) -> int:
+        return len(self.marks)
+
+    @property
+    def correct(self) -> int:
+        return self._count(CORRECT)
+
+    @property
+    def substituted(self) -> int:
+        return self._count(SUBSTITUTED)
+
+    @property
+    def skipped(self) -> int:
+        return self._count(SKIPPED)
+
+    @property
+    def ratio(self) -> float:
+        total = self.total_words + self.hypothesis_words
+        return 2.0 * self.correct / total if total else 0.0
+
+    def marks_payload(self) -> List[Dict[str, Optional[str]]]:
+        """Frontend'da ajratib ko'rsatish uchun: [{"word", "status", "heard"}]"""
+        return [
+            {"word": mark.word, "status": mark.status, "heard": mark.heard}
+            for mark in self.marks
+        ]
+
+
+def align_words(reference: str, hypothesis: str) -> Alignment:
+    ref = split_words(reference)
+    hyp = split_words(hypothesis)
+    ref_ids, hyp_ids = to_ids([n for _, n in ref], [n for _, n in hyp])
+    pairs = match_pairs(ref_ids, hyp_ids)
+
+    marks: List[WordMark] = []
+    inserted: List[str] = []
+
+    def _gap(i0: int, i1: int, j0: int, j1: int) -> None:
+        # O'qilmagan so'zlar va ortiqcha eshitilganlar tartib bo'yicha juftlanadi
+        for offset, i in enumerate(range(i0, i1)):
+            j = j0 + offset
+            if j < j1:
+                marks.append(WordMark(i, ref[i][0], SUBSTITUTED, hyp[j][0]))
+            else:
+                marks.append(WordMark(i, ref[i][0], SKIPPED))
+        inserted.extend(word for word, _ in hyp[j0 + (i1 - i0):j1])
+
+    i = j = 0
+    for pi, pj in pairs:
+        _gap(i, pi, j, pj)
+        marks.append(WordMark(pi, ref[pi][0], CORRECT, hyp[pj][0]))
+        i, j = pi + 1, pj + 1
+    _gap(i, len(ref), j, len(hyp))
+    return Alignment(marks=marks, inserted=inserted, hypothesis_words=len(hyp))
+
+
+def text_similarity(a: str, b: str) -> float:
+    """Qisqa javoblar uchun harflar darajasidagi o'xshashlik (0..1), normallashgan matnda"""
+    a_norm, b_norm = normalize_text(a), normalize_text(b)
+    if not a_norm or not b_norm:
+        return 0.0
+    pairs = match_pairs([ord(c) for c in a_norm], [ord(c) for c in b_norm])
+    return 2.0 * len(pairs) / (len(a_norm) + len(b_norm))
+
+
+__all__ = [
+    "CORRECT", "SUBSTITUTED", "SKIPPED", "WordMark", "Alignment",
+    "tokenize", "normalize_word", "split_words", "count_words", "normalize_text",
+    "to_ids", "match_pairs", "align_words", "text_similarity",
+]
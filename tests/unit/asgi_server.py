@@ -0,0 +1,48 @@
+"""
+Helper for tests that need a real local HTTP upstream (mock Telegram, Payme, ...).
+
+    async with serve_asgi(app) as base_url:
+        ...
+
+Runs uvicorn inside the test's event loop on a free port.
+"""
+import asyncio
+from contextlib import asynccontextmanager
+
+import uvicorn
+
+
+async def read_body(receive) -> bytes:
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return body
+
+
+async def handle_lifespan(scope, receive, send) -> bool:
+    """Answers uvicorn's lifespan messages; returns True if the scope was lifespan."""
+    if scope["type"] != "lifespan":
+        return False
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        else:
+            await send({"type": "lifespan.shutdown.complete"})
+            return True
+
+
+@asynccontextmanager
+async def serve_asgi(app):
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning", ws="none"))
+    task = asyncio.create_task(server.serve())
+    try:
+        while not server.started:
+            await asyncio.sleep(0.01)
+        port = server.servers[0].sockets[0].getsockname()[1]
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        await task
@@ -0,0 +1,37 @@
+"""
+Helper for importing service backend modules in unit tests.
+
+Every backend (MainPlatform, Olimp, TestAI, ...) has its own top-level `app`
+package, so they cannot all sit on sys.path at once. import_backend() swaps
+the requested backend's `app` in, imports the module and restores whatever
+`app` was loaded before. Each backend's modules are kept so a second import
+does not re-declare its SQLAlchemy models.
+"""
+import importlib
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent.parent
+
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+_loaded = {}
+
+
+def _is_app_module(name: str) -> bool:
+    return name == "app" or name.startswith("app.")
+
+
+def import_backend(service: str, module: str):
+    """import_backend("Olimp", "app.olimp.leaderboard") -> module object"""
+    backend = str(ROOT / service / "backend")
+    saved = {k: sys.modules.pop(k) for k in list(sys.modules) if _is_app_module(k)}
+    sys.modules.update(_loaded.get(service, {}))
+    sys.path.insert(0, backend)
+    try:
+        return importlib.import_module(module)
+    finally:
+        sys.path.remove(backend)
+        _loaded[service] = {k: sys.modules.pop(k) for k in list(sys.modules) if _is_app_module(k)}
+        sys.modules.update(saved)
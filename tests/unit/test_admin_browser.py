@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from backend_loader import import_backend
+from shared.database.base import Base
+from shared.database.models import AccountStatus, User, UserRole
+
+browser = import_backend("MainPlatform", "app.services.admin_browser")
+
+BASE = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+async def _setup():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    factory = async_sessionmaker(engine, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda c: Base.metadata.create_all(c, tables=[User.__table__]))
+    async with factory() as db:
+        for i in range(53):
+            # Bir xil created_at — keyset id bo'yicha ajratishi kerak
+            db.add(User(id=f"u{i:07d}", first_name=f"Ism{i}", last_name="Fam_x" if i == 7 else "Fam",
+                        email=f"user{i}@example.uz", phone=f"+99890{i:07d}",
+                        role=UserRole.teacher if i % 4 == 0 else UserRole.student,
+                        status=AccountStatus.active if i % 3 else AccountStatus.suspended,
+                        created_at=BASE + timedelta(minutes=i // 2)))
+        await db.commit()
+    return engine, factory
+
+
+def test_cursor_round_trip_and_bad_cursor():
+    cursor = browser.encode_cursor([BASE, "u0000001"])
+    assert browser.decode_cursor(cursor, 2) == [BASE.isoformat(), "u0000001"]
+    for bad in ("###", browser.encode_cursor([1]), "e30"):
+        with pytest.raises(ValueError):
+            browser.decode_cursor(bad, 2)
+    assert browser.normalize_search("  +998 (90) 123-45 ") == "+9989012345"
+    assert browser.normalize_search("Ali  Valiyev") == "ali valiyev"
+
+
+@pytest.mark.asyncio
+async def test_users_keyset_pages_match_offset_order():
+    engine, factory = await _setup()
+    try:
+        async with factory() as db:
+            stmt = browser.users_query(role=UserRole.student)
+            expected = (await db.execute(stmt.order_by(User.created_at.desc(), User.id.desc()))).scalars().all()
+            seen, cursor = [], None
+            while True:
+                users, has_more, cursor = await browser.users_page(db, stmt, 7, cursor)
+                seen.extend(u.id for u in users)
+                if not has_more:
+                    assert cursor is None
+                    break
+            assert seen == [u.id for u in expected]
+            assert await browser.estimate_rows(db, stmt) == len(expected)
+
+            # '_' LIKE belgisi sifatida emas, oddiy harf sifatida qidiriladi
+            found, _, _ = await browser.users_page(db, browser.users_query(search="fam_x"), 10)
+            assert [u.id for u in found] == ["u0000007"]
+            found, _, _ = await browser.users_page(db, browser.users_query(search="+998 90 000 0012"), 10)
+            assert [u.id for u in found] == ["u0000012"]
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_table_page_keyset_and_counts():
+    engine, factory = await _setup()
+    try:
+        async with factory() as db:
+            assert await browser.approximate_counts(db, ["users"]) == {"users": 53}
+            assert await browser.primary_key(db, "users") == [("id", "VARCHAR(8)")]
+            ids, cursor = [], None
+            while True:
+                page = await browser.table_page(db, "users", 20, cursor)
+                assert page["keyset"]
+                ids.extend(r["id"] for r in page["rows"])
+                cursor = page["next_cursor"]
+                if not page["has_more"]:
+                    break
+            assert ids == sorted((await db.execute(select(User.id))).scalars().all(), reverse=True)
+    finally:
+        await engine.dispose()
@@ -0,0 +1,161 @@
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from backend_loader import import_backend
+from shared.database.base import Base
+
+cache_mod = import_backend("MainPlatform", "app.services.ai_cache_service")
+ai_service_mod = import_backend("MainPlatform", "app.services.ai_service")
+AICache = import_backend("MainPlatform", "app.models.ai_cache").AICache
+AICacheService = cache_mod.AICacheService
+
+
+async def _make_engine():
+    db_engine = create_async_engine("sqlite+aiosqlite://")
+    async with db_engine.begin() as conn:
+        await conn.run_sync(lambda c: Base.metadata.create_all(c, tables=[AICache.__table__]))
+    cache_mod.set_cache_engine(db_engine)
+    cache_mod._memory.clear()
+    cache_mod._pending_writes.clear()
+    for key in cache_mod._stats:
+        cache_mod._stats[key] = 0
+    return db_engine
+
+
+async def _close(db_engine):
+    cache_mod._memory.clear()
+    cache_mod._pending_writes.clear()
+    cache_mod.set_cache_engine(None)
+    await db_engine.dispose()
+
+
+class _FakeCompletions:
+    def __init__(self):
+        self.calls = 0
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(0.05)  # AI kechikishi: shu vaqtda boshqa so'rovlar keladi
+        message = type("M", (), {"content": json.dumps({"question": f"savol {self.calls}"})})
+        return type("R", (), {"choices": [type("C", (), {"message": message})]})
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_prompts_share_one_upstream_call(monkeypatch):
+    """N identical concurrent call_ai(cache=True) requests -> one AI call, one ai_cache row"""
+    db_engine = await _make_engine()
+    completions = _FakeCompletions()
+    client = type("Client", (), {"chat": type("Chat", (), {"completions": completions})})
+    monkeypatch.setattr(ai_service_mod.AIService, "_client", client)
+    try:
+        messages = [{"role": "system", "content": "ertak"}, {"role": "user", "content": "Bo'g'irsoq"}]
+        results = await asyncio.gather(*[
+            ai_service_mod.ai_service.call_ai(messages, response_format={"type": "json_object"}, cache=True)
+            for _ in range(50)
+        ])
+        assert completions.calls == 1
+        assert set(results) == {json.dumps({"question": "savol 1"})}
+        assert AICacheService.stats()["coalesced"] == 49
+
+        # Boshqa parametr — boshqa kalit
+        await ai_service_mod.ai_service.call_ai(messages, temperature=0.1, cache=True)
+        assert completions.calls == 2
+
+        assert await AICacheService.flush_pending() == 2
+        async with db_engine.connect() as conn:
+            rows = (await conn.execute(select(AICache.response_json))).scalars().all()
+        assert len(rows) == 2
+
+        # Yangi worker: xotira bo'sh, javob ai_cache dan olinadi
+        cache_mod._memory.clear()
+        assert await ai_service_mod.ai_service.call_ai(
+            messages, response_format={"type": "json_object"}, cache=True
+        ) == results[0]
+        assert completions.calls == 2 and AICacheService.stats()["db_hits"] == 1
+    finally:
+        await _close(db_engine)
+
+
+@pytest.mark.asyncio
+async def test_failed_compute_is_shared_and_not_cached():
+    db_engine = await _make_engine()
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("AI down")
+
+    try:
+        results = await asyncio.gather(
+            *[AICacheService.get_or_compute("h1", failing) for _ in range(5)], return_exceptions=True
+        )
+        assert len(calls) == 1 and all(isinstance(r, RuntimeError) for r in results)
+        assert cache_mod._inflight == {} and cache_mod._pending_writes == {}
+
+        async def ok():
+            return {"ok": True}
+        assert await AICacheService.get_or_compute("h1", ok) == {"ok": True}
+    finally:
+        await _close(db_engine)
+
+
+@pytest.mark.asyncio
+async def test_evict_stale_by_ttl_and_row_limit():
+    db_engine = await _make_engine()
+    try:
+        for i in range(5):
+            await AICacheService.get_or_compute(f"h{i}", lambda i=i: asyncio.sleep(0, {"n": i}))
+        await AICacheService.flush_pending()
+        now = datetime.now(timezone.utc)
+        async with db_engine.begin() as conn:
+            for i, age_days in enumerate([60, 10, 3, 2, 1]):
+                await conn.execute(
+                    update(AICache).where(AICache.prompt_hash == f"h{i}")
+                    .values(updated_at=now - timedelta(days=age_days))
+                )
+
+        assert await AICacheService.evict_stale(ttl_days=30, max_rows=3) == 2
+        async with db_engine.connect() as conn:
+            left = (await conn.execute(select(AICache.prompt_hash).order_by(AICache.prompt_hash))).scalars().all()
+        assert left == ["h2", "h3", "h4"]
+    finally:
+        await _close(db_engine)
+
+
+def test_memory_tier_expires_and_is_bounded(monkeypatch):
+    memory = cache_mod._TTLMemoryCache(max_entries=2, ttl_seconds=10)
+    now = [1000.0]
+    monkeypatch.setattr(cache_mod.time, "monotonic", lambda: now[0])
+    memory.put("a", 1)
+    memory.put("b", 2)
+    memory.get("a")
+    memory.put("c", 3)
+    assert memory.get("b") is None and memory.get("a") == 1
+    now[0] += 11
+    assert memory.get("a") is None and len(memory) == 1
+
+
+@pytest.mark.asyncio
+async def test_lifespan_eviction_task_trims_table_until_stopped(monkeypatch):
+    db_engine = await _make_engine()
+    monkeypatch.setattr(cache_mod.settings, "AI_CACHE_MAX_ROWS", 2)
+    try:
+        for i in range(5):
+            await AICacheService.get_or_compute(f"h{i}", lambda i=i: asyncio.sleep(0, {"n": i}))
+        await AICacheService.flush_pending()
+
+        task = cache_mod.start_ai_cache_eviction(interval=0.01)
+        await asyncio.sleep(0.05)
+        async with db_engine.connect() as conn:
+            assert len((await conn.execute(select(AICache.id))).all()) == 2
+
+        await cache_mod.stop_ai_cache_eviction()
+        assert task.done() and cache_mod._eviction_task is None
+    finally:
+        await _close(db_engine)
@@ -0,0 +1,98 @@
+import json
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from asgi_server import handle_lifespan, read_body, serve_asgi
+from backend_loader import import_backend
+from shared.database.base import Base
+from shared.database.models import TelegramOutbox, TelegramUser, User, UserRole
+from shared.database.models.assignment import Assignment, AssignmentCreatorRole, AssignmentSubmission
+from shared.database.models.in_app_notification import InAppNotification, InAppNotifType
+from shared.services.telegram_outbox import TelegramOutboxWorker
+
+fanout = import_backend("MainPlatform", "app.services.assignment_fanout")
+
+TABLES = [User.__table__, TelegramUser.__table__, TelegramOutbox.__table__, Assignment.__table__,
+          AssignmentSubmission.__table__, InAppNotification.__table__]
+
+
+class MockTelegram:
+    """200 for every chat except 2004 (bot blocked -> 403)"""
+
+    def __init__(self):
+        self.delivered = []
+
+    async def __call__(self, scope, receive, send):
+        if await handle_lifespan(scope, receive, send):
+            return
+        payload = json.loads(await read_body(receive))
+        status = 403 if payload["chat_id"] == "2004" else 200
+        if status == 200:
+            self.delivered.append(payload["chat_id"])
+        await send({"type": "http.response.start", "status": status,
+                    "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": json.dumps({"ok": status == 200}).encode()})
+
+
+@pytest.mark.asyncio
+async def test_fan_out_inserts_in_bulk_and_outbox_worker_delivers():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    factory = async_sessionmaker(engine, expire_on_commit=False)
+    inserts = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _count(conn, cursor, statement, *args):
+        if statement.lstrip().upper().startswith("INSERT"):
+            inserts.append(statement.split()[2])
+
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(lambda c: Base.metadata.create_all(c, tables=TABLES))
+        async with factory() as db:
+            db.add(User(id="t0000001", first_name="O'qituvchi", last_name="X", role=UserRole.teacher))
+            for i in range(1, 31):
+                db.add(User(id=f"s{i:07d}", first_name="Ism", last_name="Fam", role=UserRole.student))
+                if i <= 20:
+                    db.add(TelegramUser(user_id=f"s{i:07d}", telegram_chat_id=str(2000 + i),
+                                        notifications_enabled=i != 3))
+            assignment = Assignment(created_by="t0000001", creator_role=AssignmentCreatorRole.teacher,
+                                    title="Uy vazifasi")
+            db.add(assignment)
+            await db.commit()
+        inserts.clear()
+
+        students = [f"s{i:07d}" for i in range(1, 31)] + ["s0000001"]  # takror
+        async with factory() as db:
+            assigned = await fanout.fan_out_assignment(
+                db, assignment.id, students, title="Yangi vazifa", message="Muddati: ertaga",
+                notif_type=InAppNotifType.assignment_new, sender_id="t0000001", telegram_text="*Yangi vazifa!*",
+            )
+            await db.commit()
+        assert len(assigned) == 30
+        assert sorted(inserts) == ["assignment_submissions", "in_app_notifications", "telegram_outbox"]
+
+        async with factory() as db:
+            count = lambda model: db.scalar(select(func.count()).select_from(model))  # noqa: E731
+            assert await count(AssignmentSubmission) == 30
+            assert await count(InAppNotification) == 30
+            assert await count(TelegramOutbox) == 19  # 20 ta bog'langan, bittasida o'chiq
+
+        mock = MockTelegram()
+        async with serve_asgi(mock) as base_url:
+            worker = TelegramOutboxWorker("TEST", factory, api_url=f"{base_url}/botTEST", rate=1000, batch_size=50)
+            assert await worker.drain_once() == (18, 1)
+            assert await worker.drain_once() == (0, 0)  # muvaffaqiyatsiz qator keyinroqqa surilgan
+
+        assert sorted(mock.delivered) == sorted(str(2000 + i) for i in range(1, 21) if i not in (3, 4))
+        async with factory() as db:
+            blocked = (await db.execute(select(TelegramOutbox).where(TelegramOutbox.chat_id == "2004"))).scalar_one()
+            assert (blocked.status, blocked.attempts) == ("pending", 1)
+            assert blocked.next_attempt_at.replace(tzinfo=timezone.utc) > datetime.now(timezone.utc)
+            statuses = (await db.execute(
+                select(TelegramOutbox.status, func.count()).group_by(TelegramOutbox.status))).all()
+            assert dict(statuses) == {"sent": 18, "pending": 1}
+    finally:
+        await engine.dispose()
@@ -0,0 +1,193 @@
+import asyncio
+import base64
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from shared.database.base import Base
+from shared.database.models.audio_cache import AudioCache
+from shared.services import audio_cache_service as acs
+
+
+async def _make_db(tmp_path):
+    db_engine = create_async_engine("sqlite+aiosqlite://")
+    async with db_engine.begin() as conn:
+        await conn.run_sync(lambda c: Base.metadata.create_all(c, tables=[AudioCache.__table__]))
+    acs.reset_audio_cache()
+    acs.set_blob_store(acs.LocalDiskAudioStore(str(tmp_path)))
+    return db_engine, async_sessionmaker(db_engine, expire_on_commit=False)()
+
+
+async def _close(db_engine, session):
+    acs.reset_audio_cache()
+    acs.set_blob_store(None)
+    await session.close()
+    await db_engine.dispose()
+
+
+def _audio(n: int) -> str:
+    return base64.b64encode(bytes([n % 256]) * (100 + n)).decode()
+
+
+@pytest.mark.asyncio
+async def test_tiers_offload_and_hit_flush(tmp_path):
+    """Bytes go to the blob store, hits are served from memory/blob and counted in one flush"""
+    db_engine, cache_db = await _make_db(tmp_path)
+    try:
+        service = acs.AudioCacheService(cache_db)
+        assert await service.get_cached_audio("salom") is None
+
+        row = await service.save_audio_to_cache("salom", _audio(1), duration_seconds=1.5)
+        assert row.audio_data is None and row.storage_key.startswith("disk:")
+        assert row.file_size == 101
+        assert len(list(tmp_path.iterdir())) == 1
+
+        hit = await service.get_cached_audio("salom")
+        assert hit["audio_data"] == _audio(1) and hit["duration_seconds"] == 1.5 and hit["cached"]
+
+        # Boshqa worker: xotira bo'sh, audio blob'dan o'qiladi
+        acs._memory.clear()
+        assert (await service.get_cached_audio("salom"))["audio_data"] == _audio(1)
+        await service.get_cached_audio("salom")
+
+        # Eski inline qator ham xizmat qiladi va keyin ko'chiriladi
+        cache_db.add(AudioCache(cache_key=service.generate_cache_key("eski"), text_hash="x",
+                                audio_data=_audio(2), hit_count=0))
+        await cache_db.commit()
+        assert (await service.get_cached_audio("eski"))["audio_data"] == _audio(2)
+        assert await service.offload_inline_rows() == 1
+
+        stats = acs.get_audio_cache_stats()
+        assert stats["hits"] == {"memory": 2, "blob": 1, "inline": 1}
+        assert stats["misses"] == 1 and stats["hit_ratio"] == 0.8
+        assert stats["latency_p95_ms"] is not None
+
+        assert await acs.flush_audio_cache_hits(cache_db.bind) == 2
+        res = await cache_db.execute(
+            select(AudioCache.hit_count, AudioCache.storage_key, AudioCache.audio_data, AudioCache.last_accessed_at)
+            .order_by(AudioCache.hit_count).execution_options(populate_existing=True)
+        )
+        rows = res.all()
+        assert [r.hit_count for r in rows] == [1, 4]
+        assert all(r.storage_key and r.audio_data is None and r.last_accessed_at for r in rows)
+    finally:
+        await _close(db_engine, cache_db)
+
+
+def test_memory_lru_is_bounded_by_bytes():
+    lru = acs._AudioLRU(max_bytes=1000)
+    for i in range(5):
+        lru.put(f"k{i}", "a" * 300, {})
+        lru.get("k0")
+    assert lru.bytes <= 1000
+    assert lru.get("k0") is not None and lru.get("k1") is None
+    lru.put("big", "a" * 2000, {})
+    assert lru.get("big") is None
+
+
+@pytest.mark.asyncio
+async def test_evict_by_idle_time_and_total_size(tmp_path):
+    """Idle rows go first, then least recently used until the total fits"""
+    db_engine, cache_db = await _make_db(tmp_path)
+    try:
+        service = acs.AudioCacheService(cache_db)
+        now = datetime.now(timezone.utc)
+        for i, age_days in enumerate([200, 5, 3, 1]):
+            row = await service.save_audio_to_cache(f"matn {i}", _audio(i))
+            row.last_accessed_at = now - timedelta(days=age_days)
+        await cache_db.commit()
+
+        result = await service.evict(max_total_bytes=210, max_idle_days=90)
+        assert result == {"deleted": 2, "freed_bytes": 100 + 101}
+        res = await cache_db.execute(select(AudioCache.file_size).order_by(AudioCache.file_size))
+        assert res.scalars().all() == [102, 103]
+        assert len(list(tmp_path.iterdir())) == 2
+        assert await service.get_cached_audio("matn 1") is None
+
+    finally:
+        await _close(db_engine, cache_db)
+
+
+@pytest.mark.asyncio
+async def test_lifespan_maintenance_offloads_evicts_and_flushes_on_stop(tmp_path):
+    db_engine, cache_db = await _make_db(tmp_path)
+    factory = async_sessionmaker(db_engine, expire_on_commit=False)
+    try:
+        service = acs.AudioCacheService(cache_db)
+        cache_db.add(AudioCache(cache_key=service.generate_cache_key("eski"), text_hash="x",
+                                audio_data=_audio(2), hit_count=0))
+        old = await service.save_audio_to_cache("unutilgan", _audio(3))
+        old.last_accessed_at = datetime.now(timezone.utc) - timedelta(days=acs.AUDIO_CACHE_MAX_IDLE_DAYS + 1)
+        await cache_db.commit()
+        acs.reset_audio_cache()
+
+        task = acs.start_audio_cache_maintenance(factory)
+        for _ in range(100):
+            rows = (await cache_db.execute(
+                select(AudioCache.storage_key).execution_options(populate_existing=True))).all()
+            if len(rows) == 1 and rows[0].storage_key:
+                break
+            await asyncio.sleep(0.02)
+        assert len(rows) == 1 and rows[0].storage_key.startswith("disk:")
+
+        # Keyingi so'rovlardagi hit'lar shutdown'da yoziladi
+        await service.get_cached_audio("eski")
+        await acs.stop_audio_cache_maintenance()
+        assert task.done() and acs.get_audio_cache_stats()["pending_hit_keys"] == 0
+        hit_count = (await cache_db.execute(
+            select(AudioCache.hit_count).execution_options(populate_existing=True))).scalar_one()
+        assert hit_count == 1
+    finally:
+        await _close(db_engine, cache_db)
+
+
+@pytest.mark.asyncio
+async def test_without_shared_storage_audio_stays_inline(tmp_path, monkeypatch):
+    """No Azure and no shared AUDIO_CACHE_DIR: nothing goes to a container-local disk"""
+    db_engine, cache_db = await _make_db(tmp_path)
+    monkeypatch.setattr(acs, "AUDIO_CACHE_STORAGE", "disk")
+    monkeypatch.setattr(acs, "AUDIO_CACHE_DIR", "")
+    acs.set_blob_store(None)
+    try:
+        assert acs.get_blob_store() is None
+        service = acs.AudioCacheService(cache_db)
+        row = await service.save_audio_to_cache("salom", _audio(1))
+        assert row.storage_key is None and row.audio_data == _audio(1)
+        assert await service.offload_inline_rows() == 0
+
+        # Boshqa servis (xotirasi bo'sh) o'sha qatorni hit qiladi
+        acs._memory.clear()
+        assert (await service.get_cached_audio("salom"))["audio_data"] == _audio(1)
+        assert list(tmp_path.iterdir()) == []
+    finally:
+        await _close(db_engine, cache_db)
+
+
+@pytest.mark.asyncio
+async def test_rows_with_missing_blobs_are_repaired_or_deleted(tmp_path):
+    """A lost blob is not a plain miss: the row is dropped (or falls back to inline) on read and in maintenance"""
+    db_engine, cache_db = await _make_db(tmp_path)
+    try:
+        service = acs.AudioCacheService(cache_db)
+        for text in ("bir", "ikki", "uch"):
+            await service.save_audio_to_cache(text, _audio(len(text)))
+        for path in tmp_path.iterdir():
+            path.unlink()  # konteyner qayta ishga tushdi
+        acs._memory.clear()
+
+        ikki = (await cache_db.execute(
+            select(AudioCache).where(AudioCache.cache_key == service.generate_cache_key("ikki")))).scalar_one()
+        ikki.audio_data = _audio(4)
+        await cache_db.commit()
+
+        assert await service.get_cached_audio("bir") is None
+        assert (await service.get_cached_audio("ikki"))["audio_data"] == _audio(4)
+        assert await service.prune_missing_blobs() == 1  # "uch"
+
+        rows = (await cache_db.execute(
+            select(AudioCache.cache_key, AudioCache.storage_key).execution_options(populate_existing=True))).all()
+        assert rows == [(service.generate_cache_key("ikki"), None)]
+    finally:
+        await _close(db_engine, cache_db)
@@ -0,0 +1,120 @@
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from backend_loader import import_backend
+from shared.database.base import Base
+from shared.database.models import (
+    StudentProfile, StudentCoin, CoinTransaction, TransactionType,
+    LiveQuiz, LiveQuizQuestion, LiveQuizParticipant, LiveQuizAnswer,
+    LiveQuizStatus, ParticipantState,
+)
+from shared.payments import add_coins, add_coins_bulk
+
+service_mod = import_backend("TestAI", "app.services.live_quiz_service")
+
+TABLES = [
+    StudentProfile.__table__, StudentCoin.__table__, CoinTransaction.__table__,
+    LiveQuiz.__table__, LiveQuizQuestion.__table__, LiveQuizParticipant.__table__, LiveQuizAnswer.__table__,
+]
+
+AWARDS = [
+    {"student_id": "s0000001", "amount": 500, "transaction_type": TransactionType.olympiad_first,
+     "description": "1-o'rin", "reference_id": "olymp001", "reference_type": "olympiad"},
+    {"student_id": "s0000002", "amount": 300, "transaction_type": TransactionType.olympiad_second,
+     "reference_id": "olymp001", "reference_type": "olympiad"},
+    {"student_id": "s0000003", "amount": 10, "transaction_type": TransactionType.lesson_complete},
+    # Bitta partiyada bir o'quvchiga ikki marta
+    {"student_id": "s0000001", "amount": 10, "transaction_type": TransactionType.olympiad_participation},
+]
+
+
+async def _make_db():
+    db_engine = create_async_engine("sqlite+aiosqlite://")
+    async with db_engine.begin() as conn:
+        await conn.run_sync(lambda c: Base.metadata.create_all(c, tables=TABLES))
+    session = async_sessionmaker(db_engine, expire_on_commit=False)()
+    for i in range(1, 5):
+        session.add(StudentProfile(id=f"s000000{i}", user_id=f"u{i}", total_coins=0))
+    # s0000002 da oldindan balans bor
+    session.add(StudentCoin(id="c0000002", student_id="s0000002", total_earned=40, total_spent=15,
+                            total_withdrawn=0, current_balance=25))
+    await session.commit()
+    return db_engine, session
+
+
+async def _ledger(session):
+    res = await session.execute(
+        select(StudentCoin.student_id, StudentCoin.total_earned, StudentCoin.total_spent,
+               StudentCoin.current_balance).order_by(StudentCoin.student_id)
+    )
+    balances = [tuple(r) for r in res.all()]
+    res = await session.execute(
+        select(StudentCoin.student_id, CoinTransaction.type, CoinTransaction.amount,
+               CoinTransaction.description, CoinTransaction.reference_id, CoinTransaction.reference_type)
+        .join(StudentCoin, StudentCoin.id == CoinTransaction.student_coin_id)
+    )
+    transactions = sorted(tuple(r) for r in res.all())
+    res = await session.execute(
+        select(StudentProfile.id, StudentProfile.total_coins)
+        .order_by(StudentProfile.id)
+        .execution_options(populate_existing=True)
+    )
+    profiles = [tuple(r) for r in res.all()]
+    return balances, transactions, profiles
+
+
+@pytest.mark.asyncio
+async def test_bulk_awards_match_per_row_add_coins():
+    """Balances, transaction ledger and cached total_coins equal add_coins() called per award"""
+    ref_engine, ref_db = await _make_db()
+    bulk_engine, bulk_db = await _make_db()
+    try:
+        for award in AWARDS:
+            await add_coins(ref_db, **award)
+        balances = await add_coins_bulk(bulk_db, AWARDS)
+
+        assert await _ledger(bulk_db) == await _ledger(ref_db)
+        assert balances == {"s0000001": 510, "s0000002": 325, "s0000003": 10}
+    finally:
+        for db, engine in ((ref_db, ref_engine), (bulk_db, bulk_engine)):
+            await db.close()
+            await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_live_quiz_rankings_match_python_sort():
+    """Window-function ranks and bulk coins match the sort + per-participant award path"""
+    db_engine, db = await _make_db()
+    try:
+        quiz = LiveQuiz(id="quiz0001", teacher_id="t0000001", title="Quiz", status=LiveQuizStatus.active)
+        db.add(quiz)
+        rows = [  # (student, score, best_streak, correct)
+            ("s0000001", 300, 2, 3), ("s0000002", 450, 1, 4), ("s0000003", 300, 3, 3), ("s0000004", 0, 0, 0),
+        ]
+        for i, (student_id, score, streak, correct) in enumerate(rows, start=1):
+            db.add(LiveQuizParticipant(id=f"p000000{i}", quiz_id=quiz.id, student_id=student_id,
+                                       display_name=student_id, state=ParticipantState.answering,
+                                       total_score=score, best_streak=streak, correct_count=correct,
+                                       wrong_count=0, current_streak=0))
+        await db.commit()
+
+        await service_mod.LiveQuizService(db)._calculate_rankings(quiz)
+
+        res = await db.execute(select(LiveQuizParticipant).order_by(LiveQuizParticipant.rank))
+        ranked = res.scalars().all()
+        expected = sorted(rows, key=lambda r: (-r[1], -r[2]))
+        assert [p.student_id for p in ranked] == [r[0] for r in expected]
+        assert [p.rank for p in ranked] == [1, 2, 3, 4]
+        assert all(p.state == ParticipantState.finished for p in ranked)
+        assert {p.student_id: p.coins_earned for p in ranked} == {r[0]: 2 * r[3] for r in rows}
+
+        balances, transactions, profiles = await _ledger(db)
+        assert balances == [("s0000001", 6, 0, 6), ("s0000002", 48, 15, 33),
+                            ("s0000003", 6, 0, 6), ("s0000004", 0, 0, 0)]
+        assert len(transactions) == 4
+        assert {t[3] for t in transactions} == {"Live Quiz mukofoti"}
+        assert profiles == [("s0000001", 6), ("s0000002", 33), ("s0000003", 6), ("s0000004", 0)]
+    finally:
+        await db.close()
+        await db_engine.dispose()
@@ -0,0 +1,89 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from shared.auth import password
+from shared.auth.crypto_executor import CryptoBusyError, configure_crypto_pool, get_crypto_stats, run_crypto
+from shared.database.models import User
+
+
+@pytest.mark.asyncio
+async def test_verify_runs_off_event_loop(monkeypatch):
+    monkeypatch.setattr(password, "BCRYPT_ROUNDS", 10)
+    configure_crypto_pool(max_workers=1)
+    try:
+        stored = password.hash_password("secret")
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.001)
+
+        task = asyncio.create_task(ticker())
+        started = time.perf_counter()
+        results = await asyncio.gather(*[password.verify_password_async("secret", stored) for _ in range(3)])
+        elapsed = time.perf_counter() - started
+        task.cancel()
+
+        assert results == [True, True, True]
+        # Loop bcrypt davomida ham ishlagan — ticker kamida har ~10 ms aylangan
+        assert ticks >= elapsed * 1000 / 10
+        assert get_crypto_stats()["completed"] == 3
+    finally:
+        configure_crypto_pool()
+
+
+@pytest.mark.asyncio
+async def test_login_upgrades_hash_when_cost_changes(monkeypatch):
+    monkeypatch.setattr(password, "BCRYPT_ROUNDS", 4)
+    user = User(first_name="Ali")
+    await user.set_password_async("secret")
+    old_hash = user.password_hash
+    assert old_hash.startswith("$2b$04$")
+    assert not password.password_needs_rehash(old_hash)
+
+    assert await user.verify_password_async("secret")
+    assert user.password_hash == old_hash
+
+    monkeypatch.setattr(password, "BCRYPT_ROUNDS", 5)
+    assert not await user.verify_password_async("wrong")
+    assert user.password_hash == old_hash  # noto'g'ri parolda hash o'zgarmaydi
+
+    assert await user.verify_password_async("secret")
+    assert user.password_hash.startswith("$2b$05$")
+    assert user.verify_password("secret")
+
+
+@pytest.mark.asyncio
+async def test_full_queue_rejects_with_busy_error():
+    configure_crypto_pool(max_workers=1, max_queue=1)
+    release = threading.Event()
+    try:
+        running = [asyncio.ensure_future(run_crypto(release.wait, 5)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        stats = get_crypto_stats()
+        assert stats["in_flight"] == 2 and stats["queue_depth"] == 1
+
+        with pytest.raises(CryptoBusyError):
+            await run_crypto(release.wait, 5)
+        assert get_crypto_stats()["rejected"] == 1
+
+        release.set()
+        assert await asyncio.gather(*running) == [True, True]
+        assert get_crypto_stats()["in_flight"] == 0
+    finally:
+        release.set()
+        configure_crypto_pool()
+
+
+def test_busy_error_maps_to_503_with_retry_after():
+    from backend_loader import import_backend
+    error_handler = import_backend("MainPlatform", "app.middleware.error_handler").error_handler
+
+    resp = asyncio.run(error_handler(None, CryptoBusyError("full")))
+    assert resp.status_code == 503
+    assert resp.headers["retry-after"] == str(CryptoBusyError.retry_after)
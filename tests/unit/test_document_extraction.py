@@ -0,0 +1,118 @@
+import asyncio
+import hashlib
+import io
+import time
+
+import pytest
+from fastapi import UploadFile
+
+from shared.services import document_extraction
+from shared.services.document_extraction import (
+    ExtractionTimeout, UploadTooLarge, configure_extraction_pool, extract_document,
+    extract_file, get_extraction_stats, spooled_upload,
+)
+
+
+def _write_pdf(path, pages, words_per_page=40):
+    """Oddiy matnli PDF (har sahifada bitta qator)"""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for page in range(pages):
+        line = " ".join(f"p{page}w{k}" for k in range(words_per_page))
+        stream = f"BT /F1 6 Tf 20 700 Td ({line}) Tj ET".encode()
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects))
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % k for k in kids), pages)
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = []
+        for number, obj in enumerate(objects, start=1):
+            offsets.append(f.tell())
+            f.write(b"%d 0 obj\n%s\nendobj\n" % (number, obj))
+        xref = f.tell()
+        f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+        for offset in offsets:
+            f.write(b"%010d 00000 n \n" % offset)
+        f.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+
+
+def _slow_extract(path, kind, max_words, encoding):
+    time.sleep(1)
+
+
+def test_extract_stops_after_max_words_and_keeps_chunk_boundary_words(tmp_path, monkeypatch):
+    pdf = tmp_path / "kitob.pdf"
+    _write_pdf(str(pdf), pages=20)
+    full = extract_file(str(pdf), "pdf")
+    assert full.pages == 20 and not full.truncated and len(full.text.split()) == 800
+
+    # 250 so'z — 7-sahifada yig'iladi, qolgan 13 sahifa parse qilinmaydi
+    head = extract_file(str(pdf), "pdf", max_words=250)
+    assert (head.pages, head.truncated) == (7, True)
+    assert head.text.split() == full.text.split()[:250]
+
+    # TXT bo'laklab o'qiladi — bo'lak chegarasidagi so'z (va ko'p baytli harf) buzilmaydi
+    monkeypatch.setattr(document_extraction, "TEXT_CHUNK_BYTES", 7)
+    txt = tmp_path / "matn.txt"
+    txt.write_text("o‘qish ko‘p ўзбекча matn\nikkinchi qator", encoding="utf-8")
+    result = extract_file(str(txt), "txt", encoding="utf-8")
+    assert result.text == "o‘qish ko‘p ўзбекча matn\nikkinchi qator" and result.pages > 1
+    assert extract_file(str(txt), "txt", max_words=3, encoding="utf-8").text == "o‘qish ko‘p ўзбекча"
+
+
+@pytest.mark.asyncio
+async def test_spooled_upload_hashes_streams_and_enforces_limit():
+    data = b"salom dunyo " * 200_000  # ~2.4 MB, bir necha bo'lak
+    digest = hashlib.sha256()
+    async with spooled_upload(UploadFile(file=io.BytesIO(data), filename="a.txt"), digest=digest) as spooled:
+        assert spooled.size == len(data)
+        with open(spooled.path, "rb") as f:
+            assert f.read() == data
+        path = spooled.path
+    assert digest.hexdigest() == hashlib.sha256(data).hexdigest()
+    with pytest.raises(FileNotFoundError):
+        open(path, "rb")
+
+    with pytest.raises(UploadTooLarge):
+        async with spooled_upload(UploadFile(file=io.BytesIO(data), filename="a.txt"), max_bytes=1024 * 1024):
+            pass
+
+
+@pytest.mark.asyncio
+async def test_process_pool_extracts_and_recovers_from_timeout(tmp_path, monkeypatch):
+    pdf = tmp_path / "kitob.pdf"
+    _write_pdf(str(pdf), pages=3)
+    configure_extraction_pool(max_workers=1, timeout=5, kind="process")
+    try:
+        result = await extract_document(str(pdf), "pdf", max_words=50)
+        assert result.truncated and len(result.text.split()) == 50
+
+        # Osilib qolgan parser: timeout, worker o'ldiriladi, keyingi so'rov yangi pool'da
+        document_extraction._pool.timeout = 0.2
+        monkeypatch.setattr(document_extraction, "extract_file", _slow_extract)
+        with pytest.raises(ExtractionTimeout):
+            await extract_document(str(pdf), "pdf")
+        monkeypatch.undo()
+        document_extraction._pool.timeout = 5
+        assert (await extract_document(str(pdf), "pdf")).pages == 3
+
+        stats = get_extraction_stats()
+        assert (stats["completed"], stats["timeouts"], stats["restarts"]) == (2, 1, 1)
+    finally:
+        configure_extraction_pool()
+
+
+@pytest.mark.asyncio
+async def test_queue_wait_does_not_count_towards_timeout():
+    # 1 worker, 4 ta 0.2 s lik vazifa: oxirgisi 0.6 s navbatda turadi, timeout esa 0.5 s
+    configure_extraction_pool(max_workers=1, timeout=0.5, kind="thread")
+    try:
+        pool = document_extraction._pool
+        await asyncio.gather(*(pool.run(time.sleep, 0.2) for _ in range(4)))
+        stats = get_extraction_stats()
+        assert (stats["completed"], stats["timeouts"], stats["queued"]) == (4, 0, 0)
+    finally:
+        configure_extraction_pool()
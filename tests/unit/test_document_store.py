@@ -0,0 +1,120 @@
+import asyncio
+import io
+import os
+import time
+import tracemalloc
+
+import fakeredis.aioredis
+import pytest
+from fastapi import HTTPException, UploadFile
+
+from backend_loader import import_backend
+from shared.services.document_extraction import Extraction
+
+document_store = import_backend("MainPlatform", "app.services.document_store")
+file_reader = import_backend("MainPlatform", "app.smartkids.file_reader_router")
+
+
+def _upload(name, data):
+    return UploadFile(file=io.BytesIO(data), filename=name)
+
+
+def _document(i):
+    return (f"Hujjat {i}: " + " ".join(f"so'z{i}_{k}" for k in range(200))).encode()
+
+
+@pytest.mark.asyncio
+async def test_identical_uploads_dedup_and_other_worker_reads_from_disk(tmp_path, monkeypatch):
+    calls = []
+    original = file_reader.extract_document
+
+    async def counting(*args, **kwargs):
+        calls.append(1)
+        return await original(*args, **kwargs)
+
+    monkeypatch.setattr(file_reader, "extract_document", counting)
+
+    def worker():
+        backend = document_store.DiskDocumentBackend(str(tmp_path), ttl_seconds=60, max_bytes=1 << 20)
+        return document_store.DocumentStore(1 << 20, 100, 60, backend)
+
+    first, second = worker(), worker()
+    try:
+        document_store.set_document_store(first)
+        data = ("Bir bor ekan. " * 300).encode()
+        a = await file_reader.read_file(_upload("Hikoya.TXT", data))
+        b = await file_reader.read_file(_upload("boshqa_nom.txt", data))
+        assert a["id"] == b["id"] and len(calls) == 1
+        assert a["text"].endswith("faqat 250 ta so'z olindi.")
+        assert first.stats()["dedup"] == 1
+
+        # Boshqa fayl turi — boshqa id; bo'sh matn saqlanmaydi
+        other = await file_reader.read_file(_upload("empty.txt", b"   "))
+        assert "error" in other
+
+        # GET boshqa worker'ga tushdi — disk qatlamidan
+        document_store.set_document_store(second)
+        assert (await file_reader.get_file(a["id"]))["text"] == a["text"]
+        assert second.stats()["shared_hits"] == 1
+        with pytest.raises(HTTPException):
+            await file_reader.get_file("../../etc/passwd")
+    finally:
+        document_store.set_document_store(None)
+
+
+@pytest.mark.asyncio
+async def test_memory_is_bounded_across_thousands_of_uploads(monkeypatch):
+    # Parser (chardet, pool) tracemalloc ostida juda sekin — bu test faqat store chegaralari haqida
+    async def fake_extract(path, kind, max_words=None, encoding=None):
+        with open(path, encoding="utf-8") as f:
+            return Extraction(f.read(), 1)
+
+    monkeypatch.setattr(file_reader, "extract_document", fake_extract)
+    store = document_store.DocumentStore(memory_bytes=256 * 1024, max_entries=500, ttl_seconds=3600)
+    document_store.set_document_store(store)
+    try:
+        for i in range(300):
+            await file_reader.read_file(_upload(f"{i}.txt", _document(i)))
+        tracemalloc.start()
+        baseline, _ = tracemalloc.get_traced_memory()
+        for i in range(300, 2300):
+            await file_reader.read_file(_upload(f"{i}.txt", _document(i)))
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        stats = store.stats()
+        assert stats["memory_bytes"] <= 256 * 1024 and stats["memory_entries"] <= 500
+        assert stats["memory_evictions"] >= 2300 - 500
+        # 2000 ta ~2.5 KB hujjat (~5 MB) — cheklanmagan dict'da xotira shuncha o'sardi
+        assert current - baseline < 1024 * 1024
+        assert await store.get(document_store.document_id("txt", _document(2299))) is not None
+        assert await store.get(document_store.document_id("txt", _document(0))) is None
+    finally:
+        document_store.set_document_store(None)
+
+
+@pytest.mark.asyncio
+async def test_ttl_expiry_and_redis_backend(tmp_path):
+    redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    store = document_store.DocumentStore(1 << 20, 100, 0.05, document_store.RedisDocumentBackend(60, redis))
+    doc_id = document_store.document_id("txt", b"salom")
+    await store.put(doc_id, "salom dunyo")
+    assert 0 < await redis.ttl(document_store.REDIS_PREFIX + doc_id) <= 60
+
+    await asyncio.sleep(0.1)
+    # Xotiradagi yozuv eskirdi, Redis'dagi hali bor
+    assert await store.get(doc_id) == "salom dunyo"
+    stats = store.stats()
+    assert (stats["memory_expired"], stats["shared_hits"]) == (1, 1)
+
+    # Disk: eskirgan fayl o'chadi, keyin hajm chegarasigacha eng eskilari
+    disk = document_store.DiskDocumentBackend(str(tmp_path), ttl_seconds=60, max_bytes=1 << 20)
+    for i in range(5):
+        await disk.put(f"{i:032x}", "x" * 1000)
+        path = os.path.join(str(tmp_path), f"{i:032x}.txt")
+        age = 120 if i == 0 else 10 - i
+        os.utime(path, (time.time() - age, time.time() - age))
+    disk.max_bytes = 2500
+    assert disk.prune() == 3
+    assert sorted(os.listdir(tmp_path)) == [f"{3:032x}.txt", f"{4:032x}.txt"]
+    assert await disk.get(f"{1:032x}") is None and await disk.get(f"{4:032x}") == "x" * 1000
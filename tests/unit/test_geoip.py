@@ -0,0 +1,107 @@
+import pytest
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from backend_loader import import_backend
+from shared.database.base import Base
+from shared.database.models import User, UserRole
+from shared.database.models.analytics import UserGeoLog
+
+geoip = import_backend("MainPlatform", "app.utils.geoip")
+writer = import_backend("MainPlatform", "app.services.geo_log_writer")
+settings = import_backend("MainPlatform", "app.core.config").settings
+
+
+def test_sample_file_lookup_boundaries_and_lru():
+    db = geoip.load_geoip_csv(geoip.SAMPLE_DB_PATH, cache_size=100)
+    assert db.size >= 10
+
+    assert db.resolve("84.54.64.0")["city"] == "Tashkent"
+    assert db.resolve("84.54.79.255")["city"] == "Tashkent"
+    assert db.resolve("84.54.80.0")["city"] == "Samarkand"
+    assert db.resolve("84.54.80.0")["latitude"] == pytest.approx(39.6542)
+    assert db.resolve("84.54.63.255") == geoip.empty_geo()  # diapazonlar orasida
+    assert db.resolve("2a02:e680::1")["country_code"] == "UZ"
+    assert db.resolve("::ffff:213.230.100.7")["city"] == "Nukus"
+
+    # Private/loopback va buzilgan manzillar — qidiruvsiz bo'sh natija
+    for ip in ("127.0.0.1", "10.0.0.5", "192.168.1.1", "172.16.0.1", "not-an-ip"):
+        assert db.resolve(ip) == geoip.empty_geo()
+
+    db.resolve("84.54.80.1")
+    db.resolve("84.54.80.1")
+    assert db.cache_info()["hits"] >= 2
+
+
+def test_unconfigured_database_writes_empty_geo(monkeypatch, caplog):
+    monkeypatch.setattr(settings, "GEOIP_DB_PATH", "")
+    monkeypatch.setattr(settings, "DEBUG", False)
+    geoip.set_geoip_db(None)
+    try:
+        assert geoip.resolve_geo("84.54.64.1") == geoip.empty_geo()
+        assert "GEOIP_DB_PATH is not set" in caplog.text
+
+        # Dev rejimida namunaviy fayl
+        monkeypatch.setattr(settings, "DEBUG", True)
+        geoip.set_geoip_db(None)
+        assert geoip.resolve_geo("84.54.64.1")["city"] == "Tashkent"
+    finally:
+        geoip.set_geoip_db(None)
+
+
+def test_loader_accepts_integer_ranges_and_skips_bad_rows(tmp_path):
+    path = tmp_path / "ranges.csv"
+    path.write_text(
+        "ip_start,ip_end,country_code,country,region,city,latitude,longitude,isp\n"
+        "1412841472,1412845567,UZ,Uzbekistan,Tashkent,Tashkent,41.3,69.2,X\n"
+        "bad,row,UZ,Uzbekistan,,,,,\n"
+        "95.0.0.10,95.0.0.1,TR,Turkey,,,,,\n"
+    )
+    db = geoip.load_geoip_csv(str(path))
+    assert db.size == 1
+    assert db.resolve("84.54.64.1")["country"] == "Uzbekistan"
+    assert db.resolve("84.54.64.1")["region"] == "Tashkent"
+
+
+@pytest.mark.asyncio
+async def test_login_events_are_written_in_one_batch():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    inserts = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _count(conn, cursor, statement, *args):
+        if statement.lstrip().upper().startswith("INSERT INTO USER_GEO_LOGS"):
+            inserts.append(statement)
+
+    geoip.set_geoip_db(geoip.load_geoip_csv(geoip.SAMPLE_DB_PATH))
+    writer.set_geo_log_engine(engine)
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(lambda c: Base.metadata.create_all(c, tables=[User.__table__, UserGeoLog.__table__]))
+        async with async_sessionmaker(engine)() as db:
+            db.add(User(id="10000001", first_name="Ali", last_name="Valiyev", role=UserRole.student))
+            await db.commit()
+        inserts.clear()
+
+        ua = "Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) Safari/604.1"
+        for ip in ("84.54.70.1", "188.113.230.9", "10.0.0.1", "unknown", "84.54.70.1"):
+            writer.record_geo_event("10000001", ip, ua)
+        assert writer.stats()["pending"] == 5
+
+        assert await writer.flush_pending() == 5
+        assert len(inserts) == 1  # executemany — bitta INSERT
+
+        async with engine.connect() as conn:
+            rows = (await conn.execute(
+                select(UserGeoLog.ip_address, UserGeoLog.city, UserGeoLog.device_type, UserGeoLog.action)
+                .order_by(UserGeoLog.created_at)
+            )).all()
+            assert (await conn.execute(select(func.count(UserGeoLog.id)))).scalar() == 5
+        assert [r.city for r in rows] == ["Tashkent", "Fergana", None, None, "Tashkent"]
+        assert {r.device_type for r in rows} == {"mobile"}
+        assert {r.action for r in rows} == {"login"}
+        assert writer.stats()["pending"] == 0
+    finally:
+        writer.set_geo_log_engine(None)
+        geoip.set_geoip_db(None)
+        await engine.dispose()
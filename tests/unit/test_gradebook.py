@@ -0,0 +1,152 @@
+import csv
+import io
+import zipfile
+from datetime import datetime, timedelta, timezone
+from xml.etree import ElementTree
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from backend_loader import import_backend
+from shared.database.base import Base
+from shared.database.models import User, UserRole
+from shared.database.models.assignment import (
+    Assignment, AssignmentCreatorRole, AssignmentSubmission, AssignmentTarget, SubmissionStatus,
+)
+from shared.database.models.classroom import Classroom, ClassroomStudent, ClassroomStudentStatus
+
+gradebook = import_backend("MainPlatform", "app.services.gradebook_service")
+
+TABLES = [User.__table__, Classroom.__table__, ClassroomStudent.__table__, Assignment.__table__,
+          AssignmentTarget.__table__, AssignmentSubmission.__table__]
+NS = {"x": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+
+
+async def _setup():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    factory = async_sessionmaker(engine, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda c: Base.metadata.create_all(c, tables=TABLES))
+    base = datetime(2026, 9, 1, tzinfo=timezone.utc)
+    async with factory() as db:
+        db.add(User(id="t0000001", first_name="Ustoz", last_name="X", role=UserRole.teacher))
+        db.add(Classroom(id="c0000001", teacher_id="p0000001", name="5-A"))
+        for sid, first, last, status in [
+            ("s0000001", "Ali", "Karimov", ClassroomStudentStatus.active),
+            ("s0000002", "Vali", "Aliyev", ClassroomStudentStatus.active),
+            ("s0000003", "Gul", "Bakirova", ClassroomStudentStatus.active),
+            ("s0000004", "Eski", "Chetda", ClassroomStudentStatus.removed),
+        ]:
+            db.add(User(id=sid, first_name=first, last_name=last, role=UserRole.student))
+            db.add(ClassroomStudent(classroom_id="c0000001", student_user_id=sid, status=status))
+        for j, aid in enumerate(["a0000001", "a0000002"]):
+            db.add(Assignment(id=aid, created_by="t0000001", creator_role=AssignmentCreatorRole.teacher,
+                              classroom_id="c0000001", title=f"Vazifa <{j + 1}>", created_at=base + timedelta(days=j)))
+        graded = SubmissionStatus.graded
+        for aid, sid, score, status, meta, minute in [
+            ("a0000001", "s0000001", 80, graded, {"correct": 8, "total": 10}, 5),
+            ("a0000001", "s0000002", 90, graded, None, 7),
+            ("a0000001", "s0000003", 80, graded, None, 3),
+            ("a0000001", "s0000004", 100, graded, None, 1),
+            ("a0000002", "s0000001", None, SubmissionStatus.submitted, {"correct": 6, "total": 10}, 2),
+            ("a0000002", "s0000002", None, SubmissionStatus.pending, None, None),
+        ]:
+            db.add(AssignmentSubmission(
+                assignment_id=aid, student_user_id=sid, score=score, status=status, meta_data=meta,
+                submitted_at=base + timedelta(minutes=minute) if minute else None,
+            ))
+        db.add(AssignmentSubmission(assignment_id="a0000001", student_user_id="s9999999",
+                                    score=10, status=graded, submitted_at=base))  # o'chirilgan foydalanuvchi
+        await db.commit()
+    return engine, factory
+
+
+@pytest.mark.asyncio
+async def test_assignment_report_is_one_query_with_window_ranks():
+    engine, factory = await _setup()
+    selects = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _count(conn, cursor, statement, *args):
+        if statement.lstrip().upper().startswith("SELECT"):
+            selects.append(statement)
+
+    try:
+        async with factory() as db:
+            results = await gradebook.assignment_report(db, "a0000001")
+        assert len(selects) == 1
+        assert [(r["student_id"], r["score"], r["rank"]) for r in results] == [
+            ("s0000004", 100, 1), ("s0000002", 90, 2),
+            ("s0000003", 80, 3), ("s0000001", 80, 4),  # teng ball — oldin topshirgan yuqorida
+            ("s9999999", 10, 5),
+        ]
+        assert results[3]["correct_count"] == 8 and results[3]["incorrect_count"] == 2
+        assert results[4]["student_first_name"] == "O'quvchi"
+
+        async with factory() as db:
+            pending = await gradebook.assignment_report(db, "a0000002")
+        assert [r["rank"] for r in pending] == [None, None]
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_gradebook_matrix_is_columnar_with_sql_averages_and_ranks():
+    engine, factory = await _setup()
+    try:
+        async with factory() as db:
+            data = await gradebook.gradebook_matrix(db, "c0000001")
+            cell = await gradebook.gradebook_cell(db, "c0000001", "a0000002", "s0000001")
+            outsider = await gradebook.gradebook_cell(db, "c0000001", "a0000001", "s0000004")
+
+        students = data["students"]
+        assert students["ids"] == ["s0000002", "s0000003", "s0000001"]  # familiya bo'yicha
+        assert [a["id"] for a in data["assignments"]] == ["a0000001", "a0000002"]
+        # s0000001 ning 2-vazifasi: score bo'sh -> meta_data["correct"]
+        assert data["scores"] == [[90, None], [80, None], [80, 6]]
+        codes = data["status_codes"]
+        assert [[codes[c] if c is not None else None for c in row] for row in data["statuses"]] == [
+            ["graded", "pending"], ["graded", None], ["graded", "submitted"],
+        ]
+        assert students["averages"] == [90.0, 80.0, 43.0]
+        assert students["ranks"] == [1, 2, 3]
+        assert "meta" not in str(data)
+
+        assert cell["meta"] == {"correct": 6, "total": 10} and cell["status"] == "submitted"
+        assert outsider is None
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_gradebook_export_streams_csv_and_xlsx():
+    engine, factory = await _setup()
+    try:
+        async with factory() as db:
+            assignments = await gradebook.classroom_assignments(db, "c0000001")
+
+        chunks = [c async for c in gradebook.stream_gradebook_csv(factory, "c0000001", assignments)]
+        rows = list(csv.reader(io.StringIO(b"".join(chunks).decode("utf-8-sig"))))
+        assert rows == [
+            ["Familiya", "Ism", "Vazifa <1>", "Vazifa <2>", "O'rtacha"],
+            ["Aliyev", "Vali", "90.0", "", "90.0"],
+            ["Bakirova", "Gul", "80.0", "", "80.0"],
+            ["Karimov", "Ali", "80.0", "6", "43.0"],
+        ]
+
+        chunks = [c async for c in gradebook.stream_gradebook_xlsx(factory, "c0000001", assignments)]
+        assert len(chunks) > 1
+        with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as zf:
+            assert zf.testzip() is None
+            assert "xl/workbook.xml" in zf.namelist()
+            sheet = ElementTree.fromstring(zf.read("xl/worksheets/sheet1.xml"))
+        cells = {
+            c.get("r"): (c.findtext("x:v", namespaces=NS) or c.findtext("x:is/x:t", namespaces=NS))
+            for c in sheet.iterfind(".//x:c", NS)
+        }
+        assert cells["C1"] == "Vazifa <1>"
+        assert (cells["A4"], cells["D4"], cells["E4"]) == ("Karimov", "6", "43.0")
+        assert "D2" not in cells
+    finally:
+        await engine.dispose()
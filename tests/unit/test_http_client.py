@@ -0,0 +1,133 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from asgi_server import handle_lifespan, read_body, serve_asgi
+from shared.payments.gateway_service import PaymeGateway
+from shared.services import http_client
+from shared.services.http_client import CircuitOpenError, configure_upstream, get_http_metrics
+
+
+class SlowPayme:
+    """Payme merchant API stand-in that takes 300 ms per CheckTransaction"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def __call__(self, scope, receive, send):
+        if await handle_lifespan(scope, receive, send):
+            return
+        request = json.loads(await read_body(receive))
+        self.calls += 1
+        await asyncio.sleep(0.3)
+        result = {"result": {"state": 2}, "id": request["id"]}
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": json.dumps(result).encode()})
+
+
+class _LocalPayme(PaymeGateway):
+    api_url = None
+
+    @property
+    def merchant_api(self):
+        return self.api_url
+
+
+async def _max_loop_lag(stop: asyncio.Event, interval: float = 0.01) -> float:
+    loop = asyncio.get_running_loop()
+    worst = 0.0
+    while not stop.is_set():
+        started = loop.time()
+        await asyncio.sleep(interval)
+        worst = max(worst, loop.time() - started - interval)
+    return worst
+
+
+@pytest.mark.asyncio
+async def test_payme_check_does_not_block_event_loop():
+    """Slow upstream calls overlap and the loop keeps ticking (the old httpx.post blocked it)"""
+    upstream = SlowPayme()
+    async with serve_asgi(upstream) as base_url:
+        _LocalPayme.api_url = f"{base_url}/api"
+        gateway = _LocalPayme({"merchant_id": "m", "secret_key": "k"})
+        stop = asyncio.Event()
+        lag_task = asyncio.create_task(_max_loop_lag(stop))
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        results = await asyncio.gather(*[gateway.check_payment(f"tx{i}") for i in range(5)])
+        elapsed = loop.time() - started
+        stop.set()
+        worst_lag = await lag_task
+
+    assert [r["status"] for r in results] == ["completed"] * 5
+    assert upstream.calls == 5
+    assert elapsed < 1.0  # ketma-ket bo'lganda >= 1.5s
+    assert worst_lag < 0.1
+    assert get_http_metrics()["payme"]["requests"] == 5
+    await http_client.close_http_clients()
+
+
+@pytest.mark.asyncio
+async def test_retries_only_idempotent_requests_and_opens_circuit():
+    statuses = iter([503, 503, 200, 503])
+    seen = []
+
+    def handler(request):
+        seen.append(request.method)
+        return httpx.Response(next(statuses))
+
+    saved = http_client.UPSTREAMS.get("click")
+    client = configure_upstream("click", transport=httpx.MockTransport(handler),
+                                backoff_seconds=0.001, failure_threshold=3)
+    try:
+        assert (await client.get("http://click.test/status")).status_code == 200
+        assert seen == ["GET", "GET", "GET"] and client.retries == 2
+
+        # POST (invoice yaratish) 5xx da qayta yuborilmaydi
+        assert (await client.post("http://click.test/create")).status_code == 503
+        assert seen[-1] == "POST" and len(seen) == 4
+
+        def down(request):
+            raise httpx.ConnectError("connection refused", request=request)
+
+        client = configure_upstream("click", transport=httpx.MockTransport(down),
+                                    backoff_seconds=0.001, failure_threshold=3, retries=5)
+        with pytest.raises(httpx.ConnectError):
+            await client.post("http://click.test/create")
+        assert client.requests == 3 and client.breaker.state == "open"
+        with pytest.raises(CircuitOpenError):
+            await client.get("http://click.test/status")
+        assert client.metrics()["rejected"] == 1
+    finally:
+        http_client.UPSTREAMS["click"] = saved
+        await http_client.close_http_clients()
+
+
+@pytest.mark.asyncio
+async def test_lessions_proxy_reuses_shared_pool_and_reports_metrics():
+    """Admin content proxy goes through the "lessions" upstream instead of a client per call"""
+    from backend_loader import import_backend
+    admin_panel = import_backend("MainPlatform", "app.api.v1.admin_panel")
+
+    seen = []
+
+    def handler(request):
+        seen.append((request.method, request.url.path))
+        return httpx.Response(200, json={"ok": True})
+
+    configure_upstream("lessions", transport=httpx.MockTransport(handler))
+    admin = {"permissions": ["content"]}
+    try:
+        await admin_panel.list_content_lessons(admin=admin, subject="math", language=None)
+        await admin_panel.update_content_lesson("l1", {"title": "x"}, admin=admin)
+        await admin_panel.delete_content_ertak("e1", admin=admin)
+
+        assert [m for m, _ in seen] == ["GET", "PUT", "DELETE"]
+        assert seen[2][1].endswith("/ertaklar/e1")
+        assert get_http_metrics()["lessions"]["requests"] == 3
+    finally:
+        await http_client.close_http_clients()
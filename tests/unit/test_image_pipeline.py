@@ -0,0 +1,157 @@
+import io
+import random
+
+import pytest
+from fastapi import HTTPException, UploadFile
+from PIL import Image, ImageDraw, ImageFont
+
+from backend_loader import import_backend
+from shared.services import image_pipeline
+from shared.services.image_pipeline import (
+    UploadTooLarge, configure_image_pipeline, get_image_pipeline_stats, prepare_upload,
+)
+
+image_reader = import_backend("MainPlatform", "app.smartkids.image_reader_router")
+math_image = import_backend("MainPlatform", "app.mathkids.math_image_router")
+
+
+def _page(seed=0, changed_line=None):
+    """Telefon rasmiga o'xshash matnli sahifa (1512x2016)"""
+    rng = random.Random(seed)
+    image = Image.new("RGB", (1512, 2016), (235, 228, 210))
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default(size=32)
+    for line, y in enumerate(range(100, 1916, 48)):
+        words = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(2, 9))) for _ in range(8)]
+        if line == changed_line:
+            words[3] = "zzzz"
+        draw.text((75, y), " ".join(words), fill=(30, 30, 30), font=font)
+    return image
+
+
+def _worksheet(changed_line=None, digit="8"):
+    """3000x4000 zich misollar sahifasi (39 qator); changed_line'da bitta raqam almashtiriladi"""
+    rng = random.Random(7)
+    image = Image.new("RGB", (3000, 4000), (240, 236, 226))
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default(size=60)
+    for line, y in enumerate(range(150, 3850, 95)):
+        text = "   ".join(f"{rng.randint(100, 250)} + {rng.randint(10, 99)} = ____" for _ in range(4))
+        if line == changed_line:
+            text = text[:2] + (digit if text[2] != digit else "3") + text[3:]
+        draw.text((120, y), text, fill=(25, 25, 25), font=font)
+    return image
+
+
+def _problem(text):
+    image = Image.new("RGB", (1512, 1134), (250, 250, 250))
+    ImageDraw.Draw(image).text((150, 450), text, fill=(20, 20, 20), font=ImageFont.load_default(size=80))
+    return image
+
+
+def _jpeg(image, quality=92, scale=1.0, orientation=None):
+    if scale != 1.0:
+        image = image.resize((int(image.width * scale), int(image.height * scale)))
+    exif = Image.Exif()
+    if orientation == 6:
+        # Kamera sensori yonboshlab yozgan, EXIF "90° aylantiring" deydi
+        image = image.transpose(Image.Transpose.ROTATE_90)
+        exif[0x0112] = 6
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=quality, exif=exif)
+    return buffer.getvalue()
+
+
+def _upload(data, name="rasm.jpg"):
+    return UploadFile(file=io.BytesIO(data), filename=name)
+
+
+@pytest.mark.asyncio
+async def test_prepare_normalizes_rotation_size_and_transparency():
+    configure_image_pipeline(max_workers=1, kind="process")
+    try:
+        source = _jpeg(_page(), orientation=6)
+        prepared = await prepare_upload(_upload(source))
+        assert (prepared.width, prepared.height) == (768, 1024)
+        assert Image.open(io.BytesIO(prepared.data)).mode == "L"
+        assert len(prepared.data) * 3 < len(source) and prepared.source_bytes == len(source)
+
+        upright = await prepare_upload(_upload(_jpeg(_page())))
+        assert (upright.width, upright.height) == (768, 1024)
+
+        # Shaffof PNG — oq fonda, qora emas
+        png = Image.new("RGBA", (400, 300), (0, 0, 0, 0))
+        ImageDraw.Draw(png).rectangle((100, 100, 300, 200), fill=(0, 0, 0, 255))
+        buffer = io.BytesIO()
+        png.save(buffer, "PNG")
+        flat = Image.open(io.BytesIO((await prepare_upload(_upload(buffer.getvalue(), "a.png"))).data))
+        assert flat.getpixel((10, 10)) > 240 and flat.getpixel((200, 150)) < 20
+
+        with pytest.raises(UploadTooLarge):
+            await prepare_upload(_upload(source), max_bytes=1024)
+        assert get_image_pipeline_stats()["pool"]["completed"] == 3
+    finally:
+        configure_image_pipeline()
+
+
+@pytest.mark.asyncio
+async def test_only_identical_reupload_skips_vision_call(monkeypatch):
+    sent = []
+
+    class StubAI:
+        @staticmethod
+        async def call_ai(messages, **kwargs):
+            url = messages[0]["content"][1]["image_url"]["url"]
+            sent.append(len(url))
+            return f"matn {len(sent)}"
+
+    monkeypatch.setattr(image_reader, "ai_service", StubAI)
+    monkeypatch.setattr(math_image, "ai_service", StubAI)
+    configure_image_pipeline(kind="thread")
+    try:
+        original = _jpeg(_page())
+        first = await image_reader.read_image(_upload(original))
+        # Aynan o'sha fayl qayta yuklandi — AI chaqirilmaydi
+        again = await image_reader.read_image(_upload(original))
+        assert again == first and len(sent) == 1
+        assert sent[0] * 3 < len(original) * 4 / 3  # base64 payload
+
+        # Qayta siqilgan nusxa — kesh emas, AI qayta o'qiydi
+        await image_reader.read_image(_upload(_jpeg(_page(), quality=60, scale=0.6)))
+        assert len(sent) == 2
+
+        # Zich sahifada bitta raqam o'zgargan — boshqa javob bo'lishi shart
+        texts = [(await image_reader.read_image(_upload(_jpeg(_worksheet(changed)))))["text"]
+                 for changed in (None, 5, 30)]
+        assert len(set(texts)) == 3 and len(sent) == 5
+
+        # Maqsad bo'yicha alohida kesh
+        for text in ("12 + 7 = ?", "12 + 9 = ?", "12 + 7 = ?"):
+            await math_image.read_math_image(_upload(_jpeg(_problem(text))))
+        assert len(sent) == 7
+
+        stats = get_image_pipeline_stats()
+        assert (stats["hits"], stats["misses"]) == (2, 7)
+
+        with pytest.raises(HTTPException) as error:
+            await image_reader.read_image(_upload(b"bu rasm emas", "rasm.jpg"))
+        assert error.value.status_code == 422
+    finally:
+        configure_image_pipeline()
+
+
+def test_result_cache_is_lru_with_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(image_pipeline.time, "monotonic", lambda: now[0])
+    cache = image_pipeline._ResultCache(max_entries=2, ttl_seconds=60)
+    cache.put("ocr", "a", "birinchi")
+    assert cache.get("ocr", "a") == "birinchi"
+    assert cache.get("math", "a") is None
+
+    cache.put("ocr", "b", "ikkinchi")
+    cache.get("ocr", "a")
+    cache.put("ocr", "c", "uchinchi")
+    assert cache.get("ocr", "b") is None and cache.evictions == 1
+
+    now[0] += 61
+    assert cache.get("ocr", "a") is None and len(cache) == 1
@@ -0,0 +1,153 @@
+import pytest
+import fakeredis.aioredis
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from backend_loader import import_backend
+from shared.database.base import Base
+from shared.database.models import (
+    StudentProfile,
+    LiveQuiz, LiveQuizQuestion, LiveQuizParticipant, LiveQuizAnswer,
+    LiveQuizStatus, ParticipantState,
+)
+
+engine_mod = import_backend("TestAI", "app.services.live_quiz_engine")
+service_mod = import_backend("TestAI", "app.services.live_quiz_service")
+errors = import_backend("TestAI", "app.core.errors")
+
+TABLES = [
+    StudentProfile.__table__, LiveQuiz.__table__, LiveQuizQuestion.__table__,
+    LiveQuizParticipant.__table__, LiveQuizAnswer.__table__,
+]
+
+# (student_user_id, question_id, selected, ms) — u1 ning 2-javobi dublikat
+SUBMISSIONS = [
+    ("u1", "q0000001", 1, 1200), ("u2", "q0000001", 0, 800), ("u3", "q0000001", 1, 29000),
+    ("u1", "q0000002", 2, 500), ("u2", "q0000002", 2, 4000), ("u1", "q0000002", 2, 100),
+    ("u3", "q0000002", 0, 300), ("u1", "q0000003", 3, 9000), ("u2", "q0000003", 3, 100),
+]
+
+
+async def _make_db():
+    db_engine = create_async_engine("sqlite+aiosqlite://")
+    async with db_engine.begin() as conn:
+        await conn.run_sync(lambda c: Base.metadata.create_all(c, tables=TABLES))
+    session = async_sessionmaker(db_engine, expire_on_commit=False)()
+    session.add(LiveQuiz(id="quiz0001", teacher_id="t0000001", title="Quiz", join_code="123456",
+                         status=LiveQuizStatus.active))
+    for i, (correct, points) in enumerate([(1, 100), (2, 200), (3, 100)], start=1):
+        session.add(LiveQuizQuestion(id=f"q000000{i}", quiz_id="quiz0001", question_text=f"Q{i}",
+                                     options=["a", "b", "c", "d"], correct_answer=correct,
+                                     points=points, time_limit=30, order=i))
+    for i in (1, 2, 3):
+        session.add(StudentProfile(id=f"s000000{i}", user_id=f"u{i}"))
+        session.add(LiveQuizParticipant(id=f"p000000{i}", quiz_id="quiz0001", student_id=f"s000000{i}",
+                                        display_name=f"Student {i}", state=ParticipantState.answering,
+                                        total_score=0, correct_count=0, wrong_count=0,
+                                        current_streak=0, best_streak=0))
+    await session.commit()
+    return db_engine, session
+
+
+async def _run(service):
+    results = []
+    for user_id, question_id, selected, ms in SUBMISSIONS:
+        try:
+            results.append(await service.submit_answer(user_id, "quiz0001", question_id, selected, ms))
+        except errors.BadRequestError as e:
+            results.append(("rejected", e.detail))
+    return results
+
+
+async def _snapshot(session):
+    res = await session.execute(
+        select(LiveQuizParticipant).order_by(LiveQuizParticipant.id)
+        .execution_options(populate_existing=True)
+    )
+    participants = [
+        (p.id, p.total_score, p.correct_count, p.wrong_count, p.current_streak, p.best_streak)
+        for p in res.scalars().all()
+    ]
+    res = await session.execute(
+        select(LiveQuizAnswer.participant_id, LiveQuizAnswer.question_id, LiveQuizAnswer.selected_answer,
+               LiveQuizAnswer.is_correct, LiveQuizAnswer.points_earned)
+        .order_by(LiveQuizAnswer.participant_id, LiveQuizAnswer.question_id)
+    )
+    return participants, [tuple(r) for r in res.all()]
+
+
+def _stores():
+    return [
+        pytest.param(lambda: engine_mod.MemoryQuizStore(), id="memory"),
+        pytest.param(lambda: engine_mod.RedisQuizStore(fakeredis.aioredis.FakeRedis(decode_responses=True)),
+                     id="redis"),
+    ]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("make_store", _stores())
+async def test_hot_path_matches_direct_db_path(make_store):
+    """Same submissions give the same responses, answers and scoreboard as the per-answer DB path"""
+    ref_engine, ref_db = await _make_db()
+    hot_engine, hot_db = await _make_db()
+    try:
+        direct = service_mod.LiveQuizService(ref_db)
+        direct.engine = None
+        hot = service_mod.LiveQuizService(hot_db)
+        hot.engine = engine_mod.LiveQuizEngine(make_store(), batch_size=4)
+
+        assert await _run(hot) == await _run(direct)
+        await hot.engine.flush(hot_db, "quiz0001")
+        assert await _snapshot(hot_db) == await _snapshot(ref_db)
+    finally:
+        await ref_db.close()
+        await hot_db.close()
+        await ref_engine.dispose()
+        await hot_engine.dispose()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("make_store", _stores())
+async def test_answers_are_batched_and_closed_quiz_rejects(make_store):
+    """Answers stay buffered until the batch fills; after close() nothing new is accepted"""
+    db_engine, db = await _make_db()
+    try:
+        engine = engine_mod.LiveQuizEngine(make_store(), batch_size=3)
+        await engine.submit(db, "u1", "quiz0001", "q0000001", 1, 100)
+        await engine.submit(db, "u2", "quiz0001", "q0000001", 1, 100)
+        assert (await _snapshot(db))[1] == []
+        assert await engine.is_answered("quiz0001", "p0000001", "q0000001") is True
+
+        await engine.submit(db, "u3", "quiz0001", "q0000001", 0, 100)
+        assert len((await _snapshot(db))[1]) == 3
+
+        await engine.submit(db, "u1", "quiz0001", "q0000002", 2, 100)
+        assert await engine.close(db, "quiz0001") == 1
+        with pytest.raises(errors.BadRequestError):
+            await engine.submit(db, "u2", "quiz0001", "q0000002", 2, 100)
+
+        participants, answers = await _snapshot(db)
+        assert len(answers) == 4
+        assert participants[0][1:] == (99 + 199, 2, 0, 2, 2)
+    finally:
+        await db.close()
+        await db_engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_state_reload_keeps_dedupe_for_written_answers():
+    """A cold store reloads from Postgres and still rejects answers that were already written"""
+    db_engine, db = await _make_db()
+    try:
+        engine = engine_mod.LiveQuizEngine(engine_mod.MemoryQuizStore(), batch_size=1)
+        await engine.submit(db, "u1", "quiz0001", "q0000001", 1, 100)
+
+        cold = engine_mod.LiveQuizEngine(engine_mod.MemoryQuizStore(), batch_size=1)
+        with pytest.raises(errors.BadRequestError):
+            await cold.submit(db, "u1", "quiz0001", "q0000001", 1, 100)
+        result = await cold.submit(db, "u1", "quiz0001", "q0000002", 2, 100)
+        assert result["total_score"] == 99 + 199
+        assert result["current_streak"] == 2
+    finally:
+        await db.close()
+        await db_engine.dispose()
@@ -0,0 +1,161 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import distinct, func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from backend_loader import import_backend
+from shared.database.base import Base
+from shared.database.models import (
+    AccountStatus, CoinTransaction, StudentCoin, SubscriptionStatus, User, UserRole, UserSubscription,
+)
+from shared.database.models.analytics import DailyPlatformMetrics, UserDailyLogin, UserGeoLog
+from shared.database.models.coin import TransactionType
+
+rollup = import_backend("MainPlatform", "app.services.metrics_rollup")
+
+TABLES = [User.__table__, UserGeoLog.__table__, UserSubscription.__table__, StudentCoin.__table__,
+          CoinTransaction.__table__, DailyPlatformMetrics.__table__, UserDailyLogin.__table__]
+NOW = datetime(2026, 9, 15, 12, 0, tzinfo=timezone.utc)
+ROLES = [UserRole.student, UserRole.student, UserRole.parent, UserRole.teacher]
+
+
+async def _setup():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    factory = async_sessionmaker(engine, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda c: Base.metadata.create_all(c, tables=TABLES))
+    rnd = random.Random(7)
+    async with factory() as db:
+        for i in range(120):
+            created = NOW - timedelta(days=rnd.randint(0, 45), hours=rnd.randint(0, 11), minutes=rnd.randint(0, 59))
+            uid = f"u{i:07d}"
+            db.add(User(id=uid, first_name="Ism", last_name="Fam", role=ROLES[i % 4], created_at=created,
+                        status=AccountStatus.active if i % 5 else AccountStatus.suspended))
+            for _ in range(rnd.randint(0, 4)):
+                at = NOW - timedelta(days=rnd.randint(0, 40), hours=rnd.randint(0, 11))
+                db.add(UserGeoLog(user_id=uid, action=rnd.choice(["login", "login", "refresh"]), created_at=at))
+            if i % 6 == 0:
+                db.add(UserSubscription(
+                    user_id=uid, plan_config_id="p0000001", amount_paid=rnd.choice([0, 50000, 99000]),
+                    status=SubscriptionStatus.active.value if i % 12 else SubscriptionStatus.expired.value,
+                    created_at=created, expires_at=NOW + timedelta(days=30),
+                ))
+            if ROLES[i % 4] == UserRole.student:
+                coin = StudentCoin(id=f"c{i:07d}", student_id=f"s{i:07d}", current_balance=rnd.randint(0, 300))
+                db.add(coin)
+                for _ in range(2):
+                    db.add(CoinTransaction(student_coin_id=coin.id, type=TransactionType.game_win,
+                                           amount=rnd.choice([5, 10, -20]),
+                                           created_at=NOW - timedelta(days=rnd.randint(0, 10))))
+        await db.commit()
+    return engine, factory
+
+
+async def _raw(db, query):
+    return (await db.execute(query)).scalar() or 0
+
+
+@pytest.mark.asyncio
+async def test_rollup_totals_match_raw_queries():
+    engine, factory = await _setup()
+    today = NOW.date()
+    today_start = datetime.combine(today, datetime.min.time(), tzinfo=timezone.utc)
+    week_start = today_start - timedelta(days=7)
+    try:
+        async with factory() as db:
+            # Job 31 kunni, backfill esa qolganini to'ldiradi
+            assert await rollup.rollup_pending(db, today=today) == 31
+            assert await rollup.rollup_pending(db, today=today) == 2  # faqat lookback
+            await rollup.backfill(db, today - timedelta(days=50), today - timedelta(days=32))
+
+        async with factory() as db:
+            overview = await rollup.platform_overview(db, now=NOW)
+            segments = await rollup.user_segments(db, now=NOW)
+            trends = await rollup.platform_trends(db, 30, now=NOW)
+
+            login = UserGeoLog.action == "login"
+            assert overview["total_users"] == await _raw(db, select(func.count(User.id)))
+            assert overview["total_students"] == await _raw(
+                db, select(func.count(User.id)).where(User.role == UserRole.student))
+            assert overview["active_users"] == await _raw(
+                db, select(func.count(User.id)).where(User.status == AccountStatus.active))
+            assert overview["coins_in_circulation"] == await _raw(db, select(func.sum(StudentCoin.current_balance)))
+            assert overview["active_subscriptions"] == await _raw(db, select(func.count(UserSubscription.id)).where(
+                UserSubscription.status == SubscriptionStatus.active.value))
+            assert overview["total_revenue"] == await _raw(db, select(func.sum(UserSubscription.amount_paid)))
+            assert overview["new_users"]["today"] == await _raw(
+                db, select(func.count(User.id)).where(User.created_at >= today_start))
+            assert overview["new_users"]["this_week"] == await _raw(
+                db, select(func.count(User.id)).where(User.created_at >= week_start))
+            assert overview["logins"] == {
+                "today_total": await _raw(db, select(func.count(UserGeoLog.id)).where(
+                    login, UserGeoLog.created_at >= today_start)),
+                "today_unique": await _raw(db, select(func.count(distinct(UserGeoLog.user_id))).where(
+                    login, UserGeoLog.created_at >= today_start)),
+            }
+
+            assert segments["active"] == await _raw(db, select(func.count(distinct(UserGeoLog.user_id))).where(
+                login, UserGeoLog.created_at >= week_start))
+            assert segments["moderate"] == await _raw(db, select(func.count(distinct(UserGeoLog.user_id))).where(
+                login, UserGeoLog.created_at >= today_start - timedelta(days=30), UserGeoLog.created_at < week_start))
+            assert segments["rich"] == await _raw(
+                db, select(func.count(StudentCoin.id)).where(StudentCoin.current_balance > 100))
+
+            month_start = today_start - timedelta(days=30)
+            assert sum(r["count"] for r in trends["registrations"]) == await _raw(
+                db, select(func.count(User.id)).where(User.created_at >= month_start))
+            assert sum(r["total_logins"] for r in trends["logins"]) == await _raw(
+                db, select(func.count(UserGeoLog.id)).where(login, UserGeoLog.created_at >= month_start))
+            assert sum(trends["by_role"].values()) == sum(r["count"] for r in trends["registrations"])
+
+            coins = (await db.execute(select(
+                func.sum(DailyPlatformMetrics.coins_earned), func.sum(DailyPlatformMetrics.coins_spent)))).one()
+            raw_earned = await _raw(db, select(func.sum(CoinTransaction.amount)).where(
+                CoinTransaction.amount > 0, CoinTransaction.created_at < today_start))
+            raw_spent = await _raw(db, select(-func.sum(CoinTransaction.amount)).where(
+                CoinTransaction.amount < 0, CoinTransaction.created_at < today_start))
+            assert tuple(coins) == (raw_earned, raw_spent)
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_unrolled_days_and_history_before_catchup_stay_in_totals():
+    engine, factory = await _setup()
+    today = NOW.date()
+    today_start = datetime.combine(today, datetime.min.time(), tzinfo=timezone.utc)
+    week_start = today_start - timedelta(days=7)
+    login = UserGeoLog.action == "login"
+    try:
+        async with factory() as db:
+            # Yarim tundan keyin, soatlik rollup'dan oldin: oxirgi qator — o'tgan kun,
+            # kecha hali hisoblanmagan; 31 kundan oldingi tarix rollup'da yo'q
+            await rollup.rollup_pending(db, today=today - timedelta(days=1))
+            assert (await rollup._latest(db)).day == today - timedelta(days=2)
+
+        async with factory() as db:
+            overview = await rollup.platform_overview(db, now=NOW)
+            segments = await rollup.user_segments(db, now=NOW)
+            trends = await rollup.platform_trends(db, 30, now=NOW)
+
+            assert overview["total_users"] == segments["total"] == await _raw(db, select(func.count(User.id)))
+            assert overview["total_revenue"] == await _raw(db, select(func.sum(UserSubscription.amount_paid)))
+            week_users = await _raw(db, select(func.count(User.id)).where(User.created_at >= week_start))
+            assert overview["new_users"]["this_week"] == segments["new"] == week_users
+            assert segments["active"] == await _raw(db, select(func.count(distinct(UserGeoLog.user_id))).where(
+                login, UserGeoLog.created_at >= week_start))
+            month_start = today_start - timedelta(days=30)
+            assert sum(r["count"] for r in trends["registrations"]) == await _raw(
+                db, select(func.count(User.id)).where(User.created_at >= month_start))
+            assert sum(r["total_logins"] for r in trends["logins"]) == await _raw(
+                db, select(func.count(UserGeoLog.id)).where(login, UserGeoLog.created_at >= month_start))
+
+            # revenue_total'siz eski qator — jonli SUM bilan to'ldiriladi
+            latest = await rollup._latest(db)
+            latest.revenue_total = None
+            await db.commit()
+            assert (await rollup.platform_overview(db, now=NOW))["total_revenue"] == overview["total_revenue"]
+    finally:
+        await engine.dispose()
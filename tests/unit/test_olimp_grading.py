@@ -0,0 +1,173 @@
+import random
+from types import SimpleNamespace
+
+import pytest
+import fakeredis.aioredis
+
+from backend_loader import import_backend
+from shared.services import redis_service
+
+grading = import_backend("Olimp", "app.olimp.grading")
+
+
+def _questions():
+    native = [
+        SimpleNamespace(id=f"n{i:07d}", correct_answer=i % 4, points=5 + i % 3, options=["a", "b", "c", "d"])
+        for i in range(12)
+    ]
+    native.append(SimpleNamespace(id="n_twoopt", correct_answer=1, points=2, options=["ha", "yo'q"]))
+    saved = [
+        SimpleNamespace(id="st000001", questions=[
+            {"correct": 2, "points": 7, "options": ["a", "b", "c"]},
+            {"answer_index": 0, "options": ["a", "b", "c", "d"]},  # default points
+            {"correct": None, "answer_index": "3", "points": 4, "options": ["a", "b", "c", "d"]},
+            {"points": 3, "options": ["a", "b"]},  # to'g'ri javob yo'q
+        ]),
+        SimpleNamespace(id="st000002", questions=[{"correct": 1, "points": 10, "options": ["x", "y"]}]),
+    ]
+    return native, saved
+
+
+def _legacy_grade(native, saved, answers, perm):
+    """The per-answer loop submit_answers used before the compiled key (DB lookups replaced by dicts)."""
+    by_id = {q.id: q for q in native}
+    saved_map = {st.id: st for st in saved}
+    total_score = total_points = correct_count = wrong_count = 0
+    details, native_rows = [], []
+    for answer in answers:
+        question_data = None
+        is_olympiad_q = False
+        n_options = 0
+        if str(answer.question_id).startswith("testai_"):
+            parts = str(answer.question_id).split("_")
+            if len(parts) >= 3:
+                st_id, q_idx_str = parts[1], parts[2]
+                try:
+                    q_idx = int(q_idx_str)
+                    st_obj = saved_map.get(st_id)
+                    if st_obj and st_obj.questions and 0 <= q_idx < len(st_obj.questions):
+                        st_q = st_obj.questions[q_idx]
+                        question_data = {
+                            "correct_answer": st_q.get("correct") if st_q.get("correct") is not None else st_q.get("answer_index"),
+                            "points": st_q.get("points", 5)
+                        }
+                        n_options = len(st_q.get("options") or [])
+                except (ValueError, IndexError):
+                    continue
+        else:
+            question = by_id.get(answer.question_id)
+            if question:
+                question_data = {"correct_answer": question.correct_answer, "points": question.points}
+                is_olympiad_q = True
+                n_options = len(question.options or [])
+        if not question_data:
+            continue
+
+        submitted_idx_original = answer.answer_index
+        try:
+            submitted_idx_int = int(answer.answer_index)
+        except (ValueError, TypeError):
+            submitted_idx_int = None
+        if perm and submitted_idx_int is not None and n_options >= 2 and 0 <= submitted_idx_int < n_options:
+            submitted_idx_original = perm(answer.question_id, n_options)[submitted_idx_int]
+        try:
+            is_correct = int(submitted_idx_original) == int(question_data["correct_answer"])
+        except (ValueError, TypeError):
+            is_correct = False
+
+        points = question_data["points"] if is_correct else 0
+        total_score += points
+        total_points += question_data["points"]
+        if is_correct:
+            correct_count += 1
+        else:
+            wrong_count += 1
+        details.append({
+            "question_id": answer.question_id,
+            "submitted_answer": answer.answer_index,
+            "original_answer_index": submitted_idx_original,
+            "is_correct": is_correct,
+            "points_earned": points
+        })
+        if is_olympiad_q:
+            native_rows.append((answer.question_id, submitted_idx_original, is_correct, points))
+    return total_score, total_points, correct_count, wrong_count, details, native_rows
+
+
+def _perm(question_id, n):
+    indices = list(range(n))
+    random.Random(question_id).shuffle(indices)
+    return indices
+
+
+def _random_submission(rng, native, saved):
+    ids = [q.id for q in native]
+    ids += [f"testai_{st.id}_{i}" for st in saved for i in range(len(st.questions))]
+    ids += ["missing1", "testai_st000001_9", "testai_st000001_x", "testai_nope_0", "testai_st000002_01", "testai_"]
+    answers = []
+    for qid in rng.sample(ids, rng.randint(0, len(ids))):
+        answer_index = rng.choice([0, 1, 2, 3, 5, -1, "2", "abc", None, 1.0])
+        answers.append(SimpleNamespace(question_id=qid, answer_index=answer_index))
+    return answers
+
+
+@pytest.mark.parametrize("shuffled", [False, True])
+def test_grade_submission_matches_legacy_loop(shuffled):
+    """Compiled-key grading gives the same scores, details and OlympiadAnswer rows as the old loop"""
+    native, saved = _questions()
+    key = grading.compile_answer_key(native, saved)
+    perm = _perm if shuffled else None
+    rng = random.Random(42)
+    for _ in range(500):
+        answers = _random_submission(rng, native, saved)
+        result = grading.grade_submission(key, answers, perm)
+        assert (
+            result.total_score, result.total_points, result.correct_count, result.wrong_count,
+            result.details, result.native_answers,
+        ) == _legacy_grade(native, saved, answers, perm)
+
+
+class _FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return self.rows
+
+
+class _FakeDB:
+    def __init__(self, native, saved):
+        self.native, self.saved = native, saved
+        self.queries = 0
+
+    async def execute(self, stmt):
+        self.queries += 1
+        return _FakeResult(self.native if self.queries % 2 else self.saved)
+
+
+@pytest.mark.asyncio
+async def test_answer_key_is_cached_until_invalidated():
+    """The key is compiled once; invalidation (local and via the Redis version) forces a reload"""
+    native, saved = _questions()
+    redis_service.set_redis(fakeredis.aioredis.FakeRedis(decode_responses=True))
+    try:
+        db = _FakeDB(native, saved)
+        key = await grading.get_answer_key("olymp001", db)
+        assert len(key) == len(native) + 5
+        assert await grading.get_answer_key("olymp001", db) is key
+        assert db.queries == 2
+
+        # Boshqa worker invalidate qildi: faqat Redis versiyasi o'zgaradi
+        await redis_service.get_redis().incr("olimp:grading:olymp001:v")
+        reloaded = await grading.get_answer_key("olymp001", db)
+        assert reloaded is not key and db.queries == 4
+
+        await grading.invalidate_answer_key("olymp001")
+        assert await grading.get_answer_key("olymp001", db) is not reloaded
+        assert db.queries == 6
+    finally:
+        grading._cache.clear()
+        redis_service.set_redis(None)
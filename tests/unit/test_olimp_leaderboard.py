@@ -0,0 +1,161 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+import fakeredis.aioredis
+
+from backend_loader import import_backend
+
+lb_mod = import_backend("Olimp", "app.olimp.leaderboard")
+
+START = datetime(2026, 5, 1, 9, 0, tzinfo=timezone.utc)
+
+
+def _participant(student_id, score, spent=0, done_after=None, status="completed"):
+    return SimpleNamespace(
+        student_id=student_id,
+        total_score=score,
+        correct_answers=0,
+        wrong_answers=0,
+        time_spent_seconds=spent,
+        coins_earned=0,
+        reading_coins=0,
+        reading_wpm=0,
+        reading_percent=0,
+        reading_time_seconds=0,
+        status=SimpleNamespace(value=status),
+        completed_at=START + timedelta(seconds=done_after) if done_after is not None else None,
+    )
+
+
+def _db_order(participants):
+    """Reference ordering used by the Postgres path (NULL completed_at last)."""
+    far = START + timedelta(days=3650)
+    return [p.student_id for p in sorted(
+        participants,
+        key=lambda p: (-(p.total_score or 0), p.time_spent_seconds or 0, p.completed_at or far),
+    )]
+
+
+@pytest.fixture
+def board():
+    return lb_mod.OlympiadLeaderboard(fakeredis.aioredis.FakeRedis(decode_responses=True))
+
+
+async def _rebuild(board, participants, names=None):
+    names = names or {}
+    await board.rebuild(
+        "olymp1",
+        "Matematika",
+        [(lb_mod.participant_row(p, names.get(p.student_id)), p.completed_at, p.time_spent_seconds)
+         for p in participants],
+        START,
+    )
+
+
+def test_composite_score_matches_sql_ordering():
+    """Higher score first, then less time, then earlier completion, unfinished last"""
+    participants = [
+        _participant("a", 50, spent=300, done_after=400),
+        _participant("b", 80, spent=900, done_after=1000),
+        _participant("c", 50, spent=200, done_after=900),
+        _participant("d", 50, spent=200, done_after=100),
+        _participant("e", 0, status="registered"),
+        _participant("f", 0, spent=0, done_after=50),
+    ]
+    by_score = sorted(
+        participants,
+        key=lambda p: lb_mod.composite_score(p.total_score, p.time_spent_seconds, p.completed_at, START),
+        reverse=True,
+    )
+    assert [p.student_id for p in by_score] == _db_order(participants)
+
+
+@pytest.mark.asyncio
+async def test_writes_are_skipped_until_rebuilt(board):
+    """Cold start: upsert is a no-op until the board has been rebuilt from DB"""
+    p = _participant("a", 10, done_after=5)
+    assert not await board.upsert("olymp1", lb_mod.participant_row(p), p.completed_at, 0, START)
+    assert not await board.is_ready("olymp1")
+
+    await _rebuild(board, [p])
+    assert await board.is_ready("olymp1")
+    assert await board.get_title("olymp1") == "Matematika"
+
+
+@pytest.mark.asyncio
+async def test_top_rank_and_window(board):
+    """Top-N, my rank and the window around a student come straight from Redis"""
+    participants = [_participant(f"s{i:03d}", score=i % 37, spent=1000 - i, done_after=i) for i in range(200)]
+    await _rebuild(board, participants, names={"s005": "Ali Valiyev"})
+    expected = _db_order(participants)
+
+    top = await board.top("olymp1", 10)
+    assert [r["student_id"] for r in top] == expected[:10]
+    assert [r["rank"] for r in top] == list(range(1, 11))
+
+    me = await board.rank_of("olymp1", "s005")
+    assert me["rank"] == expected.index("s005") + 1
+    assert me["student_name"] == "Ali Valiyev"
+
+    window = await board.around("olymp1", "s005", radius=3)
+    pos = expected.index("s005")
+    assert [r["student_id"] for r in window] == expected[max(0, pos - 3): pos + 4]
+    assert window[0]["rank"] == max(0, pos - 3) + 1
+
+    assert await board.rank_of("olymp1", "missing") is None
+    assert await board.total("olymp1") == 200
+
+
+@pytest.mark.asyncio
+async def test_upsert_moves_participant_and_keeps_name(board):
+    """A new submission re-ranks the participant without a rebuild"""
+    a = _participant("a", 10, spent=100, done_after=100)
+    b = _participant("b", 20, spent=100, done_after=100)
+    await _rebuild(board, [a, b], names={"a": "Aziz"})
+
+    a.total_score = 30
+    name = await board.get_student_name("olymp1", "a")
+    assert await board.upsert("olymp1", lb_mod.participant_row(a, name), a.completed_at, a.time_spent_seconds, START)
+
+    top = await board.top("olymp1", 5)
+    assert [r["student_id"] for r in top] == ["a", "b"]
+    assert top[0]["student_name"] == "Aziz"
+    assert top[0]["total_score"] == 30
+    assert top[1]["student_name"] == "O'quvchi #2"
+
+
+@pytest.mark.asyncio
+async def test_invalidate_forces_rebuild(board):
+    """After invalidation (question rescore) the board reports not ready"""
+    await _rebuild(board, [_participant("a", 10, done_after=1)])
+    await board.invalidate("olymp1")
+    assert not await board.is_ready("olymp1")
+    assert await board.top("olymp1", 10) == []
+
+
+@pytest.mark.asyncio
+async def test_cold_start_pollers_share_one_rebuild(board):
+    """Concurrent readers on a missing board load participants once; a failed load releases the lock"""
+    participants = [_participant(f"s{i}", i, done_after=i) for i in range(20)]
+    loads = []
+
+    async def load():
+        loads.append(1)
+        await asyncio.sleep(0.05)  # Postgres'dan hamma qatnashchilarni yuklash
+        return "Matematika", [
+            (lb_mod.participant_row(p), p.completed_at, p.time_spent_seconds) for p in participants
+        ], START
+
+    await asyncio.gather(*[board.ensure_built("olymp1", load) for _ in range(30)])
+    assert len(loads) == 1
+    assert await board.total("olymp1") == 20
+
+    async def missing():
+        raise LookupError("olympiad not found")
+
+    with pytest.raises(LookupError):
+        await board.ensure_built("olymp2", missing)
+    await board.ensure_built("olymp2", load)
+    assert len(loads) == 2 and await board.is_ready("olymp2")
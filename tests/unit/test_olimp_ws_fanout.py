@@ -0,0 +1,120 @@
+import asyncio
+import json
+
+import pytest
+import fakeredis.aioredis
+
+from backend_loader import import_backend
+from shared.services import redis_service
+
+ws_mod = import_backend("Olimp", "app.olimp.websocket")
+
+
+class FakeSocket:
+    """Minimal stand-in for starlette's WebSocket."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.sent = []
+        self.closed_with = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, data: str):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.sent.append(data)
+
+    async def close(self, code: int = 1000):
+        self.closed_with = code
+
+
+async def _settle(seconds: float = 0.05):
+    await asyncio.sleep(seconds)
+
+
+@pytest.mark.asyncio
+async def test_slow_socket_does_not_delay_others():
+    """One stuck socket is dropped on timeout; the rest get the event immediately"""
+    manager = ws_mod.ConnectionManager(send_timeout=0.2, queue_size=4, max_pushes_per_second=100, use_redis=False)
+    fast = [FakeSocket() for _ in range(50)]
+    slow = FakeSocket(delay=10)
+    for ws in fast + [slow]:
+        await manager.connect(ws, "o1")
+
+    await manager.broadcast("o1", {"type": "score", "n": 1})
+    await _settle()
+    assert all(len(ws.sent) == 1 for ws in fast)
+    assert json.loads(fast[0].sent[0]) == {"type": "score", "n": 1}
+
+    await _settle(0.3)
+    assert manager.connection_count("o1") == 50
+    assert slow.closed_with == 1013
+    await manager.close()
+
+
+@pytest.mark.asyncio
+async def test_full_queue_drops_consumer():
+    """A socket that can't drain its bounded queue is disconnected"""
+    manager = ws_mod.ConnectionManager(send_timeout=30, queue_size=2, max_pushes_per_second=100, use_redis=False)
+    stuck = FakeSocket(delay=30)
+    ok = FakeSocket()
+    await manager.connect(stuck, "o1")
+    await manager.connect(ok, "o1")
+
+    for i in range(5):
+        await manager.broadcast("o1", {"type": "score", "n": i})
+        await _settle(0.01)
+
+    assert manager.connection_count("o1") == 1
+    assert manager.dropped_slow_consumers == 1
+    assert len(ok.sent) == 5
+    await manager.close()
+
+
+@pytest.mark.asyncio
+async def test_leaderboard_updates_are_coalesced():
+    """A burst of leaderboard_update events becomes one immediate and one trailing push"""
+    manager = ws_mod.ConnectionManager(send_timeout=1, queue_size=8, max_pushes_per_second=10, use_redis=False)
+    ws = FakeSocket()
+    await manager.connect(ws, "o1")
+
+    for i in range(20):
+        await manager.broadcast("o1", {"type": "leaderboard_update", "seq": i})
+    await _settle(0.02)
+    assert [json.loads(m)["seq"] for m in ws.sent] == [0]
+
+    await _settle(0.15)
+    assert [json.loads(m)["seq"] for m in ws.sent] == [0, 19]
+
+    # Final events are never delayed
+    await manager.broadcast("o1", {"type": "leaderboard_update", "final": True})
+    await _settle(0.01)
+    assert json.loads(ws.sent[-1]) == {"type": "leaderboard_update", "final": True}
+    await manager.close()
+
+
+@pytest.mark.asyncio
+async def test_broadcast_reaches_other_workers_through_redis():
+    """An event published by one worker is delivered to sockets on another"""
+    previous = redis_service._client
+    redis_service.set_redis(fakeredis.aioredis.FakeRedis(decode_responses=True))
+    try:
+        worker_a = ws_mod.ConnectionManager(max_pushes_per_second=100)
+        worker_b = ws_mod.ConnectionManager(max_pushes_per_second=100)
+        ws = FakeSocket()
+        await worker_b.connect(ws, "o1")
+        await _settle(0.1)  # listener subscribes
+
+        await worker_a.broadcast("o1", {"type": "leaderboard_update"})
+        for _ in range(40):
+            if ws.sent:
+                break
+            await _settle()
+        assert [json.loads(m) for m in ws.sent] == [{"type": "leaderboard_update"}]
+
+        await worker_a.close()
+        await worker_b.close()
+    finally:
+        redis_service.set_redis(previous)
@@ -0,0 +1,52 @@
+from datetime import datetime, timezone
+
+from backend_loader import import_backend
+from shared.database.models.reading_rating import RatingPeriod
+
+rating_service = import_backend("MainPlatform", "app.services.rating_service")
+compute_rating_deltas = rating_service.compute_rating_deltas
+get_previous_period_keys = rating_service.get_previous_period_keys
+get_record_period_keys = rating_service.get_record_period_keys
+
+JAN_1 = datetime(2026, 1, 1, 10, 0, tzinfo=timezone.utc)
+MAR_2 = datetime(2026, 3, 2, 10, 0, tzinfo=timezone.utc)
+
+
+def test_period_keys_use_iso_week_and_utc():
+    """Period keys match the stored format and are computed in UTC"""
+    keys = get_record_period_keys(JAN_1)
+    assert keys[RatingPeriod.weekly] == "2026-W01"
+    assert keys[RatingPeriod.monthly] == "2026-01"
+    assert keys[RatingPeriod.yearly] == "2026"
+    assert keys[RatingPeriod.all_time] == ""
+
+    prev = get_previous_period_keys(JAN_1)
+    assert prev[RatingPeriod.weekly] == "2025-W52"
+    assert prev[RatingPeriod.monthly] == "2025-12"
+    assert prev[RatingPeriod.yearly] == "2025"
+    assert prev[RatingPeriod.all_time] is None
+
+
+def test_new_record_adds_to_every_period():
+    """A newly counted record adds one book to each of its four period rows"""
+    deltas = compute_rating_deltas(None, (MAR_2, 70))
+    assert len(deltas) == 4
+    for delta in deltas.values():
+        assert delta["books"] == 1
+        assert delta["score"] == 70
+
+
+def test_rescored_record_moves_between_periods():
+    """Re-completing in another week/month moves the book, all_time only gets the score diff"""
+    deltas = compute_rating_deltas((JAN_1, 50), (MAR_2, 70))
+    assert deltas[(RatingPeriod.weekly, "2026-W01")] == {"books": -1, "score": -50, "prev_key": "2025-W52"}
+    assert deltas[(RatingPeriod.weekly, "2026-W10")]["books"] == 1
+    assert deltas[(RatingPeriod.yearly, "2026")]["books"] == 0
+    assert deltas[(RatingPeriod.yearly, "2026")]["score"] == 20
+    assert deltas[(RatingPeriod.all_time, "")]["score"] == 20
+
+
+def test_unchanged_record_is_noop():
+    """Saving the same counted record again produces no upsert rows"""
+    assert compute_rating_deltas((JAN_1, 50), (JAN_1, 50)) == {}
+    assert compute_rating_deltas(None, None) == {}
@@ -0,0 +1,144 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from backend_loader import import_backend
+from shared.database.base import Base
+from shared.database.models import User, UserRole
+from shared.database.models.reading_competition import (
+    CompetitionResult, ReadingAnalysisJob, ReadingCompetition, ReadingSession, ReadingTask,
+    SessionStatus, TaskDay,
+)
+
+analysis = import_backend("Olimp", "app.reading.analysis")
+
+TABLES = [User.__table__, ReadingCompetition.__table__, ReadingTask.__table__, ReadingSession.__table__,
+          CompetitionResult.__table__, ReadingAnalysisJob.__table__]
+STORY = "Bir bor ekan bir yo'q ekan kichkina bola kitob o'qishni yaxshi ko'rar ekan"
+
+
+class MemoryStorage:
+    """iter_audio — StorageService bilan bir xil interfeys, kichik bo'laklar bilan"""
+
+    def __init__(self):
+        self.files = {}
+
+    async def iter_audio(self, filename):
+        if filename not in self.files:
+            raise FileNotFoundError(filename)
+        data = self.files[filename]
+        for i in range(0, len(data), 7):
+            yield data[i:i + 7]
+
+
+async def _setup(sessions=6):
+    engine = create_async_engine("sqlite+aiosqlite://")
+    factory = async_sessionmaker(engine, expire_on_commit=False, autoflush=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda c: Base.metadata.create_all(c, tables=TABLES))
+    async with factory() as db:
+        db.add(ReadingCompetition(id="c0000001", title="Hafta", week_number=1, year=2026))
+        db.add(ReadingTask(id="t0000001", competition_id="c0000001", day_of_week=TaskDay.monday,
+                           title="Hikoya", story_text=STORY))
+        for i in range(sessions):
+            db.add(User(id=f"s{i:07d}", first_name="O'quvchi", last_name=str(i), role=UserRole.student))
+            db.add(ReadingSession(id=f"r{i:07d}", student_id=f"s{i:07d}", task_id="t0000001",
+                                  competition_id="c0000001", status=SessionStatus.reading,
+                                  reading_time_seconds=5.0))
+        await db.commit()
+    return engine, factory
+
+
+async def _upload(factory, storage, session_id, filename, data):
+    storage.files[filename] = data
+    async with factory() as db:
+        session = await db.get(ReadingSession, session_id)
+        session.audio_filename = filename
+        job = await analysis.enqueue_analysis(db, session)
+        await db.commit()
+    return job
+
+
+@pytest.mark.asyncio
+async def test_enqueue_is_idempotent_and_worker_retries_then_scores():
+    engine, factory = await _setup()
+    storage = MemoryStorage()
+    stt = analysis.FakeSTTBackend(fail_times=1)
+    worker = analysis.ReadingAnalysisWorker(factory, stt=stt, storage=storage, concurrency=2,
+                                            retry_base_seconds=60, max_attempts=3)
+    try:
+        first = await _upload(factory, storage, "r0000000", "a.webm", STORY.encode())
+        again = await _upload(factory, storage, "r0000000", "a.webm", STORY.encode())
+        assert again.id == first.id and again.status == "pending"
+
+        # 1-urinish: STT vaqtinchalik xato -> pending, kechiktirilgan
+        assert await worker.drain_once() == 1
+        async with factory() as db:
+            job = await analysis.get_analysis_job(db, "r0000000")
+            assert (job.status, job.attempts) == ("pending", 1)
+            assert job.next_attempt_at.replace(tzinfo=timezone.utc) > datetime.now(timezone.utc) + timedelta(seconds=30)
+        assert await worker.drain_once() == 0  # hali vaqti kelmagan
+
+        async with factory() as db:
+            await db.execute(update(ReadingAnalysisJob).values(next_attempt_at=datetime.now(timezone.utc)))
+            await db.commit()
+        assert await worker.drain_once() == 1
+
+        async with factory() as db:
+            job = await analysis.get_analysis_job(db, "r0000000")
+            payload = analysis.analysis_payload(job)
+            assert payload["status"] == "done" and payload["success"]
+            assert payload["analysis"]["words_read"] == payload["analysis"]["total_words"] == 13
+            session = await db.get(ReadingSession, "r0000000")
+            assert session.status == SessionStatus.completed
+            assert session.total_score == payload["analysis"]["total_score"] > 0
+            result = (await db.execute(select(CompetitionResult))).scalars().one()
+            assert result.daily_scores["monday"]["total_score"] == session.total_score
+
+        # Tugagan job takroriy so'rovda qayta ishlanmaydi; yangi audio esa qaytadan boshlaydi
+        done = await _upload(factory, storage, "r0000000", "a.webm", STORY.encode())
+        assert done.status == "done"
+        redo = await _upload(factory, storage, "r0000000", "b.webm", b"Bir bor ekan")
+        assert (redo.id, redo.status, redo.attempts) == (first.id, "pending", 0)
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_worker_bounds_concurrency_and_fails_permanently():
+    engine, factory = await _setup(sessions=6)
+    storage = MemoryStorage()
+    stt = analysis.FakeSTTBackend(delay=0.02)
+    worker = analysis.ReadingAnalysisWorker(factory, stt=stt, storage=storage, concurrency=2, poll_seconds=0.05)
+    try:
+        for i in range(4):
+            await _upload(factory, storage, f"r{i:07d}", f"{i}.webm", STORY.encode())
+        await _upload(factory, storage, "r0000004", "silent.webm", b"   ")
+        async with factory() as db:
+            session = await db.get(ReadingSession, "r0000005")
+            session.audio_filename = "missing.webm"
+            await analysis.enqueue_analysis(db, session)
+            await db.commit()
+
+        runner = asyncio.create_task(worker.run())
+        async with factory() as db:
+            job = await analysis.wait_for_analysis(db, "r0000005", timeout=5)
+            assert job.status == "failed" and job.attempts == 1
+        for _ in range(100):
+            if sum(worker.stats.values()) == 6:
+                break
+            await asyncio.sleep(0.05)
+        runner.cancel()
+        await asyncio.gather(runner, return_exceptions=True)
+
+        assert worker.stats == {"done": 4, "retried": 0, "failed": 2}
+        assert stt.max_in_flight <= 2
+        async with factory() as db:
+            silent = await analysis.get_analysis_job(db, "r0000004")
+            assert silent.last_error == "Ovoz tanib olinmadi"
+            assert (await db.get(ReadingSession, "r0000004")).status == SessionStatus.reading
+    finally:
+        await engine.dispose()
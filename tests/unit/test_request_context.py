@@ -0,0 +1,188 @@
+from datetime import datetime, timedelta, timezone
+
+import fakeredis.aioredis
+import httpx
+import pytest
+from fastapi import Depends, FastAPI, Request
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from backend_loader import import_backend
+from shared.auth import create_access_token
+from shared.database import get_db
+from shared.database.base import Base
+from shared.database.models import AccountStatus, User, UserRole, UserSubscription
+from shared.database.models.subscription import SubscriptionPlanConfig
+from shared.services.redis_service import set_redis
+from shared.subscription import SubscriptionInfo
+
+ctx_mod = import_backend("MainPlatform", "app.middleware.request_context")
+auth_mod = import_backend("MainPlatform", "app.middleware.auth")
+settings = import_backend("MainPlatform", "app.core.config").settings
+
+
+class _Env:
+    def __init__(self):
+        self.engine = create_async_engine("sqlite+aiosqlite://")
+        self.sessions = async_sessionmaker(self.engine, expire_on_commit=False)
+        self.selects = 0
+
+        @event.listens_for(self.engine.sync_engine, "before_cursor_execute")
+        def _count(conn, cursor, statement, *args):
+            if statement.lstrip().upper().startswith("SELECT"):
+                self.selects += 1
+
+        app = FastAPI()
+        app.add_middleware(ctx_mod.RequestContextMiddleware)
+
+        async def _db():
+            async with self.sessions() as db:
+                yield db
+
+        app.dependency_overrides[get_db] = _db
+
+        @app.get("/me")
+        async def me(request: Request, user: User = Depends(auth_mod.get_current_user)):
+            sub: SubscriptionInfo = request.state.subscription
+            return {"id": user.id, "name": user.first_name, "role": user.role.value,
+                    "plan": sub.plan_slug, "ai_test": sub.has_feature("ai_test")}
+
+        @app.post("/me/name")
+        async def rename(name: str, user: User = Depends(auth_mod.get_current_user),
+                         db=Depends(get_db)):
+            user.first_name = name
+            await db.commit()
+            return {"ok": True}
+
+        self.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+    async def setup(self):
+        tables = [User.__table__, SubscriptionPlanConfig.__table__, UserSubscription.__table__]
+        async with self.engine.begin() as conn:
+            await conn.run_sync(lambda c: Base.metadata.create_all(c, tables=tables))
+        async with self.sessions() as db:
+            db.add(User(id="10000001", first_name="Ali", last_name="Valiyev", role=UserRole.parent,
+                        status=AccountStatus.active))
+            db.add(SubscriptionPlanConfig(id="20000001", name="Premium", slug="premium",
+                                          features={"ai_test": True}))
+            db.add(UserSubscription(user_id="10000001", plan_config_id="20000001",
+                                    expires_at=datetime.now(timezone.utc) + timedelta(days=30)))
+            await db.commit()
+        ctx_mod.set_session_factory(self.sessions)
+        ctx_mod.reset_user_context_cache()
+        self.selects = 0
+        return self
+
+    async def get_me(self):
+        token = create_access_token({"sub": "10000001"})
+        return await self.client.get("/me", headers={"Authorization": f"Bearer {token}"})
+
+    async def close(self):
+        await self.client.aclose()
+        ctx_mod.set_session_factory(None)
+        ctx_mod.reset_user_context_cache()
+        await self.engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_authenticated_request_hits_db_once_then_cache():
+    env = await _Env().setup()
+    try:
+        resp = await env.get_me()
+        assert resp.json() == {"id": "10000001", "name": "Ali", "role": "parent",
+                               "plan": "premium", "ai_test": True}
+        assert env.selects == 2  # User + obuna; get_current_user qayta so'ramaydi
+
+        for _ in range(5):
+            assert (await env.get_me()).status_code == 200
+        assert env.selects == 2
+        assert ctx_mod.get_user_context_stats()["hits"] == 5
+
+        # Biriktirilgan User sessiyada kuzatiladi — o'zgarish commit bo'ladi
+        token = create_access_token({"sub": "10000001"})
+        resp = await env.client.post("/me/name", params={"name": "Vali"},
+                                     headers={"Authorization": f"Bearer {token}"})
+        assert resp.status_code == 200
+        assert (await env.get_me()).json()["name"] == "Vali"
+    finally:
+        await env.close()
+
+
+@pytest.mark.asyncio
+async def test_role_subscription_and_status_changes_invalidate():
+    env = await _Env().setup()
+    try:
+        await env.get_me()
+        async with env.sessions() as db:
+            user = (await db.execute(select(User).where(User.id == "10000001"))).scalar_one()
+            user.role = UserRole.teacher
+            await db.commit()
+        assert (await env.get_me()).json()["role"] == "teacher"
+
+        async with env.sessions() as db:
+            sub = (await db.execute(select(UserSubscription))).scalar_one()
+            sub.status = "cancelled"
+            await db.commit()
+        body = (await env.get_me()).json()
+        assert body["plan"] is None and body["ai_test"] is False
+
+        async with env.sessions() as db:
+            user = await db.get(User, "10000001")
+            user.status = AccountStatus.suspended
+            await db.commit()
+        assert (await env.get_me()).status_code == 401
+
+        # Raw SQL kabi hook'siz o'zgarishlar uchun explicit invalidatsiya
+        await ctx_mod.invalidate_user_context("10000001")
+        assert ctx_mod.get_user_context_stats()["entries"] == 0
+    finally:
+        await env.close()
+
+
+@pytest.mark.asyncio
+async def test_redis_tier_round_trips_user_snapshot():
+    env = await _Env().setup()
+    set_redis(fakeredis.aioredis.FakeRedis(decode_responses=True))
+    settings.AUTH_CONTEXT_REDIS = True
+    try:
+        first = await ctx_mod.load_user_context("10000001")
+        ctx_mod._cache.clear()  # boshqa worker: LRU bo'sh, Redis'da bor
+        second = await ctx_mod.load_user_context("10000001")
+        assert ctx_mod.get_user_context_stats()["redis_hits"] == 1
+        assert second.user == first.user
+        assert second.user["role"] is UserRole.parent
+        assert second.subscription == first.subscription
+
+        await ctx_mod.invalidate_user_context("10000001")
+        await ctx_mod.load_user_context("10000001")
+        assert ctx_mod.get_user_context_stats()["misses"] == 2
+    finally:
+        settings.AUTH_CONTEXT_REDIS = False
+        set_redis(None)
+        await env.close()
+
+
+@pytest.mark.asyncio
+async def test_auth_secrets_are_never_cached():
+    env = await _Env().setup()
+    redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    set_redis(redis)
+    settings.AUTH_CONTEXT_REDIS = True
+    try:
+        async with env.sessions() as db:
+            user = await db.get(User, "10000001")
+            user.password_hash = "$2b$12$secret-hash"
+            user.refresh_token = "refresh-secret"
+            user.pin_code = "4321"
+            await db.commit()
+
+        ctx = await ctx_mod.load_user_context("10000001")
+        assert set(ctx.user) == set(ctx_mod.CONTEXT_FIELDS)
+        raw = await redis.get(ctx_mod.REDIS_PREFIX + "10000001")
+        for secret in ("secret-hash", "refresh-secret", "4321", "password_hash", "pin_code"):
+            assert secret not in raw
+        assert (await env.get_me()).json()["name"] == "Ali"
+    finally:
+        settings.AUTH_CONTEXT_REDIS = False
+        set_redis(None)
+        await env.close()
@@ -0,0 +1,210 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import BackgroundTasks, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from backend_loader import import_backend
+from shared.database.base import Base
+from shared.database.models.olympiad import OlympiadParticipant
+from shared.database.models.olympiad_stage import (
+    OlympiadStage, OlympiadStageFinalization, OlympiadStageResult, ScopeType,
+)
+
+finalization = import_backend("Olimp", "app.olimp.stage_finalization")
+multi_stage = import_backend("Olimp", "app.olimp.multi_stage_router")
+
+TABLES = [OlympiadParticipant.__table__, OlympiadStage.__table__, OlympiadStageResult.__table__,
+          OlympiadStageFinalization.__table__]
+
+
+def _legacy_finalize(stage, results, participants):
+    """Avvalgi finalize_stage algoritmi (Python'da guruhlash va saralash)"""
+    groups = {}
+    for r in results:
+        p = participants[r.participant_id]
+        if stage.scope_type == ScopeType.school:
+            key = f"{p.region}|{p.district}|{p.school_number}"
+        elif stage.scope_type == ScopeType.district:
+            key = f"{p.region}|{p.district}"
+        elif stage.scope_type == ScopeType.region:
+            key = f"{p.region}"
+        else:
+            key = "republic"
+        groups.setdefault(key, []).append(r)
+
+    ranks, current_stage, passed = {}, {}, 0
+    for members in groups.values():
+        ordered = sorted(members, key=lambda x: (-x.score, x.duration_seconds))
+        pass_count = finalization.calculate_passing_count(len(ordered), stage.passing_percent, stage.passing_min_count)
+        for i, r in enumerate(ordered):
+            ranks[r.id] = (i + 1, i < pass_count)
+            if i < pass_count:
+                current_stage[r.participant_id] = stage.stage_number + 1
+                passed += 1
+    return ranks, current_stage, len(groups), passed
+
+
+async def _setup(scope, participants=400, percent=30.0, min_count=2, seed=7):
+    engine = create_async_engine("sqlite+aiosqlite://")
+    factory = async_sessionmaker(engine, expire_on_commit=False, autoflush=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda c: Base.metadata.create_all(c, tables=TABLES))
+    rng = random.Random(seed)
+    async with factory() as db:
+        stage = OlympiadStage(id="st000001", olympiad_id="o0000001", stage_number=2, scope_type=scope,
+                              passing_percent=percent, passing_min_count=min_count)
+        db.add(stage)
+        for i in range(participants):
+            region = rng.choice(["Toshkent", "Samarqand", "Andijon", None])
+            db.add(OlympiadParticipant(
+                id=f"p{i:07d}", olympiad_id="o0000001", student_id=f"s{i:07d}", current_stage=2,
+                region=region, district=rng.choice(["Chilonzor", "Yunusobod", "Markaz"]),
+                school_number=rng.randint(1, 12),
+            ))
+            # Kam qiymatlar — teng score va teng vaqt ko'p
+            db.add(OlympiadStageResult(id=f"r{i:07d}", participant_id=f"p{i:07d}", stage_id="st000001",
+                                       score=float(rng.randint(0, 8) * 5), duration_seconds=rng.choice([60, 90, 120])))
+        await db.commit()
+    return engine, factory, stage
+
+
+async def _expected(factory, stage):
+    async with factory() as db:
+        results = (await db.execute(select(OlympiadStageResult).order_by(OlympiadStageResult.id))).scalars().all()
+        participants = {p.id: p for p in (await db.execute(select(OlympiadParticipant))).scalars().all()}
+    return _legacy_finalize(stage, results, participants)
+
+
+async def _actual(factory):
+    async with factory() as db:
+        ranks = {r.id: (r.rank_in_group, bool(r.is_passed))
+                 for r in (await db.execute(select(OlympiadStageResult))).scalars().all()}
+        stages = {p.id: p.current_stage for p in (await db.execute(select(OlympiadParticipant))).scalars().all()}
+    return ranks, {pid: value for pid, value in stages.items() if value == 3}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("scope", list(ScopeType))
+async def test_sql_finalization_matches_python_logic(scope):
+    engine, factory, stage = await _setup(scope)
+    try:
+        ranks, current_stage, groups, passed = await _expected(factory, stage)
+        async with factory() as db:
+            job = await finalization.enqueue_finalization(db, stage)
+        summary = await finalization.run_finalization(factory, job.id, chunk_rows=37)
+
+        assert await _actual(factory) == (ranks, current_stage)
+        assert summary["status"] == "completed" and summary["progress"] == 100.0
+        assert (summary["groups_count"], summary["groups_done"]) == (groups, groups)
+        assert (summary["total_passed"], summary["total_failed"]) == (passed, 400 - passed)
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_interrupted_job_resumes_from_cursor(monkeypatch):
+    engine, factory, stage = await _setup(ScopeType.school, percent=12.5, min_count=1)
+    apply_chunk = finalization.apply_chunk
+    calls, failures = [], []
+
+    async def flaky(db, stage_, conditions):
+        calls.append(len(calls))
+        if len(calls) == 3 and not failures:
+            failures.append(1)
+            raise RuntimeError("connection lost")
+        await apply_chunk(db, stage_, conditions)
+
+    monkeypatch.setattr(finalization, "apply_chunk", flaky)
+    try:
+        ranks, current_stage, groups, passed = await _expected(factory, stage)
+        async with factory() as db:
+            job = await finalization.enqueue_finalization(db, stage)
+        failed = await finalization.run_finalization(factory, job.id, chunk_rows=50)
+        assert failed["status"] == "failed" and "connection lost" in failed["error"]
+        assert 0 < failed["results_done"] < 400 and 0 < failed["progress"] < 100
+
+        # Ikkinchi urinish kursordan davom etadi: yozilgan bo'laklar qayta ishlanmaydi
+        calls.clear()
+        done = await finalization.run_finalization(factory, job.id, chunk_rows=50)
+        chunks = finalization.split_chunks(await _plan(factory, stage), 50)
+        assert len(calls) == len(chunks) - 2
+        assert done["status"] == "completed"
+        assert (done["groups_done"], done["total_passed"], done["results_done"]) == (groups, passed, 400)
+        assert await _actual(factory) == (ranks, current_stage)
+
+        # Tugagan job'ga qayta urinish hech narsa qilmaydi
+        assert (await finalization.run_finalization(factory, job.id))["status"] == "completed"
+    finally:
+        await engine.dispose()
+
+
+async def _plan(factory, stage):
+    async with factory() as db:
+        return await finalization.plan_groups(db, stage)
+
+
+@pytest.mark.asyncio
+async def test_endpoint_enqueues_background_job_and_reports_progress():
+    engine, factory, stage = await _setup(ScopeType.district, participants=20)
+    try:
+        async with factory() as db:
+            with pytest.raises(HTTPException) as error:
+                await multi_stage.get_finalization_status("o0000001", "st000001", db=db, _admin=True)
+            assert error.value.status_code == 404
+
+            tasks = BackgroundTasks()
+            response = await multi_stage.finalize_stage("o0000001", "st000001", tasks, db=db, _admin=True)
+            assert response["data"]["status"] == "pending" and len(tasks.tasks) == 1
+            job_id = response["data"]["job_id"]
+
+        await finalization.run_finalization(factory, job_id)
+        async with factory() as db:
+            status = await multi_stage.get_finalization_status("o0000001", "st000001", db=db, _admin=True)
+            assert status["data"]["status"] == "completed" and status["data"]["results_done"] == 20
+
+            # Qayta yakunlash — o'sha job noldan
+            tasks = BackgroundTasks()
+            again = await multi_stage.finalize_stage("o0000001", "st000001", tasks, db=db, _admin=True)
+            assert again["data"]["job_id"] == job_id and again["data"]["status"] == "pending"
+            assert again["data"]["results_done"] == 0 and len(tasks.tasks) == 1
+
+            with pytest.raises(HTTPException) as error:
+                await multi_stage.finalize_stage("o0000001", "missing1", BackgroundTasks(), db=db, _admin=True)
+            assert error.value.status_code == 404
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_post_on_running_job_schedules_and_claim_decides():
+    """A live running job is left alone; one with a stale heartbeat is taken over by the next POST"""
+    engine, factory, stage = await _setup(ScopeType.region, participants=20)
+    try:
+        async with factory() as db:
+            job = await finalization.enqueue_finalization(db, stage)
+            job.status = "running"
+            job.updated_at = datetime.now(timezone.utc)
+            await db.commit()
+            job_id = job.id
+
+            tasks = BackgroundTasks()
+            response = await multi_stage.finalize_stage("o0000001", "st000001", tasks, db=db, _admin=True)
+            assert response["data"]["status"] == "running" and len(tasks.tasks) == 1
+        assert (await finalization.run_finalization(factory, job_id))["status"] == "running"
+
+        async with factory() as db:
+            job = await db.get(finalization.OlympiadStageFinalization, job_id)
+            stale = timedelta(seconds=finalization.settings.STAGE_FINALIZE_STALE_SECONDS + 60)
+            job.updated_at = datetime.now(timezone.utc) - stale
+            await db.commit()
+
+            tasks = BackgroundTasks()
+            await multi_stage.finalize_stage("o0000001", "st000001", tasks, db=db, _admin=True)
+            assert len(tasks.tasks) == 1
+        done = await finalization.run_finalization(factory, job_id)
+        assert done["status"] == "completed" and done["results_done"] == 20
+    finally:
+        await engine.dispose()
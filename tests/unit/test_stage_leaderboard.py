@@ -0,0 +1,118 @@
+import random
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from backend_loader import import_backend
+from shared.database.base import Base
+from shared.database.models import StudentProfile, User, UserRole
+from shared.database.models.olympiad import OlympiadParticipant
+from shared.database.models.olympiad_stage import (
+    OlympiadStage, OlympiadStageFinalization, OlympiadStageResult, ScopeType,
+)
+
+finalization = import_backend("Olimp", "app.olimp.stage_finalization")
+multi_stage = import_backend("Olimp", "app.olimp.multi_stage_router")
+
+TABLES = [User.__table__, StudentProfile.__table__, OlympiadParticipant.__table__, OlympiadStage.__table__,
+          OlympiadStageResult.__table__, OlympiadStageFinalization.__table__]
+
+
+async def _setup(scope, students=300, seed=3):
+    engine = create_async_engine("sqlite+aiosqlite://")
+    factory = async_sessionmaker(engine, expire_on_commit=False, autoflush=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda c: Base.metadata.create_all(c, tables=TABLES))
+    rng = random.Random(seed)
+    async with factory() as db:
+        db.add(OlympiadStage(id="st000001", olympiad_id="o0000001", stage_number=1, scope_type=scope))
+        for i in range(students):
+            db.add(User(id=f"u{i:07d}", first_name="Ism", last_name=str(i), role=UserRole.student))
+            db.add(StudentProfile(id=f"s{i:07d}", user_id=f"u{i:07d}"))
+            db.add(OlympiadParticipant(
+                id=f"p{i:07d}", olympiad_id="o0000001", student_id=f"s{i:07d}",
+                region=rng.choice(["Toshkent", "Samarqand", "Xorazm"]),
+                district=rng.choice(["Markaz", "Chilonzor"]), school_number=rng.randint(1, 4),
+            ))
+        await db.flush()
+        # Oxirgi 10 ta ishtirokchi bosqichda qatnashmagan
+        for i in range(students - 10):
+            # scope ustunlari berilmaydi — before_insert participant'dan to'ldiradi
+            db.add(OlympiadStageResult(id=f"r{i:07d}", participant_id=f"p{i:07d}", stage_id="st000001",
+                                       score=float(rng.randint(0, 6) * 10), duration_seconds=rng.choice([100, 200])))
+        await db.commit()
+    return engine, factory
+
+
+async def _legacy_leaderboard(factory, scope, student_id):
+    """Avvalgi get_stage_leaderboard: hammasini yuklab Python'da filtrlash va saralash"""
+    async with factory() as db:
+        results = (await db.execute(select(OlympiadStageResult).order_by(OlympiadStageResult.id))).scalars().all()
+        participants = {p.id: p for p in (await db.execute(select(OlympiadParticipant))).scalars().all()}
+    me = next(p for p in participants.values() if p.student_id == "s" + student_id[1:])
+    keys = finalization.SCOPE_KEYS[scope]
+    rows = [(r, participants[r.participant_id]) for r in results
+            if all(getattr(participants[r.participant_id], k) == getattr(me, k) for k in keys)]
+    rows.sort(key=lambda x: (-x[0].score, x[0].duration_seconds))
+    return [{
+        "rank": i + 1, "name": f"Ism {int(p.student_id[1:])}", "school_number": p.school_number,
+        "score": r.score, "duration_seconds": r.duration_seconds, "is_passed": r.is_passed, "is_me": p.id == me.id,
+    } for i, (r, p) in enumerate(rows)]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("scope", list(ScopeType))
+async def test_index_leaderboard_matches_full_sort(scope):
+    engine, factory = await _setup(scope)
+    try:
+        async with factory() as db:
+            for student in ["u0000000", "u0000007", "u0000123", "u0000289", "u0000295"]:
+                full = await _legacy_leaderboard(factory, scope, student)
+                response = await multi_stage.get_stage_leaderboard(
+                    "o0000001", "st000001", student_id=student, limit=5, around=2, db=db)
+                data = response["data"]
+                assert data["scope"] == scope.value and data["total"] == len(full)
+
+                mine = next((e["rank"] for e in full if e["is_me"]), None)
+                assert data["my_rank"] == mine
+                expected = set(range(1, min(5, len(full)) + 1))
+                if mine is not None:
+                    expected |= {r for r in range(mine - 2, mine + 3) if 1 <= r <= len(full)}
+                assert [e["rank"] for e in data["leaderboard"]] == sorted(expected)
+                assert data["leaderboard"] == [full[r - 1] for r in sorted(expected)]
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_finalization_resyncs_scope_and_leaderboard_shows_passes():
+    engine, factory = await _setup(ScopeType.school, students=40)
+    try:
+        async with factory() as db:
+            result = await db.get(OlympiadStageResult, "r0000000")
+            participant = await db.get(OlympiadParticipant, "p0000000")
+            assert (result.region, result.district, result.school_number) == \
+                (participant.region, participant.district, participant.school_number)
+            # Ishtirokchi maktabini tuzatdi — natijadagi nusxa finalize'da yangilanadi
+            participant.school_number = 99
+            stage = await db.get(OlympiadStage, "st000001")
+            await db.commit()
+            job = await finalization.enqueue_finalization(db, stage)
+        await finalization.run_finalization(factory, job.id)
+
+        async with factory() as db:
+            assert (await db.get(OlympiadStageResult, "r0000000")).school_number == 99
+            data = (await multi_stage.get_stage_leaderboard(
+                "o0000001", "st000001", student_id="u0000000", limit=10, around=3, db=db))["data"]
+            assert data["total"] == 1 and data["my_rank"] == 1
+            assert data["leaderboard"][0]["is_me"] and data["leaderboard"][0]["is_passed"]
+            assert data["leaderboard"][0]["school_number"] == 99
+
+            # student_id'siz — butun bosqich, faqat top-N
+            data = (await multi_stage.get_stage_leaderboard(
+                "o0000001", "st000001", limit=3, around=3, db=db))["data"]
+            assert data["total"] == 30 and data["my_rank"] is None
+            assert [e["rank"] for e in data["leaderboard"]] == [1, 2, 3]
+    finally:
+        await engine.dispose()
@@ -0,0 +1,127 @@
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from asgi_server import handle_lifespan, read_body, serve_asgi
+from shared.database.base import Base
+from shared.database.models import TelegramBroadcast, TelegramUser, User, UserRole
+from shared.services.telegram_broadcast import TelegramBroadcaster, TokenBucket
+
+TABLES = [User.__table__, TelegramUser.__table__, TelegramBroadcast.__table__]
+
+
+class MockTelegram:
+    """Local Bot API stand-in: 429 once for chat 1003, 403 for chat 1004, 200 otherwise"""
+
+    def __init__(self):
+        self.delivered = []
+        self.connections = set()
+        self.throttled = False
+
+    async def __call__(self, scope, receive, send):
+        if await handle_lifespan(scope, receive, send):
+            return
+        body = await read_body(receive)
+        self.connections.add(tuple(scope["client"]))
+        payload = json.loads(body)
+        chat_id = payload["chat_id"]
+        if chat_id == "1003" and not self.throttled:
+            self.throttled = True
+            status, result = 429, {"ok": False, "error_code": 429, "parameters": {"retry_after": 1}}
+        elif chat_id == "1004":
+            status, result = 403, {"ok": False, "error_code": 403, "description": "bot was blocked by the user"}
+        else:
+            self.delivered.append((chat_id, payload["text"]))
+            status, result = 200, {"ok": True, "result": {"message_id": len(self.delivered)}}
+        await send({"type": "http.response.start", "status": status,
+                    "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": json.dumps(result).encode()})
+
+
+async def _make_db():
+    db_engine = create_async_engine("sqlite+aiosqlite://")
+    async with db_engine.begin() as conn:
+        await conn.run_sync(lambda c: Base.metadata.create_all(c, tables=TABLES))
+    factory = async_sessionmaker(db_engine, expire_on_commit=False)
+    async with factory() as db:
+        for i in range(1, 41):
+            role = UserRole.parent if i % 2 else UserRole.student
+            db.add(User(id=f"u{i:07d}", first_name="Ism", last_name="Fam", role=role))
+            db.add(TelegramUser(id=f"t{i:07d}", user_id=f"u{i:07d}", telegram_chat_id=str(1000 + i),
+                                notifications_enabled=i != 5))
+        db.add(TelegramUser(id="t9999999", telegram_chat_id="9999"))  # bog'lanmagan
+        await db.commit()
+    return db_engine, factory
+
+
+@pytest.mark.asyncio
+async def test_broadcast_against_mock_server():
+    """Role join filter, 429 retry_after honoured, at most `concurrency` keep-alive connections"""
+    mock = MockTelegram()
+    db_engine, factory = await _make_db()
+    async with serve_asgi(mock) as base_url:
+        api_url = f"{base_url}/botTEST"
+        async with factory() as db:
+            broadcast = await TelegramBroadcaster.create(db, "Salom!", filter_type="parents")
+        assert broadcast.total == 19  # 20 ota-ona, bittasida bildirishnoma o'chiq
+
+        broadcaster = TelegramBroadcaster("TEST", api_url=api_url, concurrency=4, rate=1000, chunk_size=6)
+        started = asyncio.get_running_loop().time()
+        summary = await broadcaster.run(factory, broadcast.id)
+
+        assert asyncio.get_running_loop().time() - started >= 1  # retry_after
+        assert summary["status"] == "completed"
+        assert (summary["sent"], summary["failed"]) == (19, 0)
+        delivered = sorted(chat for chat, _ in mock.delivered)
+        assert delivered == sorted(str(1000 + i) for i in range(1, 41, 2) if i != 5)
+        assert len(mock.connections) <= 4
+    await db_engine.dispose()
+
+
+class _CrashingBroadcaster(TelegramBroadcaster):
+    async def _send_chunk(self, chat_ids, payload):
+        if chat_ids[0] > "1010":
+            raise RuntimeError("worker crashed")
+        return await super()._send_chunk(chat_ids, payload)
+
+
+@pytest.mark.asyncio
+async def test_crashed_broadcast_resumes_from_cursor():
+    """A failed run keeps its cursor; the next run sends only the rest (403 counted as failed)"""
+    mock = MockTelegram()
+    db_engine, factory = await _make_db()
+    async with serve_asgi(mock) as base_url:
+        api_url = f"{base_url}/botTEST"
+        async with factory() as db:
+            broadcast = await TelegramBroadcaster.create(db, "Yangilik", filter_type="all")
+        assert broadcast.total == 40
+
+        crashed = await _CrashingBroadcaster("TEST", api_url=api_url, rate=1000, chunk_size=10).run(
+            factory, broadcast.id)
+        assert crashed["status"] == "failed" and crashed["sent"] == 9  # 1-bo'lak: 1001..1011 (1005 o'chiq), 1004 -> 403
+
+        resumed = await TelegramBroadcaster("TEST", api_url=api_url, rate=1000, chunk_size=10).run(
+            factory, broadcast.id)
+        assert resumed["status"] == "completed"
+        chats = [chat for chat, _ in mock.delivered]
+        assert len(chats) == len(set(chats)) == 39  # hech kim ikki marta olmadi
+        assert (resumed["sent"], resumed["failed"]) == (39, 1)
+
+        # Tugagan broadcast qayta ishga tushmaydi
+        again = await TelegramBroadcaster("TEST", api_url=api_url, rate=1000).run(factory, broadcast.id)
+        assert again["status"] == "completed" and len(mock.delivered) == 39
+    await db_engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_limits_rate():
+    bucket = TokenBucket(rate=50, capacity=1)
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    for _ in range(11):
+        await bucket.acquire()
+    assert loop.time() - started >= 0.19
@@ -0,0 +1,191 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi import FastAPI, Request
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from asgi_server import handle_lifespan, read_body, serve_asgi
+from shared.database.base import Base
+from shared.database.models.audio_cache import AudioCache
+from shared.services import audio_cache_service as acs
+from shared.services import tts_render_service as tts
+
+STORY = ("Bir bor ekan, bir yo'q ekan. Tog' etagida kichkina qishloq bor ekan! "
+         "Qishloqda dono chol yashar ekan. U har kuni bolalarga ertak aytib berar ekan? "
+         "Bolalar esa uni diqqat bilan tinglar ekan.")
+
+
+class FakeTTS:
+    """Lokal TTS server: audio = b"<matn>"; birinchi bo'lakdan keyingilari gate ochilguncha kutadi"""
+
+    def __init__(self):
+        self.calls = []
+        self.gate = asyncio.Event()
+        self.gate.set()
+        self.first_text = None
+
+    async def __call__(self, scope, receive, send):
+        if await handle_lifespan(scope, receive, send):
+            return
+        text = json.loads(await read_body(receive))["text"]
+        self.calls.append(text)
+        if text != self.first_text:
+            await self.gate.wait()
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"audio/mpeg")]})
+        await send({"type": "http.response.body", "body": f"<{text}>".encode()})
+
+
+async def _setup(tmp_path, fake_url):
+    db_engine = create_async_engine("sqlite+aiosqlite://")
+    async with db_engine.begin() as conn:
+        await conn.run_sync(lambda c: Base.metadata.create_all(c, tables=[AudioCache.__table__]))
+    acs.reset_audio_cache()
+    acs.set_blob_store(acs.LocalDiskAudioStore(str(tmp_path)))
+    sessions = async_sessionmaker(db_engine, expire_on_commit=False)
+    upstream = httpx.AsyncClient(base_url=fake_url)
+
+    async def synthesize(text, language, voice):
+        resp = await upstream.post("/tts", json={"text": text, "language": language, "voice": voice})
+        resp.raise_for_status()
+        return resp.content
+
+    renderer = tts.TTSRenderer(synthesize, workers=3, session_factory=sessions)
+    app = FastAPI()
+
+    @app.get("/tts")
+    async def speak(request: Request, text: str):
+        async with sessions() as db:
+            return await renderer.audio_response(request, text, "uz", "female", db)
+
+    return db_engine, sessions, upstream, renderer, app
+
+
+async def _close(db_engine, upstream, renderer):
+    for task in renderer._tasks:
+        task.cancel()
+    await upstream.aclose()
+    acs.reset_audio_cache()
+    acs.set_blob_store(None)
+    await db_engine.dispose()
+
+
+def test_split_sentences_packs_and_splits_long_sentences():
+    assert tts.split_sentences("Salom.  Qalaysan?\nYaxshi!", max_chars=100) == ["Salom. Qalaysan? Yaxshi!"]
+    assert tts.split_sentences("Salom. Qalaysan? Yaxshi!", max_chars=10) == ["Salom.", "Qalaysan?", "Yaxshi!"]
+    long_sentence = " ".join(["so'z"] * 30)
+    parts = tts.split_sentences(long_sentence, max_chars=40)
+    assert all(len(p) <= 40 for p in parts) and " ".join(parts) == long_sentence
+
+
+@pytest.mark.asyncio
+async def test_streams_first_chunk_then_serves_cached_audio_with_etag_and_range(tmp_path, monkeypatch):
+    monkeypatch.setattr(tts, "TTS_CHUNK_MAX_CHARS", 60)
+    chunks = tts.split_sentences(STORY)
+    assert len(chunks) >= 3
+    expected = b"".join(f"<{c}>".encode() for c in chunks)
+
+    fake = FakeTTS()
+    fake.first_text = chunks[0]
+    async with serve_asgi(fake) as fake_url:
+        db_engine, sessions, upstream, renderer, app = await _setup(tmp_path, fake_url)
+        try:
+            async with serve_asgi(app) as base_url, httpx.AsyncClient(base_url=base_url) as client:
+                fake.gate.clear()
+                async with client.stream("GET", "/tts", params={"text": STORY}) as resp:
+                    assert resp.status_code == 200 and "etag" not in resp.headers
+                    stream = resp.aiter_raw()
+                    # Keyingi bo'laklar hali sintez qilinmoqda, birinchisi allaqachon keldi
+                    assert await asyncio.wait_for(stream.__anext__(), 2) == f"<{chunks[0]}>".encode()
+                    fake.gate.set()
+                    rest = b"".join([chunk async for chunk in stream])
+                assert f"<{chunks[0]}>".encode() + rest == expected
+                assert sorted(fake.calls) == sorted(chunks)
+
+                resp = await client.get("/tts", params={"text": STORY})
+                etag = resp.headers["etag"]
+                assert resp.content == expected and resp.headers["accept-ranges"] == "bytes"
+                assert len(fake.calls) == len(chunks)
+
+                resp = await client.get("/tts", params={"text": STORY}, headers={"Range": "bytes=3-9"})
+                assert resp.status_code == 206 and resp.content == expected[3:10]
+                assert resp.headers["content-range"] == f"bytes 3-9/{len(expected)}"
+
+                resp = await client.get("/tts", params={"text": STORY}, headers={"Range": f"bytes={len(expected)}-"})
+                assert resp.status_code == 416
+
+                resp = await client.get("/tts", params={"text": STORY}, headers={"If-None-Match": etag})
+                assert resp.status_code == 304
+
+                # Har bir bo'lak audio_cache'da bitta content-addressed qator
+                async with sessions() as db:
+                    rows = (await db.execute(select(func.count()).select_from(AudioCache))).scalar()
+                assert rows == len(chunks)
+        finally:
+            await _close(db_engine, upstream, renderer)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_plays_and_prerender_synthesize_each_chunk_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(tts, "TTS_CHUNK_MAX_CHARS", 60)
+    chunks = tts.split_sentences(STORY)
+    fake = FakeTTS()
+    async with serve_asgi(fake) as fake_url:
+        db_engine, sessions, upstream, renderer, app = await _setup(tmp_path, fake_url)
+        try:
+            async with serve_asgi(app) as base_url, httpx.AsyncClient(base_url=base_url) as client:
+                # Nashr paytida fon render'i va bir vaqtda butun sinf "play" bosadi
+                renderer.prerender(STORY, "uz", "female")
+                responses = await asyncio.gather(*[
+                    client.get("/tts", params={"text": STORY}) for _ in range(8)
+                ])
+                assert all(r.status_code == 200 for r in responses)
+                assert len({r.content for r in responses}) == 1
+                await renderer._queue.join()
+                assert sorted(fake.calls) == sorted(chunks)
+                assert renderer.stats["rendered"] == len(chunks)
+        finally:
+            await _close(db_engine, upstream, renderer)
+
+
+@pytest.mark.asyncio
+async def test_chunks_prerendered_by_one_service_are_hits_in_the_other(tmp_path, monkeypatch):
+    """MainPlatform and Lessions share audio_cache: without shared blob storage chunks stay inline, not per-container"""
+    monkeypatch.setattr(tts, "TTS_CHUNK_MAX_CHARS", 60)
+    monkeypatch.setattr(acs, "AUDIO_CACHE_STORAGE", "inline")
+    monkeypatch.setattr(acs, "AUDIO_CACHE_DIR", "")
+    chunks = tts.split_sentences(STORY)
+    db_engine = create_async_engine("sqlite+aiosqlite://")
+    async with db_engine.begin() as conn:
+        await conn.run_sync(lambda c: Base.metadata.create_all(c, tables=[AudioCache.__table__]))
+    acs.reset_audio_cache()
+    acs.set_blob_store(None)
+    sessions = async_sessionmaker(db_engine, expire_on_commit=False)
+
+    async def synthesize(text, language, voice):
+        return f"<{text}>".encode()
+
+    main_platform = tts.TTSRenderer(synthesize, workers=2, session_factory=sessions)
+    lessions = tts.TTSRenderer(synthesize, workers=2, session_factory=sessions)
+    try:
+        main_platform.prerender(STORY, "uz", "female")  # create_ertak
+        await main_platform._queue.join()
+        assert main_platform.stats["rendered"] == len(chunks)
+
+        acs._memory.clear()  # boshqa konteyner
+        lessions.prerender(STORY, "uz", "female")
+        await lessions._queue.join()
+        assert lessions.stats == {"rendered": 0, "cache_hits": len(chunks), "coalesced": 0, "failed": 0}
+
+        async with sessions() as db:
+            rows = (await db.execute(select(AudioCache.storage_key))).all()
+        assert len(rows) == len(chunks)
+        assert all(r.storage_key is None for r in rows) and list(tmp_path.iterdir()) == []
+    finally:
+        for task in main_platform._tasks + lessions._tasks:
+            task.cancel()
+        acs.reset_audio_cache()
+        await db_engine.dispose()
@@ -0,0 +1,66 @@
+import random
+
+import pytest
+
+from shared.services import word_alignment
+from shared.services.word_alignment import align_words, count_words, match_pairs, text_similarity, tokenize
+
+STORY = "Bir bor ekan, bir yo'q ekan. Kichkina bola kitob o'qishni yaxshi ko'rar ekan."
+
+
+def _lcs_length(a, b):
+    prev = [0] * (len(b) + 1)
+    for x in a:
+        cur = [0]
+        for j, y in enumerate(b):
+            cur.append(prev[j] + 1 if x == y else max(prev[j + 1], cur[j]))
+        prev = cur
+    return prev[-1]
+
+
+def test_normalizes_cyrillic_and_apostrophes():
+    assert tokenize("Бир йўқ экан, ер ғоз маъно") == ["bir", "yo'q", "ekan", "yer", "g'oz", "ma'no"]
+    assert tokenize("O‘qish g`oz tog' 'salom'") == ["o'qish", "g'oz", "tog'", "salom"]
+    assert count_words(STORY) == 13
+
+    alignment = align_words(STORY, "бир бор экан бир йўқ экан кичкина бола китоб ўқишни яхши кўрар экан")
+    assert alignment.correct == alignment.total_words == 13
+    assert alignment.ratio == 1.0
+    assert text_similarity("Тошкент шаҳри", "toshkent shahri") == 1.0
+
+
+def test_marks_substituted_skipped_and_truncated_words():
+    alignment = align_words(STORY, "bir bor ekan bir yoq ekan kichkina qiz kitob")
+    statuses = [(m.word, m.status, m.heard) for m in alignment.marks]
+    assert statuses[:5] == [("Bir", "correct", "bir"), ("bor", "correct", "bor"), ("ekan", "correct", "ekan"),
+                            ("bir", "correct", "bir"), ("yo'q", "substituted", "yoq")]
+    assert statuses[6:9] == [("Kichkina", "correct", "kichkina"), ("bola", "substituted", "qiz"),
+                             ("kitob", "correct", "kitob")]
+    # Yarmida to'xtagan — qolgani tashlab ketilgan
+    assert [m.status for m in alignment.marks[9:]] == ["skipped"] * 4
+    assert (alignment.correct, alignment.substituted, alignment.skipped) == (7, 2, 4)
+    assert alignment.marks_payload()[7] == {"word": "bola", "status": "substituted", "heard": "qiz"}
+
+    # Takrorlangan so'z — o'qish tartibi bo'yicha birinchisi mos keladi
+    assert [m.status for m in align_words("ekan bola ekan", "ekan").marks] == ["correct", "skipped", "skipped"]
+    assert align_words("", "bir").total_words == 0
+
+
+@pytest.mark.parametrize("myers_max_edits", [0, 64])
+def test_match_pairs_is_exact_lcs_on_random_corpus(monkeypatch, myers_max_edits):
+    # 0 — har doim bit-parallel; 64 — kam tahrirli holatlar Myers orqali
+    monkeypatch.setattr(word_alignment, "MYERS_MAX_EDITS", myers_max_edits)
+    rng = random.Random(20)
+    for _ in range(300):
+        vocab = rng.randint(1, 25)
+        ref = [rng.randrange(vocab) for _ in range(rng.randint(0, 150))]
+        hyp = [rng.randrange(vocab) if rng.random() < 0.1 else token for token in ref if rng.random() > 0.1]
+        if rng.random() < 0.3:
+            hyp = hyp[: len(hyp) // 2]
+        if rng.random() < 0.15:
+            hyp = [rng.randrange(vocab) for _ in range(rng.randint(0, 80))]
+
+        pairs = match_pairs(ref, hyp)
+        assert all(ref[i] == hyp[j] for i, j in pairs)
+        assert all(i1 < i2 and j1 < j2 for (i1, j1), (i2, j2) in zip(pairs, pairs[1:]))
+        assert len(pairs) == _lcs_length(ref, hyp)